@@ -13,6 +13,7 @@ import DeDriftAndResampleHCP7T_OneSubjectCompletionChecker
 import hcp.hcp7t.archive as hcp7t_archive
 import hcp.hcp7t.subject as hcp7t_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -62,6 +63,9 @@ def should_check(subject, scan, archive):
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # Get list of subjects to check
     subject_file_name = file_utils.get_subjects_file_name(__file__)
     _inform("Retrieving subject list from: " + subject_file_name)
@@ -100,39 +104,38 @@ if __name__ == "__main__":
 
         subject_results_dict = dict()
 
-        for scan_name in dedrift_scan_names_list:
+        # Check all the scans whose unprocessed resources exist at once
+        scans_to_check = [scan_name for scan_name in dedrift_scan_names_list
+                          if should_check(subject, scan_name, archive)]
 
-            scan_results_dict = dict()
+        # does the DeDriftAndResample resource exist?
+        if completion_checker.does_processed_resource_exist(archive, subject):
+            dedrift_resource_exists = "TRUE"
+            timestamp = os.path.getmtime(archive.DeDriftAndResample_processed_dir_name(subject))
+            dedrift_resource_date = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            scans_complete = completion_checker.is_processing_complete_for_scans(archive, subject, scans_to_check)
 
-            # Should we check for the MSMAllDeDrift resource
-            if should_check(subject, scan_name, archive):
+        else:
+            dedrift_resource_exists = "FALSE"
+            dedrift_resource_date = "N/A"
+            scans_complete = dict.fromkeys(scans_to_check, False)
 
-                # does the DeDriftAndResample resource exist?
-                if completion_checker.does_processed_resource_exist(archive, subject):
-                    dedrift_resource_exists = "TRUE"
-                    timestamp = os.path.getmtime(archive.DeDriftAndResample_processed_dir_name(subject))
-                    dedrift_resource_date = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        for scan_name in dedrift_scan_names_list:
 
-                    if completion_checker.is_processing_complete(archive, subject, scan_name):
-                        files_exist = "TRUE"
-                    else:
-                        files_exist = "FALSE"
+            scan_results_dict = dict()
 
-                else:
-                    dedrift_resource_exists = "FALSE"
-                    dedrift_resource_date = "N/A"
-                    files_exist = "FALSE"
+            if scan_name in scans_complete:
+                scan_results_dict['resource_exists'] = dedrift_resource_exists
+                scan_results_dict['resource_date'] = dedrift_resource_date
+                scan_results_dict['files_exist'] = "TRUE" if scans_complete[scan_name] else "FALSE"
 
             else:
                 # unprocessed resource does not exist
-                dedrift_resource_exists = "---"
-                dedrift_resource_date = "---"
-                files_exist = "---"
+                scan_results_dict['resource_exists'] = "---"
+                scan_results_dict['resource_date'] = "---"
+                scan_results_dict['files_exist'] = "---"
 
             scan_results_dict['resource_name'] = archive.DEDRIFT_AND_RESAMPLE_RESOURCE_NAME
-            scan_results_dict['resource_exists'] = dedrift_resource_exists
-            scan_results_dict['resource_date'] = dedrift_resource_date
-            scan_results_dict['files_exist'] = files_exist
             scan_results_dict['scan_name'] = scan_name
 
             subject_results_dict[scan_name] = scan_results_dict
@@ -14,6 +14,7 @@ import os
 # import of local modules
 import hcp.hcp7t.archive as hcp7t_archive
 import hcp.hcp7t.subject as hcp7t_subject
+import utils.file_utils as file_utils
 
 
 # authorship information
@@ -36,22 +37,12 @@ class DeDriftAndResampleHCP7T_OneSubjectCompletionChecker:
         dir_list = archive.available_DeDriftAndResample_processed_dirs(hcp7t_subject_info)
         return len(dir_list) > 0
 
-    def is_processing_complete(self, archive, hcp7t_subject_info, scan_name, verbose=False):
-
-        # If the output resource does not exist, then the DeDriftAndResampleHCP7T processing
-        # certainly has not been done.
-        if not self.does_processed_resource_exist(archive, hcp7t_subject_info):
-            return False
-
-        # If we reach here, then the processed resource at least exists.
-        # Next we need to check to see if the expected files exist for the specified scan.
-
-        # Build list of expected files
+    def subject_expected_files(self, archive, hcp7t_subject_info):
+        """List of the expected files that do not depend upon the scan (MNINonLinear, fsaverage_LR32k, and Native)."""
         results_dir = archive.DeDriftAndResample_processed_dir_name(hcp7t_subject_info)
         mni_nonlinear_dir = results_dir + os.sep + 'MNINonLinear'
         fsaverage_dir = mni_nonlinear_dir + os.sep + 'fsaverage_LR32k'
         native_dir = mni_nonlinear_dir + os.sep + 'Native'
-        results_scan_dir = mni_nonlinear_dir + os.sep + 'Results' + os.sep + archive.functional_scan_long_name(scan_name)
 
         file_name_list = []
 
@@ -91,10 +82,16 @@ class DeDriftAndResampleHCP7T_OneSubjectCompletionChecker:
                 file_name_list.append(native_dir + os.sep + hcp7t_subject_info.subject_id + '.' + side + '.' + surface + '.MSMAll.native.surf.gii')
         
         file_name_list.append(native_dir + os.sep + hcp7t_subject_info.subject_id + '.native.wb.spec')
-                              
-        # results_scan_dir
-        retinotopy_scans_count = len(archive.available_retinotopy_unproc_dirs(hcp7t_subject_info))
-        
+
+        return file_name_list
+
+    def scan_expected_files(self, archive, hcp7t_subject_info, scan_name, retinotopy_scans_count):
+        """List of the expected files in the Results directory for the specified scan."""
+        results_dir = archive.DeDriftAndResample_processed_dir_name(hcp7t_subject_info)
+        results_scan_dir = results_dir + os.sep + 'MNINonLinear' + os.sep + 'Results' + os.sep + archive.functional_scan_long_name(scan_name)
+
+        file_name_list = []
+
         if archive.is_concatenated_scan_name(scan_name):
             if retinotopy_scans_count == 6:
             
@@ -159,19 +156,43 @@ class DeDriftAndResampleHCP7T_OneSubjectCompletionChecker:
                                   '_s2_MSMAll.L.atlasroi.32k_fs_LR.func.gii')
             file_name_list.append(results_scan_dir + os.sep + archive.functional_scan_long_name(scan_name) +
                                   '_s2_MSMAll.R.atlasroi.32k_fs_LR.func.gii')
-            
-        # Now check to see if expected files actually exist
-        for file_name in file_name_list:
-            if verbose:
-                _inform("Checking for existence of file: " + file_name)
-            if os.path.isfile(file_name):
-                continue
-            # If we get here, the most recently checked file does not exist
-            _inform("FILE DOES NOT EXIST: " + file_name)
-            return False
-
-        # If we get here, all files that were checked exist
-        return True
+
+        return file_name_list
+
+    def is_processing_complete_for_scans(self, archive, hcp7t_subject_info, scan_name_list, verbose=False):
+        """Returns a dictionary of scan name to whether DeDriftAndResampleHCP7T processing is complete
+        for that scan, for all the scans in scan_name_list.
+
+        The expected files that do not depend upon the scan are checked once for all the scans, and
+        each directory is read once no matter how many of the expected files it holds.
+        """
+
+        # If the output resource does not exist, then the DeDriftAndResampleHCP7T processing
+        # certainly has not been done.
+        if not self.does_processed_resource_exist(archive, hcp7t_subject_info):
+            return dict.fromkeys(scan_name_list, False)
+
+        # If we reach here, then the processed resource at least exists.
+        # Next we need to check to see if the expected files exist for each scan.
+        listing = file_utils.DirectoryListing()
+
+        if not file_utils.do_all_files_exist(self.subject_expected_files(archive, hcp7t_subject_info),
+                                             verbose, listing=listing):
+            return dict.fromkeys(scan_name_list, False)
+
+        retinotopy_scans_count = None
+        completion = dict()
+        for scan_name in scan_name_list:
+            if retinotopy_scans_count is None and archive.is_concatenated_scan_name(scan_name):
+                retinotopy_scans_count = len(archive.available_retinotopy_unproc_dirs(hcp7t_subject_info))
+
+            file_name_list = self.scan_expected_files(archive, hcp7t_subject_info, scan_name, retinotopy_scans_count)
+            completion[scan_name] = file_utils.do_all_files_exist(file_name_list, verbose, listing=listing)
+
+        return completion
+
+    def is_processing_complete(self, archive, hcp7t_subject_info, scan_name, verbose=False):
+        return self.is_processing_complete_for_scans(archive, hcp7t_subject_info, [scan_name], verbose)[scan_name]
 
 
 def _simple_interactive_demo():
@@ -18,6 +18,7 @@ import hcp.hcp7t.subject as hcp7t_subject
 import utils.file_utils as file_utils
 import utils.my_configparser as my_configparser
 import utils.os_utils as os_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -60,7 +61,9 @@ class DeDriftAndResampleHcp7TBatchSubmitter(batch_submitter.BatchSubmitter):
         config = my_configparser.MyConfigParser()
         config.read(config_file_name)
 
-        # submit jobs for listed subjects
+        prepared_list = []
+
+        # configure a submitter for each of the listed subjects
         for subject in subject_list:
 
             put_server = 'http://db-shadow' + str(self.shadow_number) + '.nrg.mir:8080'
@@ -106,14 +109,24 @@ class DeDriftAndResampleHcp7TBatchSubmitter(batch_submitter.BatchSubmitter):
             one_subject_submitter.vmem_limit_gbs = vmem_limit
             one_subject_submitter.mem_limit_gbs = mem_limit
             
-            _debug("Use the 'one subject submitter' to submit the jobs for the current subject")
-            one_subject_submitter.submit_jobs()
+            prepared_list.append((subject, one_subject_submitter, None))
 
             self.increment_shadow_number()
 
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, self.get_parallel(config))
+        self.print_submission_summary(results)
+
+    def submit_prepared(self, submitter, processing_stage):
+        """Submit the jobs for one configured subject. These submitters have no processing stages."""
+        return submitter.submit_jobs()
+
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # Get environment variables
     scripts_home = os.getenv('SCRIPTS_HOME')
     if scripts_home is None:
@@ -14,6 +14,7 @@ import os
 # import of local modules
 import hcp.hcp7t.archive as hcp7t_archive
 import hcp.hcp7t.subject as hcp7t_subject
+import utils.file_utils as file_utils
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -35,21 +36,10 @@ class DeDriftAndResampleHCP7T_HighRes_OneSubjectCompletionChecker:
         dir_list = archive.available_DeDriftAndResample_HighRes_processed_dirs(hcp7t_subject_info)
         return len(dir_list) > 0
 
-    def is_processing_complete(self, archive, hcp7t_subject_info, scan_name, verbose=False):
-
-        # If the output resource does not exist, then the DeDriftAndResampleHCP7T_HighRest processing
-        # certainly has not been done.
-        if not self.does_processed_resource_exist(archive, hcp7t_subject_info):
-            return False
-
-        # If we reach here, then the processed resource at least exists.
-        # Next we need to check to see if the expected files exist for the specified scan.
-
-        # Build list of expected files
+    def subject_expected_files(self, archive, hcp7t_subject_info):
+        """List of the expected files that do not depend upon the scan (MNINonLinear, fsaverage_LR59k, Native, and T1w)."""
         file_name_list = []
 
-        results_dir = archive.DeDriftAndResample_HighRes_processed_dir_name(hcp7t_subject_info)
-
         mni_non_linear_dir = archive.DeDriftAndResample_HighRes_processed_dir_name(hcp7t_subject_info) + os.sep + 'MNINonLinear'
 
         prefix = mni_non_linear_dir + os.sep + hcp7t_subject_info.subject_id
@@ -117,6 +107,38 @@ class DeDriftAndResampleHCP7T_HighRes_OneSubjectCompletionChecker:
         file_name_list.append(prefix + '.R.sphere.1.6mm_MSMAll.native.surf.gii')
         file_name_list.append(prefix + '.SmoothedMyelinMap_BC_1.6mm_MSMAll.native.dscalar.nii')
 
+        t1w_dir = archive.DeDriftAndResample_HighRes_processed_dir_name(hcp7t_subject_info) + os.sep + 'T1w'
+        t1w_fsave_dir = t1w_dir + os.sep + 'fsaverage_LR59k'
+        t1w_native_dir = t1w_dir + os.sep + 'Native'
+
+        prefix = t1w_fsave_dir + os.sep + hcp7t_subject_info.subject_id
+        file_name_list.append(prefix + '.1.6mm_MSMAll.59k_fs_LR.wb.spec')
+        file_name_list.append(prefix + '.L.inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.L.midthickness_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.L.midthickness_1.6mm_MSMAll_va.59k_fs_LR.shape.gii')
+        file_name_list.append(prefix + '.L.pial_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.L.very_inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.L.white_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.midthickness_1.6mm_MSMAll_va.59k_fs_LR.dscalar.nii')
+        file_name_list.append(prefix + '.midthickness_1.6mm_MSMAll_va_norm.59k_fs_LR.dscalar.nii')
+        file_name_list.append(prefix + '.R.inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.R.midthickness_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.R.midthickness_1.6mm_MSMAll_va.59k_fs_LR.shape.gii')
+        file_name_list.append(prefix + '.R.pial_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.R.very_inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+        file_name_list.append(prefix + '.R.white_1.6mm_MSMAll.59k_fs_LR.surf.gii')
+            
+        prefix = t1w_native_dir + os.sep + hcp7t_subject_info.subject_id
+        file_name_list.append(prefix + '.native.wb.spec')
+
+        return file_name_list
+
+    def scan_expected_files(self, archive, hcp7t_subject_info, scan_name):
+        """List of the expected files in the Results directory for the specified scan."""
+        file_name_list = []
+
+        results_dir = archive.DeDriftAndResample_HighRes_processed_dir_name(hcp7t_subject_info)
+
         results_scan_dir = os.sep.join([results_dir,
                                         'MNINonLinear',
                                         'Results',
@@ -159,43 +181,38 @@ class DeDriftAndResampleHCP7T_HighRes_OneSubjectCompletionChecker:
             file_name_list.append(prefix + '_Atlas_1.6mm_mean.dscalar.nii')
             file_name_list.append(prefix + '_Atlas_1.6mm_MSMAll_mean.dscalar.nii')
 
+        return file_name_list
 
-        t1w_dir = archive.DeDriftAndResample_HighRes_processed_dir_name(hcp7t_subject_info) + os.sep + 'T1w'
-        t1w_fsave_dir = t1w_dir + os.sep + 'fsaverage_LR59k'
-        t1w_native_dir = t1w_dir + os.sep + 'Native'
+    def is_processing_complete_for_scans(self, archive, hcp7t_subject_info, scan_name_list, verbose=False):
+        """Returns a dictionary of scan name to whether DeDriftAndResampleHCP7T_HighRes processing is
+        complete for that scan, for all the scans in scan_name_list.
 
-        prefix = t1w_fsave_dir + os.sep + hcp7t_subject_info.subject_id
-        file_name_list.append(prefix + '.1.6mm_MSMAll.59k_fs_LR.wb.spec')
-        file_name_list.append(prefix + '.L.inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.L.midthickness_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.L.midthickness_1.6mm_MSMAll_va.59k_fs_LR.shape.gii')
-        file_name_list.append(prefix + '.L.pial_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.L.very_inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.L.white_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.midthickness_1.6mm_MSMAll_va.59k_fs_LR.dscalar.nii')
-        file_name_list.append(prefix + '.midthickness_1.6mm_MSMAll_va_norm.59k_fs_LR.dscalar.nii')
-        file_name_list.append(prefix + '.R.inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.R.midthickness_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.R.midthickness_1.6mm_MSMAll_va.59k_fs_LR.shape.gii')
-        file_name_list.append(prefix + '.R.pial_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.R.very_inflated_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-        file_name_list.append(prefix + '.R.white_1.6mm_MSMAll.59k_fs_LR.surf.gii')
-            
-        prefix = t1w_native_dir + os.sep + hcp7t_subject_info.subject_id
-        file_name_list.append(prefix + '.native.wb.spec')
-            
-        # Now check to see if expected files actually exist
-        for file_name in file_name_list:
-            if verbose:
-                _inform("Checking for existence of file: " + file_name)
-            if os.path.isfile(file_name):
-                continue
-            # If we get here, the most recently checked file does not exist
-            _inform("FILE DOES NOT EXIST: " + file_name)
-            return False
-
-        # If we get here, all files that were checked exist
-        return True
+        The expected files that do not depend upon the scan are checked once for all the scans, and
+        each directory is read once no matter how many of the expected files it holds.
+        """
+
+        # If the output resource does not exist, then the DeDriftAndResampleHCP7T_HighRes processing
+        # certainly has not been done.
+        if not self.does_processed_resource_exist(archive, hcp7t_subject_info):
+            return dict.fromkeys(scan_name_list, False)
+
+        # If we reach here, then the processed resource at least exists.
+        # Next we need to check to see if the expected files exist for each scan.
+        listing = file_utils.DirectoryListing()
+
+        if not file_utils.do_all_files_exist(self.subject_expected_files(archive, hcp7t_subject_info),
+                                             verbose, listing=listing):
+            return dict.fromkeys(scan_name_list, False)
+
+        completion = dict()
+        for scan_name in scan_name_list:
+            file_name_list = self.scan_expected_files(archive, hcp7t_subject_info, scan_name)
+            completion[scan_name] = file_utils.do_all_files_exist(file_name_list, verbose, listing=listing)
+
+        return completion
+
+    def is_processing_complete(self, archive, hcp7t_subject_info, scan_name, verbose=False):
+        return self.is_processing_complete_for_scans(archive, hcp7t_subject_info, [scan_name], verbose)[scan_name]
 
 
 def _simple_interactive_demo():
@@ -14,6 +14,7 @@ import hcp.hcp7t.archive as hcp7t_archive
 import hcp.hcp7t.diffusion_preprocessing.one_subject_completion_checker as one_subject_completion_checker
 import hcp.hcp7t.diffusion_preprocessing.output_size_checker as output_size_checker
 import hcp.hcp7t.subject as hcp7t_subject
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -28,6 +29,9 @@ def _inform(msg):
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # Get environment variables
     subject_files_dir = os.getenv('SUBJECT_FILES_DIR')
     if subject_files_dir is None:
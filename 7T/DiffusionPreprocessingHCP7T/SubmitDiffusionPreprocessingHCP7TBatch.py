@@ -21,6 +21,7 @@ import hcp.hcp7t.subject as hcp7t_subject
 import utils.file_utils as file_utils
 import utils.my_configparser as my_configparser
 import utils.os_utils as os_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -52,7 +53,9 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
         config = my_configparser.MyConfigParser()
         config.read(config_file_name)
 
-        # Submit jobs for listed subjects
+        prepared_list = []
+
+        # Configure a submitter for each of the listed subjects
         for subject in subject_list:
 
             put_server = 'http://db-shadow' + str(self.get_and_inc_shadow_number()) + '.nrg.mir:8080'
@@ -101,11 +104,22 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
             submitter.pe_dirs_spec = 'PAAP'
             submitter.put_server = put_server
 
-            submitter.submit_jobs()
+            prepared_list.append((subject, submitter, None))
+
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, self.get_parallel(config))
+        self.print_submission_summary(results)
+
+    def submit_prepared(self, submitter, processing_stage):
+        """Submit the jobs for one configured subject. These submitters have no processing stages."""
+        return submitter.submit_jobs()
 
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # Get Environment varialbles
     xnat_pbs_jobs_home = os.getenv('XNAT_PBS_JOBS')
     if not xnat_pbs_jobs_home:
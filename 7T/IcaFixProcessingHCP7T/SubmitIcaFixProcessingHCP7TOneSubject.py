@@ -76,9 +76,13 @@ class IcaFix7TOneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubm
         else:
             scan_list.append(scan)
 
+        # determine which scans are already FIX processed
+        if incomplete_only:
+            FIX_complete = self.archive.FIX_processing_complete_for_scans(subject_info, scan_list)
+
         # process specified scans
         for scan_name in scan_list:
-            if incomplete_only and self.archive.FIX_processing_complete(subject_info, scan_name):
+            if incomplete_only and FIX_complete[scan_name]:
                 inform("scan: " + scan_name + " is already FIX processed")
                 inform("Only submitting jobs for incomplete scans - skipping " + scan_name)
                 continue
@@ -11,6 +11,7 @@ import RepairIcaFixProcessingHCP7T_OneSubjectCompletionChecker
 import hcp.hcp7t.archive as hcp7t_archive
 import hcp.hcp7t.subject as hcp7t_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -50,6 +51,9 @@ def should_check(subject, scan, archive):
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # Get list of subjects to check
     subject_file_name = file_utils.get_subjects_file_name(__file__)
 
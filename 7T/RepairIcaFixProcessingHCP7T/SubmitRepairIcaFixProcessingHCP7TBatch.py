@@ -15,6 +15,7 @@ import hcp.hcp7t.subject as hcp7t_subject
 import utils.file_utils as file_utils
 import utils.my_configparser as my_configparser
 import utils.os_utils as os_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -51,7 +52,9 @@ class RepairIcaFixProcessing7TBatchSubmitter(batch_submitter.BatchSubmitter):
         config = my_configparser.MyConfigParser()
         config.read(config_file_name)
 
-        # submit jobs for listed subjects
+        prepared_list = []
+
+        # configure the submission for each of the listed subjects
         for subject in subject_list:
 
             put_server = 'http://db-shadow' + str(self._current_shadow_number) + '.nrg.mir:8080'
@@ -93,19 +96,33 @@ class RepairIcaFixProcessing7TBatchSubmitter(batch_submitter.BatchSubmitter):
                 scan_spec = scan
                 incomplete_only = False
 
-            # Use the "one subject submitter" to submit the jobs for the current subject
-            self._one_subject_submitter.submit_jobs(
+            submit_args = (
                 userid, password, 'https://' + os_utils.getenv_required('XNAT_PBS_JOBS_XNAT_SERVER'),
                 subject.project, subject.subject_id, subject.subject_id + '_7T',
                 subject.structural_reference_project, subject.subject_id + '_3T',
                 put_server, setup_file, 
                 incomplete_only, scan_spec, 
                 wall_time_limit, mem_limit, vmem_limit)
+            prepared_list.append((subject, self._one_subject_submitter, submit_args))
             
             self.increment_shadow_number()
-                
+
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, self.get_parallel(config))
+        self.print_submission_summary(results)
+
+    def submit_prepared(self, submitter, processing_stage):
+        """
+        Submit the jobs for one configured subject. The one subject submitter takes all of
+        the subject's settings as arguments, so processing_stage is that argument tuple.
+        """
+        return submitter.submit_jobs(*processing_stage)
+
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     scripts_home = os_utils.getenv_required('SCRIPTS_HOME')
     home = os_utils.getenv_required('HOME')
 
@@ -14,6 +14,7 @@ import hcp.hcp7t.archive as hcp7t_archive
 import hcp.hcp7t.resting_state_stats.one_subject_completion_checker as one_subject_completion_checker
 import hcp.hcp7t.subject as hcp7t_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -65,6 +66,9 @@ def _write_subject_info(subject, subject_results_dict, afile):
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # get list of subjects to check
     subject_file_name = file_utils.get_subjects_file_name(__file__)
     logger.info("Retrieving subject list from: " + subject_file_name)
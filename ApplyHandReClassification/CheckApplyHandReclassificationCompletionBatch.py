@@ -14,6 +14,7 @@ import hcp.hcp3t.applyhandreclassification.one_subject_completion_checker as one
 import hcp.hcp3t.archive as hcp3t_archive
 import hcp.hcp3t.subject as hcp3t_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -54,6 +55,9 @@ def _write_subject_info(output_file, project, subject_id, scan,
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # get list of subjects to check
     subject_file_name = file_utils.get_subjects_file_name(__file__)
     logger.info("Retrieving subject list from: " + subject_file_name)
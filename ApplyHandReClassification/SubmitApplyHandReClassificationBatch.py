@@ -15,6 +15,7 @@ import hcp.hcp3t.subject as hcp3t_subject
 import utils.file_utils as file_utils
 import utils.my_configparser as my_configparser
 import utils.os_utils as os_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -34,7 +35,9 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
 
     def submit_jobs(self, username, password, subject_list, config):
 
-        # submit jobs for the listed subjects
+        prepared_list = []
+
+        # configure a submitter for each of the listed subjects
         for subject in subject_list:
 
             put_server = 'http://db-shadow' + str(self.get_and_inc_shadow_number()) + '.nrg.mir:8080'
@@ -76,10 +79,17 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
             submitter.walltime_limit_hours = walltime_limit_hrs
             submitter.vmem_limit_gbs = vmem_limit_gbs
 
-            submitter.submit_jobs(processing_stage)
+            prepared_list.append((subject, submitter, processing_stage))
+
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, self.get_parallel(config))
+        self.print_submission_summary(results)
 
 if __name__ == '__main__':
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # get ConnectomeDB credentials
     userid = input("Connectome DB Username: ")
     password = getpass.getpass("Connectome DB Password: ")
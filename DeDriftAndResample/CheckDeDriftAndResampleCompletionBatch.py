@@ -13,6 +13,7 @@ import ccf.archive as ccf_archive
 import ccf.dedrift_and_resample.one_subject_completion_checker as one_subject_completion_checker
 import ccf.subject as ccf_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -54,6 +55,9 @@ def _write_subject_info(output_file, project, subject_id, path,
 
 if __name__ == "__main__":
 
+	# profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+	profiling.start_from_environment()
+
 	# get list of subjects to check
 	subject_file_name = 'subjectfiles' + os.sep + file_utils.get_subjects_file_name(__file__)
 	module_logger.info("Retrieving subject list from: " + subject_file_name)
@@ -15,6 +15,7 @@ import hcp.hcp3t.archive as hcp3t_archive
 import hcp.hcp3t.diffusion_preprocessing.one_subject_completion_checker as one_subject_completion_checker
 import hcp.hcp3t.diffusion_preprocessing.output_size_checker as output_size_checker
 import hcp.hcp3t.subject as hcp3t_subject
+import utils.profiling as profiling
 
 
 # authorship information
@@ -30,6 +31,9 @@ def _inform(msg):
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # Get list of subjects to check
     subject_file_name = 'CheckDiffusionPreprocessingHCPBatch.subjects'
     _inform("Retrieving subject list from: " + subject_file_name)
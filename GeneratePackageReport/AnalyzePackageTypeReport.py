@@ -23,7 +23,7 @@
 import argparse
 import csv
 import ast
-import scipy
+import statistics
 
 def show_retrieved_params( args ):
     print("\nInput Parameters")
@@ -88,7 +88,7 @@ class PackageStatus:
             if self.checksum_exists:
                 self.checksum_correct = parse_bool(self.checksum_correct_str)
             else:
-                self.checksum_correct = FALSE
+                self.checksum_correct = False
         elif (self.package_exists_str == "---"):
             self.package_exists = False
             self.package_size = 0
@@ -190,7 +190,7 @@ with open(args.input_file, 'r') as tsv:
             size_list.append(subject_status.package_size)
 
     if len(size_list) > 0:
-        median_package_size = scipy.median(size_list)
+        median_package_size = statistics.median(size_list)
     else:
         median_package_size = 0.0
 
@@ -86,36 +86,18 @@ main()
 	get_options $@
 
 	inform "Creating Content List"
-	pushd ${g_package_dir}
 
-	local content_list_file_name=${g_package_name}.ContentList.rst
-	touch ${content_list_file_name}
+	# the member names are read from the zip file's central directory and written in one go
+	source ${XNAT_PBS_JOBS}/shlib/utils.shlib
+	set_g_python_environment
+	source activate ${g_python_environment} 2>/dev/null
+	${XNAT_PBS_JOBS}/lib/utils/package_utils.py content-list "${g_package_dir}/${g_package_name}"
+	local result=$?
+	source deactivate 2>/dev/null
 
-	local package_file_line="Package File: :code:\`${g_package_name}\`"
-	local package_file_line_length=${#package_file_line}
-
-	# put title line in content list file
-	echo "" >> ${content_list_file_name}
-	echo "${package_file_line}" >> ${content_list_file_name}
-	for ((i=1; i<=${package_file_line_length}; i++)); do
-		echo -n "-" >> ${content_list_file_name}
-	done
-	echo "" >> ${content_list_file_name}
-	echo "" >> ${content_list_file_name}
-
-	# put sorted list of files in the content list file
-	echo "::" >> ${content_list_file_name}
-	echo "" >> ${content_list_file_name}
-
-	unzip -Z1 ${g_package_name} | sort > ${content_list_file_name}.files.tmp
-	files_list_from_file=( $( cat ${content_list_file_name}.files.tmp ) )
-	files_list="`echo "${files_list_from_file[@]}"`"
-	for file in ${files_list} ; do
-		echo "   ${file}" >> ${content_list_file_name}
-	done
-	rm -f ${content_list_file_name}.files.tmp
-
-	popd
+	if [ ${result} -ne 0 ]; then
+		abort "Unable to create content list for ${g_package_dir}/${g_package_name}"
+	fi
 }
 
 # Invoke the main function to get things started
@@ -16,6 +16,7 @@ import ccf.subject as ccf_subject
 import utils.file_utils as file_utils
 import utils.my_configparser as my_configparser
 import utils.os_utils as os_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -34,7 +35,9 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
 
 	def submit_jobs(self, username, password, subject_list, config):
 
-		# submit jobs for the listed subjects
+		prepared_list = []
+
+		# configure a submitter for each of the listed subjects
 		for subject in subject_list:
 
 			submitter = one_subject_job_submitter.OneSubjectJobSubmitter(
@@ -91,10 +94,16 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
 			submitter.vmem_limit_gbs = vmem_limit_gbs			
 			submitter.output_resource_suffix = output_resource_suffix
 
-			# submit jobs
-			submitter.submit_jobs(processing_stage)
+			prepared_list.append((subject, submitter, processing_stage))
+
+		# submit jobs
+		results = self.submit_prepared_jobs(prepared_list, self.get_parallel(config))
+		self.print_submission_summary(results)
 			
 if __name__ == '__main__':
+	# profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+	profiling.start_from_environment()
+
 	logging.config.fileConfig(
 		file_utils.get_logging_config_file_name(__file__),
 		disable_existing_loggers=False)
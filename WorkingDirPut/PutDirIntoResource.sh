@@ -92,6 +92,16 @@ Options: [ ] = optional, < > = user-supplied value
                              and the resulting zip file is sent to the XNAT SERVER
                              with a request to extract it into the specified resource.
 
+ [--parallel=<n>]          : Only used with --use-http. If n is greater than 1, the
+                             directory's contents are divided into size-balanced zip
+                             shards that are sent n at a time. The shards that have
+                             been sent are recorded in a journal file in the directory,
+                             so that running the same command again after a failure
+                             only sends the remaining shards. Once all shards are sent,
+                             the resource's file listing is checked against the directory.
+
+                             Defaults to 1 (a single zip file is sent)
+
 EOF
 }
 
@@ -112,9 +122,11 @@ get_options()
     unset g_dir
     unset g_force
     unset g_use_http
+    unset g_parallel
 
     # default values
     g_use_http="FALSE"
+    g_parallel=1
     g_reason="Unspecified"
     g_force="FALSE"
     
@@ -179,6 +191,10 @@ get_options()
                 g_use_http="TRUE"
                 index=$(( index + 1 ))
                 ;;
+            --parallel=*)
+                g_parallel=${argument/*=/""}
+                index=$(( index + 1 ))
+                ;;
             *)
                 usage
                 log_Err_Abort "unrecognized option: ${argument}"
@@ -269,6 +285,7 @@ get_options()
 
     log_Msg "g_force: ${g_force}"
     log_Msg "g_use_http: ${g_use_http}"
+    log_Msg "g_parallel: ${g_parallel}"
 
     if [ ${error_count} -gt 0 ]; then
         usage
@@ -354,25 +371,40 @@ main()
         fi
 
         if [ "${put_it}" = "TRUE" ]; then
-            zipped_file=$(basename ${g_dir}).zip
-            pushd ${g_dir}
-            zip_cmd="zip --recurse-paths --test ${zipped_file} ."
-            log_Msg "zip_cmd: ${zip_cmd}"
-            ${zip_cmd}
-
-            java_cmd=""
-            java_cmd+="java -Xmx1024m -jar ${data_client_jar}"
-            java_cmd+=" -u ${g_user}"
-            java_cmd+=" -p ${g_password}"
-            java_cmd+=" -m PUT"
-            java_cmd+=" -r ${resource_uri}"
-            java_cmd+=" -l ${zipped_file}"
-
-            log_Msg "Using java -Xmx1024m -jar ${data_client_jar} to PUT the file: ${zipped_file} into the resource: ${resource_uri}"
-            ${java_cmd}
-
-            rm ${zipped_file}           
-            popd
+            log_Msg "Activating Python 3"
+            set_g_python_environment
+            source activate ${g_python_environment} 2>&1
+
+            if [ "${g_parallel}" -gt 1 ]; then
+                # Send size-balanced zip shards concurrently, resuming from the journal
+                # left in the directory by any previous attempt
+                put_cmd=""
+                put_cmd+="${XNAT_PBS_JOBS}/lib/utils/sharded_put_dir.py"
+                put_cmd+=" --user=${g_user}"
+                put_cmd+=" --password=${g_password}"
+                put_cmd+=" --dir=${g_dir}"
+                put_cmd+=" --resource-url=${resource_url%/files/}"
+                put_cmd+=" --reason=${g_reason}"
+                put_cmd+=" --parallel=${g_parallel}"
+
+                log_Msg "Using sharded_put_dir.py to PUT the contents of: ${g_dir} into the resource: ${resource_url} ${g_parallel} shards at a time"
+            else
+                # Stream a zip of the directory straight into the PUT request instead of
+                # writing a zip file into the directory and then sending it
+                put_cmd=""
+                put_cmd+="${XNAT_PBS_JOBS}/lib/utils/stream_put_dir.py"
+                put_cmd+=" --user=${g_user}"
+                put_cmd+=" --password=${g_password}"
+                put_cmd+=" --dir=${g_dir}"
+                put_cmd+=" --resource-uri=${resource_uri}"
+
+                log_Msg "Using stream_put_dir.py to PUT the contents of: ${g_dir} into the resource: ${resource_uri}"
+            fi
+
+            # run as the condition of the if so that a failure reaches the abort under set -e
+            if ! ${put_cmd} ; then
+                log_Err_Abort "PUT of ${g_dir} failed"
+            fi
             
         else
             log_Msg "Did not attempt to put to resource: ${resource_uri}"
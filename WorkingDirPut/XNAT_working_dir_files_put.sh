@@ -41,6 +41,7 @@ if [ -z "${XNAT_PBS_JOBS}" ] ; then
 fi
 
 source ${XNAT_PBS_JOBS}/shlib/log.shlib  # Logging related functions
+source ${XNAT_PBS_JOBS}/shlib/utils.shlib  # Utility functions
 log_Msg "XNAT_PBS_JOBS: ${XNAT_PBS_JOBS}"
 
 if [ -z "${XNAT_PBS_JOBS_XNAT_SERVER}" ] ; then
@@ -385,11 +386,12 @@ main()
         rm -rf ${g_working_dir:?}/${g_subject}
     fi
 
-    # Mask password
-    files=$(find ${g_working_dir} -maxdepth 1 -print)
-    for file in ${files} ; do
-        ${XNAT_PBS_JOBS}/WorkingDirPut/mask_password.sh --password="${g_password}" --file="${file}" --verbose
-    done
+    # Mask password in the text files of the working directory
+    log_Msg "Activating Python 3"
+    set_g_python_environment
+    source activate ${g_python_environment} 2>&1
+
+    ${XNAT_PBS_JOBS}/lib/utils/mask_password.py --password="${g_password}" --dir="${g_working_dir}" --verbose
 
     # Push files into the DB
 
@@ -36,6 +36,7 @@ if [ -z "${XNAT_PBS_JOBS}" ] ; then
 fi
 
 source ${XNAT_PBS_JOBS}/shlib/log.shlib  # Logging related functions
+source ${XNAT_PBS_JOBS}/shlib/utils.shlib  # Utility functions
 log_Msg "XNAT_PBS_JOBS: ${XNAT_PBS_JOBS}"
 
 if [ -z "${XNAT_PBS_JOBS_XNAT_SERVER}" ] ; then
@@ -155,6 +156,16 @@ Options: [ ] = optional, < > = user-supplied-value
                                This value is only used if --use-http is NOT specified.
 
                                Defaults to 'data'
+
+ [--parallel-upload=<n>]     : Only used with --use-http. Upload the working directory
+                               as size-balanced zip shards, n at a time. The uploaded
+                               shards are recorded in a journal file in the working
+                               directory, and running this script again on the same
+                               working directory resumes the upload instead of deleting
+                               the resource and starting over.
+
+                               Defaults to the value of the XNAT_PBS_JOBS_PUT_PARALLEL
+                               environment variable, or 1 (a single upload) if it is not set.
  
 EOF
 }
@@ -178,6 +189,7 @@ get_options()
     unset g_use_http
     unset g_client_string
     unset g_server_string
+    unset g_parallel_upload
     
     # default values
     g_leave_subject_id_level="FALSE"
@@ -185,6 +197,7 @@ get_options()
     g_reason="Unspecified"
     g_client_string="HCP"
     g_server_string="data"
+    g_parallel_upload="${XNAT_PBS_JOBS_PUT_PARALLEL:-1}"
 
     # parse arguments
     local num_args=${#arguments[@]}
@@ -255,6 +268,10 @@ get_options()
                 g_server_string=${argument/*=/""}
                 index=$(( index + 1 ))
                 ;;
+            --parallel-upload=*)
+                g_parallel_upload=${argument/*=/""}
+                index=$(( index + 1 ))
+                ;;
             *)
                 usage
                 log_Err_Abort "unrecognized option: ${argument}"
@@ -355,6 +372,8 @@ get_options()
         fi
     fi
 
+    log_Msg "g_parallel_upload: ${g_parallel_upload}"
+
     if [ ${error_count} -gt 0 ]; then
         usage
         exit 1
@@ -377,37 +396,52 @@ main()
     fi
     log_Msg "resource: ${resource}"
 
-    # Delete previous resource
-    log_Msg "-------------------------------------------------"
-    log_Msg "Deleting previous resource"
-    log_Msg "-------------------------------------------------"
-    ${XNAT_PBS_JOBS}/WorkingDirPut/DeleteResource.sh \
-                    --user=${g_user} \
-                    --password=${g_password} \
-                    --server=${g_server} \
-                    --project=${g_project} \
-                    --subject=${g_subject} \
-                    --session=${g_session} \
-                    --resource=${resource} \
-                    --force
-
-    # Make processing job log files readable so they can be pushed into the database
-    chmod --recursive a+r ${g_working_dir}/*
-
-    # Move resulting files out of the subject-id directory (if not instructed to leave it.)
-    if [ "${g_leave_subject_id_level}" = "FALSE" ]; then
+    # A journal left by an interrupted sharded upload means the resource already
+    # holds part of this working directory, which has already been prepared
+    upload_journal="${g_working_dir}/.xnat_put_journal.json"
+    if [ "${g_use_http}" = "TRUE" ] && [ "${g_parallel_upload}" -gt 1 ] && [ -e "${upload_journal}" ]; then
         log_Msg "-------------------------------------------------"
-        log_Msg "Moving resulting files up one level out of the ${g_subject} directory in ${g_working_dir}"
+        log_Msg "Resuming upload recorded in: ${upload_journal}"
         log_Msg "-------------------------------------------------"
-        mv ${g_working_dir}/${g_subject}/* ${g_working_dir}
-        rm -rf ${g_working_dir:?}/${g_subject}
+        resuming="TRUE"
+    else
+        resuming="FALSE"
     fi
 
-    # Mask password
-    files=$(find ${g_working_dir} -maxdepth 1 -print)
-    for file in ${files} ; do
-        ${XNAT_PBS_JOBS}/WorkingDirPut/mask_password.sh --password="${g_password}" --file="${file}" --verbose
-    done
+    if [ "${resuming}" = "FALSE" ]; then
+        # Delete previous resource
+        log_Msg "-------------------------------------------------"
+        log_Msg "Deleting previous resource"
+        log_Msg "-------------------------------------------------"
+        ${XNAT_PBS_JOBS}/WorkingDirPut/DeleteResource.sh \
+                        --user=${g_user} \
+                        --password=${g_password} \
+                        --server=${g_server} \
+                        --project=${g_project} \
+                        --subject=${g_subject} \
+                        --session=${g_session} \
+                        --resource=${resource} \
+                        --force
+
+        # Make processing job log files readable so they can be pushed into the database
+        chmod --recursive a+r ${g_working_dir}/*
+
+        # Move resulting files out of the subject-id directory (if not instructed to leave it.)
+        if [ "${g_leave_subject_id_level}" = "FALSE" ]; then
+            log_Msg "-------------------------------------------------"
+            log_Msg "Moving resulting files up one level out of the ${g_subject} directory in ${g_working_dir}"
+            log_Msg "-------------------------------------------------"
+            mv ${g_working_dir}/${g_subject}/* ${g_working_dir}
+            rm -rf ${g_working_dir:?}/${g_subject}
+        fi
+    fi
+
+    # Mask password in the text files of the working directory
+    log_Msg "Activating Python 3"
+    set_g_python_environment
+    source activate ${g_python_environment} 2>&1
+
+    ${XNAT_PBS_JOBS}/lib/utils/mask_password.py --password="${g_password}" --dir="${g_working_dir}" --verbose
 
     # Push the data into the DB
 
@@ -427,6 +461,7 @@ main()
                         --reason=${g_reason} \
                         --dir=${g_working_dir} \
                         --use-http \
+                        --parallel=${g_parallel_upload} \
                         --force
 
     else
@@ -13,6 +13,7 @@ import hcp.hcp3t.archive as hcp3t_archive
 import hcp.hcp3t.bedpostx.one_subject_completion_checker as one_subject_completion_checker
 import hcp.hcp3t.subject as hcp3t_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information 
 __author__ = "Timothy B. Brown"
@@ -32,6 +33,9 @@ DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 if __name__ == '__main__':
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # get list of subjects to check
     subject_file_name = file_utils.get_subjects_file_name(__file__)
     logger.info("Retrieving subject list from: " + subject_file_name)
@@ -13,6 +13,7 @@ import hcp.hcp3t.bedpostx.one_subject_package_job_submitter as one_subject_packa
 import hcp.hcp3t.subject as hcp3t_subject
 import utils.file_utils as file_utils
 import utils.my_configparser as my_configparser
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -30,6 +31,8 @@ class BatchPackagingSubmitter(batch_submitter.BatchSubmitter):
 
     def submit_jobs(self, subject_list, config):
 
+        prepared_list = []
+
         for subject in subject_list:
 
             server = 'http://db-shadow' + str(self.get_and_inc_shadow_number()) + '.nrg.mir:8080'
@@ -51,11 +54,18 @@ class BatchPackagingSubmitter(batch_submitter.BatchSubmitter):
             submitter.session = subject.subject_id + '_3T'
             submitter.server = server
 
-            submitter.submit_jobs(packaging_stage)
+            prepared_list.append((subject, submitter, packaging_stage))
+
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, self.get_parallel(config))
+        self.print_submission_summary(results)
 
 
 if __name__ == '__main__':
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # read the configuration file
     config_file_name = file_utils.get_config_file_name(__file__)
     logger.info("Reading configuration from file: " + config_file_name)
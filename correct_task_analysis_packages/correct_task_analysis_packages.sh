@@ -30,10 +30,42 @@ get_options()
 	done
 }
 
+# Write a copy of the package file in the output directory without the members for the other
+# tasks and smoothing levels, and its .md5 file, rewriting the package only once
+filter_package()
+{
+	local package_file=${1}
+	local output_dir=${2}
+	local exclude_options=""
+	local other
+
+	for other in ${other_tasks} ; do
+		exclude_options+=" --exclude=*${other}*"
+	done
+
+	for other in ${other_smoothing_levels} ; do
+		exclude_options+=" --exclude=*_s${other}*"
+	done
+
+	echo "exclude_options: ${exclude_options}"
+	set -f
+	${XNAT_PBS_JOBS}/lib/utils/package_utils.py filter ${package_file} --output-dir=${output_dir} ${exclude_options}
+	set +f
+}
+
 main()
 {
 	get_options $@
 
+	if [ -z "${XNAT_PBS_JOBS}" ]; then
+		echo "ERROR: XNAT_PBS_JOBS environment variable must be set"
+		exit 1
+	fi
+
+	source ${XNAT_PBS_JOBS}/shlib/utils.shlib
+	set_g_python_environment
+	source activate ${g_python_environment} 2>/dev/null
+
 	date
 
 	pushd /HCP/hcpdb/packages/live/${g_project}/${g_subject}
@@ -66,29 +98,7 @@ main()
 				new_dir="/HCP/hcpdb/packages/task_analysis_repair/${g_subject}/analysis_s${smoothing_level}"
 				mkdir -p ${new_dir}
 
-				new_file=${new_dir}/${extension_file}
-				cp ${extension_file} ${new_file}
-
-				for other_task in ${other_tasks} ; do
-					echo "other_task: ${other_task}"
-					some_to_remove=`unzip -l ${new_file} | grep "${other_task}"`
-					echo -e "some_to_remove:\n${some_to_remove}"
-					if [ ! -z "${some_to_remove}" ] ; then
-						zip --verbose -d ${new_file} "*${other_task}*"
-					fi
-				done
-
-				for other_level in ${other_smoothing_levels} ; do
-					echo "other_level: ${other_level}"
-					some_to_remove=`unzip -l ${new_file} | grep "_s${other_level}"`
-					echo -e "some_to_remove:\n${some_to_remove}"
-					if [ ! -z "${some_to_remove}" ] ; then
-						zip --verbose -d ${new_file} "*_s${other_level}*"
-					fi
-				done
-
-				md5sum ${new_file} > ${new_file}.md5
-				chmod u=rw,g=rw,o=r ${new_file}.md5
+				filter_package ${extension_file} ${new_dir}
 			fi
 			echo ""
 			
@@ -105,29 +115,7 @@ main()
 				new_dir="/HCP/hcpdb/packages/task_analysis_repair/${g_subject}/analysis_s${smoothing_level}"
 				mkdir -p ${new_dir}
 
-				new_file=${new_dir}/${full_package_file}
-				cp ${full_package_file} ${new_file}
-
-				for other_task in ${other_tasks} ; do
-					echo "other_task: ${other_task}"
-					some_to_remove=`unzip -l ${new_file} | grep "${other_task}"`
-					echo -e "some_to_remove:\n${some_to_remove}"
-					if [ ! -z "${some_to_remove}" ] ; then
-						zip --verbose -d ${new_file} "*${other_task}*"
-					fi
-				done
-
-				for other_level in ${other_smoothing_levels} ; do
-					echo "other_level: ${other_level}"
-					some_to_remove=`unzip -l ${new_file} | grep "_s${other_level}"`
-					echo -e "some_to_remove:\n${some_to_remove}"
-					if [ ! -z "${some_to_remove}" ] ; then
-						zip --verbose -d ${new_file} "*_s${other_level}*"
-					fi
-				done
-
-				md5sum ${new_file} > ${new_file}.md5
-				chmod u=rw,g=rw,o=r ${new_file}.md5
+				filter_package ${full_package_file} ${new_dir}
 			fi
 			echo ""
 
@@ -139,6 +127,8 @@ main()
 
 	popd
 
+	source deactivate 2>/dev/null
+
 	date
 }
 
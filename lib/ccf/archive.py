@@ -22,7 +22,6 @@ __maintainer__ = "Timothy B. Brown"
 # create a module logger
 module_logger = logging.getLogger(__name__)
 module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
-module_logger.setLevel(logging.DEBUG)  # Note: This can be overidden by log file configuration
 
 
 class CcfArchive(object):
@@ -7,12 +7,18 @@ pipeline processing jobs for CCF projects.
 
 # import of built-in modules
 import abc
+import concurrent.futures
+import io
 import logging
 import random
+import sys
+import threading
 
 # import of third-party modules
 
 # import of local modules
+import ccf.one_subject_job_submitter as ccf_one_subject_job_submitter
+import ccf.shadow_selector as shadow_selector
 import utils.os_utils as os_utils
 
 # authorship information
@@ -25,6 +31,38 @@ module_logger = logging.getLogger(__name__)
 module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
 
 
+class _PerThreadStdout(object):
+    """
+    Stand-in for sys.stdout that lets each worker thread collect its own output so that
+    the output for each subject can be shown in subject order once all the submissions
+    are done.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self):
+        self._local.buffer = io.StringIO()
+
+    def release(self):
+        buffer = getattr(self._local, 'buffer', None)
+        self._local.buffer = None
+        return buffer.getvalue() if buffer else ''
+
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer:
+            return buffer.write(text)
+        return self._stream.write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
 class BatchSubmitter(abc.ABC):
     """
     This class is an abstract base class for classes that are used to submit jobs for
@@ -61,6 +99,7 @@ class BatchSubmitter(abc.ABC):
         """Construct a BatchSumitter"""
         self._archive = archive
         self._shadow_number = random.randint(self.MIN_SHADOW_NUMBER, self.MAX_SHADOW_NUMBER)
+        self._shadow_selector = None
 
     @property
     def shadow_number(self):
@@ -77,7 +116,33 @@ class BatchSubmitter(abc.ABC):
             self._shadow_number = self.MIN_SHADOW_NUMBER
         module_logger.debug("increment_shadow_number:  new shadow_number: " + str(self._shadow_number))
 
+    @property
+    def shadow_selector(self):
+        """
+        ShadowSelector used to weight shadow server assignment by each server's health
+        and capacity. None if the shadow server URLs cannot be determined, in which case
+        shadow numbers are assigned by plain round robin.
+        """
+        if self._shadow_selector is None and shadow_selector.probing_enabled():
+            try:
+                url_prefix = self.get_shadow_prefix()
+            except ValueError as e:
+                module_logger.warning("Not probing shadow servers: " + str(e))
+                return None
+
+            self._shadow_selector = shadow_selector.ShadowSelector(
+                self.MIN_SHADOW_NUMBER, self.MAX_SHADOW_NUMBER,
+                start_number=self._shadow_number,
+                url_prefix=url_prefix, url_suffix=self.get_shadow_suffix(),
+                bad_shadow_list=self.BAD_SHADOW_LIST)
+
+        return self._shadow_selector
+
     def get_and_inc_shadow_number(self):
+        selector = self.shadow_selector
+        if selector:
+            return selector.next_shadow_number()
+
         current = self.shadow_number
         self.increment_shadow_number()
         if current in self.BAD_SHADOW_LIST:
@@ -99,6 +164,111 @@ class BatchSubmitter(abc.ABC):
     def get_shadow_suffix(self):
         return '.nrg.mir:8080'
         
+    def submit_prepared_jobs(self, prepared_list, parallel=1):
+        """
+        Submit jobs for a batch of subjects whose one subject submitters are already configured.
+
+        prepared_list is a list of (subject, submitter, processing_stage) tuples. Everything
+        that must be deterministic (e.g. shadow server assignment) should be done while
+        building that list, in subject order. Each submission is made by submit_prepared.
+
+        The job scripts of all the subjects with CCF one subject submitters are created
+        first, in one pass (see ccf.one_subject_job_submitter.create_scripts_for_batch).
+        Other submitters create their own scripts when submitted. If parallel is greater
+        than 1, up to that many subjects then have their job chains submitted concurrently.
+        Anything a submission prints is held until it finishes and is returned with its
+        result, so nothing is interleaved.
+
+        Returns a list of (subject, submitted_job_list, output, error) tuples in the same
+        order as prepared_list. In serial mode a failed submission raises as it always has.
+        In parallel mode the error is returned instead, so that one failed subject does not
+        prevent the rest of the batch from being submitted.
+        """
+        ccf_one_subject_job_submitter.create_scripts_for_batch(
+            [(submitter, processing_stage) for subject, submitter, processing_stage in prepared_list
+             if isinstance(submitter, ccf_one_subject_job_submitter.OneSubjectJobSubmitter)])
+
+        if parallel <= 1:
+            results = []
+            for subject, submitter, processing_stage in prepared_list:
+                submitted_job_list = self.submit_prepared(submitter, processing_stage)
+                results.append((subject, submitted_job_list, '', None))
+            self.wait_for_jobs(prepared_list)
+            return results
+
+        original_stdout = sys.stdout
+        per_thread_stdout = _PerThreadStdout(original_stdout)
+
+        def submit_one(submitter, processing_stage):
+            per_thread_stdout.capture()
+            try:
+                return self.submit_prepared(submitter, processing_stage), per_thread_stdout.release(), None
+            except Exception as e:
+                module_logger.debug("submission failed: " + str(e))
+                return None, per_thread_stdout.release(), e
+
+        sys.stdout = per_thread_stdout
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+                futures = [executor.submit(submit_one, submitter, processing_stage)
+                           for subject, submitter, processing_stage in prepared_list]
+                outcomes = [future.result() for future in futures]
+        finally:
+            sys.stdout = original_stdout
+
+        self.wait_for_jobs(prepared_list)
+        return [(prepared[0],) + outcome for prepared, outcome in zip(prepared_list, outcomes)]
+
+    def submit_prepared(self, submitter, processing_stage):
+        """
+        Submit the jobs of one prepared subject and return the list of submitted jobs (None
+        if the submitter does not report them). Batch submitters whose one subject submitters
+        are called differently override this.
+        """
+        return submitter.submit_jobs(processing_stage)
+
+    def get_parallel(self, config):
+        """
+        Number of subjects to submit concurrently for batch submitters that are configured
+        only by a configuration file. This is the Parallel value in the DEFAULT section of
+        that file, or 1 if it is not set.
+        """
+        return config['DEFAULT'].getint('Parallel', fallback=1)
+
+    def wait_for_jobs(self, prepared_list):
+        """
+        Wait for the jobs submitted by each submitter's scheduler. This only blocks for
+        schedulers that run the jobs in this process (e.g. the local scheduler), so that
+        whole job chains have run before the batch submission finishes. Submitters without
+        a scheduler submit their jobs directly and are not waited for.
+        """
+        schedulers = []
+        for subject, submitter, processing_stage in prepared_list:
+            scheduler = getattr(submitter, 'scheduler', None)
+            if scheduler and scheduler not in schedulers:
+                schedulers.append(scheduler)
+
+        for scheduler in schedulers:
+            scheduler.wait()
+
+    def print_submission_summary(self, results):
+        """
+        Show the jobs submitted (or the error encountered) for each subject, in subject order.
+        """
+        for subject, submitted_job_list, output, error in results:
+            print("-----")
+            print("\tsubject:", str(subject))
+            if output:
+                print(output, end='')
+            if error:
+                print("\tSUBMISSION FAILED:", str(error))
+            elif submitted_job_list is None:
+                print("\tsubmitted jobs: (not reported)")
+            else:
+                for job in submitted_job_list:
+                    print("\tsubmitted jobs:", job)
+        print("-----")
+
     @abc.abstractmethod
     def submit_jobs(self, subject_list):
         """
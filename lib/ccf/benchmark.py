@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+
+"""
+ccf/benchmark.py: Benchmarks of the archive scanning, completion checking, data staging,
+and packaging operations, run against a synthetic archive (see ccf/synthetic_archive.py).
+
+Each benchmark is run in a separate Python process, so that the peak resident set size
+it reports belongs to that benchmark alone. A benchmark has an untimed setup step and a
+timed step. For the timed step the following are recorded:
+
+  wall_seconds  elapsed time (the minimum over the repetitions)
+  calls         number of calls to file system functions of the os module and to open
+                (counted by wrapping those functions, so work done by other programs,
+                e.g. rsync, is not included)
+  syscalls      total system calls made by the benchmark process and its children, as
+                summarized by strace -c (only with --strace; includes interpreter startup
+                and setup, so only useful for comparison with a baseline run the same way)
+  peak_rss_kb   peak resident set size of the benchmark process
+
+Results can be saved as a baseline and later runs compared against it. A comparison
+fails (exit status 1) if any measure of any benchmark exceeds its baseline value by more
+than the tolerance.
+"""
+
+# import of built-in modules
+import argparse
+import collections
+import hashlib
+import importlib
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+# import of third-party modules
+
+# import of local modules
+import ccf.archive as ccf_archive
+import ccf.get_cinab_style_data as ccf_get_cinab_style_data
+import ccf.subject as ccf_subject
+import ccf.synthetic_archive as ccf_synthetic_archive
+import utils.my_argparse as my_argparse
+import utils.os_utils as os_utils
+import utils.profiling as profiling
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+PROJECT = 'BENCH'
+
+SUBJECT_LIST_FILE_NAME = 'subjects.txt'
+
+MEASURES = ('wall_seconds', 'calls', 'syscalls', 'peak_rss_kb')
+
+DEFAULT_TOLERANCE = 0.25
+
+# registered benchmarks: name to setup function, in the order registered
+BENCHMARKS = collections.OrderedDict()
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def benchmark(name):
+	"""
+	Register a benchmark. The decorated function is given a BenchmarkEnvironment, does
+	any setup, and returns the function to be timed.
+	"""
+	def register(setup):
+		BENCHMARKS[name] = setup
+		return setup
+	return register
+
+
+class BenchmarkEnvironment(object):
+	"""
+	What a benchmark works on: the synthetic archive described by a work directory and a
+	scratch directory of its own.
+	"""
+
+	def __init__(self, work_dir, scratch_dir):
+		self.work_dir = work_dir
+		self.scratch_dir = scratch_dir
+		os.environ['XNAT_PBS_JOBS_ARCHIVE_ROOT'] = archive_root(work_dir)
+
+		self.archive = ccf_archive.CcfArchive()
+
+		# one entry per subject and scan, as written by the synthetic archive generator
+		self.scan_infos = ccf_subject.read_subject_info_list(work_dir + os.sep + SUBJECT_LIST_FILE_NAME)
+		self.subject_infos = []
+		seen = set()
+		for scan_info in self.scan_infos:
+			if scan_info.subject_id not in seen:
+				seen.add(scan_info.subject_id)
+				self.subject_infos.append(ccf_subject.SubjectInfo(
+					scan_info.project, scan_info.subject_id, scan_info.classifier))
+
+	def scratch(self, name):
+		path = self.scratch_dir + os.sep + name
+		os.makedirs(path, exist_ok=True)
+		return path
+
+
+def archive_root(work_dir):
+	return work_dir + os.sep + 'archive'
+
+
+class SkipBenchmark(Exception):
+	"""Raised by a benchmark's setup when it cannot be run here."""
+	pass
+
+
+# benchmarks
+
+@benchmark('archive_available_queries')
+def _bench_archive_available_queries(env):
+	queries = [getattr(env.archive, name) for name in sorted(dir(env.archive)) if name.startswith('available_')]
+
+	def run():
+		for subject_info in env.subject_infos:
+			for query in queries:
+				query(subject_info)
+	return run
+
+
+def _completion_check(env, checker_module_name, subject_infos):
+	checker = importlib.import_module(checker_module_name).OneSubjectCompletionChecker()
+
+	def run():
+		for subject_info in subject_infos:
+			checker.is_processing_complete(env.archive, subject_info, False)
+	return run
+
+
+@benchmark('completion_check_structural_preprocessing')
+def _bench_completion_check_structural(env):
+	return _completion_check(env, 'ccf.structural_preprocessing.one_subject_completion_checker',
+							 env.subject_infos)
+
+
+@benchmark('completion_check_functional_preprocessing')
+def _bench_completion_check_functional(env):
+	return _completion_check(env, 'ccf.functional_preprocessing.one_subject_completion_checker',
+							 env.scan_infos)
+
+
+@benchmark('completion_check_diffusion_preprocessing')
+def _bench_completion_check_diffusion(env):
+	return _completion_check(env, 'ccf.diffusion_preprocessing.one_subject_completion_checker',
+							 env.subject_infos)
+
+
+def _retrieve(env, copy):
+	retriever = ccf_get_cinab_style_data.DataRetriever(env.archive)
+	retriever.copy = copy
+
+	def run():
+		for subject_info in env.subject_infos:
+			retriever.get_all_pipeline_data(subject_info, env.scratch(subject_info.subject_id))
+	return run
+
+
+@benchmark('retrieve_all_pipeline_data_link')
+def _bench_retrieve_link(env):
+	return _retrieve(env, False)
+
+
+@benchmark('retrieve_all_pipeline_data_copy')
+def _bench_retrieve_copy(env):
+	if not shutil.which('rsync'):
+		raise SkipBenchmark("rsync not found")
+	return _retrieve(env, True)
+
+
+@benchmark('lndir')
+def _bench_lndir(env):
+	def run():
+		for subject_info in env.subject_infos:
+			os_utils.lndir(env.archive.subject_resources_dir_full_path(subject_info),
+						   env.scratch(subject_info.subject_id))
+	return run
+
+
+def _package_name(env, subject_info):
+	return env.scratch('packages') + os.sep + subject_info.subject_id + '_3T_Structural_preproc.zip'
+
+
+def _create_package(env, subject_info):
+	# a package holds the subject directory of a resource, as made by the packaging scripts
+	resource_dir = env.archive.structural_preproc_dir_full_path(subject_info)
+	package_name = _package_name(env, subject_info)
+
+	with zipfile.ZipFile(package_name, 'w', zipfile.ZIP_DEFLATED) as package:
+		for root, dirs, files in os.walk(resource_dir + os.sep + subject_info.subject_id):
+			dirs.sort()
+			for name in sorted(files):
+				path = os.path.join(root, name)
+				package.write(path, os.path.relpath(path, resource_dir))
+
+	# checksum file in the form written by md5sum (see PackageUtils/create_checksum.sh)
+	with open(package_name + '.md5', 'w') as checksum_file:
+		checksum_file.write(_md5(package_name) + '  ' + package_name + '\n')
+
+
+def _md5(file_name):
+	md5 = hashlib.md5()
+	with open(file_name, 'rb') as source:
+		for block in iter(lambda: source.read(1024 * 1024), b''):
+			md5.update(block)
+	return md5.hexdigest()
+
+
+@benchmark('package_create')
+def _bench_package_create(env):
+	def run():
+		for subject_info in env.subject_infos:
+			_create_package(env, subject_info)
+	return run
+
+
+@benchmark('package_verify_checksum')
+def _bench_package_verify_checksum(env):
+	for subject_info in env.subject_infos:
+		_create_package(env, subject_info)
+
+	def run():
+		for subject_info in env.subject_infos:
+			package_name = _package_name(env, subject_info)
+			with open(package_name + '.md5') as checksum_file:
+				expected = checksum_file.read().split()[0]
+			if _md5(package_name) != expected:
+				raise ValueError("checksum mismatch: " + package_name)
+	return run
+
+
+# running
+
+def run_one(name, work_dir):
+	"""
+	Run the named benchmark in this process and return its result dictionary.
+	"""
+	scratch_dir = tempfile.mkdtemp(prefix=name + '.', dir=work_dir)
+	try:
+		env = BenchmarkEnvironment(work_dir, scratch_dir)
+		try:
+			timed = BENCHMARKS[name](env)
+		except SkipBenchmark as e:
+			return {'name': name, 'skipped': str(e)}
+
+		with profiling.counting_calls() as counter:
+			start_time = time.perf_counter()
+			timed()
+			wall_seconds = time.perf_counter() - start_time
+		counts = counter.totals()
+
+		return {
+			'name': name,
+			'wall_seconds': wall_seconds,
+			'calls': sum(counts.values()),
+			'calls_by_function': dict(counts),
+			'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+		}
+	finally:
+		shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def parse_strace_summary(text):
+	"""
+	Total number of system calls in the summary written by strace -c, or None if the
+	summary has no total line.
+	"""
+	for line in text.splitlines():
+		# % time, seconds, usecs/call, calls, [errors,] total
+		fields = line.split()
+		if len(fields) >= 5 and fields[-1] == 'total' and fields[3].isdigit():
+			return int(fields[3])
+	return None
+
+
+def run_in_child(name, work_dir, use_strace=False):
+	"""
+	Run the named benchmark in a new Python process and return its result dictionary.
+	"""
+	command = [sys.executable, os.path.abspath(__file__), '--work-dir', work_dir, '--run-one', name]
+	strace_file_name = None
+	if use_strace:
+		strace_file_name = work_dir + os.sep + name + '.strace'
+		command = ['strace', '-f', '-c', '-o', strace_file_name] + command
+
+	completed_process = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+	result = json.loads(completed_process.stdout.splitlines()[-1])
+
+	if strace_file_name:
+		with open(strace_file_name) as strace_file:
+			result['syscalls'] = parse_strace_summary(strace_file.read())
+		os.remove(strace_file_name)
+
+	return result
+
+
+def run_suite(names, work_dir, repeat=3, use_strace=False, report=_inform):
+	"""
+	Run each named benchmark repeat times and return a dictionary of name to combined
+	result: the minimum wall time and the maximum of the other measures.
+	"""
+	results = collections.OrderedDict()
+	for name in names:
+		runs = [run_in_child(name, work_dir, use_strace) for index in range(repeat)]
+		if 'skipped' in runs[0]:
+			report(name + ": skipped (" + runs[0]['skipped'] + ")")
+			results[name] = runs[0]
+			continue
+
+		combined = dict(runs[0])
+		combined['wall_seconds'] = min(run['wall_seconds'] for run in runs)
+		for measure in MEASURES[1:]:
+			values = [run[measure] for run in runs if run.get(measure) is not None]
+			if values:
+				combined[measure] = max(values)
+		results[name] = combined
+		report(format_result(combined))
+	return results
+
+
+def format_result(result):
+	text = "%-45s %10.4f s %10d calls %10d KB" % (
+		result['name'], result['wall_seconds'], result['calls'], result['peak_rss_kb'])
+	if result.get('syscalls') is not None:
+		text += " %10d syscalls" % result['syscalls']
+	return text
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+	"""
+	List of messages describing each measure of each benchmark that is more than
+	tolerance (a fraction) worse than in the baseline.
+	"""
+	regressions = []
+	for name, result in results.items():
+		base = baseline.get(name)
+		if not base or 'skipped' in result or 'skipped' in base:
+			continue
+		for measure in MEASURES:
+			if result.get(measure) is None or base.get(measure) is None:
+				continue
+			if result[measure] > base[measure] * (1.0 + tolerance):
+				regressions.append("%s %s: %s (baseline %s)" % (name, measure, result[measure], base[measure]))
+	return regressions
+
+
+def generate_archive(work_dir, subjects, scans, sparse_size=None, seed=0):
+	"""
+	Generate the synthetic archive and subject list the benchmarks use in work_dir.
+	"""
+	generator = ccf_synthetic_archive.SyntheticArchive(archive_root(work_dir), PROJECT, seed=seed,
+													   sparse_size=sparse_size)
+	subject_info_list = generator.generate(subjects, scans)
+	ccf_subject.write_subject_info_list(work_dir + os.sep + SUBJECT_LIST_FILE_NAME, subject_info_list)
+
+
+def main():
+	# create a parser object for getting the command line options
+	# (not profiled: profiling the benchmark processes would distort what they measure)
+	parser = my_argparse.MyArgumentParser(
+		description="Benchmark archive, completion check, staging, and packaging operations.",
+		profiling=False)
+
+	# optional arguments
+	parser.add_argument('-w', '--work-dir', dest='work_dir', required=False, type=str,
+						help="directory for the synthetic archive (default: a temporary directory)")
+	parser.add_argument('-n', '--subjects', dest='subjects', required=False, type=int, default=4)
+	parser.add_argument('-m', '--scans', dest='scans', required=False, type=int, default=4)
+	parser.add_argument('--sparse-size', dest='sparse_size', required=False, type=int)
+	parser.add_argument('-b', '--benchmark', dest='benchmarks', required=False, action='append',
+						help="benchmark to run (may be repeated, defaults to all)")
+	parser.add_argument('-r', '--repeat', dest='repeat', required=False, type=int, default=3)
+	parser.add_argument('--strace', dest='strace', action='store_true', required=False, default=False,
+						help="also count system calls with strace -c")
+	parser.add_argument('-o', '--output', dest='output', required=False, type=str,
+						help="file in which to write the results (usable as a baseline)")
+	parser.add_argument('-c', '--compare', dest='baseline', required=False, type=str,
+						help="baseline results file to compare against")
+	parser.add_argument('-t', '--tolerance', dest='tolerance', required=False, type=float,
+						default=DEFAULT_TOLERANCE)
+	parser.add_argument('-l', '--list', dest='list', action='store_true', required=False, default=False)
+	parser.add_argument('--run-one', dest='run_one', required=False, type=str, help=argparse.SUPPRESS)
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	if args.list:
+		for name in BENCHMARKS:
+			print(name)
+		return
+
+	if args.run_one:
+		print(json.dumps(run_one(args.run_one, args.work_dir)))
+		return
+
+	names = args.benchmarks if args.benchmarks else list(BENCHMARKS)
+	unknown = [name for name in names if name not in BENCHMARKS]
+	if unknown:
+		_inform("ERROR: unknown benchmark(s): " + ", ".join(unknown))
+		sys.exit(1)
+
+	if args.strace and not shutil.which('strace'):
+		_inform("ERROR: strace not found")
+		sys.exit(1)
+
+	work_dir = args.work_dir if args.work_dir else tempfile.mkdtemp(prefix='ccf_benchmark.')
+	work_dir = os.path.abspath(work_dir)
+	try:
+		if not os.path.exists(work_dir + os.sep + SUBJECT_LIST_FILE_NAME):
+			_inform("Generating archive of " + str(args.subjects) + " subjects with " +
+					str(args.scans) + " scans each in " + work_dir)
+			generate_archive(work_dir, args.subjects, args.scans, args.sparse_size)
+
+		results = run_suite(names, work_dir, args.repeat, args.strace)
+	finally:
+		if not args.work_dir:
+			shutil.rmtree(work_dir, ignore_errors=True)
+
+	if args.output:
+		with open(args.output, 'w') as output:
+			json.dump(results, output, indent=2, sort_keys=True)
+
+	if args.baseline:
+		with open(args.baseline) as baseline_file:
+			regressions = compare(results, json.load(baseline_file), args.tolerance)
+		for regression in regressions:
+			_inform("REGRESSION: " + regression)
+		if regressions:
+			sys.exit(1)
+		_inform("No regressions against " + args.baseline)
+
+
+if __name__ == '__main__':
+	main()
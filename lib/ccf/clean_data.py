@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""
+ccf/clean_data.py: Clean a pipeline's working directory before its results are put
+into the database.
+
+Everything in the subject directory that is not newer than the pipeline's .starttime
+file (i.e. data retrieved for the pipeline rather than produced by it) is removed, as
+are any XNAT catalog files anywhere in the working directory. Newly created or modified
+files are kept.
+
+The working directory is traversed once, using the status information returned with
+each directory listing where possible. Files are then removed in parallel, followed by
+the (now empty) directories that are not newer than the .starttime file. A JSON summary
+of the number and total size of the kept and removed entries is written at the end.
+"""
+
+# import of built-in modules
+import collections
+import concurrent.futures
+import json
+import logging
+import os
+import stat
+import time
+
+# import of third-party modules
+
+# import of local modules
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+CATALOG_FILE_SUFFIX = '_catalog.xml'
+
+DEFAULT_MAX_WORKERS = 16
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+class CleanPlan(object):
+	"""
+	What cleaning a working directory will keep and remove, as found by a single
+	traversal of the directory.
+	"""
+
+	def __init__(self):
+		# newly created or modified regular files
+		self.new_files = []
+		# entries other than directories to remove: (path, size, reason) tuples
+		self.removals = []
+		# directories to remove if empty, deepest first
+		self.directories = []
+		self.kept = collections.Counter()
+
+	def keep(self, size, is_new_file, path):
+		self.kept['count'] += 1
+		self.kept['bytes'] += size
+		if is_new_file:
+			self.new_files.append(path)
+
+
+def plan_clean(working_dir, subject_dir, starttime_ns):
+	"""
+	Traverse working_dir and return a CleanPlan.
+
+	Within subject_dir, entries (not following symbolic links) with a modification time
+	that is not after starttime_ns are stale. Catalog files are removed anywhere in
+	working_dir.
+	"""
+	plan = CleanPlan()
+	subject_dir = os.path.normpath(subject_dir)
+
+	def visit(directory, in_subject_dir):
+		with os.scandir(directory) as entries:
+			for entry in entries:
+				entry_stat = entry.stat(follow_symlinks=False)
+				is_dir = stat.S_ISDIR(entry_stat.st_mode)
+				in_subject = in_subject_dir or (is_dir and os.path.normpath(entry.path) == subject_dir)
+				stale = in_subject and entry_stat.st_mtime_ns <= starttime_ns
+
+				if is_dir:
+					visit(entry.path, in_subject)
+					if stale:
+						plan.directories.append(entry.path)
+				elif stale:
+					plan.removals.append((entry.path, entry_stat.st_size, 'stale'))
+				elif entry.name.endswith(CATALOG_FILE_SUFFIX):
+					plan.removals.append((entry.path, entry_stat.st_size, 'catalog'))
+				else:
+					plan.keep(entry_stat.st_size, in_subject and stat.S_ISREG(entry_stat.st_mode), entry.path)
+
+	visit(working_dir, os.path.normpath(working_dir) == subject_dir)
+	return plan
+
+
+def _remove(path):
+	try:
+		os.unlink(path)
+		return None
+	except FileNotFoundError:
+		return None
+	except OSError as e:
+		return str(e)
+
+
+def clean(working_dir, subject_dir, starttime_file_name, max_workers=DEFAULT_MAX_WORKERS):
+	"""
+	Clean working_dir as described above.
+
+	Returns a (summary dictionary, list of newly created or modified files) tuple.
+	Entries that cannot be removed are reported in the summary's errors list.
+	"""
+	start_time = time.time()
+	starttime_ns = os.stat(starttime_file_name).st_mtime_ns
+	plan = plan_clean(working_dir, subject_dir, starttime_ns)
+
+	removed = collections.defaultdict(collections.Counter)
+	errors = []
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		results = executor.map(_remove, [path for path, size, reason in plan.removals])
+		for (path, size, reason), error in zip(plan.removals, results):
+			if error:
+				errors.append(error)
+				plan.keep(size, False, path)
+			else:
+				removed[reason]['count'] += 1
+				removed[reason]['bytes'] += size
+
+	# directories were listed children first, so each is empty by the time it is reached
+	# unless it still holds newly created files
+	for directory in plan.directories:
+		try:
+			os.rmdir(directory)
+			removed['directories']['count'] += 1
+		except OSError:
+			pass
+
+	return {
+		'working_dir': working_dir,
+		'new_files': len(plan.new_files),
+		'kept': dict(plan.kept),
+		'removed': dict((reason, dict(counts)) for reason, counts in removed.items()),
+		'errors': errors,
+		'seconds': round(time.time() - start_time, 3),
+	}, plan.new_files
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Remove data not produced by a pipeline run from its working directory.")
+
+	# mandatory arguments
+	parser.add_argument('-w', '--working-dir', dest='working_dir', required=True, type=str)
+	parser.add_argument('-d', '--subject-dir', dest='subject_dir', required=True, type=str)
+	parser.add_argument('-t', '--starttime-file', dest='starttime_file', required=True, type=str)
+
+	# optional arguments
+	parser.add_argument('-s', '--summary', dest='summary', required=False, type=str,
+						help="file in which to write the JSON summary")
+	parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int,
+						default=DEFAULT_MAX_WORKERS, help="number of files to remove at once")
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	summary, new_files = clean(args.working_dir, args.subject_dir, args.starttime_file, args.parallel)
+
+	print("Newly created or modified files:")
+	for file_name in new_files:
+		print(file_name)
+
+	for error in summary['errors']:
+		_inform("ERROR: " + error)
+
+	summary_json = json.dumps(summary, sort_keys=True)
+	_inform("Summary: " + summary_json)
+	if args.summary:
+		with open(args.summary, 'w') as summary_file:
+			summary_file.write(summary_json + os.linesep)
+
+
+if __name__ == '__main__':
+	main()
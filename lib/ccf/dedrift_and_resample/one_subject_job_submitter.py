@@ -43,7 +43,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         return 1
 
     def create_work_script(self):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         script_name = self.work_script_name
 
@@ -95,26 +95,23 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         script.close()
         os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
 
-    def create_clean_data_script(self):
-        module_logger.debug(debug_utils.get_name())
-
-        # first create the "standard" version of the clean data script
-        super().create_clean_data_script()
+    def render_clean_data_script(self):
+        # start with the "standard" version of the clean data script
+        script_text = super().render_clean_data_script()
 
         # Add a statement to it to get rid of a bit more
-        script_name = self.clean_data_script_name
-
-        with open(script_name, "a") as script:
-            script.write('echo "Removing subdirectories for other subjects ')
-            script.write('and groups"' + os.linesep)
-            script.write('find ' + self.working_directory_name +
-                         ' -maxdepth 1 -type d -not -newer ' +
-                         self.starttime_file_name + ' -exec rm -rf {} \;')
-            script.write(os.linesep)
-            script.write('echo "Remaining files:"' + os.linesep)
-            script.write('find ' + self.working_directory_name + os.path.sep +
-                         self.subject + os.linesep)
+        script_text += 'echo "Removing subdirectories for other subjects '
+        script_text += 'and groups"' + os.linesep
+        script_text += ('find ' + self.working_directory_name +
+                        ' -maxdepth 1 -type d -not -newer ' +
+                        self.starttime_file_name + ' -exec rm -rf {} \\;')
+        script_text += os.linesep
+        script_text += 'echo "Remaining files:"' + os.linesep
+        script_text += ('find ' + self.working_directory_name + os.path.sep +
+                        self.subject + os.linesep)
+
+        return script_text
 
     def output_resource_name(self):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         return self.output_resource_suffix
@@ -10,6 +10,7 @@ import ccf.archive as ccf_archive
 import ccf.functional_preprocessing.one_subject_prereq_checker as one_subject_prereq_checker
 import ccf.subject as ccf_subject
 import utils.file_utils as file_utils
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -24,6 +25,9 @@ module_logger.setLevel(logging.INFO)
 
 if __name__ == "__main__":
 
+    # profile this program if XNAT_PBS_JOBS_PROFILE is set (see utils/profiling.py)
+    profiling.start_from_environment()
+
     # get list of subjects to check
     subject_file_name = file_utils.get_subjects_file_name(__file__)
     module_logger.info("Retrieving subject list from: " + subject_file_name)
@@ -29,13 +29,13 @@ from PyQt5.QtWidgets import qApp
 
 # import of local modules
 import ccf.archive as ccf_archive
-import ccf.functional_preprocessing.SubmitFunctionalPreprocessingBatch as SubmitFunctionalPreprocessingBatch
 import ccf.functional_preprocessing.one_subject_completion_checker as one_subject_completion_checker
 import ccf.functional_preprocessing.one_subject_prereq_checker as one_subject_prereq_checker
 import ccf.functional_preprocessing.one_subject_run_status_checker as one_subject_run_status_checker
 import ccf.subject as ccf_subject
 import qt_utils.login_dialog as login_dialog
 import utils.file_utils as file_utils
+import utils.lazy_import as lazy_import
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -47,6 +47,9 @@ module_logger = logging.getLogger(file_utils.get_logger_name(__file__))
 # Note: The following can be overridden by file configuration
 module_logger.setLevel(logging.INFO) 
 
+# the job submission code is only needed when processing is launched
+SubmitFunctionalPreprocessingBatch = lazy_import.lazy_module('ccf.functional_preprocessing.SubmitFunctionalPreprocessingBatch')
+
 DNM = "---"  # Does Not Matter
 NA = "N/A"  # Not Available
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
@@ -12,6 +12,7 @@ import ccf.functional_preprocessing.one_subject_job_submitter as one_subject_job
 import ccf.functional_preprocessing.one_subject_run_status_checker as one_subject_run_status_checker
 import ccf.subject as ccf_subject
 import utils.file_utils as file_utils
+import utils.my_argparse as my_argparse
 import utils.my_configparser as my_configparser
 import utils.os_utils as os_utils
 import utils.user_utils as user_utils
@@ -32,9 +33,11 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
     def __init__(self):
         super().__init__(ccf_archive.CcfArchive())
 
-    def submit_jobs(self, username, password, subject_list, config):
+    def submit_jobs(self, username, password, subject_list, config, parallel=1):
 
-        # submit jobs for the listed subject scans
+        prepared_list = []
+
+        # configure a submitter for each of the listed subject scans
         for subject in subject_list:
 
             run_status_checker = one_subject_run_status_checker.OneSubjectRunStatusChecker()
@@ -96,16 +99,14 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
             submitter.vmem_limit_gbs = vmem_limit_gbs
             submitter.output_resource_suffix = output_resource_suffix
 
-            # submit jobs
-            submitted_job_list = submitter.submit_jobs(processing_stage)
-
-            for job in submitted_job_list:
-                print("\tsubmitted jobs:", job)
+            prepared_list.append((subject, submitter, processing_stage))
 
-            print("-----")
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, parallel)
+        self.print_submission_summary(results)
 
             
-def do_submissions(userid, password, subject_list):
+def do_submissions(userid, password, subject_list, parallel=1):
 
     # read the configuration file
     config_file_name = file_utils.get_config_file_name(__file__)
@@ -115,7 +116,7 @@ def do_submissions(userid, password, subject_list):
     
     # process the subjects in the list
     batch_submitter = BatchSubmitter()
-    batch_submitter.submit_jobs(userid, password, subject_list, config)
+    batch_submitter.submit_jobs(userid, password, subject_list, config, parallel)
 
 
 if __name__ == '__main__':
@@ -124,6 +125,18 @@ if __name__ == '__main__':
         file_utils.get_logging_config_file_name(__file__),
         disable_existing_loggers=False)
 
+    parser = my_argparse.MyArgumentParser(
+        description="Batch mode submission of processing jobs for Functional Preprocessing")
+
+    # option arguments
+    #
+    # The --parallel or -p option specifies how many subject scans should have their
+    # scripts created and jobs submitted at the same time.
+    parser.add_argument('-p', '--parallel', dest='parallel', required=False, default=1, type=int)
+
+    # parse the command line arguments
+    args = parser.parse_args()
+
     # get Database credentials
     xnat_server = os_utils.getenv_required('XNAT_PBS_JOBS_XNAT_SERVER')
     userid, password = user_utils.get_credentials(xnat_server)
@@ -133,6 +146,6 @@ if __name__ == '__main__':
     print("Retrieving subject list from: " + subject_file_name)
     subject_list = ccf_subject.read_subject_info_list(subject_file_name, separator=":")
 
-    do_submissions(userid, password, subject_list)
+    do_submissions(userid, password, subject_list, args.parallel)
 
     
@@ -36,6 +36,15 @@ class OneSubjectCompletionChecker(one_subject_completion_checker.OneSubjectCompl
 		dirs.append(archive.structural_preproc_dir_full_path(subject_info))
 		return dirs
 
+	def image_references(self, archive, subject_info):
+		# the CIFTI dense time series must have as many time points as the volume time series
+		scan = subject_info.extra
+		results_scan_dir = os.sep.join([self.my_resource(archive, subject_info), subject_info.subject_id,
+										'MNINonLinear', 'Results', scan])
+		return {
+			os.sep.join([results_scan_dir, scan + '_Atlas.dtseries.nii']): os.sep.join([results_scan_dir, scan + '.nii.gz']),
+		}
+
 	def list_of_expected_files(self, archive, subject_info):
 
 		l = []
@@ -333,6 +342,8 @@ if __name__ == "__main__":
 	parser.add_argument('-o', '--output', dest='output', required=False, type=str)
 	parser.add_argument('-a', '--check-all', dest='check_all', action='store_true',
 						required=False, default=False)
+	parser.add_argument('-d', '--deep', dest='deep', action='store_true',
+						required=False, default=False)
 
 	# parse the command line arguments
 	args = parser.parse_args()
@@ -356,7 +367,8 @@ if __name__ == "__main__":
 			subject_info=subject_info,
 			verbose=args.verbose,
 			output=processing_output,
-			short_circuit=not args.check_all):
+			short_circuit=not args.check_all,
+			deep=args.deep):
 		print("Exiting with 0 code - Completion Check Successful")
 		exit(0)
 	else:
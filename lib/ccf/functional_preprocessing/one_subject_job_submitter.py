@@ -1,11 +1,8 @@
 #!/usr/bin/env python3
 
 # import of built-in modules
-import contextlib
 import logging
 import os
-import shutil
-import stat
 import subprocess
 
 # import of third-party modules
@@ -13,8 +10,8 @@ import subprocess
 # import of local modules
 import ccf.one_subject_job_submitter as one_subject_job_submitter
 import ccf.processing_stage as ccf_processing_stage
-import ccf.subject as ccf_subject
 import utils.debug_utils as debug_utils
+import utils.script_template as script_template
 import utils.str_utils as str_utils
 
 # authorship information
@@ -27,6 +24,23 @@ module_logger = logging.getLogger(__name__)
 # Note: This can be overidden by log file configuration
 module_logger.setLevel(logging.WARNING)
 
+PROCESS_DATA_TEMPLATE = one_subject_job_submitter.PBS_HEADER_TEMPLATE + """\
+{{process_data_program_path}} \\
+  --user={{username}} \\
+  --password={{password}} \\
+  --server={{server_name}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --session={{session}} \\
+  --scan={{scan}} \\
+  --session-classifier={{classifier}} \\
+  --dcmethod=TOPUP \\
+  --topupconfig=b02b0.cnf \\
+  --gdcoeffs=Prisma_3T_coeff_AS82.grad \\
+  --working-dir={{working_directory_name}} \\
+  --setup-script={{setup_file_name}}
+"""
+
 
 class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 
@@ -49,87 +63,31 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 	def WORK_PPN(self):
 		return 1
 
-	def create_process_data_job_script(self):
-		module_logger.debug(debug_utils.get_name())
-
-		# copy the .XNAT_PROCESS script to the working directory
-		processing_script_source_path = self.xnat_pbs_jobs_home
-		processing_script_source_path += os.sep + self.PIPELINE_NAME
-		processing_script_source_path += os.sep + self.PIPELINE_NAME
-		processing_script_source_path += '.XNAT_PROCESS'
-
-		processing_script_dest_path = self.working_directory_name
-		processing_script_dest_path += os.sep + self.PIPELINE_NAME
-		processing_script_dest_path += '.XNAT_PROCESS' 
-
-		shutil.copy(processing_script_source_path, processing_script_dest_path)
-		os.chmod(processing_script_dest_path, stat.S_IRWXU | stat.S_IRWXG)
-	   
-		# write the process data job script (that calls the .XNAT_PROCESS script)
-
-		subject_info = ccf_subject.SubjectInfo(self.project, self.subject,
-											   self.classifier, self.scan)
-
-		script_name = self.process_data_job_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		walltime_limit_str = str(self.walltime_limit_hours) + ':00:00'
-		vmem_limit_str = str(self.vmem_limit_gbs) + 'gb'
-
-		resources_line = '#PBS -l nodes=' + str(self.WORK_NODE_COUNT)
-		resources_line += ':ppn=' + str(self.WORK_PPN)
-		resources_line += ',walltime=' + walltime_limit_str
-		resources_line += ',mem=' + vmem_limit_str
-
-		stdout_line = '#PBS -o ' + self.working_directory_name
-		stderr_line = '#PBS -e ' + self.working_directory_name
-
-		xnat_pbs_setup_line = 'source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name()
-
-		script_line      = processing_script_dest_path
-		user_line        = '  --user=' + self.username
-		password_line    = '  --password=' + self.password
-		server_line      = '  --server=' + str_utils.get_server_name(self.server)
-		project_line     = '  --project=' + self.project
-		subject_line     = '  --subject=' + self.subject
-		session_line     = '  --session=' + self.session
-		scan_line        = '  --scan=' + self.scan
-		session_classifier_line = '  --session-classifier=' + self.classifier
-		dcmethod_line    = '  --dcmethod=TOPUP'
-		topupconfig_line = '  --topupconfig=b02b0.cnf'
-		gdcoeffs_line    = '  --gdcoeffs=Prisma_3T_coeff_AS82.grad'
-    
-		wdir_line  = '  --working-dir=' + self.working_directory_name
-		setup_line = '  --setup-script=' + self.setup_file_name
-		
-		with open(script_name, 'w') as script:
-			script.write(resources_line + os.linesep)
-			script.write(stdout_line + os.linesep)
-			script.write(stderr_line + os.linesep)
-			script.write(os.linesep)
-			script.write(xnat_pbs_setup_line + os.linesep)
-			script.write(os.linesep)
-			script.write(script_line +      ' \\' + os.linesep)
-			script.write(user_line +        ' \\' + os.linesep)
-			script.write(password_line +    ' \\' + os.linesep)
-			script.write(server_line +      ' \\' + os.linesep)
-			script.write(project_line +     ' \\' + os.linesep)
-			script.write(subject_line +     ' \\' + os.linesep)
-			script.write(session_line +     ' \\' + os.linesep)
-			script.write(scan_line +        ' \\' + os.linesep)
-			script.write(session_classifier_line + ' \\' + os.linesep)
-			script.write(dcmethod_line +    ' \\' + os.linesep)
-			script.write(topupconfig_line + ' \\' + os.linesep)
-			script.write(gdcoeffs_line +    ' \\' + os.linesep)
-			script.write(wdir_line + ' \\' + os.linesep)
-			script.write(setup_line + os.linesep)
-			
-			os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
-			
+	def render_process_data_job_script(self):
+		debug_utils.debug(module_logger)
+
+		resources = 'nodes=' + str(self.WORK_NODE_COUNT)
+		resources += ':ppn=' + str(self.WORK_PPN)
+		resources += ',walltime=' + str(self.walltime_limit_hours) + ':00:00'
+		resources += ',mem=' + str(self.vmem_limit_gbs) + 'gb'
+
+		context = self._pbs_header_context(resources, self.working_directory_name, bash_shell=False,
+										   stage='PROCESS_DATA')
+		context.update(process_data_program_path=self.process_data_program_path,
+					   username=self.username,
+					   password=self.password,
+					   server_name=str_utils.get_server_name(self.server),
+					   project=self.project,
+					   subject=self.subject,
+					   session=self.session,
+					   scan=self.scan,
+					   classifier=self.classifier,
+					   working_directory_name=self.working_directory_name,
+					   setup_file_name=self.setup_file_name)
+		return script_template.render(PROCESS_DATA_TEMPLATE, context)
+
 	def mark_running_status(self, stage):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage > ccf_processing_stage.ProcessingStage.PREPARE_SCRIPTS:
 			mark_cmd = self._xnat_pbs_jobs_home
@@ -6,6 +6,7 @@
 
 # import of local modules
 import ccf.one_subject_prereq_checker
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -18,6 +19,7 @@ class OneSubjectPrereqChecker(ccf.one_subject_prereq_checker.OneSubjectPrereqChe
     def __init__(self):
         super().__init__()
 
+    @profiling.operation('are_prereqs_met')
     def are_prereqs_met(self, archive, subject_info, verbose=False):
 
         struct_preproc_dir_paths = archive.available_structural_preproc_dir_full_paths(subject_info)
@@ -6,6 +6,7 @@ for a specified subject within a specified project.
 
 # import of built-in modules
 import abc
+import collections
 import glob
 import logging
 import logging.config
@@ -50,6 +51,14 @@ class DataRetriever(object):
         # or linked should be shown
         self._show_log = False
 
+        # indication of whether existing links to other files should be
+        # replaced when linking data into an existing directory
+        self._repair_links = False
+
+        # counts of the links created, kept, and repaired, and of the existing
+        # files skipped, when linking data
+        self._link_counts = collections.Counter()
+
     @property
     def archive(self):
         return self._archive
@@ -74,6 +83,20 @@ class DataRetriever(object):
             raise TypeError("show_log must be set to a boolean value")
         self._show_log = value
 
+    @property
+    def repair_links(self):
+        return self._repair_links
+
+    @repair_links.setter
+    def repair_links(self, value):
+        if not isinstance(value, bool):
+            raise TypeError("repair_links must be set to a boolean value")
+        self._repair_links = value
+
+    @property
+    def link_counts(self):
+        return self._link_counts
+
     def _from_to(self, get_from, put_to):
         os.makedirs(put_to, exist_ok=True)
         if self.copy:
@@ -83,49 +106,50 @@ class DataRetriever(object):
                 rsync_cmd = 'rsync -auL '
 
             rsync_cmd += get_from + os.sep + '*' + ' ' + put_to
-            module_logger.debug(debug_utils.get_name() + " rsync_cmd: " + rsync_cmd)
+            debug_utils.debug(module_logger, " rsync_cmd: %s", rsync_cmd)
 
             completed_rsync_process = subprocess.run(
                 rsync_cmd, shell=True, check=True, stdout=subprocess.PIPE,
                 universal_newlines=True)
-            module_logger.debug(debug_utils.get_name() + " stdout: " + completed_rsync_process.stdout)
+            debug_utils.debug(module_logger, " stdout: %s", completed_rsync_process.stdout)
 
         else:
-            module_logger.debug(debug_utils.get_name() + " linking " + put_to + " to " + get_from)
-            os_utils.lndir(get_from, put_to, self.show_log, ignore_existing_dst_files=True)
+            debug_utils.debug(module_logger, " linking %s to %s", put_to, get_from)
+            self._link_counts += os_utils.lndir(get_from, put_to, self.show_log, ignore_existing_dst_files=True,
+                                                repair_links=self.repair_links)
 
     # get unprocessed data
 
     def _get_unprocessed_data(self, directories, subject_info, output_dir):
         for directory in directories:
             get_from = directory
-            module_logger.debug(debug_utils.get_name() + " get_from: " + get_from)
+            debug_utils.debug(module_logger, " get_from: %s", get_from)
 
             last_sep_loc = get_from.rfind(os.sep)
             unproc_loc = get_from.rfind(self.archive.NAME_DELIMITER + self.archive.UNPROC_SUFFIX)
             sub_dir = get_from[last_sep_loc + 1:unproc_loc]
             put_to = output_dir + os.sep + subject_info.subject_id + os.sep + 'unprocessed'
             put_to += os.sep + subject_info.classifier + os.sep + sub_dir
-            module_logger.debug(debug_utils.get_name() + "   put_to: " + put_to)
+            debug_utils.debug(module_logger, "   put_to: %s", put_to)
 
             self._from_to(get_from, put_to)
 
     def get_structural_unproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_unprocessed_data(
             self.archive.available_structural_unproc_dir_full_paths(subject_info),
             subject_info,
             output_dir)
 
     def get_functional_unproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_unprocessed_data(
             self.archive.available_functional_unproc_dir_full_paths(subject_info),
             subject_info,
             output_dir)
 
     def get_diffusion_unproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_unprocessed_data(
             self.archive.available_diffusion_unproc_dir_full_paths(subject_info),
             subject_info,
@@ -141,33 +165,33 @@ class DataRetriever(object):
     def _get_preprocessed_data(self, directories, output_dir):
         for directory in directories:
             get_from = directory
-            module_logger.debug(debug_utils.get_name() + " get_from: " + get_from)
+            debug_utils.debug(module_logger, " get_from: %s", get_from)
 
             put_to = output_dir
-            module_logger.debug(debug_utils.get_name() + "   put_to: " + put_to)
+            debug_utils.debug(module_logger, "   put_to: %s", put_to)
 
             self._from_to(get_from, put_to)
 
     def get_structural_preproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_preprocessed_data(
             self.archive.available_structural_preproc_dir_full_paths(subject_info),
             output_dir)
 
     def get_supplemental_structural_preproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_preprocessed_data(
             self.archive.available_supplemental_structural_preproc_dir_full_paths(subject_info),
             output_dir)
 
     def get_functional_preproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_preprocessed_data(
             self.archive.available_functional_preproc_dir_full_paths(subject_info),
             output_dir)
 
     def get_diffusion_preproc_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self._get_preprocessed_data(
             self.archive.available_diffusion_preproc_dir_full_paths(subject_info),
             output_dir)
@@ -195,36 +219,36 @@ class DataRetriever(object):
     def _get_processed_data(self, directories, output_dir):
         for directory in directories:
             get_from = directory
-            module_logger.debug(debug_utils.get_name() + " get_from: " + get_from)
+            debug_utils.debug(module_logger, " get_from: %s", get_from)
 
             put_to = output_dir
-            module_logger.debug(debug_utils.get_name() + "   put_to: " + put_to)
+            debug_utils.debug(module_logger, "   put_to: %s", put_to)
 
             self._from_to(get_from, put_to)
 
     def get_msmall_registration_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         self._get_processed_data(
             self.archive.available_msmall_registration_dir_full_paths(subject_info),
             output_dir)
 
     def get_fix_processed_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         self._get_processed_data(
             self.archive.available_fix_processed_dir_full_paths(subject_info),
             output_dir)
 
     def get_dedriftandresample_processed_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         self._get_processed_data(
             self.archive.available_msmall_dedrift_and_resample_dir_full_paths(subject_info),
             output_dir)
 
     def get_resting_state_stats_data(self, subject_info, output_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         self._get_processed_data(
             self.archive.available_rss_processed_dir_full_paths(subject_info),
@@ -483,6 +507,8 @@ def main():
                         required=False, default=False)
     parser.add_argument('-r', '--remove-non-subdirs', dest='remove_non_subdirs', action='store_true',
                         required=False, default=False)
+    parser.add_argument('--repair-links', dest='repair_links', action='store_true',
+                        required=False, default=False)
 
     phase_choices = [
         "STRUCT_PREPROC_PREREQS", "struct_preproc_prereqs",
@@ -523,6 +549,8 @@ def main():
         module_logger.info("                Log: " + str(args.log))
     if args.remove_non_subdirs:
         module_logger.info(" Remove Non-Subdirs: " + str(args.remove_non_subdirs))
+    if args.repair_links:
+        module_logger.info("       Repair Links: " + str(args.repair_links))
 
     subject_info = ccf_subject.SubjectInfo(args.project, args.subject, args.session_classifier,
                                            args.scan)
@@ -531,6 +559,7 @@ def main():
     data_retriever = DataRetriever(archive)
     data_retriever.copy = args.copy
     data_retriever.show_log = args.log
+    data_retriever.repair_links = args.repair_links
 
     # retrieve data based on phase requested
     if args.phase == "STRUCT_PREPROC_PREREQS":
@@ -559,6 +588,12 @@ def main():
         # remove any non-subdirectory data at the output study directory level
         data_retriever.remove_non_subdirs(args.output_study_dir)
 
+    if not args.copy:
+        counts = data_retriever.link_counts
+        module_logger.info("Links created: " + str(counts['created']) + ", kept: " + str(counts['kept']) +
+                           ", repaired: " + str(counts['repaired']) + ", other existing entries skipped: " +
+                           str(counts['skipped']))
+
 if __name__ == '__main__':
     logging_config_file_name = file_utils.get_logging_config_file_name(__file__, use_env_variable=False)
     print("logging_config_file_name:", logging_config_file_name)
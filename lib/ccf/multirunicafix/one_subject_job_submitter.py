@@ -41,7 +41,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @groups.setter
     def groups(self, value):
         self._groups = value
-        module_logger.debug(debug_utils.get_name() + ": set to " + str(self._groups))
+        debug_utils.debug(module_logger, ": set to %s", self._groups)
 
     def _add_mri_prefix(self, scan_name):
         if scan_name.startswith('REST'):
@@ -88,7 +88,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         return 1
 
     def create_work_script(self):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         script_name = self.work_script_name
 
@@ -144,8 +144,9 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         script.close()
         os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
 
+    @debug_utils.span(module_logger)
     def submit_jobs(self, processing_stage=one_subject_job_submitter.ProcessingStage.PUT_DATA):
-        module_logger.debug(debug_utils.get_name() + ": processing_stage: " + str(processing_stage))
+        debug_utils.debug(module_logger, ": processing_stage: %s", processing_stage)
 
         module_logger.info("-----")
         module_logger.info("Submitting " + self.PIPELINE_NAME + " jobs for")
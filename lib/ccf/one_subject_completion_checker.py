@@ -6,19 +6,27 @@ Abstract Base Class for One Subject Completion Checker Classes
 
 # import of built-in modules
 import abc
+import logging
 import os
 import sys
 
 # import of third-party modules
 
 # import of local modules
+import utils.debug_utils as debug_utils
 import utils.file_utils as file_utils
+import utils.nifti as nifti
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
 __copyright__ = "Copyright 2017, Connectome Coordination Facility"
 __maintainer__ = "Timothy B. Brown"
 
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
 class OneSubjectCompletionChecker(abc.ABC):
     """
     Abstract base class for classes that are used to check the completion
@@ -46,6 +54,8 @@ class OneSubjectCompletionChecker(abc.ABC):
     def my_resource_time_stamp(self, archive, subject_info):
         return os.path.getmtime(self.my_resource(archive, subject_info))
                                 
+    @profiling.operation('does_processed_resource_exist')
+    @debug_utils.span(module_logger)
     def does_processed_resource_exist(self, archive, subject_info):
         fullpath = self.my_resource(archive, subject_info)
         return os.path.isdir(fullpath)
@@ -63,7 +73,19 @@ class OneSubjectCompletionChecker(abc.ABC):
 
     def do_all_files_exist(self, file_name_list, verbose=False, output=sys.stdout, short_circuit=True):
         return file_utils.do_all_files_exist(file_name_list, verbose, output, short_circuit)
+
+    def image_references(self, archive, subject_info):
+        """Dictionary of expected image file to the image it must have the same number of time points as
+        (see utils/nifti.py validate_image), used by deep completion checks. Override to add references."""
+        return dict()
+
+    def are_all_images_valid(self, archive, subject_info, file_name_list, verbose=False, output=sys.stdout,
+                             short_circuit=True):
+        return nifti.are_all_images_valid(file_name_list, verbose, output, short_circuit,
+                                          self.image_references(archive, subject_info))
     
+    @profiling.operation('is_processing_marked_complete')
+    @debug_utils.span(module_logger)
     def is_processing_marked_complete(self, archive, subject_info):
 
         # If the processed resource does not exist, then the process is certainly not marked
@@ -100,8 +122,15 @@ class OneSubjectCompletionChecker(abc.ABC):
 
         return True
         
+    @profiling.operation('is_processing_complete')
+    @debug_utils.span(module_logger)
     def is_processing_complete(self, archive, subject_info,
-                               verbose=False, output=sys.stdout, short_circuit=True):
+                               verbose=False, output=sys.stdout, short_circuit=True, deep=False):
+        """Whether the processed resource is newer than its prerequisites and all the expected files exist.
+
+        A deep check also reads the headers of the expected images to make sure they are complete (not
+        truncated) and have the expected number of time points.
+        """
 
         # If the processed resource does not exist, then the processing is certainly not complete.
         if not self.does_processed_resource_exist(archive, subject_info):
@@ -123,4 +152,11 @@ class OneSubjectCompletionChecker(abc.ABC):
         # If processed resource exists and is newer than all the prerequisite resources, then check
         # to see if all the expected files exist
         expected_file_list = self.list_of_expected_files(archive, subject_info)
-        return self.do_all_files_exist(expected_file_list, verbose, output, short_circuit)
+        all_files_exist = self.do_all_files_exist(expected_file_list, verbose, output, short_circuit)
+
+        if deep and (all_files_exist or not short_circuit):
+            all_images_valid = self.are_all_images_valid(archive, subject_info, expected_file_list,
+                                                         verbose, output, short_circuit)
+            return all_files_exist and all_images_valid
+
+        return all_files_exist
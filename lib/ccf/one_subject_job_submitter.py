@@ -7,22 +7,24 @@ that submits jobs for a pipeline for one subject.
 
 # import of built-in modules
 import abc
-import contextlib
 import logging
 import os
 import shutil
 import stat
-import subprocess
 import time
 
 # import of third-party modules
 
 # import of local modules
 import ccf.processing_stage as ccf_processing_stage
+import ccf.scheduler as ccf_scheduler
+import ccf.stage_telemetry as ccf_stage_telemetry
+import ccf.working_dir_lifecycle as ccf_working_dir_lifecycle
 import utils.debug_utils as debug_utils
-import utils.delete_resource as delete_resource
-import utils.file_utils as file_utils
+import utils.lazy_import as lazy_import
 import utils.os_utils as os_utils
+import utils.profiling as profiling
+import utils.script_template as script_template
 import utils.str_utils as str_utils
 
 # authorship information
@@ -34,6 +36,95 @@ __maintainer__ = "Timothy B. Brown"
 module_logger = logging.getLogger(__name__)
 module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
 
+# only needed when jobs are submitted, not by the completion checkers that import this module
+delete_resource = lazy_import.lazy_module('utils.delete_resource')
+
+# Job script templates (see utils/script_template.py for the template syntax)
+#
+# When a stage is given for the header (see _pbs_header_context), the first command
+# after the header (the job's payload) is run by ccf/stage_telemetry.py, which records
+# the stage's timing and resource use in the chain's telemetry file.
+
+PBS_HEADER_TEMPLATE = """\
+{{?bash_shell}}#PBS -S /bin/bash
+{{?bash_shell}}
+#PBS -l {{resources}}
+{{?queue}}#PBS -q {{queue}}
+#PBS -o {{output_dir}}
+#PBS -e {{output_dir}}
+
+{{?xnat_pbs_setup}}source {{xnat_pbs_setup}} {{db_name}}
+{{?xnat_pbs_setup}}
+{{?telemetry_stage}}{{stage_telemetry_program_path}} \\
+{{?telemetry_stage}}  --file={{telemetry_file_name}} \\
+{{?telemetry_stage}}  --pipeline={{telemetry_pipeline}} \\
+{{?telemetry_stage}}  --stage={{telemetry_stage}} \\
+{{?telemetry_stage}}  --project={{telemetry_project}} \\
+{{?telemetry_stage}}  --subject={{telemetry_subject}} \\
+{{?telemetry_scan}}  --scan={{telemetry_scan}} \\
+{{?telemetry_stage}}  -- \\
+"""
+
+GET_DATA_TEMPLATE = PBS_HEADER_TEMPLATE + """\
+{{get_data_program_path}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --classifier={{classifier}} \\
+{{?scan}}  --scan={{scan}} \\
+  --working-dir={{working_directory_name}}
+"""
+
+PUT_DATA_TEMPLATE = PBS_HEADER_TEMPLATE + """\
+{{put_program_path}} \\
+  --leave-subject-id-level \\
+  --user="{{username}}" \\
+  --password="{{password}}" \\
+  --server="{{put_server_name}}" \\
+  --project="{{project}}" \\
+  --subject="{{subject}}" \\
+  --session="{{session}}" \\
+  --working-dir="{{working_directory_name}}" \\
+  --use-http \\
+{{?scan}}  --scan="{{scan}}" \\
+  --resource-suffix="{{resource_suffix}}" \\
+  --reason="{{pipeline_name}}"
+"""
+
+CLEAN_DATA_TEMPLATE = PBS_HEADER_TEMPLATE + """\
+{{clean_data_program_path}} \\
+  --working-dir={{working_directory_name}} \\
+  --subject-dir={{subject_directory_name}} \\
+  --starttime-file={{starttime_file_name}} \\
+  --summary={{clean_data_summary_file_name}}
+"""
+
+CHECK_DATA_TEMPLATE = PBS_HEADER_TEMPLATE + """\
+{{check_data_program_path}} \\
+  --user="{{username}}" \\
+  --password="{{password}}" \\
+  --server="{{put_server_name}}" \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --classifier={{classifier}} \\
+{{?scan}}  --scan={{scan}} \\
+  --working-dir={{check_data_directory_name}}
+"""
+
+MARK_NO_LONGER_RUNNING_TEMPLATE = PBS_HEADER_TEMPLATE + """\
+{{mark_running_status_program_path}} \\
+  --user="{{username}}" \\
+  --password="{{password}}" \\
+  --server="{{put_server_name}}" \\
+  --project="{{project}}" \\
+  --subject="{{subject}}" \\
+  --classifier="{{classifier}}" \\
+{{?scan}}  --scan="{{scan}}" \\
+  --resource="RunningStatus" \\
+  --done
+
+rm -rf {{mark_completion_directory_name}}
+"""
+
 
 class OneSubjectJobSubmitter(abc.ABC):
 	"""
@@ -53,6 +144,24 @@ class OneSubjectJobSubmitter(abc.ABC):
 
 		self._scan = None
 		self._working_directory_name_prefix = None
+		self._scheduler = None
+		self._telemetry = True
+		# set by create_scripts_for_batch once the working directories and scripts exist
+		self._scripts_created = False
+
+	@property
+	def scheduler(self):
+		"""
+		Scheduler used to submit the job scripts (by default the one selected by the
+		XNAT_PBS_JOBS_SCHEDULER environment variable).
+		"""
+		if self._scheduler is None:
+			self._scheduler = ccf_scheduler.get_scheduler()
+		return self._scheduler
+
+	@scheduler.setter
+	def scheduler(self, value):
+		self._scheduler = value
 
 	def processing_stage_from_string(self, str_value):
 		return ccf_processing_stage.ProcessingStage.from_string(str_value)
@@ -113,7 +222,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@username.setter
 	def username(self, value):
 		self._username = value
-		module_logger.debug(debug_utils.get_name() + ": set to: " + str(value))
+		debug_utils.debug(module_logger, ": set to: %s", value)
 
 	@property
 	def password(self):
@@ -130,7 +239,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@server.setter
 	def server(self, value):
 		self._server = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._server))
+		debug_utils.debug(module_logger, ": set to %s", self._server)
 
 	@property
 	def project(self):
@@ -139,7 +248,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@project.setter
 	def project(self, value):
 		self._project = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._project))
+		debug_utils.debug(module_logger, ": set to %s", self._project)
 
 	@property
 	def subject(self):
@@ -148,7 +257,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@subject.setter
 	def subject(self, value):
 		self._subject = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._subject))
+		debug_utils.debug(module_logger, ": set to %s", self._subject)
 
 	@property
 	def session(self):
@@ -157,7 +266,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@session.setter
 	def session(self, value):
 		self._session = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._session))
+		debug_utils.debug(module_logger, ": set to %s", self._session)
 
 	@property
 	def classifier(self):
@@ -166,7 +275,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@classifier.setter
 	def classifier(self, value):
 		self._classifier = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._classifier))
+		debug_utils.debug(module_logger, ": set to %s", self._classifier)
 
 	@property
 	def scan(self):
@@ -175,7 +284,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@scan.setter
 	def scan(self, value):
 		self._scan = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._scan))
+		debug_utils.debug(module_logger, ": set to %s", self._scan)
 
 	@property
 	def clean_output_resource_first(self):
@@ -184,7 +293,19 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@clean_output_resource_first.setter
 	def clean_output_resource_first(self, value):
 		self._clean_output_resource_first = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._clean_output_resource_first))
+		debug_utils.debug(module_logger, ": set to %s", self._clean_output_resource_first)
+
+	@property
+	def telemetry(self):
+		"""
+		Whether the job scripts record per stage telemetry (see ccf/stage_telemetry.py).
+		"""
+		return self._telemetry
+
+	@telemetry.setter
+	def telemetry(self, value):
+		self._telemetry = value
+		debug_utils.debug(module_logger, ": set to %s", self._telemetry)
 
 	@property
 	def put_server(self):
@@ -193,7 +314,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@put_server.setter
 	def put_server(self, value):
 		self._put_server = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._put_server))
+		debug_utils.debug(module_logger, ": set to %s", self._put_server)
 
 	@property
 	def walltime_limit_hours(self):
@@ -202,7 +323,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@walltime_limit_hours.setter
 	def walltime_limit_hours(self, value):
 		self._walltime_limit_hours = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(value))
+		debug_utils.debug(module_logger, ": set to %s", value)
 
 	@property
 	def vmem_limit_gbs(self):
@@ -211,7 +332,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@vmem_limit_gbs.setter
 	def vmem_limit_gbs(self, value):
 		self._vmem_limit_gbs = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(value))
+		debug_utils.debug(module_logger, ": set to %s", value)
 
 	@property
 	def mem_limit_gbs(self):
@@ -220,7 +341,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@mem_limit_gbs.setter
 	def mem_limit_gbs(self, value):
 		self._mem_limit_gbs = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(value))
+		debug_utils.debug(module_logger, ": set to %s", value)
 		
 	@property
 	def output_resource_suffix(self):
@@ -229,7 +350,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@output_resource_suffix.setter
 	def output_resource_suffix(self, value):
 		self._output_resource_suffix = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(value))
+		debug_utils.debug(module_logger, ": set to %s", value)
 
 	@property
 	def output_resource_name(self):
@@ -292,13 +413,45 @@ class OneSubjectJobSubmitter(abc.ABC):
 	@property
 	def get_data_job_script_name(self):
 		"""Name of the script to be submitted to perform the get data job"""
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		return self.scripts_start_name + '.XNAT_GET_DATA_job.sh'
 
-	def _write_bash_header(self, script):
-		bash_line = '#PBS -S /bin/bash'
-		file_utils.wl(script, bash_line)
-		file_utils.wl(script, '')
+	def _pbs_header_context(self, resources, output_dir, queue=None, bash_shell=True, xnat_pbs_setup=True,
+							stage=None):
+		"""
+		Context values used by PBS_HEADER_TEMPLATE (the #PBS directives, the sourcing of
+		the XNAT PBS setup script at the top of each job script, and, if a stage name is
+		given and telemetry is on, the telemetry wrapper for the job's payload).
+		"""
+		telemetry_stage = stage if self.telemetry else None
+		return {
+			'bash_shell': bash_shell,
+			'resources': resources,
+			'queue': queue,
+			'output_dir': output_dir,
+			'xnat_pbs_setup': self._get_xnat_pbs_setup_script_path() if xnat_pbs_setup else None,
+			'db_name': self._get_db_name() if xnat_pbs_setup else None,
+			'telemetry_stage': telemetry_stage,
+			'stage_telemetry_program_path': self.stage_telemetry_program_path,
+			'telemetry_file_name': self.telemetry_file_name,
+			'telemetry_pipeline': self.PIPELINE_NAME,
+			'telemetry_project': self.project,
+			'telemetry_subject': self.subject,
+			'telemetry_scan': self.scan if telemetry_stage else None,
+		}
+
+	@property
+	def stage_telemetry_program_path(self):
+		"""Path to the program that runs a job's payload and records its telemetry"""
+		return self.xnat_pbs_jobs_home + os.sep + 'lib' + os.sep + 'ccf' + os.sep + 'stage_telemetry.py'
+
+	@property
+	def telemetry_file_name(self):
+		"""
+		File to which each job in the chain appends its telemetry. It is kept next to
+		(rather than in) the chain's working directories so that it outlives them.
+		"""
+		return self.working_directory_name_prefix + ccf_stage_telemetry.TELEMETRY_FILE_SUFFIX
 
 	@property
 	def get_data_program_path(self):
@@ -322,139 +475,99 @@ class OneSubjectJobSubmitter(abc.ABC):
 
 		return db_name
 	
+	def render_get_data_job_script(self):
+		"""Text of the script to be submitted to perform the get data job"""
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb',
+										   self.working_directory_name, queue='HCPput', stage='GET_DATA')
+		context.update(get_data_program_path=self.get_data_program_path,
+					   project=self.project,
+					   subject=self.subject,
+					   classifier=self.classifier,
+					   scan=self.scan,
+					   working_directory_name=self.working_directory_name)
+		return script_template.render(GET_DATA_TEMPLATE, context)
+
 	def create_get_data_job_script(self):
 		"""Create the script to be submitted to perform the get data job"""
-		module_logger.debug(debug_utils.get_name())
-
-		script_name = self.get_data_job_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		self._write_bash_header(script)
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-		script.write('#PBS -q HCPput' + os.linesep)
-		script.write('#PBS -o ' + self.working_directory_name + os.linesep)
-		script.write('#PBS -e ' + self.working_directory_name + os.linesep)
-		script.write(os.linesep)
-		script.write('source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name() + os.linesep)
-		script.write(os.linesep)
-		script.write(self.get_data_program_path + ' \\' + os.linesep)
-		script.write('  --project=' + self.project + ' \\' + os.linesep)
-		script.write('  --subject=' + self.subject + ' \\' + os.linesep)
-		script.write('  --classifier=' + self.classifier + ' \\' + os.linesep)
-
-		if self.scan:
-			script.write('  --scan=' + self.scan + ' \\' + os.linesep)
-			
-		script.write('  --working-dir=' + self.working_directory_name + os.linesep)
-
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
+		debug_utils.debug(module_logger)
+		script_template.write_script(self.get_data_job_script_name, self.render_get_data_job_script())
 
 	@property
 	def put_data_script_name(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		return self.scripts_start_name + '.XNAT_PUT_DATA_job.sh'
 
-	def create_put_data_script(self):
-		module_logger.debug(debug_utils.get_name())
-
-		script_name = self.put_data_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=12gb' + os.linesep)
-		script.write('#PBS -q HCPput' + os.linesep)
-		script.write('#PBS -o ' + self.log_dir + os.linesep)
-		script.write('#PBS -e ' + self.log_dir + os.linesep)
-		script.write(os.linesep)
-		script.write('source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name() + os.linesep)
-		script.write(os.linesep)
-		script.write(self.xnat_pbs_jobs_home + os.sep + 'WorkingDirPut' + os.sep + 'XNAT_working_dir_put.sh \\' + os.linesep)
-		script.write('  --leave-subject-id-level \\' + os.linesep)
-		script.write('  --user="' + self.username + '" \\' + os.linesep)
-		script.write('  --password="' + self.password + '" \\' + os.linesep)
-		script.write('  --server="' + str_utils.get_server_name(self.put_server) + '" \\' + os.linesep)
-		script.write('  --project="' + self.project + '" \\' + os.linesep)
-		script.write('  --subject="' + self.subject + '" \\' + os.linesep)
-		script.write('  --session="' + self.session + '" \\' + os.linesep)
-		script.write('  --working-dir="' + self.working_directory_name + '" \\' + os.linesep)
-		script.write('  --use-http' + ' \\' + os.linesep)
-
-		if self.scan:
-			script.write('  --scan="' + self.scan + '" \\' + os.linesep)
-			script.write('  --resource-suffix="' + self.output_resource_suffix + '" \\' + os.linesep)
-		else:
-			script.write('  --resource-suffix="' + self.output_resource_name + '" \\' + os.linesep)
-			
-		script.write('  --reason="' + self.PIPELINE_NAME + '"' + os.linesep)
+	def render_put_data_script(self):
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=12gb',
+										   self.log_dir, queue='HCPput', bash_shell=False, stage='PUT_DATA')
+		context.update(put_program_path=self.xnat_pbs_jobs_home + os.sep + 'WorkingDirPut' + os.sep + 'XNAT_working_dir_put.sh',
+					   username=self.username,
+					   password=self.password,
+					   put_server_name=str_utils.get_server_name(self.put_server),
+					   project=self.project,
+					   subject=self.subject,
+					   session=self.session,
+					   working_directory_name=self.working_directory_name,
+					   scan=self.scan,
+					   resource_suffix=self.output_resource_suffix if self.scan else self.output_resource_name,
+					   pipeline_name=self.PIPELINE_NAME)
+		return script_template.render(PUT_DATA_TEMPLATE, context)
 
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
+	def create_put_data_script(self):
+		debug_utils.debug(module_logger)
+		script_template.write_script(self.put_data_script_name, self.render_put_data_script())
 
 	@property
 	def clean_data_script_name(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		return self.scripts_start_name + '.CLEAN_DATA_job.sh'
 
 	@property
 	def starttime_file_name(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		starttime_file_name = self.working_directory_name
 		starttime_file_name += os.path.sep
 		starttime_file_name += self.PIPELINE_NAME
 		starttime_file_name += '.starttime'
 		return starttime_file_name
 
+	@property
+	def clean_data_program_path(self):
+		"""
+		Path to the program that removes data not produced by the pipeline from the
+		working directory.
+		"""
+		return self.xnat_pbs_jobs_home + os.sep + 'lib' + os.sep + 'ccf' + os.sep + 'clean_data.py'
+
+	@property
+	def clean_data_summary_file_name(self):
+		return self.scripts_start_name + '.CLEAN_DATA_summary.json'
+
+	def render_clean_data_script(self):
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb',
+										   self.working_directory_name, stage='CLEAN_DATA')
+		context.update(clean_data_program_path=self.clean_data_program_path,
+					   subject_directory_name=self.working_directory_name + os.path.sep + self.subject,
+					   starttime_file_name=self.starttime_file_name,
+					   working_directory_name=self.working_directory_name,
+					   clean_data_summary_file_name=self.clean_data_summary_file_name)
+		return script_template.render(CLEAN_DATA_TEMPLATE, context)
+
 	def create_clean_data_script(self):
-		module_logger.debug(debug_utils.get_name())
-
-		script_name = self.clean_data_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		self._write_bash_header(script)
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-		script.write('#PBS -o ' + self.working_directory_name + os.linesep)
-		script.write('#PBS -e ' + self.working_directory_name + os.linesep)
-		script.write(os.linesep)
-		script.write('echo "Newly created or modified files:"' + os.linesep)
-		script.write('find ' + self.working_directory_name + os.path.sep + self.subject)
-		script.write(' -type f -newer ' + self.starttime_file_name + os.linesep)
-		script.write(os.linesep)
-		script.write('echo "Removing NOT newly created or modified files."' + os.linesep)
-		script.write('find ' + self.working_directory_name + os.path.sep + self.subject)
-		script.write(' -not -newer ' + self.starttime_file_name + ' -delete')
-		script.write(os.linesep)
-		script.write('echo "Removing any XNAT catalog files still around."' + os.linesep)
-		script.write('find ' + self.working_directory_name + ' -name "*_catalog.xml" -delete')
-		script.write(os.linesep)
-		script.write('echo "Remaining files:"' + os.linesep)
-		script.write('find ' + self.working_directory_name + os.path.sep + self.subject + os.linesep)
-
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
+		debug_utils.debug(module_logger)
+		script_template.write_script(self.clean_data_script_name, self.render_clean_data_script())
 
 	@property
 	def process_data_job_script_name(self):
 		"""
 		Name of script to be submitted as a job to perform the processing of the data.
 		"""
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		return self.scripts_start_name + '.PROCESS_DATA_job.sh'
 
 	@property
 	def setup_file_name(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		return self.scripts_start_name + '.SETUP.sh'
 
 	@property
@@ -462,7 +575,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 		"""
 		Name of script to be submitted as a job to perform the check data functionality.
 		"""
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		name = self.check_data_directory_name
 		name += os.sep + self.subject
 		name += '.' + self.PIPELINE_NAME
@@ -474,7 +587,7 @@ class OneSubjectJobSubmitter(abc.ABC):
 		return name
 
 	def create_setup_file(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		
 		setup_source_file_name = self.PIPELINE_NAME + '.SetUp.sh'
 		
@@ -495,43 +608,33 @@ class OneSubjectJobSubmitter(abc.ABC):
 		name += os.sep + self.PIPELINE_NAME + '.XNAT_CHECK'
 		return name
 	
+	def render_check_data_job_script(self):
+		"""
+		Text of the script to be submitted as a job to perform the check data functionality.
+		"""
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb', self.log_dir,
+										   stage='CHECK_DATA')
+		context.update(check_data_program_path=self.check_data_program_path,
+					   username=self.username,
+					   password=self.password,
+					   put_server_name=str_utils.get_server_name(self.put_server),
+					   project=self.project,
+					   subject=self.subject,
+					   classifier=self.classifier,
+					   scan=self.scan,
+					   check_data_directory_name=self.check_data_directory_name)
+		return script_template.render(CHECK_DATA_TEMPLATE, context)
+
 	def create_check_data_job_script(self):
 		"""
 		Create the script to be submitted as a job to perform the check data functionality.
 		"""
-		module_logger.debug(debug_utils.get_name())
-
-		script_name = self.check_data_job_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		self._write_bash_header(script)
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-		script.write('#PBS -o ' + self.log_dir + os.linesep)
-		script.write('#PBS -e ' + self.log_dir + os.linesep)
-		script.write(os.linesep)
-		script.write('source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name() + os.linesep)
-		script.write(os.linesep)
-		script.write(self.check_data_program_path + ' \\' + os.linesep)
-		script.write('  --user="' + self.username + '" \\' + os.linesep)
-		script.write('  --password="' + self.password + '" \\' + os.linesep)
-		script.write('  --server="' + str_utils.get_server_name(self.put_server) + '" \\' + os.linesep)
-		script.write('  --project=' + self.project + ' \\' + os.linesep)
-		script.write('  --subject=' + self.subject + ' \\' + os.linesep)
-		script.write('  --classifier=' + self.classifier + ' \\' + os.linesep)
-		if self.scan:
-			script.write('  --scan=' + self.scan + ' \\' + os.linesep)
-		script.write('  --working-dir=' + self.check_data_directory_name + os.linesep)
-
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
+		debug_utils.debug(module_logger)
+		script_template.write_script(self.check_data_job_script_name, self.render_check_data_job_script())
 
 	@property
 	def mark_no_longer_running_script_name(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		name = self.mark_completion_directory_name
 		name += os.sep + self.subject
 		name += '.' + self.PIPELINE_NAME
@@ -551,52 +654,30 @@ class OneSubjectJobSubmitter(abc.ABC):
 		name += os.sep + self.PIPELINE_NAME + '.XNAT_MARK_RUNNING_STATUS'
 		return name
 	
+	def render_mark_no_longer_running_script(self):
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb', self.log_dir,
+										   stage='MARK_NO_LONGER_RUNNING')
+		context.update(mark_running_status_program_path=self.mark_running_status_program_path,
+					   username=self.username,
+					   password=self.password,
+					   put_server_name=str_utils.get_server_name(self.put_server),
+					   project=self.project,
+					   subject=self.subject,
+					   classifier=self.classifier,
+					   scan=self.scan,
+					   mark_completion_directory_name=self.mark_completion_directory_name)
+		return script_template.render(MARK_NO_LONGER_RUNNING_TEMPLATE, context)
+
 	def create_mark_no_longer_running_script(self):
-		module_logger.debug(debug_utils.get_name())
-
-		script_name = self.mark_no_longer_running_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		self._write_bash_header(script)
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-		script.write('#PBS -o ' + self.log_dir + os.linesep)
-		script.write('#PBS -e ' + self.log_dir + os.linesep)
-		script.write(os.linesep)
-		script.write('source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name() + os.linesep)
-		script.write(os.linesep)
-		script.write(self.mark_running_status_program_path + ' \\' + os.linesep)
-		script.write('  --user="' + self.username + '" \\' + os.linesep)
-		script.write('  --password="' + self.password + '" \\' + os.linesep)
-		script.write('  --server="' + str_utils.get_server_name(self.put_server) + '" \\' + os.linesep)
-		script.write('  --project="' + self.project + '" \\' + os.linesep)
-		script.write('  --subject="' + self.subject + '" \\' + os.linesep)
-		script.write('  --classifier="' + self.classifier + '" \\' + os.linesep)
-		if self.scan:
-			script.write('  --scan="' + self.scan + '" \\' + os.linesep)
-		script.write('  --resource="' + 'RunningStatus' + '" \\' + os.linesep)
-		script.write('  --done' + os.linesep)
-		script.write(os.linesep)
-		script.write("rm -rf " + self.mark_completion_directory_name)
-		
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
-		
+		debug_utils.debug(module_logger)
+		script_template.write_script(self.mark_no_longer_running_script_name,
+									 self.render_mark_no_longer_running_script())
+
 	def submit_get_data_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage >= ccf_processing_stage.ProcessingStage.GET_DATA:
-			if prior_job:
-				get_data_submit_cmd = 'qsub -W depend=afterok:' + prior_job + ' ' + self.get_data_job_script_name
-			else:
-				get_data_submit_cmd = 'qsub ' + self.get_data_job_script_name
-
-			completed_submit_process = subprocess.run(
-				get_data_submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-			get_data_job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+			get_data_job_no = self.scheduler.submit(self.get_data_job_script_name, prior_job)
 			return get_data_job_no, [get_data_job_no]
 
 		else:
@@ -604,17 +685,10 @@ class OneSubjectJobSubmitter(abc.ABC):
 			return None, None
 
 	def submit_process_data_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage >= ccf_processing_stage.ProcessingStage.PROCESS_DATA:
-			if prior_job:
-				work_submit_cmd = 'qsub -W depend=afterok:' + prior_job + ' ' + self.process_data_job_script_name
-			else:
-				work_submit_cmd = 'qsub ' + self.process_data_job_script_name
-
-			completed_submit_process = subprocess.run(
-				work_submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-			work_job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+			work_job_no = self.scheduler.submit(self.process_data_job_script_name, prior_job)
 			return work_job_no, [work_job_no]
 
 		else:
@@ -622,17 +696,10 @@ class OneSubjectJobSubmitter(abc.ABC):
 			return None, None
 
 	def submit_clean_data_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage >= ccf_processing_stage.ProcessingStage.CLEAN_DATA:
-			if prior_job:
-				clean_submit_cmd = 'qsub -W depend=afterok:' + prior_job + ' ' + self.clean_data_script_name
-			else:
-				clean_submit_cmd = 'qsub ' + self.clean_data_script_name
-
-			completed_submit_process = subprocess.run(
-				clean_submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-			clean_job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+			clean_job_no = self.scheduler.submit(self.clean_data_script_name, prior_job)
 			return clean_job_no, [clean_job_no]
 
 		else:
@@ -640,17 +707,10 @@ class OneSubjectJobSubmitter(abc.ABC):
 			return None, None
 
 	def submit_put_data_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage >= ccf_processing_stage.ProcessingStage.PUT_DATA:
-			if prior_job:
-				put_submit_cmd = 'qsub -W depend=afterok:' + prior_job + ' ' + self.put_data_script_name
-			else:
-				put_submit_cmd = 'qsub ' + self.put_data_script_name
-
-			completed_submit_process = subprocess.run(
-				put_submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-			put_job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+			put_job_no = self.scheduler.submit(self.put_data_script_name, prior_job)
 			return put_job_no, [put_job_no]
 
 		else:
@@ -658,17 +718,10 @@ class OneSubjectJobSubmitter(abc.ABC):
 			return None, None
 
 	def submit_check_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage >= ccf_processing_stage.ProcessingStage.CHECK_DATA:
-			if prior_job:
-				check_submit_cmd = 'qsub -W depend=afterok:' + prior_job + ' ' + self.check_data_job_script_name
-			else:
-				check_submit_cmd = 'qsub ' + self.check_data_job_script_name
-
-			completed_submit_process = subprocess.run(
-				check_submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-			check_job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+			check_job_no = self.scheduler.submit(self.check_data_job_script_name, prior_job)
 			return check_job_no, [check_job_no]
 
 		else:
@@ -676,47 +729,102 @@ class OneSubjectJobSubmitter(abc.ABC):
 			return None, None
 
 	def submit_no_longer_running_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
-
-		if prior_job:
-			cmd = 'qsub -W depend=afterany:' + prior_job + ' ' + self.mark_no_longer_running_script_name
-		else:
-			cmd = 'qsub ' + self.mark_no_longer_running_script_name
+		debug_utils.debug(module_logger)
 
-		completed_submit_process = subprocess.run(
-			cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-		job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+		job_no = self.scheduler.submit(self.mark_no_longer_running_script_name, prior_job,
+									   dependency=ccf_scheduler.AFTER_ANY)
 		return job_no, [job_no]
 		
+	@property
+	def process_data_program_source_path(self):
+		"""
+		Path to the .XNAT_PROCESS program in XNAT_PBS_JOBS that is copied to the working
+		directory and run by the process data job.
+		"""
+		name = self.xnat_pbs_jobs_home
+		name += os.sep + self.PIPELINE_NAME
+		name += os.sep + self.PIPELINE_NAME
+		name += '.XNAT_PROCESS'
+		return name
+
+	@property
+	def process_data_program_path(self):
+		"""Path to the working directory copy of the .XNAT_PROCESS program"""
+		name = self.working_directory_name
+		name += os.sep + self.PIPELINE_NAME
+		name += '.XNAT_PROCESS'
+		return name
+
+	def copy_process_data_program(self):
+		debug_utils.debug(module_logger)
+		shutil.copy(self.process_data_program_source_path, self.process_data_program_path)
+		os.chmod(self.process_data_program_path, stat.S_IRWXU | stat.S_IRWXG)
+
 	@abc.abstractmethod
-	def create_process_data_job_script(self):
+	def render_process_data_job_script(self):
+		"""
+		Text of the script to be submitted as a job to perform the processing of the data
+		(the script that runs the process_data_program_path program).
+		"""
 		raise NotImplementedError()
 
+	def create_process_data_job_script(self):
+		debug_utils.debug(module_logger)
+		self.copy_process_data_program()
+		script_template.write_script(self.process_data_job_script_name, self.render_process_data_job_script())
+
+	def copy_job_programs(self):
+		"""
+		Copy the setup file and the programs run by the job scripts into the working directory.
+		"""
+		debug_utils.debug(module_logger)
+		self.create_setup_file()
+		self.copy_process_data_program()
+
+	def rendered_job_scripts(self):
+		"""
+		List of (script name, script text) pairs for all the job scripts in the processing chain.
+		"""
+		return [
+			(self.get_data_job_script_name, self.render_get_data_job_script()),
+			(self.process_data_job_script_name, self.render_process_data_job_script()),
+			(self.clean_data_script_name, self.render_clean_data_script()),
+			(self.put_data_script_name, self.render_put_data_script()),
+			(self.check_data_job_script_name, self.render_check_data_job_script()),
+			(self.mark_no_longer_running_script_name, self.render_mark_no_longer_running_script()),
+		]
+
+	@debug_utils.span(module_logger)
 	def create_scripts(self, stage):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage >= ccf_processing_stage.ProcessingStage.PREPARE_SCRIPTS:
-			self.create_get_data_job_script()
-			self.create_setup_file()
-			self.create_process_data_job_script()
-			self.create_clean_data_script()
-			self.create_put_data_script()
-			self.create_check_data_job_script()
-			self.create_mark_no_longer_running_script()
-			
+			self.copy_job_programs()
+			script_template.write_scripts(self.rendered_job_scripts())
+
 		else:
 			module_logger.info("Scripts not created")
 
+	def create_working_directories(self):
+		"""
+		Create the working directories for this submission. They must not already exist.
+		"""
+		os.makedirs(name=self.working_directory_name)
+		os.makedirs(name=self.check_data_directory_name)
+		os.makedirs(name=self.mark_completion_directory_name)
+
 	@abc.abstractmethod
 	def mark_running_status(self, stage):
 		raise NotImplementedError()
 
+	@debug_utils.span(module_logger)
 	def do_job_submissions(self, processing_stage):
 		submitted_jobs_list = []
 		prior = None
 
-		# create scripts
-		self.create_scripts(stage=processing_stage)
+		# create scripts (unless created along with those of the rest of a batch)
+		if not self._scripts_created:
+			self.create_scripts(stage=processing_stage)
 
 		# create running status marker file to indicate that jobs are queued
 		self.mark_running_status(stage=processing_stage)
@@ -762,11 +870,27 @@ class OneSubjectJobSubmitter(abc.ABC):
 			submitted_jobs_list.append(('Running Status', all_running_status_job_nos))
 		if last_running_status_job_no:
 			prior = last_running_status_job_no
-			
+
+		self.register_working_directories(submitted_jobs_list)
+
 		return submitted_jobs_list
 
+	def register_working_directories(self, submitted_jobs_list):
+		"""
+		Record the working directories used by the submitted jobs so that they can be
+		removed once the jobs are finished (see ccf/working_dir_lifecycle.py).
+		"""
+		job_ids = [job_id for stage_name, stage_job_ids in submitted_jobs_list for job_id in stage_job_ids]
+		try:
+			ccf_working_dir_lifecycle.register(self.build_home, self.project, self.PIPELINE_NAME,
+											   self.working_directory_name_prefix, job_ids)
+		except OSError as e:
+			module_logger.warning("Unable to register working directories: " + str(e))
+
+	@profiling.operation('submit_jobs')
+	@debug_utils.span(module_logger)
 	def submit_jobs(self, processing_stage=ccf_processing_stage.ProcessingStage.CHECK_DATA):
-		module_logger.debug(debug_utils.get_name() + ": processing_stage: " + str(processing_stage))
+		debug_utils.debug(module_logger, ": processing_stage: %s", processing_stage)
 
 		module_logger.info("-----")
 
@@ -776,15 +900,14 @@ class OneSubjectJobSubmitter(abc.ABC):
 		module_logger.info("  Session: " + self.session)
 		module_logger.info("	Stage: " + str(processing_stage))
 
-		# make sure working directories do not have the same name based on
-		# the same start time by sleeping a few seconds
-		time.sleep(5)
+		if not self._scripts_created:
+			# make sure working directories do not have the same name based on
+			# the same start time by sleeping a few seconds
+			time.sleep(5)
+
+			# build the working directory name
+			self.create_working_directories()
 
-		# build the working directory name
-		os.makedirs(name=self.working_directory_name)
-		os.makedirs(name=self.check_data_directory_name)
-		os.makedirs(name=self.mark_completion_directory_name)
-		
 		module_logger.info("Output Resource Name: " + self.output_resource_name)
 
 		# clean output resource if requested
@@ -801,3 +924,45 @@ class OneSubjectJobSubmitter(abc.ABC):
 				self.output_resource_name)
 
 		return self.do_job_submissions(processing_stage)
+
+
+def create_scripts_for_batch(prepared_list):
+	"""
+	Create the working directories and job scripts for many configured submitters (e.g.
+	the subjects of a batch) in one pass, before any of their jobs are submitted.
+
+	prepared_list is a list of (submitter, processing_stage) pairs. The scripts of every
+	submitter are rendered (from the cached templates) before any of them is written.
+	A submitter whose scripts cannot be rendered, whose processing stage does not include
+	preparing scripts, or whose working directory names could be the same as those of
+	an earlier submitter in the list is left alone. Its submit_jobs then creates its
+	scripts (or reports the error) as it does when submitted on its own.
+	"""
+	debug_utils.debug(module_logger)
+
+	rendered = []
+	chains = set()
+	for submitter, stage in prepared_list:
+		if stage < ccf_processing_stage.ProcessingStage.PREPARE_SCRIPTS:
+			continue
+
+		# working directory names differ only by the time at which they are first
+		# asked for, so the same chain twice in one pass would get the same names
+		chain = (submitter.build_home, submitter.project, submitter.PIPELINE_NAME, submitter.subject, submitter.scan)
+		if chain in chains:
+			continue
+		chains.add(chain)
+
+		try:
+			rendered.append((submitter, submitter.rendered_job_scripts()))
+		except Exception as e:
+			module_logger.info("scripts not rendered for batch: " + str(e))
+
+	for submitter, scripts in rendered:
+		submitter.create_working_directories()
+		submitter.copy_job_programs()
+
+	script_template.write_scripts([script for submitter, scripts in rendered for script in scripts])
+
+	for submitter, scripts in rendered:
+		submitter._scripts_created = True
@@ -14,7 +14,8 @@ import os
 
 # import of local modules
 import utils.os_utils as os_utils
-import ccf.archive as ccf_archive
+import ccf.running_status_index as running_status_index
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -69,6 +70,24 @@ class OneSubjectRunStatusChecker(abc.ABC):
 	def PIPELINE_NAME(self):
 		raise NotImplementedError()
 
+	# How long a listing of a session's RunningStatus directory is trusted. Long lived
+	# callers (e.g. the control GUIs) ask again as jobs start and finish.
+	RUNNING_STATUS_MAX_AGE_SECONDS = 10
+
+	@property
+	def running_status_index(self):
+		"""
+		RunningStatusIndex used to look up running marker files.
+		"""
+		if getattr(self, '_running_status_index', None) is None:
+			self._running_status_index = running_status_index.RunningStatusIndex(
+				max_age_seconds=self.RUNNING_STATUS_MAX_AGE_SECONDS)
+		return self._running_status_index
+
+	def _running_marker_scan(self, subject_info):
+		"""Scan for which the running marker is made (None for the whole session)."""
+		return None
+
 	def _path_to_running_marker_file(self, subject_info):
 		"""Return the full path to the marker file for the specified subject."""
 
@@ -77,13 +96,13 @@ class OneSubjectRunStatusChecker(abc.ABC):
 		file_name += '_' + subject_info.classifier
 		file_name += '.' + 'RUNNING'
  
-		archive = ccf_archive.CcfArchive()
-		self.running_status_dir = archive.running_status_dir_full_path(subject_info)
+		self.running_status_dir = self.running_status_index.archive.running_status_dir_full_path(subject_info)
 		path = self.running_status_dir + os.sep + file_name
 		
 		#print("path: " + path)		
 		return path
 
+	@profiling.operation('get_queued_or_running')
 	def get_queued_or_running(self, subject_info):
 		"""Whether the pipeline is marked as running for specified subject.
 
@@ -92,7 +111,20 @@ class OneSubjectRunStatusChecker(abc.ABC):
 		subject. This is in contrast to checking based upon interaction with the
 		underlying queuing system.
 		"""
-		return os.path.exists(self._path_to_running_marker_file(subject_info))
+		return self.running_status_index.is_queued_or_running(
+			self.PIPELINE_NAME, subject_info, self._running_marker_scan(subject_info))
+
+	@profiling.operation('get_queued_or_running_list')
+	def get_queued_or_running_list(self, subject_info_list):
+		"""Whether the pipeline is marked as running for each subject in subject_info_list.
+
+		Each session's running status directory is read once, so this is the way to
+		check a whole subject list. Returns a list of booleans in the same order as
+		subject_info_list.
+		"""
+		self.running_status_index.refresh()
+		self.running_status_index.load(subject_info_list)
+		return [self.get_queued_or_running(subject_info) for subject_info in subject_info_list]
 
 	def get_run_status(self, subject_info):
 		"""Indication of job status for the specified subject.
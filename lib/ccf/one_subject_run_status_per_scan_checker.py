@@ -7,7 +7,6 @@ import os
 
 # import of local modules
 import ccf.one_subject_run_status_checker as one_subject_run_status_checker
-import ccf.archive as ccf_archive
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -23,6 +22,9 @@ class OneSubjectRunStatusPerScanChecker(one_subject_run_status_checker.OneSubjec
 	further documentation.
 	"""
 
+	def _running_marker_scan(self, subject_info):
+		return subject_info.extra
+
 	def _path_to_running_marker_file(self, subject_info):
 
 		file_name = self.PIPELINE_NAME
@@ -31,9 +33,7 @@ class OneSubjectRunStatusPerScanChecker(one_subject_run_status_checker.OneSubjec
 		file_name += '_' + subject_info.extra
 		file_name += '.' + 'RUNNING'
 
-		archive = ccf_archive.CcfArchive()
-		self.running_status_dir = archive.running_status_dir_full_path(subject_info)
+		self.running_status_dir = self.running_status_index.archive.running_status_dir_full_path(subject_info)
 		path = self.running_status_dir + os.sep + file_name
 		#print("path: " + path)
 		return path
-		
\ No newline at end of file
@@ -47,10 +47,10 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @reg_name.setter
     def reg_name(self, value):
         self._reg_name = value
-        module_logger.debug(debug_utils.get_name() + ": set to " + str(value))
+        debug_utils.debug(module_logger, ": set to %s", value)
 
     def create_work_script(self):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         script_name = self.work_script_name
 
@@ -106,7 +106,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
 
     def output_resource_name(self):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         return self.scan + '_' + self.output_resource_suffix
 
 
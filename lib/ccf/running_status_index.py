@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+"""
+ccf/running_status_index.py: Index of the 'running marker' files in the RunningStatus
+resource directories of CCF sessions.
+
+A running marker file named <PIPELINE>.<subject>_<classifier>[_<scan>].RUNNING in a
+session's RunningStatus resource indicates that jobs for that pipeline (and scan) are
+queued or running for the session. Rather than checking for one marker file at a time,
+a RunningStatusIndex lists each session's RunningStatus directory once and answers
+"is this pipeline queued or running" questions from the resulting set of markers.
+"""
+
+# import of built-in modules
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+# import of third-party modules
+
+# import of local modules
+import ccf.archive as ccf_archive
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+RUNNING_MARKER_SUFFIX = '.RUNNING'
+
+# number of RunningStatus directories listed at once by the bulk methods
+DEFAULT_MAX_WORKERS = 8
+
+
+def parse_running_marker_name(file_name, session_name):
+	"""
+	Parse the name of a running marker file found in the RunningStatus directory of the
+	session named session_name (i.e. <subject>_<classifier>).
+
+	Returns a (pipeline name, scan) tuple, with a scan of None for markers that are not
+	for a specific scan, or None if file_name is not a running marker for the session.
+	"""
+	if not file_name.endswith(RUNNING_MARKER_SUFFIX):
+		return None
+
+	pipeline_name, sep, marked_name = file_name[:-len(RUNNING_MARKER_SUFFIX)].partition('.')
+	if not sep or not marked_name.startswith(session_name):
+		return None
+
+	scan = marked_name[len(session_name):]
+	if not scan:
+		return (pipeline_name, None)
+	elif scan.startswith('_') and len(scan) > 1:
+		return (pipeline_name, scan[1:])
+	else:
+		return None
+
+
+class RunningStatusIndex(object):
+	"""
+	Set of the running markers in the RunningStatus directories of CCF sessions.
+
+	Each session's RunningStatus directory is listed the first time a question is asked
+	about that session. If max_age_seconds is specified, a listing older than that is
+	read again when next needed. Otherwise listings are kept until refresh is called.
+	"""
+
+	def __init__(self, archive=None, max_age_seconds=None):
+		self._archive = archive if archive else ccf_archive.CcfArchive()
+		self._max_age_seconds = max_age_seconds
+		self._lock = threading.Lock()
+		# RunningStatus directory path -> (time listed, set of (pipeline name, scan) tuples)
+		self._markers = dict()
+
+	@property
+	def archive(self):
+		return self._archive
+
+	def refresh(self, subject_info=None):
+		"""
+		Forget the listing for the specified subject's session, or for all sessions if no
+		subject is specified, so that it is read again when next needed.
+		"""
+		with self._lock:
+			if subject_info is None:
+				self._markers.clear()
+			else:
+				self._markers.pop(self._archive.running_status_dir_full_path(subject_info), None)
+
+	def _read_markers(self, running_status_dir, session_name):
+		markers = set()
+		try:
+			with os.scandir(running_status_dir) as entries:
+				for entry in entries:
+					marker = parse_running_marker_name(entry.name, session_name)
+					if marker:
+						markers.add(marker)
+		except FileNotFoundError:
+			# no RunningStatus resource, so nothing is marked as running
+			pass
+		return markers
+
+	def running_markers(self, subject_info):
+		"""
+		Set of (pipeline name, scan) tuples for the running markers in the specified
+		subject's session.
+		"""
+		running_status_dir = self._archive.running_status_dir_full_path(subject_info)
+		now = time.time()
+
+		with self._lock:
+			cached = self._markers.get(running_status_dir)
+		if cached and (self._max_age_seconds is None or now - cached[0] <= self._max_age_seconds):
+			return cached[1]
+
+		markers = self._read_markers(running_status_dir, self._archive.session_name(subject_info))
+		with self._lock:
+			self._markers[running_status_dir] = (now, markers)
+		return markers
+
+	def is_queued_or_running(self, pipeline_name, subject_info, scan=None):
+		"""
+		Whether the pipeline (for the specified scan, if any) is marked as queued or
+		running for the specified subject.
+		"""
+		return (pipeline_name, scan) in self.running_markers(subject_info)
+
+	def load(self, subject_info_list, max_workers=DEFAULT_MAX_WORKERS):
+		"""
+		List the RunningStatus directories for all the sessions in subject_info_list,
+		listing different directories concurrently.
+		"""
+		# per scan subject lists have many entries for each session
+		sessions = dict()
+		for subject_info in subject_info_list:
+			sessions.setdefault(self._archive.running_status_dir_full_path(subject_info), subject_info)
+
+		with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+			list(executor.map(self.running_markers, sessions.values()))
+
+	def queued_or_running_list(self, pipeline_name, subject_info_list, per_scan=False,
+							   max_workers=DEFAULT_MAX_WORKERS):
+		"""
+		Whether the pipeline is marked as queued or running for each subject in
+		subject_info_list.
+
+		If per_scan is True, the scan for each subject is taken from its extra field (as
+		in the subject lists for pipelines that are run separately for each scan).
+
+		Returns a list of booleans in the same order as subject_info_list.
+		"""
+		self.load(subject_info_list, max_workers)
+		return [self.is_queued_or_running(pipeline_name, subject_info,
+										  subject_info.extra if per_scan else None)
+				for subject_info in subject_info_list]
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+"""
+ccf/scheduler.py: Schedulers that run the job scripts created by a OneSubjectJobSubmitter.
+
+PbsScheduler submits each script to PBS with qsub (what the submitters have always done).
+LocalScheduler runs the scripts on this machine instead, honoring the job dependencies and
+the resource limits in each script's #PBS directives, so that whole job chains can be run
+on one workstation for integration tests and small reprocessing runs.
+
+The scheduler used by default is chosen with the XNAT_PBS_JOBS_SCHEDULER environment
+variable ('pbs', the default, or 'local'). When using the local scheduler the
+XNAT_PBS_JOBS_LOCAL_MAX_JOBS environment variable sets how many jobs can run at once.
+"""
+
+# import of built-in modules
+import abc
+import concurrent.futures
+import logging
+import os
+import re
+import signal
+import subprocess
+import threading
+
+# import of third-party modules
+
+# import of local modules
+import utils.str_utils as str_utils
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+# job dependency types (same names as the PBS depend attribute uses)
+AFTER_OK = 'afterok'
+AFTER_ANY = 'afterany'
+
+# exit status PBS reports for a job killed for exceeding its walltime
+WALLTIME_EXCEEDED_EXIT_STATUS = 271
+
+_DIRECTIVE_PATTERN = re.compile(r'^#PBS\s+-(\w)\s+(.*\S)\s*$')
+_SIZE_PATTERN = re.compile(r'^(\d+)([kmgt]?)(b|w)?$', re.IGNORECASE)
+_SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+
+class Scheduler(abc.ABC):
+	"""
+	Abstract base class for objects that run job scripts, optionally after a prior job.
+	"""
+
+	@abc.abstractmethod
+	def submit(self, script_name, prior_job=None, dependency=AFTER_OK):
+		"""
+		Submit the job script script_name and return the new job's id.
+
+		If prior_job is specified, the job does not start until the prior job has finished.
+		With the AFTER_OK dependency it only runs if the prior job succeeded. With the
+		AFTER_ANY dependency it runs however the prior job ended.
+		"""
+		raise NotImplementedError()
+
+	def wait(self):
+		"""
+		Wait for submitted jobs that are run by this process to finish. Schedulers
+		that hand jobs off to a batch system return immediately.
+		"""
+		return {}
+
+	@abc.abstractmethod
+	def active_job_ids(self):
+		"""
+		Set of the ids of jobs that are queued, held, or running (i.e. not finished),
+		each without any server suffix (see job_number).
+		"""
+		raise NotImplementedError()
+
+	@property
+	def sees_all_jobs(self):
+		"""
+		Whether active_job_ids includes jobs submitted by other processes (so that a job
+		missing from it can be taken to be finished).
+		"""
+		return False
+
+
+def job_number(job_id):
+	"""
+	Job id without the server suffix (e.g. '1234' for '1234.server.example.org'), as
+	qstat may shorten or omit the suffix.
+	"""
+	return job_id.strip().split('.')[0]
+
+
+class PbsScheduler(Scheduler):
+	"""
+	Scheduler that submits job scripts to PBS with qsub.
+	"""
+
+	def submit(self, script_name, prior_job=None, dependency=AFTER_OK):
+		if prior_job:
+			submit_cmd = 'qsub -W depend=' + dependency + ':' + prior_job + ' ' + script_name
+		else:
+			submit_cmd = 'qsub ' + script_name
+
+		completed_submit_process = subprocess.run(
+			submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+		return str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+
+	@property
+	def sees_all_jobs(self):
+		return True
+
+	def active_job_ids(self):
+		"""
+		Snapshot of the jobs qstat shows in any state other than completed (C).
+		Raises subprocess.CalledProcessError if qstat fails.
+		"""
+		completed_qstat_process = subprocess.run(
+			['qstat'], check=True, stdout=subprocess.PIPE, universal_newlines=True)
+		return parse_qstat_output(completed_qstat_process.stdout)
+
+
+def parse_qstat_output(output):
+	"""
+	Set of the job numbers of the jobs that are not completed in default format qstat
+	output (Job ID, Name, User, Time Use, S, Queue columns).
+	"""
+	active = set()
+	for line in output.splitlines():
+		fields = line.split()
+		if len(fields) >= 5 and fields[0][0].isdigit() and fields[4] != 'C':
+			active.add(job_number(fields[0]))
+	return active
+
+
+def parse_size(size_str):
+	"""
+	Number of bytes in a PBS size specification (e.g. 4gb or 512mb).
+	"""
+	match = _SIZE_PATTERN.match(size_str.strip())
+	if not match:
+		raise ValueError("Unrecognized PBS size: " + size_str)
+
+	value = int(match.group(1)) * _SIZE_UNITS[match.group(2).lower()]
+	if match.group(3) and match.group(3).lower() == 'w':
+		value *= 8  # words
+	return value
+
+
+def parse_walltime(walltime_str):
+	"""
+	Number of seconds in a PBS walltime specification ([[HH:]MM:]SS).
+	"""
+	seconds = 0
+	for field in walltime_str.strip().split(':'):
+		seconds = seconds * 60 + int(field)
+	return seconds
+
+
+def read_pbs_directives(script_name):
+	"""
+	Read the #PBS directives at the top of a job script.
+
+	Returns a dictionary with the resources requested with -l (e.g. {'nodes': '1',
+	'ppn': '1', 'walltime': '4:00:00', 'vmem': '4gb'}) under 'resources' and the values
+	of any other options (e.g. 'o', 'e', 'q') under their option letter.
+	"""
+	directives = {'resources': {}}
+
+	with open(script_name, 'r') as script:
+		for line in script:
+			line = line.strip()
+			if not line:
+				continue
+			if not line.startswith('#'):
+				break
+
+			match = _DIRECTIVE_PATTERN.match(line)
+			if not match:
+				continue
+
+			option, value = match.groups()
+			if option == 'l':
+				for resource in value.split(','):
+					name, sep, amount = resource.partition('=')
+					if name == 'nodes':
+						# node properties, e.g. nodes=1:ppn=8:gpus=1
+						amount, *properties = amount.split(':')
+						for node_property in properties:
+							property_name, sep, property_value = node_property.partition('=')
+							directives['resources'][property_name] = property_value
+					directives['resources'][name] = amount
+			else:
+				directives[option] = value
+
+	return directives
+
+
+class _LocalJob(object):
+
+	def __init__(self, job_id, script_name):
+		self.job_id = job_id
+		self.script_name = script_name
+		# set to the job's exit status when it finishes, or to None if it never runs
+		self.finished = concurrent.futures.Future()
+
+
+class LocalScheduler(Scheduler):
+	"""
+	Scheduler that runs job scripts on this machine.
+
+	Jobs whose dependencies are satisfied run on a concurrent.futures pool of max_jobs
+	workers, each job as its own bash process. The walltime in the script's #PBS
+	directives is enforced and, if enforce_memory_limits is True, the vmem (or mem)
+	request is applied as the job's address space limit. Job output goes to the -o and
+	-e directories named in the script with the names PBS would use.
+
+	Only the jobs submitted to this scheduler object are known to it, so active_job_ids
+	says nothing about jobs run by other processes (see sees_all_jobs).
+	"""
+
+	def __init__(self, max_jobs=None, enforce_memory_limits=True):
+		if max_jobs is None:
+			max_jobs = int(os.getenv('XNAT_PBS_JOBS_LOCAL_MAX_JOBS', os.cpu_count() or 1))
+		self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_jobs)
+		self._enforce_memory_limits = enforce_memory_limits
+		self._lock = threading.Lock()
+		self._job_count = 0
+		self._jobs = dict()
+
+	def submit(self, script_name, prior_job=None, dependency=AFTER_OK):
+		with self._lock:
+			if prior_job and prior_job not in self._jobs:
+				raise ValueError("Unknown prior job: " + prior_job)
+			self._job_count += 1
+			job = _LocalJob(str(self._job_count) + '.local', os.path.abspath(script_name))
+			self._jobs[job.job_id] = job
+
+		module_logger.info("submitted local job " + job.job_id + ": " + script_name)
+
+		if prior_job:
+			self._jobs[prior_job].finished.add_done_callback(
+				lambda prior: self._start_after(job, prior.result(), dependency))
+		else:
+			self._start(job)
+
+		return job.job_id
+
+	def _start_after(self, job, prior_exit_status, dependency):
+		if dependency == AFTER_OK and prior_exit_status != 0:
+			module_logger.warning("local job " + job.job_id + " not run because its prior job did not succeed")
+			job.finished.set_result(None)
+		else:
+			self._start(job)
+
+	def _start(self, job):
+		self._executor.submit(self._run, job)
+
+	def _run(self, job):
+		try:
+			exit_status = self._run_script(job)
+		except Exception as e:
+			module_logger.error("local job " + job.job_id + " could not be run: " + str(e))
+			exit_status = -1
+		job.finished.set_result(exit_status)
+
+	def _run_script(self, job):
+		directives = read_pbs_directives(job.script_name)
+		resources = directives['resources']
+
+		job_name = os.path.basename(job.script_name)
+		sequence_number = job.job_id.split('.')[0]
+		stdout_name = self._output_file_name(directives.get('o'), job_name, '.o' + sequence_number)
+		stderr_name = self._output_file_name(directives.get('e'), job_name, '.e' + sequence_number)
+
+		timeout = parse_walltime(resources['walltime']) if 'walltime' in resources else None
+		memory_limit = None
+		if self._enforce_memory_limits:
+			memory = resources.get('vmem', resources.get('mem'))
+			if memory:
+				memory_limit = parse_size(memory)
+
+		env = dict(os.environ)
+		env['PBS_JOBID'] = job.job_id
+		env['PBS_JOBNAME'] = job_name
+		env['PBS_O_WORKDIR'] = os.getcwd()
+
+		module_logger.info("running local job " + job.job_id + ": " + job.script_name)
+		with open(stdout_name, 'w') as stdout, open(stderr_name, 'w') as stderr:
+			# the job gets its own session so that everything it starts can be killed
+			# if it exceeds its walltime
+			process = subprocess.Popen(
+				_job_command(job.script_name, memory_limit), stdout=stdout, stderr=stderr, env=env,
+				start_new_session=True)
+			try:
+				exit_status = process.wait(timeout=timeout)
+			except subprocess.TimeoutExpired:
+				os.killpg(process.pid, signal.SIGKILL)
+				process.wait()
+				stderr.write("Job exceeded its walltime of " + resources['walltime'] + os.linesep)
+				exit_status = WALLTIME_EXCEEDED_EXIT_STATUS
+
+		module_logger.info("local job " + job.job_id + " finished with exit status " + str(exit_status))
+		return exit_status
+
+	def _output_file_name(self, directory, job_name, suffix):
+		if directory and os.path.isdir(directory):
+			return directory + os.sep + job_name + suffix
+		elif directory:
+			return directory
+		else:
+			return os.path.expanduser('~') + os.sep + job_name + suffix
+
+	def exit_status(self, job_id):
+		"""
+		Exit status of a finished job, None if the job was never run because of a failed
+		dependency.
+		"""
+		return self._jobs[job_id].finished.result()
+
+	def active_job_ids(self):
+		with self._lock:
+			return set(job_number(job.job_id) for job in self._jobs.values() if not job.finished.done())
+
+	def wait(self):
+		"""
+		Wait for all submitted jobs to finish and return a dictionary of job id to exit status.
+		"""
+		while True:
+			with self._lock:
+				jobs = list(self._jobs.values())
+			concurrent.futures.wait([job.finished for job in jobs])
+			with self._lock:
+				if len(self._jobs) == len(jobs):
+					return dict((job.job_id, job.finished.result()) for job in jobs)
+
+	def shutdown(self):
+		self.wait()
+		self._executor.shutdown()
+
+
+def _job_command(script_name, memory_limit=None):
+	"""
+	Command that runs the job script, limiting the virtual memory of the job (and
+	everything it starts) to memory_limit bytes if that is given. The limit is set by
+	the shell (ulimit -v) before it runs the script, rather than by Python code in the
+	forked child, which is not safe when jobs are started from several threads.
+	"""
+	if not memory_limit:
+		return ['/bin/bash', script_name]
+
+	limit_kb = max(1, memory_limit // 1024)
+	return ['/bin/bash', '-c', 'ulimit -v ' + str(limit_kb) + ' && exec /bin/bash "$0"', script_name]
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+	"""
+	The scheduler selected by the XNAT_PBS_JOBS_SCHEDULER environment variable, shared by
+	all submitters in this process.
+	"""
+	global _default_scheduler
+	with _default_scheduler_lock:
+		if _default_scheduler is None:
+			scheduler_name = os.getenv('XNAT_PBS_JOBS_SCHEDULER', 'pbs').lower()
+			if scheduler_name == 'pbs':
+				_default_scheduler = PbsScheduler()
+			elif scheduler_name == 'local':
+				_default_scheduler = LocalScheduler()
+			else:
+				raise ValueError("Unrecognized XNAT_PBS_JOBS_SCHEDULER: " + scheduler_name)
+		return _default_scheduler
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+
+"""
+ccf/shadow_selector.py: Select the PUT shadow server to use for a job based upon
+the health, latency, and recent upload throughput of each shadow server.
+
+Probing is opt-in (see probing_enabled). Upload throughput is recorded by the
+programs that PUT working directories (utils/stream_put_dir.py and
+utils/sharded_put_dir.py) each time an upload succeeds.
+"""
+
+# import of built-in modules
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# import of third-party modules
+
+# import of local modules
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+DEFAULT_PROBE_PATH = '/data/version'
+DEFAULT_PROBE_TIMEOUT_SECS = 5.0
+DEFAULT_CACHE_MINUTES = 5.0
+
+# Weight given to the most recent upload when updating a shadow's throughput estimate
+THROUGHPUT_SMOOTHING = 0.3
+
+# Probe latencies below this are treated as equal, so that ordinary network jitter
+# does not skew assignment
+LATENCY_FLOOR_SECS = 0.05
+
+# No healthy shadow gets less than this fraction of the best shadow's share of jobs
+MIN_RELATIVE_WEIGHT = 0.05
+
+
+def default_cache_file_name():
+    """
+    Name of the file in which shadow server status is cached between invocations.
+
+    Can be specified using the XNAT_PBS_JOBS_SHADOW_CACHE environment variable.
+    """
+    cache_file_name = os.getenv('XNAT_PBS_JOBS_SHADOW_CACHE')
+    if not cache_file_name:
+        cache_file_name = os.path.expanduser('~') + os.sep + '.xnat_pbs_jobs_shadow_status.json'
+    return cache_file_name
+
+
+def default_cache_seconds():
+    """
+    Number of seconds for which a probe result is considered current.
+
+    Can be specified (in minutes) using the XNAT_PBS_JOBS_SHADOW_CACHE_MINUTES environment variable.
+    """
+    minutes_str = os.getenv('XNAT_PBS_JOBS_SHADOW_CACHE_MINUTES')
+    minutes = float(minutes_str) if minutes_str else DEFAULT_CACHE_MINUTES
+    return minutes * 60.0
+
+
+def probing_enabled():
+    """
+    Whether shadow servers should be probed before being assigned work.
+
+    Probing is off (shadow numbers are assigned by plain round robin) unless the
+    XNAT_PBS_JOBS_SHADOW_PROBE environment variable is set to one of: true, yes, on, 1
+    """
+    value = os.getenv('XNAT_PBS_JOBS_SHADOW_PROBE', 'false')
+    return value.strip().lower() in ('true', 'yes', 'on', '1')
+
+
+def server_url(uri):
+    """
+    The scheme and network location of uri (e.g. http://db-shadow3.nrg.mir:8080), which
+    is how shadow servers are identified in the ShadowStatusCache.
+    """
+    parts = urllib.parse.urlsplit(uri)
+    return parts.scheme + '://' + parts.netloc
+
+
+def record_upload(uri, num_bytes, seconds, cache=None):
+    """
+    Record the throughput of a completed upload to uri (any URI on the server uploaded
+    to) in the shared ShadowStatusCache.
+    """
+    if cache is None:
+        cache = ShadowStatusCache()
+    cache.record_upload(server_url(uri), num_bytes, seconds)
+
+
+class ShadowStatus(object):
+    """
+    The most recently known state of one shadow server.
+    """
+
+    def __init__(self, url, healthy=True, latency=None, checked=0.0, throughput=None, uploads=0):
+        self.url = url
+        self.healthy = healthy
+        self.latency = latency        # seconds for the probe request, None if never probed
+        self.checked = checked        # time.time() at which the probe was done
+        self.throughput = throughput  # smoothed upload bytes/second, None if no upload recorded
+        self.uploads = uploads        # number of uploads that contributed to throughput
+
+    @classmethod
+    def from_dict(cls, url, values):
+        return cls(url,
+                   healthy=values.get('healthy', True),
+                   latency=values.get('latency'),
+                   checked=values.get('checked', 0.0),
+                   throughput=values.get('throughput'),
+                   uploads=values.get('uploads', 0))
+
+    def to_dict(self):
+        return {
+            'healthy': self.healthy,
+            'latency': self.latency,
+            'checked': self.checked,
+            'throughput': self.throughput,
+            'uploads': self.uploads
+        }
+
+    def is_current(self, max_age_secs, now=None):
+        if now is None:
+            now = time.time()
+        return self.latency is not None and (now - self.checked) <= max_age_secs
+
+    def __str__(self):
+        return (self.url + ": healthy=" + str(self.healthy) +
+                " latency=" + str(self.latency) +
+                " throughput=" + str(self.throughput))
+
+
+class ShadowStatusCache(object):
+    """
+    A JSON file of ShadowStatus values keyed by shadow server URL.
+
+    The file is shared by all submissions (and by PUT jobs that record their
+    throughput) so each read merges in what other processes have written.
+    """
+
+    def __init__(self, file_name=None):
+        self._file_name = file_name if file_name else default_cache_file_name()
+
+    @property
+    def file_name(self):
+        return self._file_name
+
+    def load(self):
+        try:
+            with open(self._file_name, 'r') as cache_file:
+                values = json.load(cache_file)
+        except (OSError, ValueError):
+            return dict()
+
+        return {url: ShadowStatus.from_dict(url, status) for url, status in values.items()}
+
+    def save(self, status_map):
+        values = self.load()
+        values.update(status_map)
+        directory = os.path.dirname(os.path.abspath(self._file_name))
+        try:
+            fd, temp_name = tempfile.mkstemp(dir=directory, prefix='.shadow_status.')
+            with os.fdopen(fd, 'w') as temp_file:
+                json.dump({url: status.to_dict() for url, status in values.items()}, temp_file, indent=2)
+            os.replace(temp_name, self._file_name)
+        except OSError as e:
+            module_logger.warning("Unable to write shadow status cache " + self._file_name + ": " + str(e))
+            with contextlib.suppress(OSError, UnboundLocalError):
+                os.remove(temp_name)
+
+    def record_upload(self, url, num_bytes, seconds):
+        """
+        Fold the throughput of a completed upload to the specified shadow URL into its
+        smoothed throughput estimate.
+        """
+        if seconds <= 0:
+            return
+
+        observed = num_bytes / seconds
+        status_map = self.load()
+        status = status_map.get(url, ShadowStatus(url, checked=0.0))
+
+        if status.throughput is None:
+            status.throughput = observed
+        else:
+            status.throughput = (THROUGHPUT_SMOOTHING * observed +
+                                 (1.0 - THROUGHPUT_SMOOTHING) * status.throughput)
+        status.uploads += 1
+
+        self.save({url: status})
+
+
+def probe_shadow(url, probe_path=DEFAULT_PROBE_PATH, timeout=DEFAULT_PROBE_TIMEOUT_SECS):
+    """
+    Time one request to the specified shadow server.
+
+    Any HTTP response that is not a server error (5xx) means the server is up, so an
+    authentication challenge counts as healthy. Connection failures, time outs, and
+    5xx responses count as unhealthy.
+    """
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(url + probe_path, timeout=timeout) as response:
+            response.read(1)
+        healthy = True
+    except urllib.error.HTTPError as e:
+        healthy = e.code < 500
+    except (urllib.error.URLError, OSError) as e:
+        module_logger.info("probe of " + url + " failed: " + str(e))
+        healthy = False
+    latency = time.monotonic() - start
+
+    return healthy, latency
+
+
+class ShadowSelector(object):
+    """
+    Hands out shadow server numbers in proportion to each server's available capacity.
+
+    A shadow's capacity is estimated from its probe latency relative to the fastest
+    shadow and its recorded upload throughput relative to the shadow with the best
+    throughput. Unhealthy shadows, and shadows in the bad_shadow_list, are given no
+    work at all. Assignment is a smooth weighted round robin, so for a given set of
+    weights the sequence of numbers returned is deterministic.
+
+    If no shadow is healthy (or probing is disabled), this falls back to plain round
+    robin over the non-bad shadows.
+    """
+
+    def __init__(self, min_shadow_number, max_shadow_number, start_number=None,
+                 url_prefix=None, url_suffix=None, shadow_urls=None, bad_shadow_list=None,
+                 cache=None, cache_seconds=None, probe=None,
+                 probe_path=DEFAULT_PROBE_PATH, probe_timeout=DEFAULT_PROBE_TIMEOUT_SECS):
+        """
+        :param shadow_urls: optional mapping of shadow number to base URL, used instead
+                            of url_prefix + number + url_suffix (e.g. to point at local
+                            stand-in servers)
+        :param probe: whether to probe the shadows; defaults to probing_enabled()
+        """
+        self._numbers = list(range(min_shadow_number, max_shadow_number + 1))
+        self._bad_shadow_list = list(bad_shadow_list) if bad_shadow_list else list()
+
+        if shadow_urls:
+            self._urls = dict(shadow_urls)
+        else:
+            self._urls = {number: url_prefix + str(number) + url_suffix for number in self._numbers}
+
+        # rotate the numbers so that ties go to the start number first, just as
+        # the plain round robin assignment starts at a random shadow
+        if start_number in self._numbers:
+            index = self._numbers.index(start_number)
+            self._numbers = self._numbers[index:] + self._numbers[:index]
+
+        self._cache = cache if cache else ShadowStatusCache()
+        self._cache_seconds = cache_seconds if cache_seconds is not None else default_cache_seconds()
+        self._probe = probing_enabled() if probe is None else probe
+        self._probe_path = probe_path
+        self._probe_timeout = probe_timeout
+
+        self._weights = None
+        self._current = {number: 0.0 for number in self._numbers}
+        self._round_robin_index = 0
+
+    def url(self, shadow_number):
+        return self._urls[shadow_number]
+
+    def _candidates(self):
+        return [number for number in self._numbers if number not in self._bad_shadow_list]
+
+    def refresh(self, force=False):
+        """
+        Probe every candidate shadow whose cached status is stale (or all of them if force
+        is True) and compute the assignment weights.
+        """
+        candidates = self._candidates()
+        statuses = self._cache.load()
+        now = time.time()
+
+        to_probe = [number for number in candidates
+                    if force or self.url(number) not in statuses
+                    or not statuses[self.url(number)].is_current(self._cache_seconds, now)]
+
+        if self._probe and to_probe:
+            probed = dict()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(to_probe)) as executor:
+                futures = {number: executor.submit(probe_shadow, self.url(number),
+                                                   self._probe_path, self._probe_timeout)
+                           for number in to_probe}
+                for number in to_probe:
+                    url = self.url(number)
+                    healthy, latency = futures[number].result()
+                    status = statuses.get(url, ShadowStatus(url))
+                    status.healthy = healthy
+                    status.latency = latency
+                    status.checked = time.time()
+                    statuses[url] = status
+                    probed[url] = status
+                    module_logger.info("probed " + str(status))
+            self._cache.save(probed)
+
+        self._weights = self._compute_weights(candidates, statuses)
+        self._current = {number: 0.0 for number in self._numbers}
+        return self._weights
+
+    def _compute_weights(self, candidates, statuses):
+        if not self._probe:
+            return dict()
+
+        healthy = [number for number in candidates
+                   if self.url(number) in statuses and statuses[self.url(number)].healthy]
+        if not healthy:
+            module_logger.warning("No healthy shadow servers found, using plain round robin")
+            return dict()
+
+        latencies = {number: max(statuses[self.url(number)].latency or 0.0, LATENCY_FLOOR_SECS)
+                     for number in healthy}
+        best_latency = min(latencies.values())
+
+        throughputs = {number: statuses[self.url(number)].throughput for number in healthy}
+        known_throughputs = [value for value in throughputs.values() if value]
+        best_throughput = max(known_throughputs) if known_throughputs else None
+
+        weights = dict()
+        for number in healthy:
+            weight = best_latency / latencies[number]
+            if best_throughput and throughputs[number]:
+                weight *= throughputs[number] / best_throughput
+            weights[number] = weight
+
+        best_weight = max(weights.values())
+        return {number: max(weight / best_weight, MIN_RELATIVE_WEIGHT) for number, weight in weights.items()}
+
+    @property
+    def weights(self):
+        """Current assignment weight by shadow number (empty when using plain round robin)"""
+        if self._weights is None:
+            self.refresh()
+        return dict(self._weights)
+
+    def next_shadow_number(self):
+        """
+        Return the number of the shadow server to which the next job should PUT its data.
+        """
+        if self._weights is None:
+            self.refresh()
+
+        if not self._weights:
+            candidates = self._candidates()
+            if not candidates:
+                raise ValueError("All shadow servers are in the bad shadow list")
+            number = candidates[self._round_robin_index % len(candidates)]
+            self._round_robin_index += 1
+            return number
+
+        total = 0.0
+        chosen = None
+        for number in self._numbers:
+            if number in self._weights:
+                self._current[number] += self._weights[number]
+                total += self._weights[number]
+                if chosen is None or self._current[number] > self._current[chosen]:
+                    chosen = number
+
+        self._current[chosen] -= total
+        return chosen
+
+
+def main():
+    parser = my_argparse.MyArgumentParser(
+        description="Show shadow server status or record the throughput of an upload to a shadow server.")
+
+    parser.add_argument('-c', '--cache-file', dest='cache_file', required=False, default=None, type=str)
+    parser.add_argument('-r', '--record-url', dest='record_url', required=False, default=None, type=str,
+                        help="shadow server URL for which to record an upload")
+    parser.add_argument('-b', '--bytes', dest='num_bytes', required=False, default=0, type=int)
+    parser.add_argument('-s', '--seconds', dest='seconds', required=False, default=0.0, type=float)
+
+    args = parser.parse_args()
+
+    cache = ShadowStatusCache(args.cache_file)
+
+    if args.record_url:
+        cache.record_upload(args.record_url, args.num_bytes, args.seconds)
+
+    for url, status in sorted(cache.load().items()):
+        print(str(status))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+"""
+ccf/stage_telemetry.py: Run one stage of a job chain and record how long it took and
+what resources it used.
+
+The generated job scripts (see ccf/one_subject_job_submitter.py) run their payload
+command through this program, e.g.
+
+    stage_telemetry.py --file=<chain>.telemetry.jsonl --pipeline=StructuralPreprocessing \\
+      --stage=GET_DATA --project=HCP_1200 --subject=100206 -- <payload command and arguments>
+
+The command is run as a child process. When it finishes, one JSON line is appended to the
+telemetry file with the stage labels, start and end times, the exit code, the peak
+resident set size and CPU time of the command (and its descendants), and the I/O counts
+from /proc/self/io that the command's process tree added. The command's arguments are not
+recorded (they can include passwords).
+
+This program exits with the exit code of the command (128 + the signal number if the
+command was killed by a signal), so job dependencies behave as if the command had been
+run directly. A failure to write the telemetry line is reported but does not change the
+exit code.
+
+Job scripts that do not source the XNAT PBS setup script (e.g. those whose payloads
+set up their own Python environment) run this program with no PYTHONPATH, so it uses
+only the Python standard library.
+"""
+
+# import of built-in modules
+import argparse
+import fcntl
+import json
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+# import of third-party modules
+
+# import of local modules
+# None (see above)
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+TELEMETRY_FILE_SUFFIX = '.telemetry.jsonl'
+
+PROC_IO_FILE_NAME = '/proc/self/io'
+
+# signals passed on to the command while it runs
+FORWARDED_SIGNALS = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2)
+
+# exit code used when the command cannot be started (as by the shell)
+COMMAND_NOT_FOUND = 127
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, file=sys.stderr, flush=True)
+
+
+def read_proc_io(file_name=PROC_IO_FILE_NAME):
+	"""
+	Dictionary of the counters in /proc/self/io (rchar, wchar, syscr, syscw,
+	read_bytes, write_bytes, cancelled_write_bytes), or an empty dictionary where
+	that file is not available.
+
+	The counters of child processes are added to their parent's when they are waited
+	for, so the difference between readings before and after running a command
+	includes all the I/O of the command's process tree.
+	"""
+	counters = dict()
+	try:
+		with open(file_name) as proc_io:
+			for line in proc_io:
+				name, value = line.split(':')
+				counters[name.strip()] = int(value)
+	except (OSError, ValueError):
+		pass
+	return counters
+
+
+def run_command(command):
+	"""
+	Run command (a list of program and arguments) and return a dictionary describing
+	the run: start, end, seconds, exit_code, max_rss_kb, user_seconds, system_seconds,
+	and the /proc/self/io counter differences.
+	"""
+	io_before = read_proc_io()
+	start = time.time()
+
+	try:
+		process = subprocess.Popen(command)
+	except OSError as e:
+		_inform("ERROR: unable to run " + command[0] + ": " + str(e))
+		exit_code = COMMAND_NOT_FOUND
+	else:
+		previous_handlers = dict()
+
+		def forward(signal_number, frame):
+			process.send_signal(signal_number)
+
+		for signal_number in FORWARDED_SIGNALS:
+			previous_handlers[signal_number] = signal.signal(signal_number, forward)
+		try:
+			return_code = process.wait()
+		finally:
+			for signal_number, handler in previous_handlers.items():
+				signal.signal(signal_number, handler)
+
+		exit_code = return_code if return_code >= 0 else 128 - return_code
+
+	end = time.time()
+	io_after = read_proc_io()
+	usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+	record = {
+		'start': round(start, 3),
+		'end': round(end, 3),
+		'seconds': round(end - start, 3),
+		'exit_code': exit_code,
+		'max_rss_kb': usage.ru_maxrss,
+		'user_seconds': round(usage.ru_utime, 3),
+		'system_seconds': round(usage.ru_stime, 3),
+	}
+	for name, value in io_after.items():
+		record[name] = value - io_before.get(name, 0)
+	return record
+
+
+def append_record(file_name, record):
+	"""
+	Append record as one JSON line to file_name, holding an exclusive lock so that
+	stages of different chains sharing a file do not interleave their lines.
+	"""
+	with open(file_name, 'a') as telemetry_file:
+		fcntl.flock(telemetry_file, fcntl.LOCK_EX)
+		try:
+			telemetry_file.write(json.dumps(record, sort_keys=True) + '\n')
+		finally:
+			fcntl.flock(telemetry_file, fcntl.LOCK_UN)
+
+
+def read_records(file_names):
+	"""
+	Generator of the records in the specified telemetry files. Lines that cannot be
+	parsed (e.g. partially written by a job that was killed) are skipped.
+	"""
+	for file_name in file_names:
+		with open(file_name) as telemetry_file:
+			for line in telemetry_file:
+				try:
+					yield json.loads(line)
+				except ValueError:
+					pass
+
+
+def _parse_args(argv):
+	parser = argparse.ArgumentParser(
+		description="Run a job stage and append its timing and resource use to a telemetry file.")
+
+	# mandatory arguments
+	parser.add_argument('-f', '--file', dest='file', required=True, type=str)
+	parser.add_argument('--pipeline', dest='pipeline', required=True, type=str)
+	parser.add_argument('--stage', dest='stage', required=True, type=str)
+
+	# optional arguments
+	parser.add_argument('--project', dest='project', required=False, type=str)
+	parser.add_argument('--subject', dest='subject', required=False, type=str)
+	parser.add_argument('--scan', dest='scan', required=False, type=str)
+
+	# everything after -- is the command to run
+	if '--' not in argv:
+		parser.error("the command to run must follow --")
+	separator = argv.index('--')
+	args = parser.parse_args(argv[:separator])
+	command = argv[separator + 1:]
+	if not command:
+		parser.error("no command to run")
+	return args, command
+
+
+def main():
+	args, command = _parse_args(sys.argv[1:])
+
+	record = {
+		'pipeline': args.pipeline,
+		'stage': args.stage,
+		'project': args.project,
+		'subject': args.subject,
+		'scan': args.scan,
+		'job_id': os.getenv('PBS_JOBID'),
+		'host': socket.gethostname(),
+	}
+	record.update(run_command(command))
+
+	try:
+		append_record(args.file, record)
+	except OSError as e:
+		_inform("WARNING: unable to write telemetry to " + args.file + ": " + str(e))
+
+	sys.exit(record['exit_code'])
+
+
+if __name__ == '__main__':
+	main()
@@ -64,13 +64,17 @@ if __name__ == "__main__":
     # is marked complete and just go ahead and do a full completion check.
     parser.add_argument('-b', '--bypass-mark', dest='bypass_mark', action='store_true',
                         required=False, default=False)
+    # The --deep option also reads the headers of the expected images to make sure they are complete
+    # (not truncated) and consistent. It implies --bypass-mark.
+    parser.add_argument('-d', '--deep', dest='deep', action='store_true',
+                        required=False, default=False)
     parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
                         required=False, default=False)
 
     # parse the command line arguments
     args = parser.parse_args()
 
-    if args.bypass_mark:
+    if args.bypass_mark or args.deep:
         module_logger.info("Bypassing completion markers and doing complete check")
         print("Bypassing completion markers and doing complete check")
     else:
@@ -97,14 +101,16 @@ if __name__ == "__main__":
     prereq_checker = one_subject_prereq_checker.OneSubjectPrereqChecker()
     running_checker = one_subject_run_status_checker.OneSubjectRunStatusChecker()
     
-    for subject in subject_list:
+    # read each session's running status directory once for the whole list
+    queued_or_running_list = running_checker.get_queued_or_running_list(subject_list)
+
+    for subject, queued_or_running in zip(subject_list, queued_or_running_list):
         project = subject.project
         subject_id = subject.subject_id
         classifier = subject.classifier
         scan = subject.extra
 
         prereqs_met = prereq_checker.are_prereqs_met(archive, subject)
-        queued_or_running = running_checker.get_queued_or_running(subject)
         
         if completion_checker.does_processed_resource_exist(archive, subject):
             resource_exists = True
@@ -115,9 +121,10 @@ if __name__ == "__main__":
             timestamp = os.path.getmtime(fullpath)
             resource_date = datetime.datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
             
-            if args.bypass_mark:
+            if args.bypass_mark or args.deep:
                 files_exist = completion_checker.is_processing_complete(archive, subject,
-                                                                        verbose=args.verbose)
+                                                                        verbose=args.verbose,
+                                                                        deep=args.deep)
             else:
                 files_exist = completion_checker.is_processing_marked_complete(archive, subject)
 
@@ -34,9 +34,11 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
     def __init__(self):
         super().__init__(ccf_archive.CcfArchive())
 
-    def submit_jobs(self, username, password, subject_list, config, force_job_submission=False):
+    def submit_jobs(self, username, password, subject_list, config, force_job_submission=False, parallel=1):
 
-        # submit jobs for the listed subjects
+        prepared_list = []
+
+        # configure a submitter for each of the listed subjects
         for subject in subject_list:
 
             if not force_job_submission:
@@ -103,16 +105,14 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
             submitter.vmem_limit_gbs = vmem_limit_gbs
             submitter.output_resource_suffix = output_resource_suffix
 
-            # submit jobs
-            submitted_job_list = submitter.submit_jobs(processing_stage)
-
-            for job in submitted_job_list:
-                print("\tsubmitted jobs:", job)
+            prepared_list.append((subject, submitter, processing_stage))
 
-            print("-----")
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, parallel)
+        self.print_submission_summary(results)
 
 
-def do_submissions(userid, password, subject_list, force_job_submissions=False):
+def do_submissions(userid, password, subject_list, force_job_submissions=False, parallel=1):
 
     # read the configuration file
     config_file_name = file_utils.get_config_file_name(__file__)
@@ -122,7 +122,7 @@ def do_submissions(userid, password, subject_list, force_job_submissions=False):
 
     # process the subjects in the list
     batch_submitter = BatchSubmitter()
-    batch_submitter.submit_jobs(userid, password, subject_list, config, force_job_submissions)
+    batch_submitter.submit_jobs(userid, password, subject_list, config, force_job_submissions, parallel)
     
 
 if __name__ == '__main__':
@@ -141,6 +141,10 @@ if __name__ == '__main__':
     # subject/session and to go ahead and submit the jobs anyhow.
     parser.add_argument('-f', '--force-job-submission', dest='force_job_submission', action='store_true',
                         required=False, default=False)
+
+    # The --parallel or -p option specifies how many subjects should have their
+    # scripts created and jobs submitted at the same time.
+    parser.add_argument('-p', '--parallel', dest='parallel', required=False, default=1, type=int)
     
     # parse the command line arguments
     args = parser.parse_args()
@@ -154,4 +158,4 @@ if __name__ == '__main__':
     print("Retrieving subject list from: " + subject_file_name)
     subject_list = ccf_subject.read_subject_info_list(subject_file_name, separator=":")
 
-    do_submissions(userid, password, subject_list, args.force_job_submission)
+    do_submissions(userid, password, subject_list, args.force_job_submission, args.parallel)
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 # import of built-in modules
-import contextlib
 import glob
 import logging
 import os
@@ -17,6 +16,7 @@ import ccf.processing_stage as ccf_processing_stage
 import ccf.subject as ccf_subject
 import utils.debug_utils as debug_utils
 import utils.os_utils as os_utils
+import utils.script_template as script_template
 import utils.str_utils as str_utils
 
 # authorship information
@@ -29,6 +29,63 @@ module_logger = logging.getLogger(__name__)
 # Note: This can be overidden by log file configuration
 module_logger.setLevel(logging.WARNING)
 
+GET_DATA_TEMPLATE = one_subject_job_submitter.PBS_HEADER_TEMPLATE + """\
+{{get_data_program_path}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --classifier={{classifier}} \\
+{{?scan}}  --scan={{scan}} \\
+  --working-dir={{working_directory_name}} \\
+{{?use_prescan_normalized}}  --use-prescan-normalized \\
+  --delay-seconds=120
+"""
+
+PROCESS_DATA_TEMPLATE = one_subject_job_submitter.PBS_HEADER_TEMPLATE + """\
+{{process_data_program_path}} \\
+  --user={{username}} \\
+  --password={{password}} \\
+  --server={{server_name}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --session={{session}} \\
+  --session-classifier={{classifier}} \\
+  --fieldmap-type={{fieldmap_type}} \\
+  --first-t1w-directory-name={{first_t1w_directory_name}} \\
+  --first-t1w-resource-name={{first_t1w_resource_name}} \\
+  --first-t1w-file-name={{first_t1w_file_name}} \\
+  --first-t2w-directory-name={{first_t2w_directory_name}} \\
+  --first-t2w-resource-name={{first_t2w_resource_name}} \\
+  --first-t2w-file-name={{first_t2w_file_name}} \\
+  --brainsize={{brain_size}} \\
+  --t1template={{t1template}} \\
+  --t1templatebrain={{t1templatebrain}} \\
+  --t1template2mm={{t1template2mm}} \\
+  --t2template={{t2template}} \\
+  --t2templatebrain={{t2templatebrain}} \\
+  --t2template2mm={{t2template2mm}} \\
+  --templatemask={{templatemask}} \\
+  --template2mmmask={{template2mmmask}} \\
+  --fnirtconfig={{fnirtconfig}} \\
+  --gdcoeffs={{gdcoeffs}} \\
+  --topupconfig={{topupconfig}} \\
+{{?spin_echo}}  --se-phase-pos={{se_phase_pos}} \\
+{{?spin_echo}}  --se-phase-neg={{se_phase_neg}} \\
+  --working-dir={{working_directory_name}} \\
+  --setup-script={{setup_file_name}}
+"""
+
+FREESURFER_ASSESSOR_TEMPLATE = one_subject_job_submitter.PBS_HEADER_TEMPLATE + """\
+{{freesurfer_assessor_program_path}} \\
+  --user={{username}} \\
+  --password={{password}} \\
+  --server={{server_name}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --session={{session}} \\
+  --session-classifier={{classifier}} \\
+  --working-dir={{working_directory_name}}
+"""
+
 
 class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 
@@ -71,7 +128,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 	@use_prescan_normalized.setter
 	def use_prescan_normalized(self, value):
 		self._use_prescan_normalized = value
-		module_logger.debug(debug_utils.get_name() + ": set to " + str(self._use_prescan_normalized))
+		debug_utils.debug(module_logger, ": set to %s", self._use_prescan_normalized)
 	
 	@property
 	def brain_size(self):
@@ -80,8 +137,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 	@brain_size.setter
 	def brain_size(self, value):
 		self._brain_size = value
-		module_logger.debug(debug_utils.get_name() + ": set to " +
-							str(self._brain_size))
+		debug_utils.debug(module_logger, ": set to %s", self._brain_size)
 
 	def _template_size_str(self):
 		if self.project == None:
@@ -144,46 +200,21 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 
 	@property
 	def freesurfer_assessor_script_name(self):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 		return self.scripts_start_name + '.XNAT_CREATE_FREESURFER_ASSESSOR_job.sh'
 
-	def create_get_data_job_script(self):
-		"""Create the script to be submitted to perform the get data job"""
-		module_logger.debug(debug_utils.get_name())
-
-		script_name = self.get_data_job_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		self._write_bash_header(script)
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-		script.write('#PBS -q HCPput' + os.linesep)
-		script.write('#PBS -o ' + self.working_directory_name + os.linesep)
-		script.write('#PBS -e ' + self.working_directory_name + os.linesep)
-		script.write(os.linesep)
-		script.write('source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name() + os.linesep)
-		script.write(os.linesep)
-		script.write(self.get_data_program_path + ' \\' + os.linesep)
-		script.write('  --project=' + self.project + ' \\' + os.linesep)
-		script.write('  --subject=' + self.subject + ' \\' + os.linesep)
-		script.write('  --classifier=' + self.classifier + ' \\' + os.linesep)
-
-		if self.scan:
-			script.write('  --scan=' + self.scan + ' \\' + os.linesep)
-			
-		script.write('  --working-dir=' + self.working_directory_name + ' \\' + os.linesep)
-
-		if self.use_prescan_normalized:
-			script.write('  --use-prescan-normalized' + ' \\' + os.linesep)
-		
-		script.write('  --delay-seconds=120' + os.linesep)
-		
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
-
+	def render_get_data_job_script(self):
+		"""Text of the script to be submitted to perform the get data job"""
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb',
+										   self.working_directory_name, queue='HCPput', stage='GET_DATA')
+		context.update(get_data_program_path=self.get_data_program_path,
+					   project=self.project,
+					   subject=self.subject,
+					   classifier=self.classifier,
+					   scan=self.scan,
+					   working_directory_name=self.working_directory_name,
+					   use_prescan_normalized=self.use_prescan_normalized)
+		return script_template.render(GET_DATA_TEMPLATE, context)
 
 	def _get_first_t1w_resource_fullpath(self, subject_info):
 		t1w_resource_paths = self.archive.available_t1w_unproc_dir_full_paths(subject_info)
@@ -322,214 +353,116 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 		else:
 			return self.session + self.archive.NAME_DELIMITER + self._get_first_t2w_name(subject_info) + '.nii.gz'
 
-	def create_process_data_job_script(self):
-		module_logger.debug(debug_utils.get_name())
-
-		# copy the .XNAT_PROCESS script to the working directory
-		processing_script_source_path = self.xnat_pbs_jobs_home
-		processing_script_source_path += os.sep + self.PIPELINE_NAME
-		processing_script_source_path += os.sep + self.PIPELINE_NAME
-		processing_script_source_path += '.XNAT_PROCESS'
-
-		processing_script_dest_path = self.working_directory_name
-		processing_script_dest_path += os.sep + self.PIPELINE_NAME
-		processing_script_dest_path += '.XNAT_PROCESS'
-
-		shutil.copy(processing_script_source_path, processing_script_dest_path)
-		os.chmod(processing_script_dest_path, stat.S_IRWXU | stat.S_IRWXG)
-
-		# write the process data job script (that calls the .XNAT_PROCESS script)
+	def render_process_data_job_script(self):
+		debug_utils.debug(module_logger)
 
 		subject_info = ccf_subject.SubjectInfo(self.project, self.subject, self.classifier)
 
-		script_name = self.process_data_job_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		walltime_limit_str = str(self.walltime_limit_hours) + ':00:00'
-		vmem_limit_str = str(self.vmem_limit_gbs) + 'gb'
-
-		resources_line = '#PBS -l nodes=' + str(self.WORK_NODE_COUNT)
-		resources_line += ':ppn=' + str(self.WORK_PPN)
-		resources_line += ',walltime=' + walltime_limit_str
-		resources_line += ',mem=' + vmem_limit_str
-
-		stdout_line = '#PBS -o ' + self.working_directory_name
-		stderr_line = '#PBS -e ' + self.working_directory_name
-
-		xnat_pbs_setup_line = 'source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name()
-		
-		script_line	= processing_script_dest_path
-		user_line	  = '  --user=' + self.username
-		password_line  = '  --password=' + self.password
-		server_line	= '  --server=' + str_utils.get_server_name(self.server)
-		project_line   = '  --project=' + self.project
-		subject_line   = '  --subject=' + self.subject
-		session_line   = '  --session=' + self.session
-		session_classifier_line = '  --session-classifier=' + self.classifier
-
-		if self._has_spin_echo_field_maps(subject_info):
-			fieldmap_type_line = '  --fieldmap-type=' + 'SpinEcho'
-		else:
-			fieldmap_type_line = '  --fieldmap-type=' + 'SiemensGradientEcho' 
-			
-		first_t1w_directory_name_line = '  --first-t1w-directory-name=' + self._get_first_t1w_directory_name(subject_info)
-		first_t1w_resource_name_line  = '  --first-t1w-resource-name=' + self._get_first_t1w_resource_name(subject_info)
-		first_t1w_file_name_line	  = '  --first-t1w-file-name=' + self._get_first_t1w_file_name(subject_info)
-		
-		first_t2w_directory_name_line = '  --first-t2w-directory-name=' + self._get_first_t2w_directory_name(subject_info)
-		first_t2w_resource_name_line  = '  --first-t2w-resource-name=' + self._get_first_t2w_resource_name(subject_info)
-		first_t2w_file_name_line	  = '  --first-t2w-file-name=' + self._get_first_t2w_file_name(subject_info)
-		
-		brain_size_line			   = '  --brainsize=' + str(self.brain_size)
-
-		t1template_line	  = '  --t1template=' + self.T1W_TEMPLATE_NAME
-		t1templatebrain_line = '  --t1templatebrain=' + self.T1W_TEMPLATE_BRAIN_NAME
-		t1template2mm_line   = '  --t1template2mm=' + self.T1W_TEMPLATE_2MM_NAME
-		t2template_line	  = '  --t2template=' + self.T2W_TEMPLATE_NAME
-		t2templatebrain_line = '  --t2templatebrain=' + self.T2W_TEMPLATE_BRAIN_NAME
-		t2template2mm_line   = '  --t2template2mm=' + self.T2W_TEMPLATE_2MM_NAME
-		templatemask_line	= '  --templatemask=' + self.TEMPLATE_MASK_NAME
-		template2mmmask_line = '  --template2mmmask=' + self.TEMPLATE_2MM_MASK_NAME
-
-		fnirtconfig_line	 = '  --fnirtconfig=' + self.FNIRT_CONFIG_FILE_NAME
+		resources = 'nodes=' + str(self.WORK_NODE_COUNT)
+		resources += ':ppn=' + str(self.WORK_PPN)
+		resources += ',walltime=' + str(self.walltime_limit_hours) + ':00:00'
+		resources += ',mem=' + str(self.vmem_limit_gbs) + 'gb'
 
 		if subject_info.project in OneSubjectJobSubmitter._CONNECTOME_SKYRA_SCANNER_PROJECTS:
-			gdcoeffs_line = '  --gdcoeffs=' + self.CONNECTOME_GDCOEFFS_FILE_NAME
+			gdcoeffs = self.CONNECTOME_GDCOEFFS_FILE_NAME
 		elif subject_info.project in OneSubjectJobSubmitter._PRISMA_3T_PROJECTS:
-			gdcoeffs_line = '  --gdcoeffs=' + self.PRISMA_3T_GDCOEFFS_FILE_NAME
+			gdcoeffs = self.PRISMA_3T_GDCOEFFS_FILE_NAME
 		else:
 			raise ValueError("Unrecognized project for setting gradient distortion coefficients file: " + subject_info.project)
 
-		topupconfig_line	 = '  --topupconfig=' + self.TOPUP_CONFIG_FILE_NAME
+		spin_echo = self._has_spin_echo_field_maps(subject_info)
+
+		context = self._pbs_header_context(resources, self.working_directory_name, bash_shell=False,
+										   stage='PROCESS_DATA')
+		context.update(process_data_program_path=self.process_data_program_path,
+					   username=self.username,
+					   password=self.password,
+					   server_name=str_utils.get_server_name(self.server),
+					   project=self.project,
+					   subject=self.subject,
+					   session=self.session,
+					   classifier=self.classifier,
+					   fieldmap_type='SpinEcho' if spin_echo else 'SiemensGradientEcho',
+					   first_t1w_directory_name=self._get_first_t1w_directory_name(subject_info),
+					   first_t1w_resource_name=self._get_first_t1w_resource_name(subject_info),
+					   first_t1w_file_name=self._get_first_t1w_file_name(subject_info),
+					   first_t2w_directory_name=self._get_first_t2w_directory_name(subject_info),
+					   first_t2w_resource_name=self._get_first_t2w_resource_name(subject_info),
+					   first_t2w_file_name=self._get_first_t2w_file_name(subject_info),
+					   brain_size=self.brain_size,
+					   t1template=self.T1W_TEMPLATE_NAME,
+					   t1templatebrain=self.T1W_TEMPLATE_BRAIN_NAME,
+					   t1template2mm=self.T1W_TEMPLATE_2MM_NAME,
+					   t2template=self.T2W_TEMPLATE_NAME,
+					   t2templatebrain=self.T2W_TEMPLATE_BRAIN_NAME,
+					   t2template2mm=self.T2W_TEMPLATE_2MM_NAME,
+					   templatemask=self.TEMPLATE_MASK_NAME,
+					   template2mmmask=self.TEMPLATE_2MM_MASK_NAME,
+					   fnirtconfig=self.FNIRT_CONFIG_FILE_NAME,
+					   gdcoeffs=gdcoeffs,
+					   topupconfig=self.TOPUP_CONFIG_FILE_NAME,
+					   spin_echo=spin_echo,
+					   se_phase_pos=self._get_positive_spin_echo_file_name(subject_info) if spin_echo else None,
+					   se_phase_neg=self._get_negative_spin_echo_file_name(subject_info) if spin_echo else None,
+					   working_directory_name=self.working_directory_name,
+					   setup_file_name=self.setup_file_name)
+		return script_template.render(PROCESS_DATA_TEMPLATE, context)
 
-		if self._has_spin_echo_field_maps(subject_info):
-			se_phase_pos_line = '  --se-phase-pos=' + self._get_positive_spin_echo_file_name(subject_info)
-			se_phase_neg_line = '  --se-phase-neg=' + self._get_negative_spin_echo_file_name(subject_info)
-			# mag_line = None
-			# phase_line = None
-		else:
-			se_phase_pos_line = None
-			se_phase_neg_line = None
-			# mag_line   = '  --fmapmag=' + self._get_fmap_mag_file_name(subject_info)
-			# phase_line = '  --fmapphase=' + self._get_fmap_phase_file_name(subject_info)
-			
-		wdir_line  = '  --working-dir=' + self.working_directory_name
-		setup_line = '  --setup-script=' + self.setup_file_name
-
-		with open(script_name, 'w') as script:
-			script.write(resources_line + os.linesep)
-			script.write(stdout_line + os.linesep)
-			script.write(stderr_line + os.linesep)
-			script.write(os.linesep)
-			script.write(xnat_pbs_setup_line + os.linesep)
-			script.write(os.linesep)
-			script.write(script_line + ' \\' + os.linesep)
-			script.write(user_line + ' \\' + os.linesep)
-			script.write(password_line + ' \\' + os.linesep)
-			script.write(server_line + ' \\' + os.linesep)
-			script.write(project_line + ' \\' + os.linesep)
-			script.write(subject_line + ' \\' + os.linesep)
-			script.write(session_line + ' \\' + os.linesep)
-			script.write(session_classifier_line + ' \\' + os.linesep)
-			script.write(fieldmap_type_line + ' \\' + os.linesep)
-			script.write(first_t1w_directory_name_line + ' \\' + os.linesep)
-			script.write(first_t1w_resource_name_line + ' \\' + os.linesep)
-			script.write(first_t1w_file_name_line + ' \\' + os.linesep)
-			script.write(first_t2w_directory_name_line + ' \\' + os.linesep)
-			script.write(first_t2w_resource_name_line + ' \\' + os.linesep)
-			script.write(first_t2w_file_name_line + ' \\' + os.linesep)
-			script.write(brain_size_line + ' \\' + os.linesep)
-			script.write(t1template_line + ' \\' + os.linesep)
-			script.write(t1templatebrain_line + ' \\' + os.linesep)
-			script.write(t1template2mm_line + ' \\' + os.linesep)
-			script.write(t2template_line + ' \\' + os.linesep)
-			script.write(t2templatebrain_line + ' \\' + os.linesep)
-			script.write(t2template2mm_line + ' \\' + os.linesep)
-			script.write(templatemask_line + ' \\' + os.linesep)
-			script.write(template2mmmask_line + ' \\' + os.linesep)
-			script.write(fnirtconfig_line + ' \\' + os.linesep)
-			script.write(gdcoeffs_line + ' \\' + os.linesep)
-			script.write(topupconfig_line + ' \\' + os.linesep)
-
-			if (se_phase_pos_line): script.write(se_phase_pos_line + ' \\' + os.linesep)
-			if (se_phase_neg_line): script.write(se_phase_neg_line + ' \\' + os.linesep)
-			# if (mag_line): script.write(mag_line + ' \\' + os.linesep)
-			# if (phase_line): script.write(phase_line + ' \\' + os.linesep)
-			
-			script.write(wdir_line + ' \\' + os.linesep)
-			script.write(setup_line + os.linesep)
+	@property
+	def freesurfer_assessor_program_source_path(self):
+		name = self.xnat_pbs_jobs_home
+		name += os.sep + self.PIPELINE_NAME
+		name += os.sep + self.PIPELINE_NAME
+		name += '.XNAT_CREATE_FREESURFER_ASSESSOR'
+		return name
 
-			os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
+	@property
+	def freesurfer_assessor_program_path(self):
+		name = self.working_directory_name
+		name += os.sep + self.PIPELINE_NAME
+		name += '.XNAT_CREATE_FREESURFER_ASSESSOR'
+		return name
+
+	def copy_freesurfer_assessor_program(self):
+		debug_utils.debug(module_logger)
+		shutil.copy(self.freesurfer_assessor_program_source_path, self.freesurfer_assessor_program_path)
+		os.chmod(self.freesurfer_assessor_program_path, stat.S_IRWXU | stat.S_IRWXG)
+
+	def render_freesurfer_assessor_script(self):
+		context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb', self.working_directory_name,
+										   stage='FREESURFER_ASSESSOR')
+		context.update(freesurfer_assessor_program_path=self.freesurfer_assessor_program_path,
+					   username=self.username,
+					   password=self.password,
+					   server_name=str_utils.get_server_name(self.server),
+					   project=self.project,
+					   subject=self.subject,
+					   session=self.session,
+					   classifier=self.classifier,
+					   working_directory_name=self.working_directory_name)
+		return script_template.render(FREESURFER_ASSESSOR_TEMPLATE, context)
 
 	def create_freesurfer_assessor_script(self):
-		module_logger.debug(debug_utils.get_name())
-
-		# copy the .XNAT_CREATE_FREESURFER_ASSESSOR script to the working directory
-		freesurfer_assessor_source_path = self.xnat_pbs_jobs_home
-		freesurfer_assessor_source_path += os.sep + self.PIPELINE_NAME
-		freesurfer_assessor_source_path += os.sep + self.PIPELINE_NAME
-		freesurfer_assessor_source_path += '.XNAT_CREATE_FREESURFER_ASSESSOR'
-
-		freesurfer_assessor_dest_path = self.working_directory_name
-		freesurfer_assessor_dest_path += os.sep + self.PIPELINE_NAME
-		freesurfer_assessor_dest_path += '.XNAT_CREATE_FREESURFER_ASSESSOR'
-
-		shutil.copy(freesurfer_assessor_source_path, freesurfer_assessor_dest_path)
-		os.chmod(freesurfer_assessor_dest_path, stat.S_IRWXU | stat.S_IRWXG)
-
-		# write the freesurfer assessor submission script (that calls the .XNAT_CREATE_FREESURFER_ASSESSOR script)
-
-		script_name = self.freesurfer_assessor_script_name
-
-		with contextlib.suppress(FileNotFoundError):
-			os.remove(script_name)
-
-		script = open(script_name, 'w')
-
-		self._write_bash_header(script)
-		script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-		script.write('#PBS -o ' + self.working_directory_name + os.linesep)
-		script.write('#PBS -e ' + self.working_directory_name + os.linesep)
-		script.write(os.linesep)
-		script.write('source ' + self._get_xnat_pbs_setup_script_path() + ' ' + self._get_db_name() + os.linesep)
-		script.write(os.linesep)
-		script_line	= freesurfer_assessor_dest_path
-		user_line	  = '  --user='		+ self.username
-		password_line  = '  --password='	+ self.password
-		server_line	= '  --server='	  + str_utils.get_server_name(self.server)
-		project_line   = '  --project='	 + self.project
-		subject_line   = '  --subject='	 + self.subject
-		session_line   = '  --session='	 + self.session
-		session_classifier_line = '  --session-classifier=' + self.classifier
-		wdir_line	  = '  --working-dir=' + self.working_directory_name
-
-		script.write(script_line   + ' \\' + os.linesep)
-		script.write(user_line	 + ' \\' + os.linesep)
-		script.write(password_line + ' \\' + os.linesep)
-		script.write(server_line + ' \\' + os.linesep)
-		script.write(project_line + ' \\' + os.linesep)
-		script.write(subject_line + ' \\' + os.linesep)
-		script.write(session_line + ' \\' + os.linesep)
-		script.write(session_classifier_line + ' \\' + os.linesep)
-		script.write(wdir_line + os.linesep)
-
-		script.close()
-		os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
-
-	def create_scripts(self, stage):
-		module_logger.debug(debug_utils.get_name())
-		super().create_scripts(stage)
+		debug_utils.debug(module_logger)
+		self.copy_freesurfer_assessor_program()
+		script_template.write_script(self.freesurfer_assessor_script_name, self.render_freesurfer_assessor_script())
 
-		if OneSubjectJobSubmitter._SUPPRESS_FREESURFER_ASSESSOR_JOB:
-			return
+	def copy_job_programs(self):
+		super().copy_job_programs()
+
+		if not OneSubjectJobSubmitter._SUPPRESS_FREESURFER_ASSESSOR_JOB:
+			self.copy_freesurfer_assessor_program()
+
+	def rendered_job_scripts(self):
+		scripts = super().rendered_job_scripts()
+
+		if not OneSubjectJobSubmitter._SUPPRESS_FREESURFER_ASSESSOR_JOB:
+			scripts.append((self.freesurfer_assessor_script_name, self.render_freesurfer_assessor_script()))
 
-		if stage >= ccf_processing_stage.ProcessingStage.PREPARE_SCRIPTS:
-			self.create_freesurfer_assessor_script()
+		return scripts
 
 	def submit_process_data_jobs(self, stage, prior_job=None):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		# go ahead and submit the standard process data job and then
 		# submit an additional freesurfer assessor job
@@ -541,14 +474,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 			return standard_process_data_jobno, all_process_data_jobs
 		
 		if stage >= ccf_processing_stage.ProcessingStage.PROCESS_DATA:
-			if standard_process_data_jobno:
-				fs_submit_cmd = 'qsub -W depend=afterok:' + standard_process_data_jobno + ' ' + self.freesurfer_assessor_script_name
-			else:
-				fs_submit_cmd = 'qsub ' + self.freesurfer_assessor_script_name
-
-			completed_submit_process = subprocess.run(
-				fs_submit_cmd, shell=True, check=True, stdout=subprocess.PIPE, universal_newlines=True)
-			fs_job_no = str_utils.remove_ending_new_lines(completed_submit_process.stdout)
+			fs_job_no = self.scheduler.submit(self.freesurfer_assessor_script_name, standard_process_data_jobno)
 			all_process_data_jobs.append(fs_job_no)
 			return fs_job_no, all_process_data_jobs
 
@@ -557,7 +483,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
 			return standard_process_data_jobno, all_process_data_jobs
 
 	def mark_running_status(self, stage):
-		module_logger.debug(debug_utils.get_name())
+		debug_utils.debug(module_logger)
 
 		if stage > ccf_processing_stage.ProcessingStage.PREPARE_SCRIPTS:
 			mark_cmd = self._xnat_pbs_jobs_home
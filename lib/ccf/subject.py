@@ -11,7 +11,7 @@ import os
 # import of third-party modules
 
 # import of local modules
-import utils.str_utils as str_utils
+import utils.subject_list as subject_list
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -87,25 +87,13 @@ def read_subject_info_list(file_name, separator=SubjectInfo.DEFAULT_SEPARATOR())
     """
     subject_info_list = []
 
-    input_file = open(file_name, 'r')
-    for line in input_file:
-        # remove new line characters
-        line = str_utils.remove_ending_new_lines(line)
-
-        # remove leading and trailing spaces
-        line = line.strip()
-
-        # ignore blank lines and comment lines - starting with #
-        if line != '' and line[0] != '#':
-            (project, subject_id, classifier, extra) = line.split(separator)
-            # Make the string 'None' in the file translate to a None type instead of
-            # just the string itself
-            if extra == 'None':
-                extra = None
-            subject_info = SubjectInfo(project, subject_id, classifier, extra)
-            subject_info_list.append(subject_info)
-
-    input_file.close()
+    for (project, subject_id, classifier, extra) in subject_list.read_fields(file_name, 'ccf', separator):
+        # Make the string 'None' in the file translate to a None type instead of
+        # just the string itself
+        if extra == 'None':
+            extra = None
+        subject_info = SubjectInfo(project, subject_id, classifier, extra)
+        subject_info_list.append(subject_info)
 
     return subject_info_list
 
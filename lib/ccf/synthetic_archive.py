@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+"""
+ccf/synthetic_archive.py: Generate a synthetic CCF/HCP archive for benchmarks and tests.
+
+The generated archive follows the directory and naming conventions that CcfArchive and
+Hcp7T_Archive expect (<root>/<project>/arc001/<subject>_<classifier>/RESOURCES/...), so
+the archive, completion checking, and staging code can be run against it anywhere by
+pointing XNAT_PBS_JOBS_ARCHIVE_ROOT at the generated root.
+
+For each subject the following resources are created:
+
+  T1w_MPR1_unproc, T2w_SPC1_unproc, Diffusion_unproc, <scan>_unproc
+  Structural_preproc, Diffusion_preproc, <scan>_preproc
+  <scan>_FIX, <scan>_RSS, MSMAllReg, MSMAllDeDrift
+  RunningStatus
+
+The preprocessed resources contain exactly the files the corresponding CCF completion
+checkers expect, along with <PIPELINE>.starttime and <PIPELINE>.XNAT_CHECK.success
+markers. Modification times are set so that every processed resource is newer than its
+prerequisites. NIfTI and CIFTI files get small valid headers, and can optionally be
+extended to a given size as sparse files.
+
+Faults can be injected: a fraction of the expected files can be left out and a fraction
+of the completion markers can be made older than their starttime markers.
+"""
+
+# import of built-in modules
+import logging
+import os
+import random
+import sys
+import time
+
+# import of third-party modules
+
+# import of local modules
+import ccf.archive as ccf_archive
+import ccf.subject as ccf_subject
+import utils.my_argparse as my_argparse
+import utils.nifti as nifti
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+DEFAULT_SCAN_NAMES = [
+	'rfMRI_REST1_AP', 'rfMRI_REST1_PA', 'rfMRI_REST2_AP', 'rfMRI_REST2_PA',
+	'tfMRI_MOVIE1_AP', 'tfMRI_MOVIE2_PA', 'tfMRI_RETCCW_AP', 'tfMRI_RETCW_PA',
+]
+
+FIRST_SUBJECT_ID = 100000
+
+COMPLETION_MESSAGE = 'Completion Check was successful'
+
+# seconds between the modification times of successive generations of resources
+# (unprocessed, structural preprocessed, other preprocessed, FIX, RSS/MSMAll)
+GENERATION_INTERVAL = 3600
+
+# files (relative to the resource) in the resources for which there is no completion
+# checker to supply a list; {subject}, {scan}, and {session} are substituted
+UNPROC_STRUCTURAL_FILES = ['{session}_{scan}.nii.gz']
+UNPROC_DIFFUSION_FILES = [
+	'{session}_DWI_dir95_RL.nii.gz', '{session}_DWI_dir95_RL.bval', '{session}_DWI_dir95_RL.bvec',
+	'{session}_DWI_dir95_LR.nii.gz', '{session}_DWI_dir95_LR.bval', '{session}_DWI_dir95_LR.bvec',
+]
+UNPROC_FUNCTIONAL_FILES = [
+	'{session}_{scan}.nii.gz', '{session}_{scan}_SBRef.nii.gz',
+	'{session}_SpinEchoFieldMap_AP.nii.gz', '{session}_SpinEchoFieldMap_PA.nii.gz',
+]
+FIX_FILES = [
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_Atlas_hp2000_clean.dtseries.nii',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000_clean.nii.gz',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.nii.gz',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/Atlas_hp_preclean.dtseries.nii',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/Atlas.nii.gz',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/mask.nii.gz',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/filtered_func_data.ica/melodic_IC.nii.gz',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/filtered_func_data.ica/melodic_mix',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/filtered_func_data.ica/log.txt',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/fix/features.csv',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/fix/logMatlab.txt',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_hp2000.ica/mc/prefiltered_func_data_mcf.par',
+]
+RSS_FILES = [
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_Atlas_stats.dscalar.nii',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_Atlas_stats.txt',
+	'{subject}/MNINonLinear/Results/{scan}/RestingStateStats/{scan}_Atlas_CSF.txt',
+	'{subject}/MNINonLinear/Results/{scan}/RestingStateStats/{scan}_Atlas_WM.txt',
+]
+MSMALL_REG_FILES = [
+	'{subject}/MNINonLinear/fsaverage_LR32k/{subject}.L.sphere.MSMAll.32k_fs_LR.surf.gii',
+	'{subject}/MNINonLinear/fsaverage_LR32k/{subject}.R.sphere.MSMAll.32k_fs_LR.surf.gii',
+	'{subject}/MNINonLinear/fsaverage_LR32k/{subject}.ArealDistortion_MSMAll.32k_fs_LR.dscalar.nii',
+]
+MSMALL_DEDRIFT_FILES = [
+	'{subject}/MNINonLinear/fsaverage_LR32k/{subject}.MyelinMap_MSMAll.32k_fs_LR.dscalar.nii',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_Atlas_MSMAll.dtseries.nii',
+	'{subject}/MNINonLinear/Results/{scan}/{scan}_Atlas_MSMAll_hp2000_clean.dtseries.nii',
+]
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def _completion_checkers():
+	# imported here, as the checker modules import their (much larger) job submitter modules
+	import ccf.diffusion_preprocessing.one_subject_completion_checker as diffusion_checker
+	import ccf.functional_preprocessing.one_subject_completion_checker as functional_checker
+	import ccf.structural_preprocessing.one_subject_completion_checker as structural_checker
+
+	return {
+		'structural': structural_checker.OneSubjectCompletionChecker(),
+		'functional': functional_checker.OneSubjectCompletionChecker(),
+		'diffusion': diffusion_checker.OneSubjectCompletionChecker(),
+	}
+
+
+class SyntheticArchive(object):
+	"""
+	Generator of a synthetic archive rooted at root.
+
+	Creating a SyntheticArchive sets the XNAT_PBS_JOBS_ARCHIVE_ROOT environment variable
+	of this process to root so that archive objects created afterwards use it.
+	"""
+
+	def __init__(self, root, project, classifier='3T', seed=0, sparse_size=None,
+				 missing_fraction=0.0, stale_marker_fraction=0.0, base_time=None):
+		self._root = os.path.abspath(root)
+		self._project = project
+		self._classifier = classifier
+		self._random = random.Random(seed)
+		self._sparse_size = sparse_size
+		self._missing_fraction = missing_fraction
+		self._stale_marker_fraction = stale_marker_fraction
+		self._base_time = base_time if base_time is not None else time.time() - 10 * GENERATION_INTERVAL
+
+		os.environ['XNAT_PBS_JOBS_ARCHIVE_ROOT'] = self._root
+		self._archive = ccf_archive.CcfArchive()
+		self._checkers = _completion_checkers()
+
+		# full paths of the expected files that were deliberately not created
+		self.missing_files = []
+		# full paths of completion markers that were made older than their starttime markers
+		self.stale_markers = []
+
+	@property
+	def archive(self):
+		return self._archive
+
+	def subject_ids(self, subject_count):
+		return [str(FIRST_SUBJECT_ID + index) for index in range(subject_count)]
+
+	def generate(self, subject_count, scan_count):
+		"""
+		Generate subject_count subjects with scan_count functional scans each.
+
+		Returns the list of SubjectInfo objects, one for each subject and scan (with the
+		scan name in the extra field), as used by the per scan pipelines.
+		"""
+		scan_names = [DEFAULT_SCAN_NAMES[index % len(DEFAULT_SCAN_NAMES)] +
+					  ('' if index < len(DEFAULT_SCAN_NAMES) else str(index // len(DEFAULT_SCAN_NAMES)))
+					  for index in range(scan_count)]
+		subject_info_list = []
+		for subject_id in self.subject_ids(subject_count):
+			subject_info_list.extend(self.generate_subject(subject_id, scan_names))
+		return subject_info_list
+
+	def generate_subject(self, subject_id, scan_names):
+		subject_info = ccf_subject.SubjectInfo(self._project, subject_id, self._classifier)
+		resources_dir = self._archive.subject_resources_dir_full_path(subject_info)
+		session = self._archive.session_name(subject_info)
+		t_unproc, t_structural, t_preproc, t_fix, t_post = [self._base_time + index * GENERATION_INTERVAL
+															 for index in range(5)]
+
+		# unprocessed data
+		for scan in ['T1w_MPR1', 'T2w_SPC1']:
+			self._make_resource(resources_dir + os.sep + scan + '_unproc', UNPROC_STRUCTURAL_FILES,
+								t_unproc, subject=subject_id, scan=scan, session=session)
+		self._make_resource(self._archive.diffusion_unproc_dir_full_path(subject_info), UNPROC_DIFFUSION_FILES,
+							t_unproc, subject=subject_id, session=session)
+		for scan in scan_names:
+			self._make_resource(resources_dir + os.sep + scan + '_unproc', UNPROC_FUNCTIONAL_FILES,
+								t_unproc, subject=subject_id, scan=scan, session=session)
+
+		# preprocessed data, with exactly the files the completion checkers look for
+		self._make_checked_resource('structural', subject_info, t_structural)
+		self._make_checked_resource('diffusion', subject_info, t_preproc)
+		scan_infos = []
+		for scan in scan_names:
+			scan_info = ccf_subject.SubjectInfo(self._project, subject_id, self._classifier, scan)
+			self._make_checked_resource('functional', scan_info, t_preproc)
+			scan_infos.append(scan_info)
+
+		# processed data
+		for scan in scan_names:
+			self._make_resource(resources_dir + os.sep + scan + '_FIX', FIX_FILES, t_fix,
+								subject=subject_id, scan=scan, session=session)
+			if self._archive.is_resting_state_scan_name(scan):
+				self._make_resource(resources_dir + os.sep + scan + '_RSS', RSS_FILES, t_post,
+									subject=subject_id, scan=scan, session=session)
+		self._make_resource(self._archive.msmall_registration_dir_full_path(subject_info), MSMALL_REG_FILES,
+							t_post, subject=subject_id, scan=scan_names[0] if scan_names else '', session=session)
+		self._make_resource(self._archive.dedrift_and_resample_dir_full_path(subject_info), MSMALL_DEDRIFT_FILES,
+							t_post, subject=subject_id, scan=scan_names[0] if scan_names else '', session=session)
+
+		os.makedirs(self._archive.running_status_dir_full_path(subject_info), exist_ok=True)
+
+		return scan_infos
+
+	def _make_resource(self, resource_dir, file_templates, mtime, **names):
+		paths = [resource_dir + os.sep + template.format(**names) for template in file_templates]
+		self._create_tree(resource_dir, paths, mtime)
+
+	def _make_checked_resource(self, checker_name, subject_info, mtime):
+		checker = self._checkers[checker_name]
+		resource_dir = checker.my_resource(self._archive, subject_info)
+		expected = checker.list_of_expected_files(self._archive, subject_info)
+
+		# the expected list includes directories, recognized by having other entries in them
+		directories = set(os.path.dirname(path) for path in expected)
+		files = [path for path in expected if path not in directories]
+		kept = []
+		for path in files:
+			if self._random.random() < self._missing_fraction:
+				self.missing_files.append(path)
+			else:
+				kept.append(path)
+
+		self._create_tree(resource_dir, kept, mtime, directories)
+		self._make_markers(resource_dir, checker.PIPELINE_NAME, mtime)
+		os.utime(resource_dir, (mtime, mtime))
+
+	def _make_markers(self, resource_dir, pipeline_name, mtime):
+		starttime_marker = resource_dir + os.sep + pipeline_name + '.starttime'
+		success_marker = resource_dir + os.sep + pipeline_name + '.XNAT_CHECK.success'
+
+		with open(starttime_marker, 'w'):
+			pass
+		with open(success_marker, 'w') as marker:
+			marker.write(COMPLETION_MESSAGE + '\n')
+
+		os.utime(starttime_marker, (mtime - GENERATION_INTERVAL / 2, mtime - GENERATION_INTERVAL / 2))
+		if self._random.random() < self._stale_marker_fraction:
+			os.utime(success_marker, (mtime - GENERATION_INTERVAL, mtime - GENERATION_INTERVAL))
+			self.stale_markers.append(success_marker)
+		else:
+			os.utime(success_marker, (mtime, mtime))
+
+	def _create_tree(self, resource_dir, file_paths, mtime, directories=()):
+		all_directories = set(directories)
+		all_directories.add(resource_dir)
+		for path in file_paths:
+			all_directories.add(os.path.dirname(path))
+		for directory in sorted(all_directories):
+			os.makedirs(directory, exist_ok=True)
+
+		for path in file_paths:
+			self._write_file(path)
+			os.utime(path, (mtime, mtime))
+
+		# deepest first, so that setting a directory's time is not undone by its children
+		for directory in sorted(all_directories, key=lambda name: name.count(os.sep), reverse=True):
+			os.utime(directory, (mtime, mtime))
+
+	def _write_file(self, path):
+		contents = nifti.image_for_file_name(path)
+		if contents is None:
+			contents = (os.path.basename(path) + '\n').encode()
+
+		with open(path, 'wb') as output:
+			output.write(contents)
+			if self._sparse_size and contents[:4] != b'\x1f\x8b' and len(contents) < self._sparse_size:
+				# extend uncompressed images to a realistic size without using disk space
+				output.truncate(self._sparse_size)
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(description="Generate a synthetic CCF archive.")
+
+	# mandatory arguments
+	parser.add_argument('-r', '--root', dest='root', required=True, type=str,
+						help="archive root directory (use as XNAT_PBS_JOBS_ARCHIVE_ROOT)")
+
+	# optional arguments
+	parser.add_argument('-p', '--project', dest='project', required=False, type=str, default='SYNTH')
+	parser.add_argument('-c', '--classifier', dest='classifier', required=False, type=str, default='3T')
+	parser.add_argument('-n', '--subjects', dest='subjects', required=False, type=int, default=2)
+	parser.add_argument('-m', '--scans', dest='scans', required=False, type=int, default=4)
+	parser.add_argument('--sparse-size', dest='sparse_size', required=False, type=int,
+						help="extend uncompressed images to this many bytes as sparse files")
+	parser.add_argument('--missing-fraction', dest='missing_fraction', required=False, type=float, default=0.0,
+						help="fraction of expected files to leave out")
+	parser.add_argument('--stale-fraction', dest='stale_fraction', required=False, type=float, default=0.0,
+						help="fraction of completion markers to make older than their starttime markers")
+	parser.add_argument('--seed', dest='seed', required=False, type=int, default=0)
+	parser.add_argument('-o', '--subject-list', dest='subject_list', required=False, type=str,
+						help="file in which to write the generated per scan subject list")
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	if os.path.exists(args.root) and os.listdir(args.root):
+		_inform("ERROR: archive root is not empty: " + args.root)
+		sys.exit(1)
+
+	generator = SyntheticArchive(args.root, args.project, args.classifier, args.seed, args.sparse_size,
+								 args.missing_fraction, args.stale_fraction)
+	subject_info_list = generator.generate(args.subjects, args.scans)
+
+	if args.subject_list:
+		ccf_subject.write_subject_info_list(args.subject_list, subject_info_list)
+
+	_inform("Generated " + str(args.subjects) + " subjects with " + str(args.scans) + " scans each")
+	_inform("Missing files: " + str(len(generator.missing_files)))
+	_inform("Stale completion markers: " + str(len(generator.stale_markers)))
+	_inform("export XNAT_PBS_JOBS_ARCHIVE_ROOT=" + os.path.abspath(args.root))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+"""
+ccf/telemetry_report.py: Summarize the per stage telemetry written by the job scripts
+(see ccf/stage_telemetry.py) for each pipeline.
+
+For each pipeline and stage the report shows the number of runs and failures, the
+median and maximum elapsed time, the share of the pipeline's total elapsed time spent
+in the stage, the largest peak resident set size, and the total bytes read and written
+(from storage, as counted in /proc/<pid>/io read_bytes and write_bytes).
+
+Telemetry files are found as <build dir>/<project>/*.telemetry.jsonl, or can be named
+on the command line.
+"""
+
+# import of built-in modules
+import collections
+import glob
+import json
+import logging
+import os
+import statistics
+import sys
+
+# import of third-party modules
+
+# import of local modules
+import ccf.stage_telemetry as ccf_stage_telemetry
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+# order in which the stages of a chain run
+STAGE_ORDER = ['GET_DATA', 'PROCESS_DATA', 'FREESURFER_ASSESSOR', 'CLEAN_DATA', 'PUT_DATA', 'CHECK_DATA',
+			   'MARK_NO_LONGER_RUNNING']
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def find_telemetry_files(build_dir, projects=None):
+	"""
+	List of the telemetry files in the project directories of build_dir (all projects
+	if projects is not specified).
+	"""
+	if not projects:
+		projects = ['*']
+	file_names = []
+	for project in projects:
+		file_names.extend(glob.glob(os.sep.join([build_dir, project, '*' + ccf_stage_telemetry.TELEMETRY_FILE_SUFFIX])))
+	return sorted(file_names)
+
+
+def _stage_key(stage):
+	return (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage)
+
+
+def summarize(records):
+	"""
+	Dictionary of pipeline to an ordered dictionary of stage to summary dictionary.
+	"""
+	grouped = collections.defaultdict(lambda: collections.defaultdict(list))
+	for record in records:
+		grouped[record.get('pipeline')][record.get('stage')].append(record)
+
+	summary = dict()
+	for pipeline, stages in grouped.items():
+		pipeline_seconds = sum(record.get('seconds', 0) for runs in stages.values() for record in runs)
+		pipeline_summary = collections.OrderedDict()
+		for stage in sorted(stages, key=_stage_key):
+			runs = stages[stage]
+			seconds = [record.get('seconds', 0) for record in runs]
+			pipeline_summary[stage] = {
+				'runs': len(runs),
+				'failures': sum(1 for record in runs if record.get('exit_code')),
+				'median_seconds': statistics.median(seconds),
+				'max_seconds': max(seconds),
+				'time_share': sum(seconds) / pipeline_seconds if pipeline_seconds else 0.0,
+				'max_rss_kb': max(record.get('max_rss_kb', 0) for record in runs),
+				'read_bytes': sum(record.get('read_bytes', 0) for record in runs),
+				'write_bytes': sum(record.get('write_bytes', 0) for record in runs),
+			}
+		summary[pipeline] = pipeline_summary
+	return summary
+
+
+def format_summary(summary):
+	"""
+	Text table of a summary returned by summarize.
+	"""
+	gb = 1024 ** 3
+	lines = []
+	for pipeline in sorted(summary, key=str):
+		lines.append(str(pipeline))
+		lines.append("  %-22s %6s %6s %12s %12s %6s %10s %10s %10s" % (
+			'stage', 'runs', 'failed', 'median(s)', 'max(s)', 'time%', 'maxRSS(MB)', 'read(GB)', 'write(GB)'))
+		for stage, stage_summary in summary[pipeline].items():
+			lines.append("  %-22s %6d %6d %12.1f %12.1f %6.1f %10.1f %10.2f %10.2f" % (
+				stage, stage_summary['runs'], stage_summary['failures'],
+				stage_summary['median_seconds'], stage_summary['max_seconds'],
+				100.0 * stage_summary['time_share'], stage_summary['max_rss_kb'] / 1024.0,
+				stage_summary['read_bytes'] / gb, stage_summary['write_bytes'] / gb))
+	return os.linesep.join(lines)
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(description="Summarize job stage telemetry per pipeline.")
+
+	# optional arguments
+	parser.add_argument('files', nargs='*', help="telemetry files (default: those in the build directory)")
+	parser.add_argument('-b', '--build-dir', dest='build_dir', required=False, type=str,
+						default=os.getenv('XNAT_PBS_JOBS_BUILD_DIR'))
+	parser.add_argument('-p', '--project', dest='projects', required=False, action='append',
+						help="project to summarize (may be repeated, defaults to all projects)")
+	parser.add_argument('--pipeline', dest='pipelines', required=False, action='append',
+						help="pipeline to summarize (may be repeated, defaults to all pipelines)")
+	parser.add_argument('-j', '--json', dest='json', action='store_true', required=False, default=False,
+						help="output the summary as JSON")
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	file_names = args.files
+	if not file_names:
+		if not args.build_dir:
+			_inform("ERROR: telemetry files, --build-dir, or XNAT_PBS_JOBS_BUILD_DIR required")
+			sys.exit(1)
+		file_names = find_telemetry_files(args.build_dir, args.projects)
+
+	records = ccf_stage_telemetry.read_records(file_names)
+	if args.pipelines:
+		records = (record for record in records if record.get('pipeline') in args.pipelines)
+	summary = summarize(records)
+
+	if args.json:
+		print(json.dumps(summary, indent=2, sort_keys=True))
+	else:
+		print(format_summary(summary))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+"""
+ccf/working_dir_lifecycle.py: Keep track of the working directories created in the
+build space for each submitted job chain, and remove those whose chains are no longer
+queued or running.
+
+Each submission creates <PIPELINE>.<subject>[.<scan>].<seconds since epoch> prefixed
+.XNAT_PROCESS_DATA, .XNAT_CHECK_DATA, and .XNAT_MARK_RUNNING_STATUS directories under
+<build dir>/<project>. When the jobs are submitted, the prefix and the ids of the jobs
+in the chain are appended to a registry file in the project's build directory.
+
+A chain is live while any of its jobs is still known to the scheduler (e.g. shown by
+qstat). The directories of chains that are not live (and directories that were never
+registered, if requested) can then be reported and garbage collected.
+
+A scheduler that only knows the jobs submitted by its own process (the local scheduler)
+cannot tell whether a chain is live. Chains are then reported as unknown, and garbage
+collection is refused.
+"""
+
+# import of built-in modules
+import collections
+import concurrent.futures
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import stat
+import sys
+import time
+
+# import of third-party modules
+
+# import of local modules
+import ccf.scheduler as ccf_scheduler
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+REGISTRY_FILE_NAME = '.working_dir_registry.jsonl'
+
+WORKING_DIR_SUFFIXES = ('.XNAT_PROCESS_DATA', '.XNAT_CHECK_DATA', '.XNAT_MARK_RUNNING_STATUS')
+
+# <PIPELINE>.<subject>[.<scan>].<seconds since epoch>.XNAT_<kind>
+_WORKING_DIR_PATTERN = re.compile(r'^(?P<prefix>(?P<pipeline>[^.]+)\..*\.(?P<created>\d{9,}))\.XNAT_[A-Z_]+$')
+
+DEFAULT_MAX_WORKERS = 8
+
+# live, dead, unknown (liveness cannot be determined), and unregistered chain states
+LIVE = 'live'
+DEAD = 'dead'
+UNKNOWN = 'unknown'
+UNREGISTERED = 'unregistered'
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+@contextlib.contextmanager
+def _locked(file_name, mode):
+	with open(file_name, mode) as locked_file:
+		fcntl.flock(locked_file, fcntl.LOCK_EX)
+		try:
+			yield locked_file
+		finally:
+			fcntl.flock(locked_file, fcntl.LOCK_UN)
+
+
+def registry_file_name(build_home, project):
+	return build_home + os.sep + project + os.sep + REGISTRY_FILE_NAME
+
+
+def register(build_home, project, pipeline, working_directory_name_prefix, job_ids):
+	"""
+	Record that the job chain with the specified job ids uses the working directories
+	with the specified prefix.
+	"""
+	entry = {
+		'prefix': os.path.basename(working_directory_name_prefix),
+		'pipeline': pipeline,
+		'job_ids': list(job_ids),
+		'registered': int(time.time()),
+	}
+	with _locked(registry_file_name(build_home, project), 'a') as registry:
+		registry.write(json.dumps(entry, sort_keys=True) + '\n')
+
+
+def read_registry(build_home, project):
+	"""
+	Dictionary of working directory prefix to registry entry for a project. If a prefix
+	was registered more than once, the last entry is used.
+	"""
+	entries = dict()
+	try:
+		with open(registry_file_name(build_home, project), 'r') as registry:
+			for line in registry:
+				try:
+					entry = json.loads(line)
+					entries[entry['prefix']] = entry
+				except (ValueError, KeyError):
+					module_logger.warning("skipping unreadable registry line: " + line.rstrip())
+	except FileNotFoundError:
+		pass
+	return entries
+
+
+def forget(build_home, project, prefixes):
+	"""
+	Remove the entries for the specified working directory prefixes from a project's
+	registry.
+	"""
+	prefixes = set(prefixes)
+	file_name = registry_file_name(build_home, project)
+	if not prefixes or not os.path.exists(file_name):
+		return
+
+	with _locked(file_name, 'r+') as registry:
+		lines = [line for line in registry if _line_prefix(line) not in prefixes]
+		registry.seek(0)
+		registry.writelines(lines)
+		registry.truncate()
+
+
+def _line_prefix(line):
+	try:
+		return json.loads(line)['prefix']
+	except (ValueError, KeyError):
+		return None
+
+
+def tree_size(path):
+	"""
+	Total size in bytes of the entries in and below path, not following symbolic links.
+	"""
+	total = 0
+	pending = [path]
+	while pending:
+		try:
+			with os.scandir(pending.pop()) as entries:
+				for entry in entries:
+					entry_stat = entry.stat(follow_symlinks=False)
+					total += entry_stat.st_size
+					if stat.S_ISDIR(entry_stat.st_mode):
+						pending.append(entry.path)
+		except (FileNotFoundError, PermissionError):
+			pass
+	return total
+
+
+class Chain(object):
+	"""
+	The working directories in a project's build directory that share one prefix.
+	"""
+
+	def __init__(self, project, prefix, pipeline, created):
+		self.project = project
+		self.prefix = prefix
+		self.pipeline = pipeline
+		self.created = created
+		self.directories = []
+		self.job_ids = []
+		self.state = UNREGISTERED
+		self.size = 0
+
+	@property
+	def age_seconds(self):
+		return time.time() - self.created
+
+
+def find_chains(build_home, project):
+	"""
+	List of the Chains for the working directories in a project's build directory, with
+	job ids filled in from the project's registry.
+	"""
+	project_dir = build_home + os.sep + project
+	registry = read_registry(build_home, project)
+	chains = dict()
+
+	with os.scandir(project_dir) as entries:
+		for entry in entries:
+			match = _WORKING_DIR_PATTERN.match(entry.name)
+			if not match or not entry.is_dir(follow_symlinks=False):
+				continue
+
+			prefix = match.group('prefix')
+			chain = chains.get(prefix)
+			if chain is None:
+				chain = Chain(project, prefix, match.group('pipeline'), int(match.group('created')))
+				registered = registry.get(prefix)
+				if registered:
+					chain.job_ids = registered['job_ids']
+				chains[prefix] = chain
+			chain.directories.append(entry.path)
+
+	return list(chains.values())
+
+
+def reconcile(chains, active_job_ids):
+	"""
+	Set the state of each chain: live if any of its jobs is in active_job_ids (job
+	numbers, see ccf.scheduler.job_number), dead if none are, or unregistered. If
+	active_job_ids is None (the active jobs are not known), registered chains are
+	unknown.
+	"""
+	for chain in chains:
+		if chain.job_ids and active_job_ids is None:
+			chain.state = UNKNOWN
+		elif chain.job_ids:
+			alive = any(ccf_scheduler.job_number(job_id) in active_job_ids for job_id in chain.job_ids)
+			chain.state = LIVE if alive else DEAD
+
+
+def measure(chains, max_workers=DEFAULT_MAX_WORKERS):
+	"""
+	Set the size of each chain (the total size of its directories), measuring
+	different directories in parallel.
+	"""
+	directories = [(chain, directory) for chain in chains for directory in chain.directories]
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		sizes = executor.map(tree_size, [directory for chain, directory in directories])
+		for (chain, directory), size in zip(directories, sizes):
+			chain.size += size
+
+
+def space_report(chains):
+	"""
+	Dictionary of (project, pipeline) to a Counter of chain states and bytes held by
+	chains in each state.
+	"""
+	report = collections.defaultdict(collections.Counter)
+	for chain in chains:
+		counts = report[(chain.project, chain.pipeline)]
+		counts[chain.state] += 1
+		counts[chain.state + '_bytes'] += chain.size
+	return report
+
+
+def select_garbage(chains, min_age_seconds, max_bytes=None, include_unregistered=False):
+	"""
+	The chains to remove: dead (and, if include_unregistered is True, unregistered)
+	chains at least min_age_seconds old, oldest first, stopping before the total size
+	removed would exceed max_bytes (if specified).
+	"""
+	states = (DEAD, UNREGISTERED) if include_unregistered else (DEAD,)
+	candidates = sorted((chain for chain in chains
+						 if chain.state in states and chain.age_seconds >= min_age_seconds),
+						key=lambda chain: chain.created)
+
+	selected = []
+	total = 0
+	for chain in candidates:
+		if max_bytes is not None and total + chain.size > max_bytes:
+			break
+		selected.append(chain)
+		total += chain.size
+	return selected
+
+
+def _remove_tree(path):
+	try:
+		shutil.rmtree(path)
+		return None
+	except FileNotFoundError:
+		return None
+	except OSError as e:
+		return str(e)
+
+
+def collect(build_home, chains, max_workers=DEFAULT_MAX_WORKERS):
+	"""
+	Remove the directories of the specified chains in parallel and drop the removed
+	chains from their projects' registries. Returns a list of error messages.
+	"""
+	directories = [(chain, directory) for chain in chains for directory in chain.directories]
+	failed = set()
+	errors = []
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		results = executor.map(_remove_tree, [directory for chain, directory in directories])
+		for (chain, directory), error in zip(directories, results):
+			if error:
+				failed.add(chain.prefix)
+				errors.append(error)
+
+	removed_by_project = collections.defaultdict(list)
+	for chain in chains:
+		if chain.prefix not in failed:
+			removed_by_project[chain.project].append(chain.prefix)
+	for project, prefixes in removed_by_project.items():
+		forget(build_home, project, prefixes)
+
+	return errors
+
+
+def _projects(build_home):
+	with os.scandir(build_home) as entries:
+		return sorted(entry.name for entry in entries if entry.is_dir() and not entry.name.startswith('.'))
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Report and remove build space working directories of finished job chains.")
+
+	# optional arguments
+	parser.add_argument('-b', '--build-dir', dest='build_dir', required=False, type=str,
+						default=os.getenv('XNAT_PBS_JOBS_BUILD_DIR'))
+	parser.add_argument('-p', '--project', dest='projects', required=False, action='append',
+						help="project to examine (may be repeated, defaults to all projects)")
+	parser.add_argument('-g', '--gc', dest='gc', action='store_true', required=False, default=False,
+						help="remove the directories of chains that are no longer live")
+	parser.add_argument('-a', '--min-age-hours', dest='min_age_hours', required=False, type=float, default=24.0)
+	parser.add_argument('-m', '--max-gb', dest='max_gb', required=False, type=float,
+						help="remove at most this many GB in one run")
+	parser.add_argument('-u', '--include-unregistered', dest='include_unregistered', action='store_true',
+						required=False, default=False,
+						help="also remove old directories for which no jobs were registered")
+	parser.add_argument('-n', '--dry-run', dest='dry_run', action='store_true', required=False, default=False)
+	parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int, default=DEFAULT_MAX_WORKERS)
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	if not args.build_dir:
+		_inform("ERROR: --build-dir or XNAT_PBS_JOBS_BUILD_DIR required")
+		sys.exit(1)
+
+	chains = []
+	for project in args.projects if args.projects else _projects(args.build_dir):
+		chains.extend(find_chains(args.build_dir, project))
+
+	scheduler = ccf_scheduler.get_scheduler()
+	if scheduler.sees_all_jobs:
+		active_job_ids = scheduler.active_job_ids()
+	else:
+		active_job_ids = None
+		_inform("WARNING: the scheduler in use cannot see the jobs of other processes, "
+				"so whether registered chains are live is unknown")
+
+	reconcile(chains, active_job_ids)
+	measure(chains, args.parallel)
+
+	gb = 1024 ** 3
+	for (project, pipeline), counts in sorted(space_report(chains).items()):
+		_inform(project + " " + pipeline + ": " +
+				", ".join("%d %s (%.1f GB)" % (counts[state], state, counts[state + '_bytes'] / gb)
+						  for state in (LIVE, DEAD, UNKNOWN, UNREGISTERED) if counts[state]))
+
+	if not args.gc:
+		return
+
+	if active_job_ids is None:
+		_inform("ERROR: --gc needs a scheduler that can see all jobs (e.g. pbs), not removing any directories")
+		sys.exit(1)
+
+	max_bytes = int(args.max_gb * gb) if args.max_gb is not None else None
+	garbage = select_garbage(chains, args.min_age_hours * 3600, max_bytes, args.include_unregistered)
+	_inform("Removing " + str(len(garbage)) + " chains (%.1f GB)" % (sum(chain.size for chain in garbage) / gb))
+
+	for chain in garbage:
+		_inform("  " + chain.project + os.sep + chain.prefix + " (" + chain.state + ")")
+
+	if not args.dry_run:
+		errors = collect(args.build_dir, garbage, args.parallel)
+		for error in errors:
+			_inform("ERROR: " + error)
+		if errors:
+			sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -67,9 +67,9 @@ class CinabStyleDataRetriever(abc.ABC):
         self._show_log = value
 
     def _from_to(self, get_from, put_to):
-        module_logger.debug(debug_utils.get_name() + " get_from: " + get_from + " put_to: " + put_to)
+        debug_utils.debug(module_logger, " get_from: %s put_to: %s", get_from, put_to)
         if self.copy:
-            module_logger.debug(debug_utils.get_name() + " copying")
+            debug_utils.debug(module_logger, " copying")
             os.makedirs(put_to, exist_ok=True)
 
             if self.show_log:
@@ -86,7 +86,7 @@ class CinabStyleDataRetriever(abc.ABC):
             module_logger.info(completed_rsync_process.stdout)
 
         else:
-            module_logger.debug(debug_utils.get_name() + " linking")
+            debug_utils.debug(module_logger, " linking")
             os.makedirs(put_to, exist_ok=True)
             os_utils.lndir(get_from, put_to, self.show_log, ignore_existing_dst_files=True)
 
@@ -187,11 +187,11 @@ class CinabStyleDataRetriever(abc.ABC):
             self._from_to(get_from, put_to)
 
     def get_apply_hand_reclassification_data(self, subject_info, output_study_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         for directory in self.archive.available_apply_handreclassification_dir_fullpaths(subject_info):
 
             get_from = directory
-            module_logger.debug(debug_utils.get_name() + " get_from: " + get_from)
+            debug_utils.debug(module_logger, " get_from: %s", get_from)
             put_to = output_study_dir
             self._from_to(get_from, put_to)
 
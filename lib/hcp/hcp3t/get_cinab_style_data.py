@@ -46,23 +46,23 @@ class CinabStyleDataRetriever(hcp.get_cinab_style_data.CinabStyleDataRetriever):
         for directory in self.archive.available_structural_unproc_dir_fullpaths(subject_info):
 
             get_from = directory
-            module_logger.debug(debug_utils.get_name() + " get_from: " + get_from)
+            debug_utils.debug(module_logger, " get_from: %s", get_from)
 
             last_sep_loc = get_from.rfind(os.sep)
             unproc_loc = get_from.rfind('_' + self.archive.UNPROC_SUFFIX)
             sub_dir = get_from[last_sep_loc + 1:unproc_loc]
             put_to = output_study_dir + os.sep + subject_info.subject_id + os.sep + 'unprocessed' + \
                 os.sep + self.archive.TESLA_SPEC + os.sep + sub_dir
-            module_logger.debug(debug_utils.get_name() + " put_to: " + put_to)
+            debug_utils.debug(module_logger, " put_to: %s", put_to)
 
             self._from_to(get_from, put_to)
 
     def get_unproc_data(self, subject_info, output_study_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         self.get_structural_unproc_data(subject_info, output_study_dir)
         self.get_functional_unproc_data(subject_info, output_study_dir)
         self.get_diffusion_unproc_data(subject_info, output_study_dir)
-        module_logger.debug(debug_utils.get_name() + " Done")
+        debug_utils.debug(module_logger, " Done")
 
     def get_structural_preproc_data(self, subject_info, output_study_dir):
 
@@ -184,14 +184,14 @@ class CinabStyleDataRetriever(hcp.get_cinab_style_data.CinabStyleDataRetriever):
             self.get_apply_hand_reclassification_data(subject_info, output_study_dir)
 
     def get_full_data(self, subject_info, output_study_dir):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
         if not self.copy:
             # when creating symbolic links (copy == False), must be done in reverse
             # chronological order
-            module_logger.debug(debug_utils.get_name() + " linking")
-            module_logger.debug(debug_utils.get_name() + " apply_hand_reclassification_data")
+            debug_utils.debug(module_logger, " linking")
+            debug_utils.debug(module_logger, " apply_hand_reclassification_data")
             self.get_apply_hand_reclassification_data(subject_info, output_study_dir)
-            module_logger.debug(debug_utils.get_name() + " handreclassification_data")
+            debug_utils.debug(module_logger, " handreclassification_data")
             self.get_handreclassification_data(subject_info, output_study_dir)
             self.get_bedpostx_data(subject_info, output_study_dir)
             self.get_msmall_dedrift_and_resample_data(subject_info, output_study_dir)
@@ -202,11 +202,11 @@ class CinabStyleDataRetriever(hcp.get_cinab_style_data.CinabStyleDataRetriever):
             self.get_icafix_data(subject_info, output_study_dir)
             self.get_preproc_data(subject_info, output_study_dir)
             self.get_unproc_data(subject_info, output_study_dir)
-            module_logger.debug(debug_utils.get_name() + " Done")
+            debug_utils.debug(module_logger, " Done")
 
         else:
             # when copying (via rsync), should be done in chronological order
-            module_logger.debug(debug_utils.get_name() + " copying")
+            debug_utils.debug(module_logger, " copying")
             self.get_unproc_data(subject_info, output_study_dir)
             self.get_preproc_data(subject_info, output_study_dir)
             self.get_icafix_data(subject_info, output_study_dir)
@@ -57,7 +57,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @username.setter
     def username(self, value):
         self._username = value
-        logger.debug(debug_utils.get_name() + ": set to: " + str(self._username))
+        debug_utils.debug(logger, ": set to: %s", self._username)
 
     @property 
     def password(self):
@@ -74,7 +74,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @server.setter
     def server(self, value):
         self._server = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._server))
+        debug_utils.debug(logger, ": set to %s", self._server)
 
     @property
     def setup_script(self):
@@ -83,7 +83,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @setup_script.setter
     def setup_script(self, value):
         self._setup_script = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._setup_script))
+        debug_utils.debug(logger, ": set to %s", self._setup_script)
 
     @property
     def project(self):
@@ -92,7 +92,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @project.setter
     def project(self, value):
         self._project = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._project))
+        debug_utils.debug(logger, ": set to %s", self._project)
 
     @property
     def subject(self):
@@ -101,7 +101,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @subject.setter
     def subject(self, value):
         self._subject = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._subject))
+        debug_utils.debug(logger, ": set to %s", self._subject)
 
     @property
     def session(self):
@@ -110,7 +110,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @session.setter
     def session(self, value):
         self._session = value
-        logger.debug(debug_utils.get_name() + ": session set to " + str(self._session))
+        debug_utils.debug(logger, ": session set to %s", self._session)
 
     @property
     def scan(self):
@@ -119,7 +119,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @scan.setter
     def scan(self, value):
         self._scan = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._scan))
+        debug_utils.debug(logger, ": set to %s", self._scan)
     
     @property
     def clean_output_resource_first(self):
@@ -128,7 +128,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @clean_output_resource_first.setter
     def clean_output_resource_first(self, value):
         self._clean_output_resource_first = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._clean_output_resource_first))
+        debug_utils.debug(logger, ": set to %s", self._clean_output_resource_first)
 
     @property
     def put_server(self):
@@ -137,7 +137,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @put_server.setter
     def put_server(self, value):
         self._put_server = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(self._put_server))
+        debug_utils.debug(logger, ": set to %s", self._put_server)
 
     @property
     def walltime_limit_hours(self):
@@ -146,7 +146,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @walltime_limit_hours.setter
     def walltime_limit_hours(self, value):
         self._walltime_limit_hours = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(value))
+        debug_utils.debug(logger, ": set to %s", value)
 
     @property
     def vmem_limit_gbs(self):
@@ -155,7 +155,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @vmem_limit_gbs.setter
     def vmem_limit_gbs(self, value):
         self._vmem_limit_gbs = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(value))
+        debug_utils.debug(logger, ": set to %s", value)
 
     @property
     def reg_name(self):
@@ -164,7 +164,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @reg_name.setter
     def reg_name(self, value):
         self._reg_name = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(value))
+        debug_utils.debug(logger, ": set to %s", value)
 
     @property
     def output_resource_suffix(self):
@@ -173,7 +173,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
     @output_resource_suffix.setter
     def output_resource_suffix(self, value):
         self._output_resource_suffix = value
-        logger.debug(debug_utils.get_name() + ": set to " + str(value))
+        debug_utils.debug(logger, ": set to %s", value)
 
     def _get_scripts_start_name(self):
         start_name = self._working_directory_name
@@ -186,19 +186,19 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         return start_name
     
     def _get_data_script_name(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
         return self._get_scripts_start_name() + '.XNAT_GET_DATA_job.sh'
 
     def _work_script_name(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
         return self._get_scripts_start_name() + '.PROCESS_DATA_job.sh'
 
     def _clean_data_script_name(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
         return self._get_scripts_start_name() + '.CLEAN_DATA_job.sh'
 
     def _starttime_file_name(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
         starttime_file_name = self._working_directory_name
         starttime_file_name += os.path.sep
         starttime_file_name += self.PIPELINE_NAME
@@ -216,7 +216,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         file_utils.wl(script, '')
 
     def _create_get_data_script(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
 
         script_name = self._get_data_script_name()
         with contextlib.suppress(FileNotFoundError):
@@ -240,7 +240,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
 
     def _create_clean_data_script(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
 
         script_name = self._clean_data_script_name()
         with contextlib.suppress(FileNotFoundError):
@@ -271,7 +271,7 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
 
     def _create_work_script(self):
-        logger.debug(debug_utils.get_name())
+        debug_utils.debug(logger)
 
         script_name = self._work_script_name()
         with contextlib.suppress(FileNotFoundError):
@@ -319,8 +319,9 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         work_script.close()
         os.chmod(self._work_script_name(), stat.S_IRWXU | stat.S_IRWXG)
 
+    @debug_utils.span(logger)
     def submit_jobs(self, processing_stage=ProcessingStage.PUT_DATA):
-        logger.debug(debug_utils.get_name() + ": processing_stage: " + str(processing_stage))
+        debug_utils.debug(logger, ": processing_stage: %s", processing_stage)
 
         logger.info("-----")
         logger.info("Submitting " + self.PIPELINE_NAME + " jobs for")
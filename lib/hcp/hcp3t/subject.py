@@ -17,7 +17,7 @@ import sys
 
 # import of local modules
 import hcp.subject as hcp_subject
-import utils.str_utils as str_utils
+import utils.subject_list as subject_list
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -46,23 +46,13 @@ def read_subject_info_list(file_name, separator=Hcp3TSubjectInfo.DEFAULT_SEPARAT
     """
     subject_info_list = []
 
-    input_file = open(file_name, 'r')
-    for line in input_file:
-        # remove new line characters
-        line = str_utils.remove_ending_new_lines(line)
-
-        # remove leading and trailing spaces
-        line = line.strip()
-
-        # ignore blank lines and comment lines - starting with #
-        if line != '' and line[0] != '#':
-            (project, subject_id, extra) = line.split(separator)
-            # Make the string 'None' in the file translate to a None type instead of just the
-            # string itself
-            if extra == 'None':
-                extra = None
-            subject_info = Hcp3TSubjectInfo(project, subject_id, extra)
-            subject_info_list.append(subject_info)
+    for (project, subject_id, extra) in subject_list.read_fields(file_name, 'hcp3t', separator):
+        # Make the string 'None' in the file translate to a None type instead of just the
+        # string itself
+        if extra == 'None':
+            extra = None
+        subject_info = Hcp3TSubjectInfo(project, subject_id, extra)
+        subject_info_list.append(subject_info)
 
     return subject_info_list
 
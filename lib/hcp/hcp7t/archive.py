@@ -15,6 +15,8 @@ import glob
 # path changes and import of local modules
 import hcp.hcp7t.subject as hcp7t_subject
 import hcp.archive as hcp_archive
+import utils.file_utils as file_utils
+import utils.nifti as nifti
 
 
 # authorship information
@@ -66,21 +68,32 @@ class Hcp7T_Archive(hcp_archive.HcpArchive):
             return False
 
         else:
-            highres_clean_atlas_name = self.results_scan_dir(hcp7t_subject_info, scan_name) + os.sep + self.functional_scan_long_name(scan_name) + '_Atlas_1.6mm_hp2000_clean.dtseries.nii'
+            scan_prefix = self.results_scan_dir(hcp7t_subject_info, scan_name) + os.sep + self.functional_scan_long_name(scan_name)
+            highres_clean_atlas_name = scan_prefix + '_Atlas_1.6mm_hp2000_clean.dtseries.nii'
             if not os.path.isfile(highres_clean_atlas_name):
                 # The highres clean atlas file doesn't exist. So the repair can not be complete.
                 _inform("FILE DOES NOT EXIST: " + highres_clean_atlas_name)
                 return False
 
-            # If we get here, the highres clean atlas file does exist. Now check how big it is.
-            file_size_in_bytes = os.path.getsize(highres_clean_atlas_name)
-            #_inform("file_size_in_bytes: " + str(file_size_in_bytes))
+            # If we get here, the highres clean atlas file does exist. Now check that it is a complete
+            # CIFTI dense time series on the 1.6mm (59k) grid: the repair re-runs the clean up at 59k,
+            # and an unrepaired file is a valid CIFTI file with the 2mm brainordinate count. So its
+            # dimensions (brainordinates and time points) must be those of the uncleaned 1.6mm dense
+            # time series of the same run, and it must have as many time points as the (2mm) clean
+            # atlas file. Only the headers are read.
+            highres_atlas_name = scan_prefix + '_Atlas_1.6mm.dtseries.nii'
+            try:
+                expected_dims = nifti.read_header(highres_atlas_name).dims
+            except (nifti.NiftiHeaderError, OSError) as e:
+                _inform("CANNOT READ REFERENCE: " + highres_atlas_name + ": " + str(e))
+                return False
 
-            min_size = 500 * 1000 * 1000
-            #_inform("min_size: " + str(min_size))
-            
-            if file_size_in_bytes < min_size:
-                # It's too small to be the repaired version
+            clean_atlas_name = scan_prefix + '_Atlas_hp2000_clean.dtseries.nii'
+            problems = nifti.validate_image(highres_clean_atlas_name, reference_file_name=clean_atlas_name,
+                                            expected_dims=expected_dims)
+            if problems:
+                # It's not a complete repaired version
+                _inform("FILE IS NOT VALID: " + highres_clean_atlas_name + ": " + "; ".join(problems))
                 return False
 
         # If we get here, we've passed all the tests and the repair is done.
@@ -91,15 +104,8 @@ class Hcp7T_Archive(hcp_archive.HcpArchive):
         ret_value += os.sep + self.functional_scan_long_name(scan_name)
         return ret_value
             
-    def FIX_processing_complete(self, hcp7t_subject_info, scan_name, check_for_highres_clean_dtseries=True):
-        """Returns True if the specified scan has completed FIX processing for the specified subject."""
-
-        # If the output resource does not exist, then the processing has not been done.
-        if not self.does_FIX_processed_exist(hcp7t_subject_info, scan_name):
-            return False
-
-        # If we reach here, then the FIX processed resource at least exists.
-        # Next we need to check to see if the expected files exist.
+    def FIX_expected_files(self, hcp7t_subject_info, scan_name, check_for_highres_clean_dtseries=True):
+        """Returns the list of files expected in the FIX processed resource for the specified scan."""
 
         results_dir = self.subject_resources_dir_fullpath(hcp7t_subject_info) + os.sep + self.FIX_processed_resource_name(scan_name)
         results_scan_dir = results_dir + os.sep + self.functional_scan_long_name(scan_name)
@@ -181,16 +187,36 @@ class Hcp7T_Archive(hcp_archive.HcpArchive):
         file_name_list.append(mc_dir + os.sep + 'prefiltered_func_data_mcf_conf.nii.gz')
         file_name_list.append(mc_dir + os.sep + 'prefiltered_func_data_mcf.par')
 
-        for file_name in file_name_list:
-            # inform("Checking for existence of file: " + file_name)
-            if os.path.isfile(file_name):
+        return file_name_list
+
+    def FIX_processing_complete_for_scans(self, hcp7t_subject_info, scan_name_list, check_for_highres_clean_dtseries=True):
+        """Returns a dictionary of scan name to whether the scan has completed FIX processing for the
+        specified subject, for all the scans in scan_name_list.
+
+        The available FIX processed resources are found once for all the scans, and each directory
+        is read once no matter how many of the expected files it holds.
+        """
+        FIX_processed_names = self.available_FIX_processed_names(hcp7t_subject_info)
+        listing = file_utils.DirectoryListing()
+
+        completion = dict()
+        for scan_name in scan_name_list:
+            # If the output resource does not exist, then the processing has not been done.
+            if scan_name not in FIX_processed_names:
+                completion[scan_name] = False
                 continue
-            # If we get here, the most recently checked file does not exist
-            _inform("FILE DOES NOT EXIST: " + file_name)
-            return False
 
-        # If we get here, all files that were checked exist
-        return True
+            # If we reach here, then the FIX processed resource at least exists.
+            # Next we need to check to see if the expected files exist.
+            file_name_list = self.FIX_expected_files(hcp7t_subject_info, scan_name, check_for_highres_clean_dtseries)
+            completion[scan_name] = file_utils.do_all_files_exist(file_name_list, listing=listing)
+
+        return completion
+
+    def FIX_processing_complete(self, hcp7t_subject_info, scan_name, check_for_highres_clean_dtseries=True):
+        """Returns True if the specified scan has completed FIX processing for the specified subject."""
+        return self.FIX_processing_complete_for_scans(hcp7t_subject_info, [scan_name],
+                                                      check_for_highres_clean_dtseries)[scan_name]
 
     def is_movie_scan_name(self, scan_name):
         return (self.is_task_scan_name(scan_name) and 'MOVIE' in scan_name)
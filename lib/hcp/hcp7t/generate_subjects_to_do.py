@@ -1,5 +1,14 @@
 #!/usr/bin/env python3
 
+"""
+generate_subjects_to_do.py: Output the subjects in the all subjects list whose IDs are in a
+to do list, in to do list order, in the 4 field form written by Hcp7TSubjectInfo (a missing
+extra field is output as None).
+
+This is the join operation of utils/subject_list.py, which uses a hash index of the all subjects
+list instead of searching the whole list for each subject ID.
+"""
+
 # import of built-in modules
 
 # import of third party modules
@@ -7,6 +16,7 @@
 # import of local modules
 import hcp.hcp7t.subject as hcp7t_subject
 import utils.my_argparse as my_argparse
+import utils.subject_list as subject_list
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -22,20 +32,8 @@ def main():
 
     args = parser.parse_args()
 
-    # print("Retrieving all subjects from: " + args.all_subjects)
-    all_subjects_list = hcp7t_subject.read_subject_info_list(args.all_subjects, separator=":")
-
-    # print("Retrieving subject ids in TODO list from: " + args.todo_subjects)
-    to_do_subjects_list = []
-
-    to_do_ids_file = open(args.todo_subjects, "r")
-    for line in to_do_ids_file:
-        subject_id = line[:-1]
-
-        for subject in all_subjects_list:
-            if subject_id == subject.subject_id:
-                print(str(subject))
-                break
+    for line in subject_list.combine('join', [args.todo_subjects, args.all_subjects], ['id', 'hcp7t'], separator=":"):
+        print(str(hcp7t_subject.subject_info_from_fields(line.split(":"))))
             
 
 if __name__ == '__main__':
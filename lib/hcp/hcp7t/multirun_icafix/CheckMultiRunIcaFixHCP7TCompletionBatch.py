@@ -63,13 +63,17 @@ if __name__ == "__main__":
     # is marked complete and just go ahead and do a full completion check.
     parser.add_argument('-b', '--bypass-mark', dest='bypass_mark', action='store_true',
                         required=False, default=False)
+    # The --deep option also reads the headers of the expected images to make sure they are complete
+    # (not truncated) and consistent. It implies --bypass-mark.
+    parser.add_argument('-d', '--deep', dest='deep', action='store_true',
+                        required=False, default=False)
     parser.add_argument('-v', '--verbose', dest='verbose', action='store_true',
                         required=False, default=False)
 
     # parse the command line arguments
     args = parser.parse_args()
 
-    if args.bypass_mark:
+    if args.bypass_mark or args.deep:
         module_logger.info("Bypassing completion markers and doing complete check")
         print("Bypassing completion markers and doing complete check")
     else:
@@ -112,9 +116,10 @@ if __name__ == "__main__":
             timestamp = os.path.getmtime(fullpath)
             resource_date = datetime.datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
     
-            if args.bypass_mark:
+            if args.bypass_mark or args.deep:
                 files_exist = completion_checker.is_processing_complete(archive, subject,
-                                                                        verbose=args.verbose)
+                                                                        verbose=args.verbose,
+                                                                        deep=args.deep)
             else:
                 files_exist = completion_checker.is_processing_marked_complete(archive, subject)
 
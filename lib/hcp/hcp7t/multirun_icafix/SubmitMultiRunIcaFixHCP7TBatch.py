@@ -33,9 +33,11 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
     def __init__(self):
         super().__init__(hcp7t_archive.Hcp7T_Archive())
 
-    def submit_jobs(self, username, password, subject_list, config, force_submission=False):
+    def submit_jobs(self, username, password, subject_list, config, force_submission=False, parallel=1):
 
-        # submit jobs for the listed subjects
+        prepared_list = []
+
+        # configure a submitter for each of the listed subjects
         for subject in subject_list:
 
             run_status_checker = one_subject_run_status_checker.OneSubjectRunStatusChecker()
@@ -105,16 +107,14 @@ class BatchSubmitter(batch_submitter.BatchSubmitter):
             submitter.vmem_limit_gbs = vmem_limit_gbs
             submitter.output_resource_suffix = output_resource_suffix
 
-            # submit jobs
-            submitted_job_list = submitter.submit_jobs(processing_stage)
-
-            for job in submitted_job_list:
-                print("\tsubmitted jobs: ", str(job))
+            prepared_list.append((subject, submitter, processing_stage))
 
-            print("-----")
+        # submit jobs
+        results = self.submit_prepared_jobs(prepared_list, parallel)
+        self.print_submission_summary(results)
 
 
-def do_submissions(userid, password, subject_list, force_submission=False):
+def do_submissions(userid, password, subject_list, force_submission=False, parallel=1):
 
     # read the configuration file
     config_file_name = file_utils.get_config_file_name(__file__)
@@ -124,7 +124,7 @@ def do_submissions(userid, password, subject_list, force_submission=False):
 
     # process subjects in the list
     batch_submitter = BatchSubmitter()
-    batch_submitter.submit_jobs(userid, password, subject_list, config, force_submission)
+    batch_submitter.submit_jobs(userid, password, subject_list, config, force_submission, parallel)
 
 
 if __name__ == '__main__':
@@ -145,6 +145,10 @@ if __name__ == '__main__':
     parser.add_argument('-f', '--force', dest='force', action='store_true',
                         required=False, default=False)
 
+    # The --parallel or -p option specifies how many subjects should have their
+    # scripts created and jobs submitted at the same time.
+    parser.add_argument('-p', '--parallel', dest='parallel', required=False, default=1, type=int)
+
     # parse the command line arguments
     args = parser.parse_args()
 
@@ -157,5 +161,5 @@ if __name__ == '__main__':
     print("Retrieving subject list from: " + subject_file_name)
     subject_list = hcp7t_subject.read_subject_info_list(subject_file_name, separator=":")
 
-    do_submissions(userid, password, subject_list, args.force)
+    do_submissions(userid, password, subject_list, args.force, args.parallel)
     
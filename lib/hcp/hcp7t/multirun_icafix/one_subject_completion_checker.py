@@ -186,6 +186,8 @@ if __name__ == "__main__":
     parser.add_argument('-o', '--output', dest='output', required=False, type=str)
     parser.add_argument('-a', '--check-all', dest='check_all', action='store_true',
                         required=False, default=False)
+    parser.add_argument('-d', '--deep', dest='deep', action='store_true',
+                        required=False, default=False)
 
     # parse the command line arguments
     args = parser.parse_args()
@@ -206,7 +208,8 @@ if __name__ == "__main__":
             subject_info=subject_info,
             verbose=args.verbose,
             output=processing_output,
-            short_circuit=not args.check_all):
+            short_circuit=not args.check_all,
+            deep=args.deep):
         print("Exiting with 0 code - Completion Check Successful")
         exit(0)
     else:
@@ -1,11 +1,8 @@
 #!/usr/bin/env python3
 
 # import of built-in modules
-import contextlib
 import logging
 import os
-import shutil
-import stat
 import subprocess
 
 # import of third-party modules
@@ -15,6 +12,7 @@ import ccf.one_subject_job_submitter as one_subject_job_submitter
 import ccf.processing_stage as ccf_processing_stage
 import hcp.hcp7t.subject as hcp7t_subject
 import utils.debug_utils as debug_utils
+import utils.script_template as script_template
 import utils.str_utils as str_utils
 
 # authorship information
@@ -27,6 +25,29 @@ module_logger = logging.getLogger(__name__)
 # Note: This can be overridden by log file configuration
 module_logger.setLevel(logging.WARNING)
 
+GET_DATA_TEMPLATE = one_subject_job_submitter.PBS_HEADER_TEMPLATE + """\
+{{get_data_program_path}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --ref-project={{structural_reference_project}} \\
+  --working-dir={{working_directory_name}}
+"""
+
+PROCESS_DATA_TEMPLATE = one_subject_job_submitter.PBS_HEADER_TEMPLATE + """\
+{{process_data_program_path}} \\
+  --user={{username}} \\
+  --password={{password}} \\
+  --server={{server_name}} \\
+  --project={{project}} \\
+  --subject={{subject}} \\
+  --session={{session}} \\
+  --group={{group_spec}} \\
+  --concat-name=tfMRI_7T_{{concat_spec}} \\
+  --working-dir={{working_directory_name}} \\
+  --setup-script={{setup_file_name}}
+
+"""
+
 _order_list = ['RETCCW',
                'RETCW',
                'RETEXP',
@@ -114,121 +135,64 @@ class OneSubjectJobSubmitter(one_subject_job_submitter.OneSubjectJobSubmitter):
         name += '.XNAT_MARK_RUNNING_STATUS'
         return name
     
-    def create_get_data_job_script(self):
-        """Create the script to be submitted to perform the get data job"""
-        module_logger.debug(debug_utils.get_name())
-
-        script_name = self.get_data_job_script_name
-
-        with contextlib.suppress(FileNotFoundError):
-            os.remove(script_name)
-
-        script = open(script_name, 'w')
-
-        self._write_bash_header(script)
-        script.write('#PBS -l nodes=1:ppn=1,walltime=4:00:00,vmem=4gb' + os.linesep)
-        script.write('#PBS -q HCPput' + os.linesep)
-        script.write('#PBS -o ' + self.working_directory_name + os.linesep)
-        script.write('#PBS -e ' + self.working_directory_name + os.linesep)
-        script.write(os.linesep)
-        script.write(self.get_data_program_path + ' \\' + os.linesep)
-        script.write('  --project=' + self.project + ' \\' + os.linesep)
-        script.write('  --subject=' + self.subject + ' \\' + os.linesep)
-        script.write('  --ref-project=' + self.structural_reference_project + ' \\' + os.linesep)
-        script.write('  --working-dir=' + self.working_directory_name + os.linesep)
-
-        script.close()
-        os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
-    
-    def create_process_data_job_script(self):
-        module_logger.debug(debug_utils.get_name())
-
-        # copy the .XNAT script to the working directory
-        processing_script_source_name = self.xnat_pbs_jobs_home
-        processing_script_source_name += os.sep + '7T'
-        processing_script_source_name += os.sep + self.PIPELINE_NAME
-        processing_script_source_name += os.sep + self.PIPELINE_NAME
-        processing_script_source_name += '.XNAT_PROCESS'
-
-        processing_script_dest_name = self.working_directory_name
-        processing_script_dest_name += os.sep + self.PIPELINE_NAME
-        processing_script_dest_name += '.XNAT_PROCESS'
+    def render_get_data_job_script(self):
+        """Text of the script to be submitted to perform the get data job"""
+        context = self._pbs_header_context('nodes=1:ppn=1,walltime=4:00:00,vmem=4gb',
+                                           self.working_directory_name, queue='HCPput',
+                                           xnat_pbs_setup=False, stage='GET_DATA')
+        context.update(get_data_program_path=self.get_data_program_path,
+                       project=self.project,
+                       subject=self.subject,
+                       structural_reference_project=self.structural_reference_project,
+                       working_directory_name=self.working_directory_name)
+        return script_template.render(GET_DATA_TEMPLATE, context)
 
-        shutil.copy(processing_script_source_name, processing_script_dest_name)
-        os.chmod(processing_script_dest_name, stat.S_IRWXU | stat.S_IRWXG)
+    @property
+    def process_data_program_source_path(self):
+        name = self.xnat_pbs_jobs_home
+        name += os.sep + '7T'
+        name += os.sep + self.PIPELINE_NAME
+        name += os.sep + self.PIPELINE_NAME
+        name += '.XNAT_PROCESS'
+        return name
 
-        # write the process data job script (that calls the .XNAT script)
+    def render_process_data_job_script(self):
+        debug_utils.debug(module_logger)
 
         subject_info = hcp7t_subject.Hcp7TSubjectInfo(project=self.project, subject_id=self.subject)
 
-        script_name = self.process_data_job_script_name
-
-        with contextlib.suppress(FileNotFoundError):
-            os.remove(script_name)
-
-        walltime_limit_str = str(self.walltime_limit_hours) + ':00:00'
-        mem_limit_str = str(self.mem_limit_gbs) + 'gb'
-        vmem_limit_str = str(self.vmem_limit_gbs) + 'gb'
-        
-        resources_line = '#PBS -l nodes=' + str(self.WORK_NODE_COUNT)
-        resources_line += ':ppn=' + str(self.WORK_PPN)
-        resources_line += ',walltime=' + walltime_limit_str
-        resources_line += ',mem=' + mem_limit_str
-        resources_line += ',vmem=' + vmem_limit_str
-
-        stdout_line = '#PBS -o ' + self.working_directory_name
-        stderr_line = '#PBS -e ' + self.working_directory_name
-
-        script_line   = processing_script_dest_name
-        user_line     = '  --user='     + self.username
-        password_line = '  --password=' + self.password
-        server_line   = '  --server='   + str_utils.get_server_name(self.server)
-        project_line  = '  --project='  + self.project
-        subject_line  = '  --subject='  + self.subject
-        session_line  = '  --session='  + self.subject + '_7T'
+        resources = 'nodes=' + str(self.WORK_NODE_COUNT)
+        resources += ':ppn=' + str(self.WORK_PPN)
+        resources += ',walltime=' + str(self.walltime_limit_hours) + ':00:00'
+        resources += ',mem=' + str(self.mem_limit_gbs) + 'gb'
+        resources += ',vmem=' + str(self.vmem_limit_gbs) + 'gb'
 
         avail_retinotopy_task_names = self.archive.available_retinotopy_preproc_names(subject_info)
-        
+
         # sort available retinotopy task names into the order the
         # tasks were presented to the subject
         avail_retinotopy_task_names = sorted(avail_retinotopy_task_names,
                                              key=retinotopy_presentation_order_key)
 
-        # add the tesla spec to each element of the group
-        group_names = list(map(add_tesla_spec, avail_retinotopy_task_names))
-
-        group_spec = '@'.join(group_names)
-        group_line  = '  --group=' + group_spec
-        
-        concat_spec = '_'.join(list(map(remove_scan_type, avail_retinotopy_task_names)))
-        concat_line = '  --concat-name=tfMRI_7T_' + concat_spec
-        
-        wdir_line  = '  --working-dir=' + self.working_directory_name
-        setup_line = '  --setup-script=' + self.setup_file_name
-
-        with open(script_name, 'w') as script:
-            script.write(resources_line + os.linesep)
-            script.write(stdout_line + os.linesep)
-            script.write(stderr_line + os.linesep)
-            script.write(os.linesep)
-
-            script.write(script_line   + ' \\' + os.linesep)
-            script.write(user_line     + ' \\' + os.linesep)
-            script.write(password_line + ' \\' + os.linesep)
-            script.write(server_line   + ' \\' + os.linesep)
-            script.write(project_line  + ' \\' + os.linesep)
-            script.write(subject_line  + ' \\' + os.linesep)
-            script.write(session_line  + ' \\' + os.linesep)
-            script.write(group_line    + ' \\' + os.linesep)
-            script.write(concat_line   + ' \\' + os.linesep)
-            script.write(wdir_line     + ' \\' + os.linesep)
-            script.write(setup_line    + os.linesep)
-            script.write(os.linesep)
-
-            os.chmod(script_name, stat.S_IRWXU | stat.S_IRWXG)
+        context = self._pbs_header_context(resources, self.working_directory_name,
+                                           bash_shell=False, xnat_pbs_setup=False,
+                                           stage='PROCESS_DATA')
+        context.update(process_data_program_path=self.process_data_program_path,
+                       username=self.username,
+                       password=self.password,
+                       server_name=str_utils.get_server_name(self.server),
+                       project=self.project,
+                       subject=self.subject,
+                       session=self.subject + '_7T',
+                       # add the tesla spec to each element of the group
+                       group_spec='@'.join(map(add_tesla_spec, avail_retinotopy_task_names)),
+                       concat_spec='_'.join(map(remove_scan_type, avail_retinotopy_task_names)),
+                       working_directory_name=self.working_directory_name,
+                       setup_file_name=self.setup_file_name)
+        return script_template.render(PROCESS_DATA_TEMPLATE, context)
 
     def mark_running_status(self, stage):
-        module_logger.debug(debug_utils.get_name())
+        debug_utils.debug(module_logger)
 
         if stage > ccf_processing_stage.ProcessingStage.PREPARE_SCRIPTS:
             mark_cmd = self._xnat_pbs_jobs_home
@@ -14,7 +14,7 @@ import sys
 
 # import of local modules
 import hcp.subject as hcp_subject
-import utils.str_utils as str_utils
+import utils.subject_list as subject_list
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -89,63 +89,30 @@ def read_subject_info_list(file_name, separator=Hcp7TSubjectInfo.DEFAULT_SEPARAT
     """
     subject_info_list = []
 
-    input_file = open(file_name, 'r')
-    for line in input_file:
-        # remove new line characters
-        line = str_utils.remove_ending_new_lines(line)
-
-        # remove leading and trailing spaces
-        line = line.strip()
-
-        # ignore blank lines and comment lines - starting with #
-        if line != '' and line[0] != '#':
-            try:
-                (project, structural_ref_project, subject_id, extra) = line.split(separator)
-            except ValueError as e:
-                if str(e) == 'not enough values to unpack (expected 4, got 3)':
-                    (project, structural_ref_project, subject_id) = line.split(separator)
-                    extra = None
-                else:
-                    raise
-
-            # Make the string 'None' in the file translate to a None type instead of just the
-            # string itself
-            if project == 'None':
-                project = None
-            if structural_ref_project == 'None':
-                structural_ref_project = None
-            if subject_id == 'None':
-                subject_id = None
-            if extra == 'None':
-                extra = None
-
-            subject_info = Hcp7TSubjectInfo(project, structural_ref_project, subject_id, extra)
-            subject_info_list.append(subject_info)
-
-    input_file.close()
-    return subject_info_list
+    for fields in subject_list.read_fields(file_name, 'hcp7t', separator):
+        subject_info_list.append(subject_info_from_fields(fields))
 
+    return subject_info_list
 
-def read_subject_id_list(file_name):
-    """Reads a subject id list from the specified file."""
 
-    subject_id_list = []
+def subject_info_from_fields(fields):
+    """Creates a subject information object from the fields of one line of a subject list.
 
-    input_file = open(file_name, 'r')
-    for line in input_file:
-        # remove new line characters
-        line = str_utils.remove_ending_new_lines(line)
+    :param fields: project, structural reference project, subject id, and (optionally) extra
+    :type fields: list
+    """
+    # Make the string 'None' in the file translate to a None type instead of just the
+    # string itself (a missing extra field is also None)
+    fields = list(fields) + [None] * (4 - len(fields))
+    (project, structural_ref_project, subject_id, extra) = [None if field == 'None' else field
+                                                            for field in fields]
 
-        # remove leading and trailing spaces
-        line = line.strip()
+    return Hcp7TSubjectInfo(project, structural_ref_project, subject_id, extra)
 
-        # ignore blank lines and comment lines - starting with #
-        if line != '' and line[0] != '#':
-            subject_id = line
-            subject_id_list.append(subject_id)
 
-    input_file.close()
-    return subject_id_list
+def read_subject_id_list(file_name):
+    """Reads a subject id list from the specified file."""
+    return [subject_id for (subject_id,) in subject_list.read_fields(file_name, 'id', separator=':')]
 
 
 def write_subject_info_list(file_name, subject_info_list):
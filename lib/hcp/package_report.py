@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+"""hcp/package_report.py: Report whether the packages of the subjects of an HCP project exist and are up to date.
+
+Which packages a subject should have, and which archived resources each package is made
+from, is given by a table of package types (PACKAGE_TYPES). A package is expected for a
+subject when at least one of the resources it is made from is in the subject's archive.
+
+For each subject, the RESOURCES directory and each package directory are read once
+(names, sizes, and modification times together), whatever the number of package types.
+Subjects are read in parallel. One report is then written for each package type, as
+<package type>.PackageReport.tsv, in the layout read by
+GeneratePackageReport/AnalyzePackageTypeReport.py:
+
+  Subject ID  Package  Package Exists  Package Size  Package Date  Checksum Exists
+  Checksum Correct  Notes
+
+Package Exists is TRUE or FALSE for expected packages, and --- (and so are the other
+columns) for packages that are not expected. Checksum Correct is FALSE if the checksum
+file is older than the package (so it cannot be the checksum of the package) or, with
+--verify-checksums, if the checksum does not match. Notes names the newest resource if
+it was modified after the package was written (STALE:).
+
+For example, the reports of the 3T packages in the live packages root:
+
+  package_report.py -p HCP_500 --package-project HCP_900 -r /HCP/hcpdb/packages/live -o reports
+  package_report.py -p HCP_1200 -r /HCP/hcpdb/packages/PostMsmAll -t 'rfMRI_REST*_fix*'
+"""
+
+# import of built-in modules
+import collections
+import concurrent.futures
+import datetime
+import fnmatch
+import hashlib
+import os
+import sys
+
+# import of third party modules
+# None
+
+# import of local modules
+import hcp.subject_query as subject_query
+import utils.file_utils as file_utils
+import utils.my_argparse as my_argparse
+import utils.subject_list as subject_list
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility/Human Connectome Project"
+__maintainer__ = "Timothy B. Brown"
+
+DEFAULT_MAX_WORKERS = 16
+
+DNM = "---"  # Does Not Matter
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+REPORT_SUFFIX = '.PackageReport.tsv'
+HEADER_ROW = ['Subject ID', 'Package', 'Package Exists', 'Package Size', 'Package Date', 'Checksum Exists',
+              'Checksum Correct', 'Notes']
+
+CHECKSUM_SUFFIX = '.md5'
+
+# name: name of the package type (and of its report)
+# package_dir: directory of the package in the subject's package directory
+# file_name: package file name, {subject_id} is replaced by the subject ID
+# source_patterns: glob patterns of the names of the resources the package is made from
+PackageType = collections.namedtuple('PackageType', ['name', 'package_dir', 'file_name', 'source_patterns'])
+
+TASKS_3T = ('EMOTION', 'GAMBLING', 'LANGUAGE', 'MOTOR', 'RELATIONAL', 'SOCIAL', 'WM')
+TASK_ANALYSIS_SMOOTHING_LEVELS_3T = (2, 4, 8, 12)
+VOLUME_TASK_ANALYSIS_SMOOTHING_LEVELS_3T = (4,)
+
+SCANS_7T = ('rfMRI_REST1', 'rfMRI_REST2', 'rfMRI_REST3', 'rfMRI_REST4',
+            'tfMRI_MOVIE1', 'tfMRI_MOVIE2', 'tfMRI_MOVIE3', 'tfMRI_MOVIE4',
+            'tfMRI_RETBAR1', 'tfMRI_RETBAR2', 'tfMRI_RETCCW', 'tfMRI_RETCON', 'tfMRI_RETCW', 'tfMRI_RETEXP')
+# 7T package group name: resource name prefix
+GROUPS_7T = collections.OrderedDict([('MOVIE', 'tfMRI_MOVIE'), ('REST', 'rfMRI_REST'), ('RET', 'tfMRI_RET')])
+
+
+def _package_type(name, package_dir, tesla_spec, *source_patterns):
+    return PackageType(name, package_dir, '{subject_id}_' + tesla_spec + '_' + name + '.zip', source_patterns)
+
+
+def _package_types_3t():
+    types = [_package_type('Structural_unproc', 'unproc', '3T', 'T1w_*_unproc', 'T2w_*_unproc')]
+    types += [_package_type(scan + '_unproc', 'unproc', '3T', scan + '*_unproc')
+              for scan in ['rfMRI_REST1', 'rfMRI_REST2'] + ['tfMRI_' + task for task in TASKS_3T]]
+    types.append(_package_type('Diffusion_unproc', 'unproc', '3T', 'Diffusion_unproc'))
+
+    types.append(_package_type('Structural_preproc', 'preproc', '3T', 'Structural_preproc'))
+    types.append(_package_type('Structural_preproc_extended', 'preproc', '3T', 'Structural_preproc'))
+    types += [_package_type(scan + '_preproc', 'preproc', '3T', scan + '*_preproc')
+              for scan in ['rfMRI_REST1', 'rfMRI_REST2'] + ['tfMRI_' + task for task in TASKS_3T]]
+    types.append(_package_type('Diffusion_preproc', 'preproc', '3T', 'Diffusion_preproc'))
+
+    types.append(_package_type('rfMRI_REST_fix', 'fix', '3T', 'rfMRI_REST*_FIX'))
+    types += [_package_type(scan + '_fixextended', 'fixextended', '3T', scan + '*_FIX')
+              for scan in ('rfMRI_REST1', 'rfMRI_REST2')]
+
+    types += [_package_type('tfMRI_' + task + '_analysis_s' + str(level), 'analysis_s' + str(level), '3T',
+                            'tfMRI_' + task)
+              for level in TASK_ANALYSIS_SMOOTHING_LEVELS_3T for task in TASKS_3T]
+    types += [_package_type('tfMRI_' + task + '_volume_s' + str(level), 'volume_s' + str(level), '3T',
+                            'tfMRI_' + task)
+              for level in VOLUME_TASK_ANALYSIS_SMOOTHING_LEVELS_3T for task in TASKS_3T]
+
+    types.append(PackageType('bedpostx', 'bedpostx', '{subject_id}_bedpostx.zip', ('Diffusion_bedpostx',)))
+    return types
+
+
+def _package_types_7t():
+    types = [_package_type(scan + '_unproc', 'unproc', '7T', scan + '_*_unproc') for scan in SCANS_7T]
+    for group, prefix in GROUPS_7T.items():
+        types += [_package_type(group + '_' + variant, 'preproc', '7T', prefix + '*_preproc')
+                  for variant in ('1.6mm_preproc', '2mm_preproc', 'Volume_preproc', 'preproc_extended')]
+    for group, prefix in GROUPS_7T.items():
+        types += [_package_type(group + '_' + variant, 'fix', '7T', prefix + '*_FIX')
+                  for variant in ('1.6mm_fix', '2mm_fix', 'Volume_fix')]
+    for group, prefix in GROUPS_7T.items():
+        types.append(_package_type(group + '_fixextended', 'fixextended', '7T', prefix + '*_FIX'))
+    return types
+
+
+PACKAGE_TYPES = {
+    '3T': _package_types_3t(),
+    '7T': _package_types_7t(),
+}
+
+# modification time and size of an entry of a directory
+FileInfo = collections.namedtuple('FileInfo', ['mtime', 'size'])
+
+
+def _inform(msg):
+    """Inform the user by writing out a message that is prefixed by the file name.
+
+    :param msg: Message to output
+    :type msg: str
+    """
+    print(os.path.basename(__file__) + ": " + msg, file=sys.stderr, flush=True)
+
+
+def _archive(classifier):
+    if classifier == '7T':
+        import hcp.hcp7t.archive as hcp7t_archive
+        return hcp7t_archive.Hcp7T_Archive()
+
+    import hcp.hcp3t.archive as hcp3t_archive
+    return hcp3t_archive.Hcp3T_Archive()
+
+
+def read_directory(directory):
+    """Dictionary of the names of the entries of directory to their FileInfo, from one
+    directory read (empty if the directory does not exist). Symbolic links are followed."""
+    infos = dict()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                infos[entry.name] = FileInfo(stat.st_mtime, stat.st_size)
+    except OSError:
+        pass
+    return infos
+
+
+class SubjectPackages(object):
+    """The archived resources and the package files of one subject, each directory read once."""
+
+    def __init__(self, subject_id, resources_dir, subject_package_dir, package_dirs):
+        self.subject_id = subject_id
+        self.resources = read_directory(resources_dir)
+        self.package_dir_fullpaths = dict((package_dir, subject_package_dir + os.sep + package_dir)
+                                          for package_dir in package_dirs)
+        self.package_files = dict((package_dir, read_directory(fullpath))
+                                  for package_dir, fullpath in self.package_dir_fullpaths.items())
+
+    def newest_source(self, package_type):
+        """(name, FileInfo) of the most recently modified resource that package_type is made
+        from, or None if there is none."""
+        sources = [(name, info) for name, info in self.resources.items()
+                   if any(fnmatch.fnmatchcase(name, pattern) for pattern in package_type.source_patterns)]
+        return max(sources, key=lambda source: source[1].mtime) if sources else None
+
+
+def _date_str(mtime):
+    return datetime.datetime.fromtimestamp(mtime).strftime(DATE_FORMAT)
+
+
+def size_str(size):
+    """Size in the form output by ls -lh (e.g. 1.2G), in K at least, as AnalyzePackageTypeReport.py reads it."""
+    return file_utils.human_readable_byte_size(size) if size >= 1024 else "%3.1fK" % (size / 1024.0)
+
+
+def _md5_hexdigest(file_name):
+    md5 = hashlib.md5()
+    with open(file_name, 'rb') as input_file:
+        for data in iter(lambda: input_file.read(1024 * 1024), b''):
+            md5.update(data)
+    return md5.hexdigest()
+
+
+def is_checksum_matching(package_file_name):
+    """Whether the checksum recorded in package_file_name.md5 is the checksum of the package."""
+    try:
+        with open(package_file_name + CHECKSUM_SUFFIX, 'r') as checksum_file:
+            recorded = checksum_file.read().split()
+        return bool(recorded) and recorded[0] == _md5_hexdigest(package_file_name)
+    except OSError:
+        return False
+
+
+def report_row(subject, package_type, verify_checksums=False):
+    """Columns (HEADER_ROW) of the report row of the subject's package of package_type."""
+    package_name = package_type.file_name.format(subject_id=subject.subject_id)
+
+    newest_source = subject.newest_source(package_type)
+    if newest_source is None:
+        return [subject.subject_id, package_name, DNM, DNM, DNM, DNM, DNM, '']
+
+    files = subject.package_files[package_type.package_dir]
+    package = files.get(package_name)
+    checksum = files.get(package_name + CHECKSUM_SUFFIX)
+
+    if package is None:
+        return [subject.subject_id, package_name, 'FALSE', 'UNKNOWN', 'UNKNOWN', 'FALSE', 'UNCHECKED', '']
+
+    if checksum is None:
+        checksum_exists, checksum_correct = 'FALSE', 'UNCHECKED'
+    else:
+        correct = checksum.mtime >= package.mtime
+        if correct and verify_checksums:
+            package_fullpath = subject.package_dir_fullpaths[package_type.package_dir] + os.sep + package_name
+            correct = is_checksum_matching(package_fullpath)
+        checksum_exists, checksum_correct = 'TRUE', str(correct).upper()
+
+    source_name, source = newest_source
+    notes = ''
+    if source.mtime > package.mtime:
+        notes = 'STALE: ' + source_name + ' modified ' + _date_str(source.mtime) + ', after the package'
+
+    return [subject.subject_id, package_name, 'TRUE', size_str(package.size),
+            _date_str(package.mtime), checksum_exists, checksum_correct, notes]
+
+
+def subject_report_rows(archive, project, package_project_dir, package_types, subject_id, verify_checksums=False):
+    """Report rows of the subject's packages, one for each of package_types (in order)."""
+    resources_dir = (archive.project_archive_root(project) + os.sep +
+                     subject_id + archive.NAME_DELIMITER + archive.TESLA_SPEC + os.sep + 'RESOURCES')
+    package_dirs = sorted(set(package_type.package_dir for package_type in package_types))
+    subject = SubjectPackages(subject_id, resources_dir, package_project_dir + os.sep + subject_id, package_dirs)
+    return [report_row(subject, package_type, verify_checksums) for package_type in package_types]
+
+
+def report_rows(archive, project, package_project_dir, package_types, subject_ids, verify_checksums=False,
+                max_workers=DEFAULT_MAX_WORKERS):
+    """Dictionary of package type name to the report rows of the subjects (in the order of
+    subject_ids). The subjects are read concurrently."""
+    rows = collections.OrderedDict((package_type.name, []) for package_type in package_types)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        subject_rows = executor.map(
+            lambda subject_id: subject_report_rows(archive, project, package_project_dir, package_types,
+                                                   subject_id, verify_checksums),
+            subject_ids)
+        for row_list in subject_rows:
+            for package_type, row in zip(package_types, row_list):
+                rows[package_type.name].append(row)
+    return rows
+
+
+def write_reports(rows, output_dir):
+    """Write a report file for each package type in rows to output_dir. Returns the file names."""
+    file_names = []
+    for name, type_rows in rows.items():
+        file_name = output_dir + os.sep + name + REPORT_SUFFIX
+        with open(file_name, 'w') as report_file:
+            for row in [HEADER_ROW] + type_rows:
+                report_file.write("\t".join(row) + os.linesep)
+        file_names.append(file_name)
+    return file_names
+
+
+def main():
+    # create a parser object for getting the command line options
+    parser = my_argparse.MyArgumentParser(
+        description="Write a package report for each package type of the subjects of an HCP project.")
+
+    # mandatory arguments
+    parser.add_argument('-p', '--project', dest='project', required=True, type=str,
+                        help="project whose archive the packages are made from")
+    parser.add_argument('-r', '--packages-root', dest='packages_root', required=True, type=str,
+                        help="directory containing the project package directories")
+
+    # optional arguments
+    parser.add_argument('--package-project', dest='package_project', required=False, type=str, default=None,
+                        help="project whose package directory the packages are in (default: --project)")
+    parser.add_argument('-c', '--classifier', dest='classifier', required=False,
+                        choices=subject_query.CLASSIFIERS, default='3T')
+    parser.add_argument('-s', '--subjects', dest='subjects_file', required=False, type=str, default=None,
+                        help="subject list file (default: all subjects in the project archive)")
+    parser.add_argument('-f', '--subjects-format', dest='subjects_format', required=False,
+                        choices=list(subject_list.FORMATS.keys()), default=subject_list.DEFAULT_FORMAT)
+    parser.add_argument('-t', '--package-type', dest='type_patterns', required=False, action='append',
+                        help="report only the package types whose names match this pattern (may be repeated)")
+    parser.add_argument('-o', '--output-dir', dest='output_dir', required=False, type=str, default='.')
+    parser.add_argument('--verify-checksums', dest='verify_checksums', action='store_true', required=False,
+                        default=False, help="also compare the checksum files to the checksums of the packages")
+    parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int, default=DEFAULT_MAX_WORKERS)
+
+    # parse the command line arguments
+    args = parser.parse_args()
+
+    package_types = [package_type for package_type in PACKAGE_TYPES[args.classifier]
+                     if not args.type_patterns or
+                     any(fnmatch.fnmatchcase(package_type.name, pattern) for pattern in args.type_patterns)]
+    if not package_types:
+        _inform("ERROR: no package types match " + ", ".join(args.type_patterns))
+        sys.exit(1)
+
+    archive = _archive(args.classifier)
+    if args.subjects_file:
+        subject_ids = list(collections.OrderedDict.fromkeys(
+            key for key, line in subject_list.read_records(args.subjects_file, args.subjects_format)))
+    else:
+        subject_ids = subject_query.project_subject_ids(archive, args.project)
+
+    package_project_dir = args.packages_root + os.sep + (args.package_project or args.project)
+    rows = report_rows(archive, args.project, package_project_dir, package_types, subject_ids,
+                       args.verify_checksums, args.parallel)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for file_name in write_reports(rows, args.output_dir):
+        _inform("wrote " + file_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+
+"""hcp/subject_query.py: Select the subjects of HCP projects that satisfy a query over their archived resources.
+
+The query is a Python style boolean expression (and, or, not, comparisons, numbers and
+strings) of these functions of a subject:
+
+  resources(pattern)                number of resources whose names match the glob pattern
+  files(resource, pattern)          number of files in the resource whose paths (relative to
+                                    the resource directory) match the glob pattern
+  volumes(resource, pattern)        list of the volume counts of the matching image files,
+                                    read from their NIfTI headers (use with min, max, len)
+  volume_mismatches(resource, pattern, regex)
+                                    number of matching image files whose volume count is not
+                                    the number captured by regex from the file name
+  mtime(resource)                   modification time of the resource directory (-inf if the
+                                    resource does not exist)
+  newer(resource, other_resource)   whether both resources exist and resource was modified
+                                    after other_resource
+  min, max, len, any, all           as in Python (min and max of an empty list are 0)
+
+For example (the questions answered by the scripts in subject_selection/ and by
+FindMissingRetinotopyScans.py):
+
+  subject_query.py -p HCP_500 -p HCP_900 -c 3T \\
+      "files('Diffusion_unproc', '*_DWI_dir95_[LR][LR].nii.gz') == 0 and
+       files('Diffusion_unproc', '*_DWI_dir9[67]_[LR][LR].nii.gz') == 4"
+  subject_query.py -p HCP_500 -p HCP_900 -c 3T \\
+      "files('Diffusion_unproc', '*_DWI_dir95_[LR][LR].nii.gz') == 1"
+  subject_query.py -p HCP_500 -p HCP_900 -c 3T \\
+      "volume_mismatches('Diffusion_unproc', '*_DWI_dir*_[LR][LR].nii.gz', '_dir([0-9]+)_') > 0"
+  subject_query.py -p HCP_1200 -c 7T "resources('tfMRI_RET*_preproc') < 6"
+  subject_query.py -p HCP_1200 -c 3T "newer('Structural_preproc', 'Diffusion_preproc')"
+
+The query is compiled once. Each subject's session is then read in a single traversal:
+the resources directory and each resource directory that the query looks into are listed
+at most once per subject, whatever the number of predicates that use them. Subjects are
+evaluated in parallel. The selected subjects are written as subject list (.subjects) lines.
+"""
+
+# import of built-in modules
+import ast
+import concurrent.futures
+import fnmatch
+import math
+import os
+import re
+import sys
+
+# import of third party modules
+# None
+
+# import of local modules
+import utils.file_utils as file_utils
+import utils.my_argparse as my_argparse
+import utils.nifti as nifti
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility/Human Connectome Project"
+__maintainer__ = "Timothy B. Brown"
+
+DEFAULT_MAX_WORKERS = 16
+
+CLASSIFIERS = ('3T', '7T')
+
+# names that can be used in a query besides the subject functions
+BUILTIN_NAMES = {
+    'min': lambda values: min(values) if values else 0,
+    'max': lambda values: max(values) if values else 0,
+    'len': len,
+    'any': any,
+    'all': all,
+    'True': True,
+    'False': False,
+}
+
+SUBJECT_FUNCTION_NAMES = ('resources', 'files', 'volumes', 'volume_mismatches', 'mtime', 'newer')
+
+# kinds of expression nodes allowed in a query
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.BinOp, ast.Add, ast.Sub, ast.Call, ast.Name, ast.Load, ast.Constant,
+)
+
+
+def _inform(msg):
+    """Inform the user by writing out a message that is prefixed by the file name.
+
+    :param msg: Message to output
+    :type msg: str
+    """
+    print(os.path.basename(__file__) + ": " + msg, file=sys.stderr, flush=True)
+
+
+class QueryError(ValueError):
+    """A query is not a valid expression of the query functions."""
+    pass
+
+
+def compile_query(query):
+    """Compile the query text to a code object, allowing only the query functions and
+    simple expressions.
+
+    :raises QueryError: if the query is not valid
+    """
+    try:
+        tree = ast.parse(query.strip(), mode='eval')
+    except SyntaxError as e:
+        raise QueryError("invalid query: " + str(e))
+
+    allowed_names = set(SUBJECT_FUNCTION_NAMES) | set(BUILTIN_NAMES)
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise QueryError("not allowed in a query: " + type(node).__name__)
+        if isinstance(node, ast.Name) and node.id not in allowed_names:
+            raise QueryError("unknown name in query: " + node.id)
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.keywords):
+            raise QueryError("only the query functions can be called, with positional arguments")
+
+    return compile(tree, '<query>', 'eval')
+
+
+class SubjectView(object):
+    """The archived resources of one subject, as seen by a query.
+
+    Directory listings, file times, and image headers are each read at most once.
+    """
+
+    def __init__(self, archive, subject_info):
+        self._resources_dir = archive.subject_resources_dir_fullpath(subject_info)
+        self._listing = file_utils.DirectoryListing()
+        self._mtimes = dict()
+        self._volume_counts = dict()
+
+    def _resource_dir(self, resource):
+        return self._resources_dir + os.sep + resource
+
+    def _matching_paths(self, resource, pattern):
+        """Full paths of the files in resource that match pattern, which can include
+        directories (e.g. 'MNINonLinear/Results/*/*.nii.gz')."""
+        directories = [self._resource_dir(resource)]
+        parts = pattern.split('/')
+        for part in parts[:-1]:
+            directories = [directory + os.sep + name
+                           for directory in directories
+                           for name in sorted(fnmatch.filter(self._listing.names(directory), part))]
+        return [directory + os.sep + name
+                for directory in directories
+                for name in sorted(fnmatch.filter(self._listing.names(directory), parts[-1]))]
+
+    def resources(self, pattern):
+        return len(fnmatch.filter(self._listing.names(self._resources_dir), pattern))
+
+    def files(self, resource, pattern):
+        return len(self._matching_paths(resource, pattern))
+
+    def _volume_count(self, path):
+        if path not in self._volume_counts:
+            try:
+                self._volume_counts[path] = nifti.read_header(path).series_length
+            except (nifti.NiftiHeaderError, OSError):
+                self._volume_counts[path] = 0
+        return self._volume_counts[path]
+
+    def volumes(self, resource, pattern):
+        return [self._volume_count(path) for path in self._matching_paths(resource, pattern)]
+
+    def volume_mismatches(self, resource, pattern, regex):
+        mismatches = 0
+        for path in self._matching_paths(resource, pattern):
+            match = re.search(regex, os.path.basename(path))
+            if match and int(match.group(1)) != self._volume_count(path):
+                mismatches += 1
+        return mismatches
+
+    def mtime(self, resource):
+        if resource not in self._mtimes:
+            if resource in self._listing.names(self._resources_dir):
+                try:
+                    self._mtimes[resource] = os.path.getmtime(self._resource_dir(resource))
+                except OSError:
+                    self._mtimes[resource] = -math.inf
+            else:
+                self._mtimes[resource] = -math.inf
+        return self._mtimes[resource]
+
+    def newer(self, resource, other_resource):
+        mtime = self.mtime(resource)
+        other_mtime = self.mtime(other_resource)
+        return mtime > other_mtime and other_mtime > -math.inf
+
+    def namespace(self):
+        names = dict(BUILTIN_NAMES)
+        for name in SUBJECT_FUNCTION_NAMES:
+            names[name] = getattr(self, name)
+        return names
+
+
+def evaluate(code, archive, subject_info):
+    """Whether the subject satisfies the compiled query."""
+    return bool(eval(code, {'__builtins__': {}}, SubjectView(archive, subject_info).namespace()))
+
+
+def _archive_and_subject_class(classifier):
+    if classifier == '7T':
+        import hcp.hcp7t.archive as hcp7t_archive
+        import hcp.hcp7t.subject as hcp7t_subject
+        return hcp7t_archive.Hcp7T_Archive(), (lambda project, subject_id: hcp7t_subject.Hcp7TSubjectInfo(
+            project=project, subject_id=subject_id))
+
+    import hcp.hcp3t.archive as hcp3t_archive
+    import hcp.hcp3t.subject as hcp3t_subject
+    return hcp3t_archive.Hcp3T_Archive(), (lambda project, subject_id: hcp3t_subject.Hcp3TSubjectInfo(
+        project, subject_id))
+
+
+def project_subject_ids(archive, project):
+    """Sorted subject IDs of the sessions in the project archive, from one directory read."""
+    suffix = archive.NAME_DELIMITER + archive.TESLA_SPEC
+    try:
+        with os.scandir(archive.project_archive_root(project)) as entries:
+            return sorted(entry.name[:-len(suffix)] for entry in entries
+                          if entry.name.endswith(suffix) and entry.is_dir())
+    except OSError:
+        return []
+
+
+def select(code, archive, subject_info_list, max_workers=DEFAULT_MAX_WORKERS):
+    """Generator of the subjects in subject_info_list that satisfy the compiled query, in
+    list order. Subjects are evaluated concurrently."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        verdicts = executor.map(lambda subject_info: evaluate(code, archive, subject_info), subject_info_list)
+        for subject_info, verdict in zip(subject_info_list, verdicts):
+            if verdict:
+                yield subject_info
+
+
+def main():
+    # create a parser object for getting the command line options
+    parser = my_argparse.MyArgumentParser(
+        description="Select the subjects of HCP projects that satisfy a query over their archived resources.")
+
+    # mandatory arguments
+    parser.add_argument('query', help="boolean expression of the query functions (see the module documentation)")
+    parser.add_argument('-p', '--project', dest='projects', required=True, action='append',
+                        help="project to query (may be repeated)")
+
+    # optional arguments
+    parser.add_argument('-c', '--classifier', dest='classifier', required=False, choices=CLASSIFIERS, default='3T')
+    parser.add_argument('-n', '--negate', dest='negate', action='store_true', required=False, default=False,
+                        help="select the subjects that do not satisfy the query")
+    parser.add_argument('-o', '--output', dest='output', required=False, type=str, default=None,
+                        help="subject list file to write (default: standard output)")
+    parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int, default=DEFAULT_MAX_WORKERS)
+
+    # parse the command line arguments
+    args = parser.parse_args()
+
+    try:
+        code = compile_query(('not (' + args.query + ')') if args.negate else args.query)
+    except QueryError as e:
+        _inform("ERROR: " + str(e))
+        sys.exit(1)
+
+    archive, subject_class = _archive_and_subject_class(args.classifier)
+    subject_info_list = [subject_class(project, subject_id)
+                         for project in args.projects
+                         for subject_id in project_subject_ids(archive, project)]
+
+    output_file = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for subject_info in select(code, archive, subject_info_list, args.parallel):
+            output_file.write(str(subject_info) + os.linesep)
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
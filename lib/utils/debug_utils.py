@@ -1,7 +1,28 @@
 #!/usr/bin/env python3
 
+"""
+utils/debug_utils.py: Debug tracing that costs (almost) nothing when DEBUG logging is off.
+
+    debug_utils.debug(module_logger, ": set to %s", value)
+
+logs "<calling function name>: set to <value>" at DEBUG level. When the logger is not
+enabled for DEBUG, the only cost is the isEnabledFor check: the caller's name is not
+looked up and the message is not formatted. Pass values as arguments (not str(value)
+concatenated into the message) so that they are only converted when logged.
+
+    @debug_utils.span(module_logger)
+    def submit_jobs(self, ...):
+
+logs the time taken by each call of the decorated function (a timing span) at DEBUG
+level, with the span name and seconds also attached to the log record as the span and
+seconds attributes for formatters that output structured records.
+"""
+
 # import of built-in modules
-import inspect
+import functools
+import logging
+import sys
+import time
 
 # import of third party modules
 # None
@@ -14,5 +35,39 @@ __author__ = "Timothy B. Brown"
 __copyright__ = "Copyright 2017, The Human Connectome Project"
 __maintainer__ = "Timothy B. Brown"
 
-def get_name():
-    return inspect.stack()[1][3]
+
+def get_name(depth=1):
+    """Name of the function that called get_name (or that function's caller for depth 2, etc.)"""
+    return sys._getframe(depth).f_code.co_name
+
+
+def debug(logger, msg='', *args):
+    """Log msg % args at DEBUG level on logger, prefixed by the name of the calling function."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%s' + msg, sys._getframe(1).f_code.co_name, *args)
+
+
+def span(logger, name=None):
+    """
+    Decorator that logs the time taken by each call of the decorated function at DEBUG
+    level on logger. The span is named name, or the qualified name of the function.
+    """
+    def decorator(function):
+        span_name = name if name else function.__qualname__
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if not logger.isEnabledFor(logging.DEBUG):
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                logger.debug('span=%s seconds=%.6f', span_name, seconds,
+                             extra={'span': span_name, 'seconds': seconds})
+
+        return timed
+
+    return decorator
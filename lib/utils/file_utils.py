@@ -218,13 +218,52 @@ def rm_dir_if_exists(full_path, verbose=False, output=sys.stdout):
             print("Removing directory: '" + full_path + "' and all its contents", file=output)
         shutil.rmtree(full_path)
 
-def do_all_files_exist(file_name_list, verbose=False, output=sys.stdout, short_circuit=True):
+class DirectoryListing(object):
+    """Answers whether paths exist by reading the directories that contain them, each directory at most once.
+
+    Checking for many files that are in a few directories this way takes one directory read per
+    directory instead of one stat per file. The listing is a snapshot: files created or removed
+    after a directory has been read are not noticed.
+    """
+
+    def __init__(self):
+        self._names = dict()
+
+    def names(self, directory):
+        """Set of the names of the entries in directory that exist (as os.path.exists decides,
+        so broken symbolic links are left out). Empty if directory cannot be read."""
+        try:
+            return self._names[directory]
+        except KeyError:
+            pass
+
+        names = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.is_symlink() or os.path.exists(entry.path):
+                        names.add(entry.name)
+        except OSError:
+            pass
+
+        self._names[directory] = names
+        return names
+
+    def exists(self, path):
+        directory, name = os.path.split(path)
+        return name in self.names(directory)
+
+
+def do_all_files_exist(file_name_list, verbose=False, output=sys.stdout, short_circuit=True, listing=None):
+    """Whether all the files in file_name_list exist. If a DirectoryListing is specified, it is used
+    to check for the files (and shares its directory reads with other checks that use it)."""
     all_files_exist = True
+    exists = listing.exists if listing else os.path.exists
     
     for file_name in file_name_list:
         if verbose:
             print("Checking for existence of: " + file_name, file=output)
-        if os.path.exists(file_name):
+        if exists(file_name):
             continue
 
         # If we get here, the most recently checked file does not exist
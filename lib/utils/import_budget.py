@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+"""
+utils/import_budget.py: Check that modules used as short lived command line programs
+import within a time budget.
+
+Each module is imported in a new interpreter run with "python -X importtime", and the
+cumulative import time reported for the module is compared with the budget. The wall
+clock time of the whole interpreter run (including interpreter startup) is reported
+as well. For modules over budget, the imports that took the most time themselves are
+listed, which is usually enough to see what should be imported lazily (see
+utils/lazy_import.py).
+
+The program exits with status 1 if any module is over budget. Each module is measured
+several times and the fastest run is used, to reduce the effect of a busy machine.
+"""
+
+# import of built-in modules
+import os
+import re
+import subprocess
+import sys
+import time
+
+# import of third party modules
+# None
+
+# import of local modules
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+DEFAULT_BUDGET_MS = 100.0
+
+DEFAULT_REPEAT = 5
+
+# modules run many times from shell loops (e.g. once per subject and scan)
+DEFAULT_MODULES = [
+	'ccf.structural_preprocessing.one_subject_completion_checker',
+	'ccf.functional_preprocessing.one_subject_completion_checker',
+	'ccf.diffusion_preprocessing.one_subject_completion_checker',
+	'ccf.structural_preprocessing.one_subject_prereq_checker',
+	'ccf.functional_preprocessing.one_subject_prereq_checker',
+	'hcp.hcp7t.multirun_icafix.one_subject_completion_checker',
+]
+
+# import time:  self [us] | cumulative | imported package
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)\s*$')
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+class ImportTiming(object):
+	"""
+	Result of importing a module once: the module's cumulative import time, the wall
+	time of the interpreter run, and the (self time, module name) pairs of all imports.
+	"""
+
+	def __init__(self, module_name, import_us, wall_us, imports):
+		self.module_name = module_name
+		self.import_us = import_us
+		self.wall_us = wall_us
+		self.imports = imports
+
+	def slowest_imports(self, count):
+		return sorted(self.imports, reverse=True)[:count]
+
+
+def parse_importtime(text, module_name):
+	"""
+	Return a (cumulative microseconds for module_name, list of (self microseconds,
+	module name) pairs) tuple for the -X importtime output text. The cumulative time
+	is None if module_name was not imported.
+	"""
+	cumulative = None
+	imports = []
+	for line in text.splitlines():
+		match = _IMPORTTIME_LINE.match(line)
+		if not match:
+			continue
+		self_us, cumulative_us, name = match.groups()
+		imports.append((int(self_us), name))
+		if name == module_name:
+			cumulative = int(cumulative_us)
+	return cumulative, imports
+
+
+def time_import(module_name, python=sys.executable):
+	"""
+	Import module_name in a new interpreter and return its ImportTiming.
+
+	:raises RuntimeError: if the import fails
+	"""
+	start = time.perf_counter()
+	completed_process = subprocess.run([python, '-X', 'importtime', '-c', 'import ' + module_name],
+									   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+									   universal_newlines=True)
+	wall_us = int((time.perf_counter() - start) * 1000000)
+
+	cumulative, imports = parse_importtime(completed_process.stderr, module_name)
+	if completed_process.returncode != 0 or cumulative is None:
+		errors = [line for line in completed_process.stderr.splitlines() if not line.startswith('import time:')]
+		raise RuntimeError("unable to import " + module_name + ": " + os.linesep.join(errors[-5:]))
+
+	return ImportTiming(module_name, cumulative, wall_us, imports)
+
+
+def fastest_import(module_name, repeat=DEFAULT_REPEAT, python=sys.executable):
+	"""
+	The ImportTiming with the smallest import time of repeat imports of module_name.
+	"""
+	return min((time_import(module_name, python) for index in range(repeat)),
+			   key=lambda timing: timing.import_us)
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Check that command line modules import within a time budget.")
+
+	# optional arguments
+	parser.add_argument('modules', nargs='*', help="modules to check (defaults to the completion checkers)")
+	parser.add_argument('-b', '--budget-ms', dest='budget_ms', required=False, type=float,
+						default=DEFAULT_BUDGET_MS)
+	parser.add_argument('-r', '--repeat', dest='repeat', required=False, type=int, default=DEFAULT_REPEAT)
+	parser.add_argument('-t', '--top', dest='top', required=False, type=int, default=10,
+						help="number of slowest imports to list for modules over budget")
+	parser.add_argument('-v', '--verbose', dest='verbose', action='store_true', required=False, default=False,
+						help="list the slowest imports for every module")
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	over_budget = 0
+	for module_name in args.modules if args.modules else DEFAULT_MODULES:
+		try:
+			timing = fastest_import(module_name, args.repeat)
+		except RuntimeError as e:
+			_inform("ERROR: " + str(e))
+			over_budget += 1
+			continue
+
+		import_ms = timing.import_us / 1000.0
+		over = import_ms > args.budget_ms
+		_inform("%-4s %-60s import %7.1f ms  process %7.1f ms" % (
+			'OVER' if over else 'OK', module_name, import_ms, timing.wall_us / 1000.0))
+
+		if over or args.verbose:
+			for self_us, name in timing.slowest_imports(args.top):
+				_inform("       %7.1f ms  %s" % (self_us / 1000.0, name))
+		if over:
+			over_budget += 1
+
+	if over_budget:
+		_inform(str(over_budget) + " module(s) over the " + str(args.budget_ms) + " ms budget")
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
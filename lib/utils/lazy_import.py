@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+"""
+utils/lazy_import.py: Import modules only when they are first used.
+
+A module that is expensive to import (e.g. requests) but only needed by some of the
+functions of the module importing it can be imported with
+
+    requests = lazy_import.lazy_module('requests')
+
+instead of "import requests". The module is located at that point (so a missing
+module is still reported immediately) but its code is not run until one of its
+attributes is first used.
+"""
+
+# import of built-in modules
+import importlib
+import importlib.util
+import sys
+
+# import of third party modules
+# None
+
+# import of local modules
+# None
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+
+def lazy_module(name):
+	"""
+	Return the module with the specified (absolute) name, loading it on first
+	attribute access if it has not already been imported.
+
+	:raises ImportError: if the module cannot be found
+	"""
+	module = sys.modules.get(name)
+	if module is not None:
+		return module
+
+	spec = importlib.util.find_spec(name)
+	if spec is None:
+		raise ImportError("No module named " + repr(name), name=name)
+
+	loader = importlib.util.LazyLoader(spec.loader)
+	spec.loader = loader
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[name] = module
+	loader.exec_module(module)
+	return module
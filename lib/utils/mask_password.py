@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+"""
+utils/mask_password.py: Replace a password with a mask in the text files of a directory
+before the directory is put into an XNAT resource.
+
+The directory is walked once. Files that are not text (recognized by their extension,
+their leading "magic" bytes, or a NUL byte near the start) are skipped without being
+read further. Each remaining file is searched in fixed size chunks, and only files in
+which the password is found are rewritten. Files are searched in parallel.
+
+Symbolic links are followed, as they are when the directory is put into a resource, so
+every file that is uploaded is searched. Files outside the directory are never changed:
+a link to a file that contains the password is replaced by a masked copy of the file,
+and a linked directory on the way to such a file is first replaced by a directory of
+links to its entries.
+"""
+
+# import of built-in modules
+import concurrent.futures
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+# import of third party modules
+# None
+
+# import of local modules
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+# text that replaces the password (as written by mask_password.sh)
+PASSWORD_MASK = b'***password_mask***'
+
+CHUNK_SIZE = 1024 * 1024
+
+# number of leading bytes examined to decide whether a file is text
+SNIFF_SIZE = 8192
+
+DEFAULT_MAX_WORKERS = 8
+
+# files with these (lower case) extensions are never searched
+BINARY_EXTENSIONS = (
+	'.nii', '.nii.gz', '.gz', '.bz2', '.zip', '.tar', '.tgz',
+	'.mgz', '.mgh', '.img', '.hdr', '.dcm', '.gii', '.mat', '.npy',
+	'.png', '.jpg', '.jpeg', '.gif', '.tif', '.tiff', '.pdf',
+)
+
+# leading bytes of binary formats that may turn up without a telling extension
+BINARY_MAGIC_NUMBERS = (
+	b'\x1f\x8b',           # gzip
+	b'PK\x03\x04',         # zip
+	b'BZh',                # bzip2
+	b'\x89PNG',            # PNG
+	b'\xff\xd8\xff',       # JPEG
+	b'%PDF',               # PDF
+	b'\xff\xff\xfe',       # FreeSurfer triangle surface
+	b'\x00\x00\x01\x5c',   # NIfTI-1 header (sizeof_hdr 348, big endian)
+	b'\x5c\x01\x00\x00',   # NIfTI-1 header (sizeof_hdr 348, little endian)
+	b'\x00\x00\x02\x1c',   # NIfTI-2 header (sizeof_hdr 540, big endian)
+	b'\x1c\x02\x00\x00',   # NIfTI-2 header (sizeof_hdr 540, little endian)
+)
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def has_binary_extension(file_name):
+	return file_name.lower().endswith(BINARY_EXTENSIONS)
+
+
+def looks_binary(leading_bytes):
+	"""
+	Whether the leading bytes of a file indicate that it is not a text file.
+	"""
+	return leading_bytes.startswith(BINARY_MAGIC_NUMBERS) or b'\x00' in leading_bytes
+
+
+def contains(file_name, password, chunk_size=CHUNK_SIZE):
+	"""
+	Whether the file contains the password (bytes). Returns False without searching
+	the rest of the file if its first bytes show that it is not a text file.
+	"""
+	overlap = len(password) - 1
+	with open(file_name, 'rb') as source:
+		chunk = source.read(max(chunk_size, SNIFF_SIZE))
+		if looks_binary(chunk[:SNIFF_SIZE]):
+			return False
+
+		tail = b''
+		while chunk:
+			data = tail + chunk
+			if password in data:
+				return True
+			# keep enough of the end to find a password split across two chunks
+			tail = data[-overlap:] if overlap else b''
+			chunk = source.read(chunk_size)
+
+	return False
+
+
+def mask(file_name, password, password_mask=PASSWORD_MASK, chunk_size=CHUNK_SIZE):
+	"""
+	Replace every occurrence of password in the file with password_mask.
+
+	The masked contents are written to a temporary file in the same directory, which
+	then replaces the original (keeping its permissions and times).
+	"""
+	overlap = len(password) - 1
+	directory, base_name = os.path.split(file_name)
+	fd, temp_name = tempfile.mkstemp(dir=directory or None, prefix='.' + base_name + '.')
+
+	try:
+		with open(file_name, 'rb') as source, os.fdopen(fd, 'wb') as target:
+			tail = b''
+			while True:
+				chunk = source.read(chunk_size)
+				data = tail + chunk
+
+				position = 0
+				while True:
+					found = data.find(password, position)
+					if found < 0:
+						break
+					target.write(data[position:found])
+					target.write(password_mask)
+					position = found + len(password)
+
+				if not chunk:
+					target.write(data[position:])
+					break
+
+				# hold back what could be the start of a password continued in the next chunk
+				keep = max(position, len(data) - overlap)
+				target.write(data[position:keep])
+				tail = data[keep:]
+
+		shutil.copystat(file_name, temp_name)
+		os.replace(temp_name, file_name)
+
+	except BaseException:
+		if os.path.exists(temp_name):
+			os.remove(temp_name)
+		raise
+
+
+def candidate_files(directory):
+	"""
+	Files in and below directory that could be text files, following symbolic links (to
+	files and to directories) as the uploads of the directory do. A directory that is
+	reached again (through a link) is not searched again.
+	"""
+	visited = set()
+	for root, dirs, files in os.walk(directory, followlinks=True):
+		root_stat = os.stat(root)
+		visited.add((root_stat.st_dev, root_stat.st_ino))
+		for name in list(dirs):
+			try:
+				dir_stat = os.stat(os.path.join(root, name))
+			except OSError:
+				dirs.remove(name)
+				continue
+			if (dir_stat.st_dev, dir_stat.st_ino) in visited:
+				dirs.remove(name)
+		for name in files:
+			path = os.path.join(root, name)
+			if not has_binary_extension(name) and os.path.isfile(path):
+				yield path
+
+
+def replace_directory_link(path):
+	"""
+	Replace the symbolic link to a directory at path with a directory (with the same
+	permissions) holding a link to each entry of the directory linked to.
+	"""
+	real_path = os.path.realpath(path)
+	parent, base_name = os.path.split(path)
+	new_dir = tempfile.mkdtemp(dir=parent or None, prefix='.' + base_name + '.')
+	try:
+		for name in os.listdir(real_path):
+			os.symlink(os.path.join(real_path, name), os.path.join(new_dir, name))
+		shutil.copystat(real_path, new_dir)
+		os.remove(path)
+		os.rename(new_dir, path)
+	except BaseException:
+		if os.path.exists(new_dir):
+			shutil.rmtree(new_dir)
+		raise
+
+
+def make_directories_own(directory, file_name):
+	"""
+	Replace each linked directory between directory and file_name with a directory of
+	links (see replace_directory_link), so that file_name can be replaced without
+	changing anything outside directory.
+	"""
+	relative_dir = os.path.dirname(os.path.relpath(file_name, directory))
+	path = directory
+	for name in relative_dir.split(os.sep) if relative_dir else []:
+		path = os.path.join(path, name)
+		if os.path.islink(path):
+			replace_directory_link(path)
+
+
+def mask_password_in_directory(directory, password, password_mask=PASSWORD_MASK,
+							   max_workers=DEFAULT_MAX_WORKERS):
+	"""
+	Mask the password (str or bytes) in every text file in and below directory.
+
+	Returns the list of files that were changed.
+	"""
+	if isinstance(password, str):
+		password = password.encode()
+	if not password:
+		raise ValueError("password to mask must not be empty")
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		futures = dict((executor.submit(contains, file_name, password), file_name)
+					   for file_name in candidate_files(directory))
+		found_files = sorted(futures[future] for future in concurrent.futures.as_completed(futures)
+							 if future.result())
+
+		# linked directories are replaced one at a time, before any file in them is masked
+		for file_name in found_files:
+			make_directories_own(directory, file_name)
+
+		list(executor.map(lambda file_name: mask(file_name, password, password_mask), found_files))
+
+	return found_files
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Mask a password in the text files in a directory.")
+
+	# mandatory arguments
+	parser.add_argument('-pw', '--password', dest='password', required=True, type=str)
+	parser.add_argument('-d', '--dir', dest='directory', required=True, type=str)
+
+	# optional arguments
+	parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int,
+						default=DEFAULT_MAX_WORKERS, help="number of files to search at once")
+	parser.add_argument('-v', '--verbose', dest='verbose', action='store_true', required=False, default=False)
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	try:
+		masked_files = mask_password_in_directory(args.directory, args.password, max_workers=args.parallel)
+	except (OSError, ValueError) as e:
+		_inform("ERROR: " + str(e))
+		sys.exit(1)
+
+	if args.verbose:
+		for file_name in masked_files:
+			_inform("Masked password in file: " + file_name)
+
+
+if __name__ == '__main__':
+	main()
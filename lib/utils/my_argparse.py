@@ -8,7 +8,7 @@ import argparse
 # None
 
 # import of local modules
-# None
+import utils.profiling as profiling
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -17,7 +17,31 @@ __maintainer__ = "Timothy B. Brown"
 
 
 class MyArgumentParser(argparse.ArgumentParser):
-    """This subclass of ArgumentParser prints out the help message when an error is found in parsing."""
+    """This subclass of ArgumentParser prints out the help message when an error is found in parsing.
+
+    It also adds the --profile and --profile-dir options, and starts profiling (see utils/profiling.py)
+    when the arguments are parsed if --profile is specified or the XNAT_PBS_JOBS_PROFILE environment
+    variable is set. Programs whose own measurements profiling would distort (e.g. benchmarks)
+    pass profiling=False to leave out the options and ignore the environment variable.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._profiling = kwargs.pop('profiling', True)
+        super().__init__(*args, **kwargs)
+        if self._profiling:
+            self.add_argument('--profile', dest='profile', nargs='?', const=profiling.PROFILERS[0],
+                              choices=profiling.PROFILERS, required=False, default=None,
+                              help="profile this program (also set by " + profiling.PROFILE_ENVIRONMENT_VARIABLE + ")")
+            self.add_argument('--profile-dir', dest='profile_dir', required=False, type=str, default=None,
+                              help="directory for profile output (default: current directory)")
+
+    def parse_known_args(self, args=None, namespace=None):
+        namespace, extras = super().parse_known_args(args, namespace)
+        if self._profiling:
+            profiler = namespace.profile or profiling.profiler_from_environment()
+            if profiler:
+                profiling.start(profiler, namespace.profile_dir)
+        return namespace, extras
 
     def error(self, message):
         sys.stderr.write('error: %s\n' % message)
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+
+"""
+utils/nifti.py: Minimal NIfTI-1 and NIfTI-2 (CIFTI) header support.
+
+Only as much of the formats as the tools in this repository need is implemented:
+building small but valid images (e.g. for synthetic test archives), and reading and
+validating image headers (e.g. for deep completion checks).
+
+Validation reads only the header and the extension size/code pairs, never the image
+data. It catches outputs that were truncated (e.g. by an interrupted upload), files that
+are not images at all, and images whose dimensions do not match those of the run they
+were made from, without relying on file size thresholds.
+"""
+
+# import of built-in modules
+import gzip
+import os
+import struct
+import sys
+
+# import of third-party modules
+
+# import of local modules
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+NIFTI1_HEADER_SIZE = 348
+NIFTI2_HEADER_SIZE = 540
+
+NIFTI1_MAGIC = b'n+1\x00'
+NIFTI2_MAGIC = b'n+2\x00\r\n\x1a\n'
+
+# NIfTI datatype codes and the number of bits per voxel of each
+DT_UINT8 = 2
+DT_INT16 = 4
+DT_INT32 = 8
+DT_FLOAT32 = 16
+DT_FLOAT64 = 64
+BITPIX = {DT_UINT8: 8, DT_INT16: 16, DT_INT32: 32, DT_FLOAT32: 32, DT_FLOAT64: 64}
+
+# NIfTI extension code for CIFTI-2 XML
+NIFTI_ECODE_CIFTI = 32
+
+IMAGE_FILE_NAME_EXTENSIONS = ('.nii', '.nii.gz')
+
+# size of the 4 bytes that follow the header, the first of which is non-zero if there are extensions
+EXTENSION_FLAG_SIZE = 4
+
+# CIFTI intent codes by file name extension
+CIFTI_INTENT_CODES = {
+	'.dconn.nii': 3001,
+	'.dtseries.nii': 3002,
+	'.pconn.nii': 3003,
+	'.ptseries.nii': 3004,
+	'.dscalar.nii': 3006,
+	'.dlabel.nii': 3007,
+	'.pscalar.nii': 3008,
+	'.pdconn.nii': 3009,
+	'.dpconn.nii': 3010,
+}
+
+
+def cifti_intent_code(file_name):
+	"""
+	CIFTI intent code implied by the file name's extension, or None if it is not a CIFTI
+	file name.
+	"""
+	for extension, intent_code in CIFTI_INTENT_CODES.items():
+		if file_name.endswith(extension):
+			return intent_code
+	return None
+
+
+class NiftiHeaderError(Exception):
+	"""Raised when a file does not have a readable NIfTI-1 or NIfTI-2 header."""
+	pass
+
+
+class NiftiHeader(object):
+	"""
+	The fields of a NIfTI-1 or NIfTI-2 header that are needed to validate an image,
+	plus the (code, size) of each extension.
+	"""
+
+	def __init__(self, version, dims, datatype, bitpix, vox_offset, intent_code, extensions):
+		self.version = version
+		self.dims = dims
+		self.datatype = datatype
+		self.bitpix = bitpix
+		self.vox_offset = vox_offset
+		self.intent_code = intent_code
+		self.extensions = extensions
+
+	@property
+	def is_cifti(self):
+		return self.intent_code in CIFTI_INTENT_CODES.values()
+
+	@property
+	def data_size(self):
+		"""Size in bytes of the image data."""
+		count = 1
+		for dim in self.dims:
+			count *= dim
+		return count * self.bitpix // 8
+
+	@property
+	def file_size(self):
+		"""Size in bytes of a complete single file image with this header."""
+		return self.vox_offset + self.data_size
+
+	@property
+	def series_length(self):
+		"""
+		Number of time points: the 5th dimension (the first CIFTI matrix dimension) of a
+		CIFTI image, the 4th dimension of other images.
+		"""
+		index = 4 if self.is_cifti else 3
+		return self.dims[index] if len(self.dims) > index else 1
+
+
+def _open_image(file_name):
+	if file_name.endswith('.gz'):
+		return gzip.open(file_name, 'rb')
+	return open(file_name, 'rb')
+
+
+def _parse_header(header_bytes):
+	"""
+	(version, byte order, dims, datatype, bitpix, vox_offset, intent_code) from the
+	bytes at the start of an image file.
+	"""
+	for byte_order in '<>':
+		if len(header_bytes) >= NIFTI2_HEADER_SIZE and \
+		   struct.unpack_from(byte_order + 'i', header_bytes, 0)[0] == NIFTI2_HEADER_SIZE:
+			if header_bytes[4:12] != NIFTI2_MAGIC:
+				raise NiftiHeaderError("bad NIfTI-2 magic")
+			datatype, bitpix = struct.unpack_from(byte_order + 'hh', header_bytes, 12)
+			dim = struct.unpack_from(byte_order + '8q', header_bytes, 16)
+			vox_offset = struct.unpack_from(byte_order + 'q', header_bytes, 168)[0]
+			intent_code = struct.unpack_from(byte_order + 'i', header_bytes, 504)[0]
+			return 2, byte_order, dim, datatype, bitpix, vox_offset, intent_code
+
+		if len(header_bytes) >= NIFTI1_HEADER_SIZE and \
+		   struct.unpack_from(byte_order + 'i', header_bytes, 0)[0] == NIFTI1_HEADER_SIZE:
+			if header_bytes[344:348] != NIFTI1_MAGIC:
+				raise NiftiHeaderError("bad NIfTI-1 magic (only single file images are supported)")
+			dim = struct.unpack_from(byte_order + '8h', header_bytes, 40)
+			intent_code, datatype, bitpix = struct.unpack_from(byte_order + 'hhh', header_bytes, 68)
+			vox_offset = int(struct.unpack_from(byte_order + 'f', header_bytes, 108)[0])
+			return 1, byte_order, dim, datatype, bitpix, vox_offset, intent_code
+
+	raise NiftiHeaderError("not a NIfTI-1 or NIfTI-2 image")
+
+
+def read_header(file_name):
+	"""
+	Read the header and extension sizes of the image in file_name (.nii or .nii.gz).
+
+	:raises NiftiHeaderError: if the file does not have a valid NIfTI-1 or NIfTI-2 header
+	:raises OSError: if the file cannot be read
+	"""
+	with _open_image(file_name) as image_file:
+		try:
+			header_bytes = image_file.read(NIFTI2_HEADER_SIZE + EXTENSION_FLAG_SIZE)
+		except (EOFError, gzip.BadGzipFile) as e:
+			raise NiftiHeaderError("unreadable header: " + str(e))
+
+		version, byte_order, dim, datatype, bitpix, vox_offset, intent_code = _parse_header(header_bytes)
+		header_size = NIFTI2_HEADER_SIZE if version == 2 else NIFTI1_HEADER_SIZE
+
+		if not 1 <= dim[0] <= 7:
+			raise NiftiHeaderError("bad number of dimensions: " + str(dim[0]))
+		dims = tuple(dim[1:dim[0] + 1])
+		if any(size < 1 for size in dims):
+			raise NiftiHeaderError("bad dimensions: " + str(dims))
+		if bitpix < 8 or bitpix % 8 or (datatype in BITPIX and BITPIX[datatype] != bitpix):
+			raise NiftiHeaderError("bad datatype/bitpix: " + str(datatype) + "/" + str(bitpix))
+		if vox_offset < header_size:
+			raise NiftiHeaderError("bad vox_offset: " + str(vox_offset))
+
+		# walk the extensions (there are some if the first extension flag byte is not zero)
+		extensions = []
+		if len(header_bytes) > header_size and header_bytes[header_size] and \
+		   vox_offset > header_size + EXTENSION_FLAG_SIZE:
+			offset = header_size + EXTENSION_FLAG_SIZE
+			while offset < vox_offset:
+				image_file.seek(offset)
+				extension_header = image_file.read(8)
+				if len(extension_header) < 8:
+					raise NiftiHeaderError("truncated extension at offset " + str(offset))
+				esize, ecode = struct.unpack(byte_order + 'ii', extension_header)
+				if esize < 16 or esize % 16 or offset + esize > vox_offset:
+					raise NiftiHeaderError("bad extension size " + str(esize) + " at offset " + str(offset))
+				extensions.append((ecode, esize))
+				offset += esize
+
+	return NiftiHeader(version, dims, datatype, bitpix, vox_offset, intent_code, extensions)
+
+
+def _stored_size(file_name):
+	"""
+	Size of the image file contents: the file size, or for gzip files the uncompressed
+	size recorded in the gzip trailer (modulo 2**32).
+	"""
+	if not file_name.endswith('.gz'):
+		return os.path.getsize(file_name)
+	with open(file_name, 'rb') as gzip_file:
+		gzip_file.seek(-4, os.SEEK_END)
+		return struct.unpack('<I', gzip_file.read(4))[0]
+
+
+def is_image_file_name(file_name):
+	return file_name.endswith(IMAGE_FILE_NAME_EXTENSIONS)
+
+
+def validate_image(file_name, reference_file_name=None, expected_dims=None):
+	"""
+	List of the problems found with the image in file_name (empty if there are none).
+
+	The header must be valid and, for CIFTI file names, have the CIFTI intent code and
+	extension. The file must be long enough for the data the header declares (for gzip
+	files, the uncompressed size recorded in the gzip trailer must match). If
+	expected_dims is specified, the image dimensions must equal it. If
+	reference_file_name is specified (e.g. the run the image was made from), the image
+	must have the same number of time points as the reference image.
+	"""
+	try:
+		header = read_header(file_name)
+	except (NiftiHeaderError, OSError) as e:
+		return [str(e)]
+
+	problems = []
+
+	intent_code = cifti_intent_code(file_name)
+	if intent_code:
+		if header.intent_code != intent_code:
+			problems.append("intent code " + str(header.intent_code) + " is not " + str(intent_code))
+		if NIFTI_ECODE_CIFTI not in [ecode for ecode, esize in header.extensions]:
+			problems.append("no CIFTI extension")
+
+	try:
+		stored_size = _stored_size(file_name)
+	except OSError as e:
+		problems.append(str(e))
+	else:
+		if file_name.endswith('.gz'):
+			if stored_size != header.file_size % 2**32:
+				problems.append("uncompressed size " + str(stored_size) + " does not match header size " +
+								str(header.file_size))
+		elif stored_size < header.file_size:
+			problems.append("truncated: " + str(stored_size) + " bytes of " + str(header.file_size))
+
+	if expected_dims is not None and tuple(expected_dims) != header.dims:
+		problems.append("dimensions " + str(header.dims) + " are not " + str(tuple(expected_dims)))
+
+	if reference_file_name:
+		try:
+			reference_series_length = read_header(reference_file_name).series_length
+		except (NiftiHeaderError, OSError) as e:
+			problems.append("reference " + reference_file_name + ": " + str(e))
+		else:
+			if header.series_length != reference_series_length:
+				problems.append(str(header.series_length) + " time points, but " + reference_file_name +
+								" has " + str(reference_series_length))
+
+	return problems
+
+
+def are_all_images_valid(file_name_list, verbose=False, output=sys.stdout, short_circuit=True, references=None):
+	"""
+	Whether all the images in file_name_list (the .nii and .nii.gz files that exist) are
+	valid as decided by validate_image. references is an optional dictionary of file name
+	to the reference file name to validate it against.
+	"""
+	references = references if references else dict()
+	all_images_valid = True
+
+	for file_name in file_name_list:
+		if not is_image_file_name(file_name) or not os.path.isfile(file_name):
+			continue
+		if verbose:
+			print("Validating image: " + file_name, file=output)
+		problems = validate_image(file_name, references.get(file_name))
+		if not problems:
+			continue
+
+		print("IMAGE IS NOT VALID: " + file_name + ": " + "; ".join(problems), file=output)
+		all_images_valid = False
+		if short_circuit:
+			return all_images_valid
+
+	return all_images_valid
+
+
+def _data_size(dims, datatype):
+	count = 1
+	for dim in dims:
+		count *= dim
+	return count * BITPIX[datatype] // 8
+
+
+def nifti1_image(dims=(2, 2, 2), datatype=DT_FLOAT32, pixdims=None):
+	"""
+	Bytes of a NIfTI-1 single file (.nii) image with the specified dimensions and zero
+	data.
+	"""
+	pixdims = pixdims if pixdims else (1.0,) * len(dims)
+	dim = [len(dims)] + list(dims) + [1] * (7 - len(dims))
+	pixdim = [1.0] + list(pixdims) + [0.0] * (7 - len(pixdims))
+	vox_offset = NIFTI1_HEADER_SIZE + 4
+
+	header = bytearray(NIFTI1_HEADER_SIZE)
+	struct.pack_into('<i', header, 0, NIFTI1_HEADER_SIZE)
+	struct.pack_into('<8h', header, 40, *dim)
+	struct.pack_into('<hh', header, 70, datatype, BITPIX[datatype])
+	struct.pack_into('<8f', header, 76, *pixdim)
+	struct.pack_into('<ff', header, 108, float(vox_offset), 1.0)
+	struct.pack_into('<hh', header, 252, 1, 1)
+	struct.pack_into('<4f', header, 280, 1.0, 0.0, 0.0, 0.0)
+	struct.pack_into('<4f', header, 296, 0.0, 1.0, 0.0, 0.0)
+	struct.pack_into('<4f', header, 312, 0.0, 0.0, 1.0, 0.0)
+	header[344:348] = NIFTI1_MAGIC
+
+	return bytes(header) + b'\x00' * 4 + b'\x00' * _data_size(dims, datatype)
+
+
+def _extension(ecode, content):
+	# each extension is 8 bytes of size and code plus content padded to a multiple of 16
+	size = 8 + len(content)
+	size += -size % 16
+	return struct.pack('<ii', size, ecode) + content + b'\x00' * (size - 8 - len(content))
+
+
+def nifti2_image(dims=(1, 1, 1, 1, 2, 2), datatype=DT_FLOAT32, intent_code=0, cifti_xml=None):
+	"""
+	Bytes of a NIfTI-2 single file image with the specified dimensions and zero data.
+	If cifti_xml is specified it is stored as a CIFTI extension.
+	"""
+	dim = [len(dims)] + list(dims) + [1] * (7 - len(dims))
+	pixdim = [1.0] * 8
+
+	extensions = _extension(NIFTI_ECODE_CIFTI, cifti_xml) if cifti_xml is not None else b''
+	vox_offset = NIFTI2_HEADER_SIZE + 4 + len(extensions)
+
+	header = bytearray(NIFTI2_HEADER_SIZE)
+	struct.pack_into('<i', header, 0, NIFTI2_HEADER_SIZE)
+	header[4:12] = NIFTI2_MAGIC
+	struct.pack_into('<hh', header, 12, datatype, BITPIX[datatype])
+	struct.pack_into('<8q', header, 16, *dim)
+	struct.pack_into('<8d', header, 104, *pixdim)
+	struct.pack_into('<q', header, 168, vox_offset)
+	struct.pack_into('<d', header, 176, 1.0)
+	struct.pack_into('<i', header, 504, intent_code)
+
+	extension_flag = b'\x01\x00\x00\x00' if extensions else b'\x00' * 4
+	return bytes(header) + extension_flag + extensions + b'\x00' * _data_size(dims, datatype)
+
+
+def cifti_image(intent_code, series_length=2, brainordinates=2):
+	"""
+	Bytes of a small CIFTI-2 image (NIfTI-2 with a CIFTI XML extension) for the
+	specified CIFTI intent code.
+	"""
+	cifti_xml = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+				 b'<CIFTI Version="2"><Matrix></Matrix></CIFTI>\n')
+	return nifti2_image((1, 1, 1, 1, series_length, brainordinates), DT_FLOAT32, intent_code, cifti_xml)
+
+
+# dimensions of synthetic NIfTI-1 images, with as many time points as synthetic CIFTI images
+SYNTHETIC_DIMS = (2, 2, 2, 2)
+
+
+def image_for_file_name(file_name):
+	"""
+	Bytes of a small valid image of the kind implied by file_name: a CIFTI image for
+	CIFTI extensions, a NIfTI-1 image for .nii, gzipped for .nii.gz, or None for other
+	file names.
+	"""
+	intent_code = cifti_intent_code(file_name)
+	if intent_code:
+		return cifti_image(intent_code)
+	elif file_name.endswith('.nii'):
+		return nifti1_image(SYNTHETIC_DIMS)
+	elif file_name.endswith('.nii.gz'):
+		return gzip.compress(nifti1_image(SYNTHETIC_DIMS), compresslevel=1, mtime=0)
+	return None
@@ -3,17 +3,17 @@
 """os_utils.py: Some simple and hopefully useful os utilities."""
 
 # import of built-in modules
-import glob
+import collections
+import errno
 import logging
 import os
-import shutil
-import tempfile
+import sys
 
 # import of third party modules
 # None
 
 # import of local modules
-# None
+import utils.symlink_utils as symlink_utils
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -37,8 +37,31 @@ def getenv_required(var_name):
     return value
 
 
-def lndir(src, dst, show_log=False, ignore_existing_dst_files=False):
+def _dir_entries(directory):
+    """Dictionary of the names of the entries of directory to their os.DirEntry objects."""
+    try:
+        with os.scandir(directory) as entries:
+            return dict((entry.name, entry) for entry in entries)
+    except FileNotFoundError:
+        return dict()
+
 
+def lndir(src, dst, show_log=False, ignore_existing_dst_files=False, repair_links=False):
+    """
+    Make dst a tree of directories like src, with a symbolic link in place of each file
+    in src (like the lndir command). dst can already have some of the tree, e.g. when data
+    is staged into an existing working directory again.
+
+    Each directory of dst is listed once. Links are made only for the files that have no
+    entry in dst yet. Links that already point to the src file are kept. For any other
+    existing entry, FileExistsError is raised, unless ignore_existing_dst_files is True.
+    In that case the entry is left as it is (e.g. a copy of the file, which takes
+    precedence), except that links to some other file are replaced if repair_links is
+    True.
+
+    Returns a collections.Counter of the links created, kept, and repaired, and of the
+    existing entries that were skipped.
+    """
     if not os.path.isdir(src):
         raise OSError("ERROR: %s is not a valid directory." % src)
 
@@ -48,68 +71,69 @@ def lndir(src, dst, show_log=False, ignore_existing_dst_files=False):
     if not os.path.exists(dst):
         os.mkdir(dst)
 
+    counts = collections.Counter()
+
     for root, dirs, files in os.walk(src):
         log.debug("root:  " + root)
+        dst_dir = '%s%s' % (dst, root.replace(src, ''))
+        dst_entries = _dir_entries(dst_dir)
 
         for filename in files:
             log.debug("filename: " + filename)
-            try:
-                src_filename = '%s/%s' % (root, filename)
-                dst_filename = '%s%s/%s' % (dst, root.replace(src, ''), filename)
+            src_filename = '%s/%s' % (root, filename)
+            dst_filename = '%s/%s' % (dst_dir, filename)
+            dst_entry = dst_entries.get(filename)
+
+            if dst_entry is None:
                 if show_log:
                     print("linking: %s --> %s" % (dst_filename, src_filename))
                 os.symlink(src_filename, dst_filename)
+                counts['created'] += 1
 
-            except FileExistsError as e:
-                if not ignore_existing_dst_files:
-                    raise e
-
-        for dirname in dirs:
-            log.debug("dirname: " + dirname)
-            try:
-                os.mkdir('%s%s/%s' % (dst, root.replace(src, ''), dirname))
-            except OSError:
-                pass
-
+            elif dst_entry.is_symlink() and os.readlink(dst_filename) == src_filename:
+                counts['kept'] += 1
 
-def replace_lndir_symlinks(srcpath):
-    """
-    Replaces all symlinks in an lndir (see above) created directory structure with
-    copies of the files that are linked to.
-    """
-    for filename in glob.glob(srcpath + os.sep + '*'):
-        log.debug("filename: " + filename)
-
-        if os.path.isdir(filename) and not os.path.islink(filename):
-            log.debug("\tis a directory that is not a symlink - recursing")
-            replace_lndir_symlinks(filename)
+            elif not ignore_existing_dst_files:
+                raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst_filename)
 
-        elif os.path.isfile(filename) and os.path.islink(filename):
-            log.debug("\tis a regular file that is a symlink and should be replaced")
+            elif repair_links and dst_entry.is_symlink():
+                if show_log:
+                    print("relinking: %s --> %s" % (dst_filename, src_filename))
+                # replace the link in one step, so that it always exists
+                temporary_filename = dst_filename + '.lndir'
+                os.symlink(src_filename, temporary_filename)
+                os.replace(temporary_filename, dst_filename)
+                counts['repaired'] += 1
 
-            log.info("Replacing: " + filename + " with copy of: " + os.path.realpath(filename))
+            else:
+                counts['skipped'] += 1
 
-            with tempfile.TemporaryDirectory() as temp_dirpath:
-                temp_filename = temp_dirpath + os.sep + os.path.basename(filename)
-                shutil.copy2(filename, temp_filename)
-                os.remove(filename)
-                shutil.move(temp_filename, filename)
+        for dirname in dirs:
+            log.debug("dirname: " + dirname)
+            if dirname not in dst_entries:
+                try:
+                    os.mkdir('%s/%s' % (dst_dir, dirname))
+                except OSError:
+                    pass
 
-def replace_symlinks_with_relative(srcpath):
+    return counts
 
-    for filename in glob.glob(srcpath + os.sep + '*'):
 
-        fullpath = os.path.abspath(filename)
+def replace_lndir_symlinks(srcpath, dry_run=False, max_workers=symlink_utils.DEFAULT_MAX_WORKERS):
+    """
+    Replaces all symlinks to files in an lndir (see above) created directory structure
+    with copies of the files that are linked to. Returns the number of links that could
+    not be replaced.
+    """
+    return symlink_utils.rewrite_links(srcpath, symlink_utils.COPY, dry_run, max_workers, sys.stdout)
 
-        if os.path.islink(fullpath):
-            linked_to = os.path.realpath(fullpath)
-            relative_path = os.path.relpath(linked_to, os.path.dirname(fullpath))
-            os.remove(fullpath)
-            print(fullpath + " -> " + relative_path)
-            os.symlink(relative_path, fullpath)
 
-        if os.path.isdir(fullpath):
-            replace_symlinks_with_relative(fullpath)
+def replace_symlinks_with_relative(srcpath, dry_run=False, max_workers=symlink_utils.DEFAULT_MAX_WORKERS):
+    """
+    Replaces all symlinks in the directory structure with relative links to the files
+    they resolve to. Returns the number of links that could not be replaced.
+    """
+    return symlink_utils.rewrite_links(srcpath, symlink_utils.RELATIVE, dry_run, max_workers, sys.stdout)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+"""
+utils/package_utils.py: Create the files that accompany a package (zip) file.
+
+  content-list  <package>.ContentList.rst, the sorted list of the package's members
+                (as PackageUtils/build_content_list.sh)
+  filter        a copy of a package without the members excluded by name patterns,
+                and its <package>.md5 checksum file
+
+The member names are read from the zip file's central directory only. The filter
+command copies the retained members' local headers and compressed data unchanged (no
+member is decompressed or recompressed) and writes a new central directory, so the
+package is rewritten once however many patterns remove members. The checksum is
+computed from the bytes as they are written.
+
+Several packages can be processed in one run. They are processed concurrently, in
+separate processes, as reading a large central directory is CPU bound.
+"""
+
+# import of built-in modules
+import concurrent.futures
+import fnmatch
+import functools
+import hashlib
+import os
+import sys
+import zipfile
+
+# import of third party modules
+# None
+
+# import of local modules
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+CONTENT_LIST_SUFFIX = '.ContentList.rst'
+
+CHECKSUM_SUFFIX = '.md5'
+
+# permissions of checksum files (u=rw,g=rw,o=r, as set by PackageUtils/create_checksum.sh)
+CHECKSUM_FILE_MODE = 0o664
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# indentation of the member names in the literal block of the content list
+CONTENT_LIST_INDENT = '   '
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def member_names(package_file_name):
+	"""
+	List of the names of the members of the zip file package_file_name, as recorded in
+	its central directory.
+	"""
+	with zipfile.ZipFile(package_file_name) as package:
+		return package.namelist()
+
+
+def render_content_list(package_name, names):
+	"""
+	Text of the content list of the package named package_name (a base name) with
+	member names names: a title and the sorted names as a reStructuredText literal
+	block.
+	"""
+	title = "Package File: :code:`" + package_name + "`"
+	lines = ["", title, "-" * len(title), "", "::", ""]
+	lines.extend(CONTENT_LIST_INDENT + name for name in sorted(names))
+	return "\n".join(lines) + "\n"
+
+
+def write_content_list(package_file_name):
+	"""
+	Write the content list of package_file_name next to it, replacing any existing
+	content list. Returns a description of the result.
+	"""
+	content_list_file_name = package_file_name + CONTENT_LIST_SUFFIX
+	text = render_content_list(os.path.basename(package_file_name), member_names(package_file_name))
+	with open(content_list_file_name, 'w') as content_list_file:
+		content_list_file.write(text)
+	return "wrote " + content_list_file_name
+
+
+def is_member_retained(name, include_patterns=None, exclude_patterns=None):
+	"""
+	Whether the member name matches one of include_patterns (if any are specified)
+	and none of exclude_patterns. Patterns are shell style (fnmatch); * also matches /.
+	"""
+	if include_patterns and not any(fnmatch.fnmatchcase(name, pattern) for pattern in include_patterns):
+		return False
+	return not (exclude_patterns and any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude_patterns))
+
+
+class _HashingWriter(object):
+	"""
+	Write only file object that computes the MD5 checksum of what is written to it.
+	It cannot seek, so zipfile writes the central directory where it is.
+	"""
+
+	def __init__(self, output_file):
+		self._output_file = output_file
+		self._position = 0
+		self.md5 = hashlib.md5()
+
+	def write(self, data):
+		self._output_file.write(data)
+		self.md5.update(data)
+		self._position += len(data)
+		return len(data)
+
+	def tell(self):
+		return self._position
+
+	def flush(self):
+		self._output_file.flush()
+
+
+def _copy_bytes(input_file, output_file, length):
+	while length > 0:
+		data = input_file.read(min(length, COPY_BUFFER_SIZE))
+		if not data:
+			raise zipfile.BadZipFile("unexpected end of file")
+		output_file.write(data)
+		length -= len(data)
+
+
+def write_checksum_file(file_name, md5_hexdigest):
+	"""
+	Write file_name.md5 in the format of md5sum run in file_name's directory.
+	Returns the checksum file name.
+	"""
+	checksum_file_name = file_name + CHECKSUM_SUFFIX
+	with open(checksum_file_name, 'w') as checksum_file:
+		checksum_file.write(md5_hexdigest + "  " + os.path.basename(file_name) + "\n")
+	os.chmod(checksum_file_name, CHECKSUM_FILE_MODE)
+	return checksum_file_name
+
+
+def filter_package(package_file_name, output_file_name, include_patterns=None, exclude_patterns=None,
+				   checksum=True):
+	"""
+	Write output_file_name, a copy of the zip file package_file_name with only the
+	members retained by is_member_retained, and (if checksum is True) its checksum file.
+	output_file_name may be package_file_name (the package is replaced when the copy is
+	complete).
+
+	Returns a (retained member count, removed member count) tuple.
+	"""
+	temporary_file_name = output_file_name + '.filtering'
+	try:
+		retained_count, removed_count, md5_hexdigest = _filter_package(
+			package_file_name, temporary_file_name, include_patterns, exclude_patterns)
+	except BaseException:
+		if os.path.exists(temporary_file_name):
+			os.remove(temporary_file_name)
+		raise
+
+	os.replace(temporary_file_name, output_file_name)
+	if checksum:
+		write_checksum_file(output_file_name, md5_hexdigest)
+
+	return retained_count, removed_count
+
+
+def _filter_package(package_file_name, output_file_name, include_patterns, exclude_patterns):
+	with zipfile.ZipFile(package_file_name) as package:
+		members = package.infolist()
+
+		# each member's local header, data, and data descriptor run up to the next member's
+		# local header, or to the central directory for the last member
+		offsets = sorted(member.header_offset for member in members) + [package.start_dir]
+		member_ends = dict(zip(offsets[:-1], offsets[1:]))
+
+		retained = [member for member in members
+					if is_member_retained(member.filename, include_patterns, exclude_patterns)]
+		new_offsets = dict()
+
+		with open(output_file_name, 'wb') as output_file:
+			writer = _HashingWriter(output_file)
+			with zipfile.ZipFile(writer, 'w') as filtered_package:
+				for member in sorted(retained, key=lambda member: member.header_offset):
+					new_offsets[member.header_offset] = writer.tell()
+					package.fp.seek(member.header_offset)
+					_copy_bytes(package.fp, writer, member_ends[member.header_offset] - member.header_offset)
+
+				# the central directory lists the members in their original order, with their
+				# new local header offsets (zipfile adds zip64 records as needed)
+				filtered_package.start_dir = writer.tell()
+				for member in retained:
+					member.header_offset = new_offsets[member.header_offset]
+					filtered_package.filelist.append(member)
+					filtered_package.NameToInfo[member.filename] = member
+				filtered_package.comment = package.comment
+
+	return len(retained), len(members) - len(retained), writer.md5.hexdigest()
+
+
+def filter_package_into(output_dir, include_patterns, exclude_patterns, checksum, package_file_name):
+	"""
+	filter_package writing to output_dir (or replacing package_file_name if output_dir
+	is None). Returns a description of the result.
+	"""
+	output_file_name = os.path.join(output_dir, os.path.basename(package_file_name)) if output_dir else package_file_name
+	retained_count, removed_count = filter_package(package_file_name, output_file_name, include_patterns,
+												   exclude_patterns, checksum)
+	return ("wrote " + output_file_name + ": " + str(retained_count) + " members kept, " +
+			str(removed_count) + " removed")
+
+
+def run_for_packages(function, package_file_names, max_workers=DEFAULT_MAX_WORKERS):
+	"""
+	Call function (a module level function, so that it can be run in another process)
+	for each package file name. Returns a list of (package file name, result or
+	exception) pairs in the order of package_file_names.
+	"""
+	if max_workers <= 1 or len(package_file_names) <= 1:
+		results = []
+		for package_file_name in package_file_names:
+			try:
+				results.append((package_file_name, function(package_file_name)))
+			except (OSError, zipfile.BadZipFile) as e:
+				results.append((package_file_name, e))
+		return results
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+		futures = [executor.submit(function, package_file_name) for package_file_name in package_file_names]
+		results = []
+		for package_file_name, future in zip(package_file_names, futures):
+			try:
+				results.append((package_file_name, future.result()))
+			except (OSError, zipfile.BadZipFile) as e:
+				results.append((package_file_name, e))
+		return results
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(description="Create the files that accompany package files.")
+
+	# mandatory arguments
+	parser.add_argument('command', choices=['content-list', 'filter'])
+	parser.add_argument('packages', nargs='+', help="package (zip) files")
+
+	# optional arguments
+	parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int, default=DEFAULT_MAX_WORKERS,
+						help="number of packages to process at once")
+	parser.add_argument('-i', '--include', dest='include_patterns', required=False, action='append',
+						help="filter: keep only members matching this pattern (may be repeated)")
+	parser.add_argument('-x', '--exclude', dest='exclude_patterns', required=False, action='append',
+						help="filter: remove members matching this pattern (may be repeated)")
+	parser.add_argument('-o', '--output-dir', dest='output_dir', required=False, type=str, default=None,
+						help="filter: directory for the filtered packages (default: replace the packages)")
+	parser.add_argument('--no-checksum', dest='checksum', action='store_false', required=False, default=True,
+						help="filter: do not write .md5 files")
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	if args.command == 'filter':
+		if args.output_dir:
+			os.makedirs(args.output_dir, exist_ok=True)
+		function = functools.partial(filter_package_into, args.output_dir, args.include_patterns,
+									 args.exclude_patterns, args.checksum)
+	else:
+		function = write_content_list
+
+	error_count = 0
+	for package_file_name, result in run_for_packages(function, args.packages, args.parallel):
+		if isinstance(result, Exception):
+			_inform("ERROR: " + package_file_name + ": " + str(result))
+			error_count += 1
+		else:
+			_inform(result)
+
+	if error_count:
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+"""
+utils/profiling.py: Opt-in profiling of command line programs.
+
+Programs whose arguments are parsed by utils.my_argparse.MyArgumentParser accept a
+--profile option. Setting the XNAT_PBS_JOBS_PROFILE environment variable has the
+same effect. This also reaches programs run by other programs and from shell
+loops, except those that create their parser with profiling=False (the benchmarks)
+and the job stage telemetry wrapper (ccf/stage_telemetry.py), which does not use
+MyArgumentParser. The batch submission and checking scripts that take no arguments
+call start_from_environment, so the environment variable profiles them too. The
+profiler is one of:
+
+  cprofile  deterministic profile of the main thread, written as <prefix>.prof
+            (read with pstats, snakeviz, etc.)
+  sample    stacks of all threads sampled every SAMPLE_INTERVAL_SECONDS of wall
+            clock time, written in collapsed stack format as <prefix>.folded
+            (read with flamegraph.pl, speedscope, etc.)
+
+In either case, calls to the file system functions of the os module and to open are
+counted for each high level operation. Operations are named with the operation
+decorator / context manager. Each call is counted for the innermost operation that
+is running in its thread, and the counts are written to <prefix>.fscalls (tab
+separated operation, function, count).
+
+The files are written when the program exits. They go in the current directory,
+which is where the batch check programs write their .status files, unless
+--profile-dir or XNAT_PBS_JOBS_PROFILE_DIR names another directory. The prefix is
+<program name>.<date and time>.<process id>.
+"""
+
+# import of built-in modules
+import atexit
+import builtins
+import collections
+import contextlib
+import cProfile
+import functools
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+# import of third party modules
+# None
+
+# import of local modules
+# None
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+PROFILE_ENVIRONMENT_VARIABLE = 'XNAT_PBS_JOBS_PROFILE'
+PROFILE_DIR_ENVIRONMENT_VARIABLE = 'XNAT_PBS_JOBS_PROFILE_DIR'
+
+PROFILERS = ('cprofile', 'sample')
+
+# values of the environment variable that leave profiling off
+OFF_VALUES = ('', '0', 'no', 'false', 'off')
+
+SAMPLE_INTERVAL_SECONDS = 0.005
+
+COUNTED_OS_FUNCTIONS = (
+	'stat', 'lstat', 'scandir', 'listdir', 'open', 'mkdir', 'rmdir', 'unlink', 'rename',
+	'replace', 'symlink', 'readlink', 'utime', 'chmod', 'access',
+)
+
+# operation that calls made outside of any named operation are counted for
+TOP_LEVEL_OPERATION = '<top level>'
+
+# call counter that is installed, if any
+_call_counter = None
+
+# operations running in each thread
+_thread_state = threading.local()
+
+# profiling started by start, if any
+_active_profile = None
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, file=sys.stderr, flush=True)
+
+
+def _operation_stack():
+	try:
+		return _thread_state.operations
+	except AttributeError:
+		_thread_state.operations = []
+		return _thread_state.operations
+
+
+@contextlib.contextmanager
+def operation(name):
+	"""
+	Count the file system calls made in the with block (or decorated function) for
+	the operation name. Does nothing unless calls are being counted.
+	"""
+	if _call_counter is None:
+		yield
+		return
+
+	operations = _operation_stack()
+	operations.append(name)
+	try:
+		yield
+	finally:
+		operations.pop()
+
+
+class CallCounter(object):
+	"""
+	Counts of calls made to each counted function, for each operation.
+	"""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self.counts = collections.defaultdict(collections.Counter)
+
+	def count(self, function_name):
+		operations = _operation_stack()
+		operation_name = operations[-1] if operations else TOP_LEVEL_OPERATION
+		with self._lock:
+			self.counts[operation_name][function_name] += 1
+
+	def totals(self):
+		"""
+		Counter of the calls made to each function in all operations.
+		"""
+		totals = collections.Counter()
+		for operation_counts in self.counts.values():
+			totals.update(operation_counts)
+		return totals
+
+	def write(self, file_name):
+		with open(file_name, 'w') as output_file:
+			output_file.write("\t".join(["Operation", "Function", "Calls"]) + os.linesep)
+			for operation_name in sorted(self.counts):
+				for function_name, calls in self.counts[operation_name].most_common():
+					output_file.write("\t".join([operation_name, function_name, str(calls)]) + os.linesep)
+
+
+def install_call_counter(counter):
+	"""
+	Replace the file system functions of the os module, open, and the function that
+	subprocess.Popen uses to start programs ('spawn') with versions that count their
+	calls in counter. Returns a function that puts the originals back.
+	"""
+	global _call_counter
+
+	previous_counter = _call_counter
+	originals = []
+
+	def wrap(module, name, key):
+		original = getattr(module, name)
+
+		@functools.wraps(original)
+		def counted(*args, **kwargs):
+			counter.count(key)
+			return original(*args, **kwargs)
+
+		originals.append((module, name, original))
+		setattr(module, name, counted)
+
+	for name in COUNTED_OS_FUNCTIONS:
+		wrap(os, name, name)
+	wrap(builtins, 'open', 'open')
+	wrap(subprocess.Popen, '_execute_child', 'spawn')
+	_call_counter = counter
+
+	def uninstall():
+		global _call_counter
+		_call_counter = previous_counter
+		for module, name, original in reversed(originals):
+			setattr(module, name, original)
+
+	return uninstall
+
+
+@contextlib.contextmanager
+def counting_calls():
+	"""
+	Count file system calls while in the with block. Yields the CallCounter.
+	"""
+	counter = CallCounter()
+	uninstall = install_call_counter(counter)
+	try:
+		yield counter
+	finally:
+		uninstall()
+
+
+def _frame_name(frame):
+	code = frame.f_code
+	return frame.f_globals.get('__name__', '?') + '.' + getattr(code, 'co_qualname', code.co_name)
+
+
+class StackSampler(object):
+	"""
+	Samples the stacks of all threads on a wall clock interval timer, counting the
+	samples of each distinct stack.
+	"""
+
+	def __init__(self, interval=SAMPLE_INTERVAL_SECONDS):
+		self.interval = interval
+		self.stacks = collections.Counter()
+		self._previous_handler = None
+
+	def _sample(self, signal_number, frame):
+		main_thread_id = threading.main_thread().ident
+		for thread_id, thread_frame in sys._current_frames().items():
+			# the main thread is running this handler, sample what it interrupted
+			if thread_id == main_thread_id:
+				thread_frame = frame
+			names = []
+			while thread_frame is not None:
+				# leave out the call counting wrappers
+				if thread_frame.f_globals.get('__name__') != __name__:
+					names.append(_frame_name(thread_frame))
+				thread_frame = thread_frame.f_back
+			if names:
+				self.stacks[';'.join(reversed(names))] += 1
+
+	def start(self):
+		self._previous_handler = signal.signal(signal.SIGALRM, self._sample)
+		signal.setitimer(signal.ITIMER_REAL, self.interval, self.interval)
+
+	def stop(self):
+		signal.setitimer(signal.ITIMER_REAL, 0)
+		signal.signal(signal.SIGALRM, self._previous_handler)
+
+	def write(self, file_name):
+		with open(file_name, 'w') as output_file:
+			for stack, samples in self.stacks.most_common():
+				output_file.write(stack + ' ' + str(samples) + '\n')
+
+
+def profiler_from_environment():
+	"""
+	The profiler requested by the XNAT_PBS_JOBS_PROFILE environment variable, or None.
+	Values other than the profiler names that do not turn profiling off select cprofile.
+	"""
+	value = os.getenv(PROFILE_ENVIRONMENT_VARIABLE, '').strip().lower()
+	if value in OFF_VALUES:
+		return None
+	return value if value in PROFILERS else PROFILERS[0]
+
+
+def start_from_environment(profile_dir=None):
+	"""
+	Start profiling this process if the XNAT_PBS_JOBS_PROFILE environment variable asks
+	for it. For programs that do not parse their arguments with MyArgumentParser (e.g.
+	the batch submission and checking scripts that read configuration files instead).
+	"""
+	profiler = profiler_from_environment()
+	if profiler:
+		start(profiler, profile_dir)
+
+
+def output_prefix(profile_dir=None):
+	program_name = os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'python'
+	if not profile_dir:
+		profile_dir = os.getenv(PROFILE_DIR_ENVIRONMENT_VARIABLE) or os.getcwd()
+	return os.sep.join([profile_dir, '.'.join([program_name, time.strftime('%Y%m%d-%H%M%S'), str(os.getpid())])])
+
+
+def start(profiler, profile_dir=None):
+	"""
+	Start profiling this process with the named profiler (see PROFILERS) and count file
+	system calls. The results are written when the process exits. Does nothing if
+	profiling has already been started.
+	"""
+	global _active_profile
+
+	if _active_profile is not None:
+		return
+	if profiler not in PROFILERS:
+		raise ValueError("unknown profiler: " + str(profiler))
+
+	prefix = output_prefix(profile_dir)
+	counter = CallCounter()
+
+	if profiler == 'cprofile':
+		collector = cProfile.Profile()
+		collector.enable()
+	else:
+		collector = StackSampler()
+		collector.start()
+
+	_active_profile = (profiler, prefix, collector, counter, install_call_counter(counter))
+	atexit.register(stop)
+
+
+def stop():
+	"""
+	Stop profiling started by start and write the results.
+	"""
+	global _active_profile
+
+	if _active_profile is None:
+		return
+	profiler, prefix, collector, counter, uninstall_call_counter = _active_profile
+	_active_profile = None
+	uninstall_call_counter()
+
+	if profiler == 'cprofile':
+		collector.disable()
+		file_names = [prefix + '.prof']
+		collector.dump_stats(file_names[0])
+	else:
+		collector.stop()
+		file_names = [prefix + '.folded']
+		collector.write(file_names[0])
+
+	file_names.append(prefix + '.fscalls')
+	counter.write(file_names[1])
+
+	_inform("profile written to " + ", ".join(file_names))
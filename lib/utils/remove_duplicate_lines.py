@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 
-"""remove_duplicate_lines.py: simple program to remove duplicate lines from a file"""
+"""remove_duplicate_lines.py: simple program to remove duplicate lines from a file
+
+This is the dedup operation of utils/subject_list.py for the line format, which also
+de-duplicates subject list files by subject ID.
+"""
 
 # import of built-in modules
 import os
@@ -10,6 +14,7 @@ import os
 
 # import of local modules
 import utils.my_argparse as my_argparse
+import utils.subject_list as subject_list
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -41,15 +46,8 @@ def main():
     _inform(" Input file name: " + args.input_file_name)
     _inform("Output file name: " + args.output_file_name)
 
-    output_lines = []
-    with open(args.input_file_name, 'r') as input_file:
-        for line in input_file:
-            line = line.rstrip()
-            if line not in output_lines:
-                output_lines.append(line)
-
     with open(args.output_file_name, 'w') as output_file:
-        for line in output_lines:
+        for line in subject_list.combine('dedup', [args.input_file_name], ['line']):
             output_file.write(line + os.linesep)
 
 
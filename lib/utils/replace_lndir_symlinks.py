@@ -2,6 +2,7 @@
 
 # import of built-in modules
 import os
+import sys
 
 # import of third party modules
 # None
@@ -9,6 +10,7 @@ import os
 # import of local modules
 import utils.my_argparse as my_argparse
 import utils.os_utils as os_utils
+import utils.symlink_utils as symlink_utils
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -21,6 +23,10 @@ def main():
 
     # optional arguments
     parser.add_argument('-d', '--directory', dest='directory', required=False, default=None, type=str)
+    parser.add_argument('-n', '--dry-run', dest='dry_run', action='store_true', required=False, default=False,
+                        help="list the links that would be replaced without replacing them")
+    parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int,
+                        default=symlink_utils.DEFAULT_MAX_WORKERS)
 
     # parse the command line arguments
     args = parser.parse_args()
@@ -30,7 +36,8 @@ def main():
 
     root_path = os.path.expandvars(os.path.expanduser(args.directory))
     print("root_path: " + root_path)
-    os_utils.replace_lndir_symlinks(root_path)
+    if os_utils.replace_lndir_symlinks(root_path, args.dry_run, args.parallel):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
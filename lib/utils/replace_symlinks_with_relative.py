@@ -2,6 +2,7 @@
 
 # import of built-in modules
 import os
+import sys
 
 # import of third party modules
 # None
@@ -9,6 +10,7 @@ import os
 # import of local modules
 import utils.my_argparse as my_argparse
 import utils.os_utils as os_utils
+import utils.symlink_utils as symlink_utils
 
 # authorship information
 __author__ = "Timothy B. Brown"
@@ -20,12 +22,17 @@ def main():
     parser = my_argparse.MyArgumentParser()
 
     parser.add_argument('-d', '--directory', dest='directory', required=True, type=str)
+    parser.add_argument('-n', '--dry-run', dest='dry_run', action='store_true', required=False, default=False,
+                        help="list the links that would be replaced without replacing them")
+    parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int,
+                        default=symlink_utils.DEFAULT_MAX_WORKERS)
 
     args = parser.parse_args()
 
     root_path = os.path.expandvars(os.path.expanduser(args.directory))
     print("root_path: " + root_path)
-    os_utils.replace_symlinks_with_relative(root_path)
+    if os_utils.replace_symlinks_with_relative(root_path, args.dry_run, args.parallel):
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+"""
+utils/script_template.py: Simple templates for generating job scripts.
+
+A template is plain script text in which {{name}} is replaced by the value of name
+in the context dictionary supplied when rendering. A line that starts with {{?name}}
+is only included when the value of name is true, and a line that starts with
+{{!name}} is only included when the value of name is false. For example:
+
+    {{program}} \\
+      --subject={{subject}} \\
+    {{?scan}}  --scan={{scan}} \\
+      --working-dir={{working_dir}}
+
+Templates are parsed once per process (see get_template) and rendered scripts are
+written with a single write to a temporary file that is then renamed into place
+(see write_script), so a job never sees a partially written script.
+"""
+
+# import of built-in modules
+import contextlib
+import os
+import re
+import stat
+import tempfile
+
+# import of third party modules
+# None
+
+# import of local modules
+# None
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+_CONDITION_PATTERN = re.compile(r'^\{\{([?!])(\w+)\}\}')
+_FIELD_PATTERN = re.compile(r'\{\{(\w+)\}\}')
+
+# permissions given to written scripts
+SCRIPT_MODE = stat.S_IRWXU | stat.S_IRWXG
+
+
+class ScriptTemplate(object):
+    """
+    A script template parsed into lines of literal text and field references.
+    """
+
+    def __init__(self, text):
+        self._lines = []
+        for line in text.splitlines():
+            condition = None
+            match = _CONDITION_PATTERN.match(line)
+            if match:
+                condition = (match.group(2), match.group(1) == '?')
+                line = line[match.end():]
+
+            # re.split with a capturing group alternates literal text and field names
+            parts = _FIELD_PATTERN.split(line)
+            segments = [(index % 2 == 1, part) for index, part in enumerate(parts) if part]
+            self._lines.append((condition, segments))
+
+    def render(self, context):
+        """
+        Return the script text for the specified context dictionary.
+        """
+        rendered = []
+        for condition, segments in self._lines:
+            if condition:
+                name, required_value = condition
+                if bool(context[name]) != required_value:
+                    continue
+
+            rendered.append(''.join(str(context[part]) if is_field else part
+                                    for is_field, part in segments))
+            rendered.append(os.linesep)
+
+        return ''.join(rendered)
+
+
+_template_cache = dict()
+
+
+def get_template(text):
+    """
+    Return the compiled template for the specified template text, compiling it the
+    first time it is requested.
+    """
+    template = _template_cache.get(text)
+    if template is None:
+        template = ScriptTemplate(text)
+        _template_cache[text] = template
+    return template
+
+
+def render(text, context):
+    """
+    Render the template text (compiled once and cached) with the specified context.
+    """
+    return get_template(text).render(context)
+
+
+def write_script(file_name, text, mode=SCRIPT_MODE):
+    """
+    Write the script text to file_name in a single write and make it executable.
+
+    The text goes to a temporary file in the same directory which then replaces
+    any existing file_name.
+    """
+    directory, base_name = os.path.split(file_name)
+    fd, temp_name = tempfile.mkstemp(dir=directory or None, prefix='.' + base_name + '.')
+    try:
+        with os.fdopen(fd, 'w') as script:
+            script.write(text)
+        os.chmod(temp_name, mode)
+        os.replace(temp_name, file_name)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_name)
+        raise
+
+
+def write_scripts(scripts, mode=SCRIPT_MODE):
+    """
+    Write each (file_name, text) pair in scripts.
+    """
+    for file_name, text in scripts:
+        write_script(file_name, text, mode)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+"""
+utils/sharded_put_dir.py: Put a directory of files into an XNAT resource as several
+zip "shards" uploaded concurrently, resuming an interrupted upload where it left off.
+
+The files in the directory are divided into shards of roughly equal total size. Each
+shard is streamed (see utils/stream_put_dir.py) into the resource in its own PUT request
+asking XNAT to extract it. The shard plan and the shards that have been accepted by the
+server are recorded in a journal file in the directory, so that running the upload again
+after a failure only sends the shards that were not accepted. Once every shard has been
+sent, the resource's file listing is compared with the files in the directory. The
+combined throughput of the shards is recorded for the server (see ccf/shadow_selector.py).
+"""
+
+# import of built-in modules
+import concurrent.futures
+import getpass
+import heapq
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+# import of third party modules
+import requests
+
+# import of local modules
+import ccf.shadow_selector as shadow_selector
+import utils.my_argparse as my_argparse
+import utils.stream_put_dir as stream_put_dir
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+# name of the journal file kept in the directory being uploaded (never uploaded itself)
+JOURNAL_FILE_NAME = '.xnat_put_journal.json'
+
+# shards are planned to hold about this many bytes each
+DEFAULT_SHARD_SIZE = 2 * 1024 * 1024 * 1024
+
+DEFAULT_MAX_WORKERS = 4
+
+# shards report their progress from separate threads
+_inform_lock = threading.Lock()
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	with _inform_lock:
+		print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def plan_shards(file_sizes, shard_count):
+	"""
+	Divide the files into shard_count shards with total sizes as equal as practical.
+
+	file_sizes is a dictionary of file name to size. Returns a list of shards, each a
+	sorted list of file names. The largest files are placed first, each into the shard
+	that is currently smallest.
+	"""
+	shard_count = max(1, min(shard_count, len(file_sizes)))
+	shards = [[] for index in range(shard_count)]
+	heap = [(0, index) for index in range(shard_count)]
+
+	for name in sorted(file_sizes, key=lambda name: (-file_sizes[name], name)):
+		total, index = heapq.heappop(heap)
+		shards[index].append(name)
+		heapq.heappush(heap, (total + file_sizes[name], index))
+
+	return [sorted(shard) for shard in shards]
+
+
+class UploadJournal(object):
+	"""
+	The shard plan for uploading a directory and the set of shards already uploaded,
+	kept in a JSON file. Each update rewrites the file and renames it into place.
+	"""
+
+	def __init__(self, file_name, file_sizes, shards, completed=()):
+		self._file_name = file_name
+		self._lock = threading.Lock()
+		self.file_sizes = file_sizes
+		self.shards = shards
+		self.completed = set(completed)
+
+	@classmethod
+	def load_or_plan(cls, file_name, file_sizes, shard_size):
+		"""
+		Load the journal in file_name if it was written for the same set of files (names
+		and sizes). Otherwise start a new journal with a fresh shard plan.
+		"""
+		try:
+			with open(file_name, 'r') as journal_file:
+				contents = json.load(journal_file)
+			if contents['file_sizes'] == file_sizes:
+				return cls(file_name, file_sizes, contents['shards'], contents['completed'])
+			module_logger.warning("files changed since journal was written, starting over: " + file_name)
+		except FileNotFoundError:
+			pass
+		except (ValueError, KeyError) as e:
+			module_logger.warning("ignoring unreadable journal: " + file_name + ": " + str(e))
+
+		shard_count = -(-sum(file_sizes.values()) // shard_size)
+		journal = cls(file_name, file_sizes, plan_shards(file_sizes, shard_count))
+		journal.save()
+		return journal
+
+	@property
+	def pending(self):
+		return [index for index in range(len(self.shards)) if index not in self.completed]
+
+	def mark_completed(self, index):
+		with self._lock:
+			self.completed.add(index)
+			self.save()
+
+	def save(self):
+		contents = {
+			'file_sizes': self.file_sizes,
+			'shards': self.shards,
+			'completed': sorted(self.completed),
+		}
+		temp_name = self._file_name + '.tmp'
+		with open(temp_name, 'w') as journal_file:
+			json.dump(contents, journal_file)
+		os.replace(temp_name, self._file_name)
+
+
+def files_uri(resource_url, reason):
+	"""
+	URI to which to PUT a zip file to have it extracted into the resource at resource_url.
+	Files already in the resource that are not in the zip are left in place.
+	"""
+	return resource_url + '/files/?overwrite=true&extract=true&event_reason=' + reason
+
+
+def list_resource_files(session, resource_url):
+	"""
+	Dictionary of file name (relative to the resource) to size for the files in the
+	resource at resource_url.
+	"""
+	response = session.get(resource_url + '/files', params={'format': 'json'})
+	response.raise_for_status()
+
+	listed = dict()
+	for result in response.json()['ResultSet']['Result']:
+		name = result['URI'].partition('/files/')[2]
+		listed[name] = int(result['Size'])
+	return listed
+
+
+def verify_upload(session, resource_url, file_sizes):
+	"""
+	Compare the resource's file listing with file_sizes. Returns a list of messages
+	describing each missing or mismatched file, empty if the upload is complete.
+	"""
+	listed = list_resource_files(session, resource_url)
+
+	problems = []
+	for name, size in sorted(file_sizes.items()):
+		if name not in listed:
+			problems.append("missing: " + name)
+		elif listed[name] != size:
+			problems.append("size mismatch: " + name + " (" + str(listed[name]) + " != " + str(size) + ")")
+	return problems
+
+
+def put_directory(directory, resource_url, user, password, reason='Unspecified',
+				  compression='stored', shard_size=DEFAULT_SHARD_SIZE,
+				  max_workers=DEFAULT_MAX_WORKERS, verify=True):
+	"""
+	Upload the contents of directory into the resource at resource_url (e.g.
+	https://<server>/REST/projects/<project>/subjects/<subject>/experiments/<id>/resources/<name>)
+	in shards of about shard_size bytes, up to max_workers at a time.
+
+	Returns True if every shard was accepted and (if verify is True) the resource's file
+	listing matches the directory.
+	"""
+	files = stream_put_dir.list_files(directory, exclude=(JOURNAL_FILE_NAME, JOURNAL_FILE_NAME + '.tmp'))
+	paths = dict((arcname, path) for path, arcname in files)
+	file_sizes = dict((arcname, os.path.getsize(path)) for path, arcname in files if os.path.exists(path))
+
+	journal = UploadJournal.load_or_plan(os.path.join(directory, JOURNAL_FILE_NAME), file_sizes, shard_size)
+	pending = journal.pending
+	_inform(str(len(journal.shards)) + " shards, " + str(len(pending)) + " to upload")
+
+	session = requests.Session()
+	session.auth = (user, password)
+	adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+	session.mount('http://', adapter)
+	session.mount('https://', adapter)
+
+	uri = files_uri(resource_url, reason)
+
+	def put_shard(index):
+		shard_files = [(paths[name], name) for name in journal.shards[index]]
+		prefix = "shard " + str(index) + ": "
+		stream = stream_put_dir.put_directory(directory, uri, user, password, compression, session=session,
+											  files=shard_files, report=lambda msg: _inform(prefix + msg),
+											  record_throughput=False)
+		journal.mark_completed(index)
+		return stream.bytes_produced
+
+	failed = 0
+	bytes_sent = 0
+	start_time = time.time()
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		futures = dict((executor.submit(put_shard, index), index) for index in pending)
+		for future in concurrent.futures.as_completed(futures):
+			try:
+				bytes_sent += future.result()
+			except (requests.RequestException, OSError) as e:
+				failed += 1
+				_inform("ERROR: shard " + str(futures[future]) + " failed: " + str(e))
+
+	if failed:
+		_inform(str(failed) + " shards failed, run again to resume")
+		return False
+
+	if bytes_sent:
+		shadow_selector.record_upload(resource_url, bytes_sent, time.time() - start_time)
+
+	if verify:
+		problems = verify_upload(session, resource_url, file_sizes)
+		for problem in problems:
+			_inform("ERROR: " + problem)
+		if problems:
+			return False
+		_inform("Verified " + str(len(file_sizes)) + " files in resource listing")
+
+	return True
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Put a directory into an XNAT resource as concurrently uploaded zip shards.")
+
+	# mandatory arguments
+	parser.add_argument('-u', '--user', dest='user', required=True, type=str)
+	parser.add_argument('-d', '--dir', dest='directory', required=True, type=str)
+	parser.add_argument('-r', '--resource-url', dest='resource_url', required=True, type=str,
+						help="URL of the resource (without /files)")
+
+	# optional arguments
+	parser.add_argument('-pw', '--password', dest='password', required=False, type=str)
+	parser.add_argument('--reason', dest='reason', required=False, type=str, default='Unspecified')
+	parser.add_argument('-c', '--compression', dest='compression', required=False, default='stored',
+						choices=sorted(stream_put_dir.COMPRESSION_TYPES.keys()))
+	parser.add_argument('-s', '--shard-size', dest='shard_size', required=False, type=int,
+						default=DEFAULT_SHARD_SIZE, help="approximate number of bytes in each shard")
+	parser.add_argument('-j', '--parallel', dest='parallel', required=False, type=int,
+						default=DEFAULT_MAX_WORKERS, help="number of shards to upload at once")
+	parser.add_argument('--no-verify', dest='verify', action='store_false', required=False, default=True)
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	if args.password:
+		password = args.password
+	else:
+		password = getpass.getpass("Password: ")
+
+	# show parsed arguments
+	_inform("Parsed arguments:")
+	_inform("      Username: " + args.user)
+	_inform("      Password: " + "*** password mask ***")
+	_inform("     Directory: " + args.directory)
+	_inform("  Resource URL: " + args.resource_url)
+	_inform("    Shard size: " + str(args.shard_size))
+	_inform("      Parallel: " + str(args.parallel))
+
+	try:
+		succeeded = put_directory(args.directory, args.resource_url, args.user, password, args.reason,
+								  args.compression, args.shard_size, args.parallel, args.verify)
+	except requests.RequestException as e:
+		_inform("ERROR: " + str(e))
+		succeeded = False
+
+	if not succeeded:
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
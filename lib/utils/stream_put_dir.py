@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+"""
+utils/stream_put_dir.py: Put a directory of files into an XNAT resource by streaming a zip
+of the directory in an HTTP PUT request that asks XNAT to extract it.
+
+The zip is produced as it is sent, so unlike zipping the directory into a local file and
+then uploading that file, each byte is only read once from the directory and nothing is
+written back to it. A manifest of the files sent (name, size, CRC-32 and MD5) can be
+written as the files are read.
+
+The throughput of each successful upload is recorded for the server uploaded to (see
+ccf/shadow_selector.py), so that later jobs can be assigned to the PUT shadow servers
+that have been taking data the fastest.
+"""
+
+# import of built-in modules
+import getpass
+import hashlib
+import logging
+import os
+import sys
+import time
+import zipfile
+
+# import of third party modules
+import requests
+
+# import of local modules
+import ccf.shadow_selector as shadow_selector
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# create a module logger
+module_logger = logging.getLogger(__name__)
+module_logger.setLevel(logging.WARNING)  # Note: This can be overidden by log file configuration
+
+# size of the reads from the files being sent
+READ_SIZE = 1024 * 1024
+
+# how often (in seconds) to report progress while sending
+PROGRESS_INTERVAL_SECS = 30
+
+COMPRESSION_TYPES = {
+	'stored': zipfile.ZIP_STORED,
+	'deflate': zipfile.ZIP_DEFLATED,
+}
+
+# zlib level used for 'deflate' compression (fastest)
+DEFLATE_LEVEL = 1
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, flush=True)
+
+
+def build_resource_uri(protocol, server, project, subject, session_id, resource, reason):
+	"""
+	URI to which to PUT a zip file to have it extracted into the specified session level
+	resource (replacing anything already there).
+	"""
+	uri = protocol + '://' + server
+	uri += '/REST/projects/' + project
+	uri += '/subjects/' + subject
+	uri += '/experiments/' + session_id
+	uri += '/resources/' + resource
+	uri += '/files/'
+	uri += '?overwrite=true'
+	uri += '&replace=true'
+	uri += '&event_reason=' + reason
+	uri += '&extract=true'
+	return uri
+
+
+class _StreamBuffer(object):
+	"""
+	Write-only, unseekable file object that collects what the zipfile module writes until
+	it is drained. Being unseekable makes zipfile write each member's sizes and CRC after
+	its data instead of going back to fill them in.
+	"""
+
+	def __init__(self):
+		self._chunks = []
+		self._position = 0
+
+	def write(self, data):
+		self._chunks.append(bytes(data))
+		self._position += len(data)
+		return len(data)
+
+	def tell(self):
+		return self._position
+
+	def flush(self):
+		pass
+
+	def drain(self):
+		chunks = self._chunks
+		self._chunks = []
+		return chunks
+
+
+class ManifestEntry(object):
+
+	def __init__(self, name, size, crc, md5):
+		self.name = name
+		self.size = size
+		self.crc = crc
+		self.md5 = md5
+
+	def __str__(self):
+		return '\t'.join([self.name, str(self.size), '%08x' % self.crc, self.md5])
+
+
+def list_files(directory, exclude=()):
+	"""
+	List of (path, name in zip) tuples for the files in and below directory, following
+	symbolic links as zip does by default. A directory that is reached again (e.g. through
+	a link to one of its parents) is not listed again. Files whose names (relative to
+	directory) are in exclude are left out.
+	"""
+	files = []
+	visited = set()
+	for root, dirs, names in os.walk(directory, followlinks=True):
+		root_stat = os.stat(root)
+		visited.add((root_stat.st_dev, root_stat.st_ino))
+		for name in list(dirs):
+			try:
+				dir_stat = os.stat(os.path.join(root, name))
+			except OSError:
+				dirs.remove(name)
+				continue
+			if (dir_stat.st_dev, dir_stat.st_ino) in visited:
+				module_logger.warning("skipping directory already listed: " + os.path.join(root, name))
+				dirs.remove(name)
+		dirs.sort()
+		relative_root = os.path.relpath(root, directory)
+		for name in sorted(names):
+			arcname = name if relative_root == os.curdir else os.path.join(relative_root, name)
+			if arcname not in exclude:
+				files.append((os.path.join(root, name), arcname))
+	return files
+
+
+class DirectoryZipStream(object):
+	"""
+	Iterable of the bytes of a zip file of the contents of directory, produced as it is
+	iterated over. If files is specified, only those (path, name in zip) tuples are
+	included instead of everything found by list_files.
+
+	As each file is added, its ManifestEntry is appended to the manifest list and the
+	counts used for progress reporting are updated.
+	"""
+
+	def __init__(self, directory, compression='stored', files=None):
+		self._files = files if files is not None else list_files(directory)
+		self._compression = COMPRESSION_TYPES[compression]
+		self.manifest = []
+		self.bytes_read = 0
+		self.bytes_produced = 0
+		self.seconds = None  # time taken by the PUT, set by put_directory
+
+	def _drain(self, buffer):
+		for chunk in buffer.drain():
+			self.bytes_produced += len(chunk)
+			yield chunk
+
+	def __iter__(self):
+		buffer = _StreamBuffer()
+		kwargs = {'compresslevel': DEFLATE_LEVEL} if self._compression == zipfile.ZIP_DEFLATED else {}
+
+		with zipfile.ZipFile(buffer, 'w', compression=self._compression, allowZip64=True, **kwargs) as zip_file:
+			for path, arcname in self._files:
+				try:
+					zip_info = zipfile.ZipInfo.from_file(path, arcname)
+				except FileNotFoundError:
+					module_logger.warning("skipping broken link: " + path)
+					continue
+				zip_info.compress_type = self._compression
+
+				md5 = hashlib.md5()
+				with open(path, 'rb') as source, zip_file.open(zip_info, 'w') as member:
+					while True:
+						data = source.read(READ_SIZE)
+						if not data:
+							break
+						md5.update(data)
+						member.write(data)
+						self.bytes_read += len(data)
+						yield from self._drain(buffer)
+
+				self.manifest.append(ManifestEntry(arcname, zip_info.file_size, zip_info.CRC, md5.hexdigest()))
+				yield from self._drain(buffer)
+
+		# the central directory is written when the zip file is closed
+		yield from self._drain(buffer)
+
+
+class _ProgressReporter(object):
+	"""
+	Passes through the chunks of a DirectoryZipStream, reporting throughput periodically.
+	"""
+
+	def __init__(self, stream, interval=PROGRESS_INTERVAL_SECS, report=_inform):
+		self._stream = stream
+		self._interval = interval
+		self._report = report
+		self.start_time = None
+
+	def __iter__(self):
+		self.start_time = time.time()
+		last_report = self.start_time
+		for chunk in self._stream:
+			yield chunk
+			now = time.time()
+			if now - last_report >= self._interval:
+				last_report = now
+				self._report(describe_throughput(self._stream, now - self.start_time))
+
+
+def describe_throughput(stream, elapsed):
+	megabytes = stream.bytes_produced / (1024 * 1024)
+	rate = megabytes / elapsed if elapsed > 0 else 0.0
+	return ("%d files, %.1f MB read, %.1f MB sent in %.1f s (%.1f MB/s)" %
+			(len(stream.manifest), stream.bytes_read / (1024 * 1024), megabytes, elapsed, rate))
+
+
+def put_directory(directory, resource_uri, user, password, compression='stored',
+				  manifest_file_name=None, session=None, timeout=None, files=None, report=_inform,
+				  record_throughput=True):
+	"""
+	Stream a zip of the contents of directory (or of just the specified files) to
+	resource_uri in a chunked HTTP PUT. If record_throughput is True, the throughput
+	of a successful upload is recorded for the server (see ccf/shadow_selector.py).
+
+	Returns the DirectoryZipStream, whose manifest lists the files that were sent.
+	Raises requests.HTTPError if the server does not accept the upload.
+	"""
+	stream = DirectoryZipStream(directory, compression, files)
+	progress = _ProgressReporter(stream, report=report)
+
+	http = session if session else requests.Session()
+	response = http.put(resource_uri, data=iter(progress), auth=(user, password),
+						headers={'Content-Type': 'application/zip'}, timeout=timeout)
+	stream.seconds = time.time() - progress.start_time
+
+	report("PUT status: " + str(response.status_code))
+	report(describe_throughput(stream, stream.seconds))
+	response.raise_for_status()
+
+	if record_throughput:
+		shadow_selector.record_upload(resource_uri, stream.bytes_produced, stream.seconds)
+
+	if manifest_file_name:
+		with open(manifest_file_name, 'w') as manifest_file:
+			manifest_file.write(''.join(str(entry) + os.linesep for entry in stream.manifest))
+
+	return stream
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Put a directory into an XNAT resource by streaming a zip of it in an HTTP PUT.")
+
+	# mandatory arguments
+	parser.add_argument('-u', '--user', dest='user', required=True, type=str)
+	parser.add_argument('-d', '--dir', dest='directory', required=True, type=str)
+	parser.add_argument('-r', '--resource-uri', dest='resource_uri', required=True, type=str,
+						help="URI to PUT the zip to (including extract=true)")
+
+	# optional arguments
+	parser.add_argument('-pw', '--password', dest='password', required=False, type=str)
+	parser.add_argument('-c', '--compression', dest='compression', required=False, default='stored',
+						choices=sorted(COMPRESSION_TYPES.keys()))
+	parser.add_argument('-m', '--manifest', dest='manifest', required=False, type=str,
+						help="file in which to write the name, size, CRC-32 and MD5 of each file sent")
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	if args.password:
+		password = args.password
+	else:
+		password = getpass.getpass("Password: ")
+
+	# show parsed arguments
+	_inform("Parsed arguments:")
+	_inform("     Username: " + args.user)
+	_inform("     Password: " + "*** password mask ***")
+	_inform("    Directory: " + args.directory)
+	_inform("  Compression: " + args.compression)
+	_inform("     Manifest: " + str(args.manifest))
+
+	try:
+		put_directory(args.directory, args.resource_uri, args.user, password,
+					  args.compression, args.manifest)
+	except requests.RequestException as e:
+		_inform("ERROR: PUT failed: " + str(e))
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+"""
+utils/subject_list.py: Read subject list (.subjects) files and combine them by subject ID.
+
+Subject list files have one subject per line, with fields separated by ':' or a tab.
+Blank lines and lines starting with # are ignored. The fields depend on the format:
+
+  ccf    project:subject_id:classifier:extra
+  hcp3t  project:subject_id:extra
+  hcp7t  project:structural_reference_project:subject_id[:extra]
+  id     subject_id
+  line   the whole line is the key (blank and comment lines are kept)
+
+The operations compare subjects by subject ID (the key), and output the lines of the
+input files unchanged:
+
+  union         lines of all files, the first line for each subject
+  intersection  lines of the first file for subjects in all the other files
+  difference    lines of the first file for subjects in none of the other files
+  dedup         lines of the file(s), the first line for each subject
+  join          for each line of the first file, the line of the second file with the
+                same subject (e.g. full subject lines for a list of subject IDs)
+
+Files are read as streams. The first file is never held in memory; the others are
+indexed by key in hash tables. If the files are larger than the memory limit, each
+file is instead sorted by key in bounded memory (an external sort through temporary
+files) and the sorted files are merged, so the output is in key order rather than in
+the order of the first file.
+"""
+
+# import of built-in modules
+import collections
+import heapq
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+
+# import of third party modules
+# None
+
+# import of local modules
+import utils.my_argparse as my_argparse
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+# format name: (field names, number of fields that must be present)
+FORMATS = collections.OrderedDict([
+	('ccf', (('project', 'subject_id', 'classifier', 'extra'), 4)),
+	('hcp3t', (('project', 'subject_id', 'extra'), 3)),
+	('hcp7t', (('project', 'structural_reference_project', 'subject_id', 'extra'), 3)),
+	('id', (('subject_id',), 1)),
+	('line', (None, 0)),
+])
+
+DEFAULT_FORMAT = 'ccf'
+
+SEPARATORS = (':', '\t')
+
+OPERATIONS = ('union', 'intersection', 'difference', 'dedup', 'join')
+
+# total size of the input files above which they are sorted externally instead of indexed
+DEFAULT_MEMORY_LIMIT_BYTES = 1024 ** 3
+
+# number of records sorted in memory at a time by the external sort
+DEFAULT_SORT_CHUNK_RECORDS = 1000000
+
+
+def _inform(msg):
+	"""Inform the user of this program by outputing a message that is prefixed by the file name.
+
+	:param msg: Message to output
+	:type msg: str
+	"""
+	print(os.path.basename(__file__) + ": " + msg, file=sys.stderr, flush=True)
+
+
+class SubjectListError(ValueError):
+	"""
+	A line of a subject list file does not have the fields of its format.
+	"""
+	pass
+
+
+def _split(line, separator):
+	if separator is None:
+		separator = '\t' if '\t' in line else SEPARATORS[0]
+	return line.split(separator)
+
+
+def read_fields(file_name, format_name=DEFAULT_FORMAT, separator=None):
+	"""
+	Generator of the list of fields of each subject line in file_name. Optional fields
+	that are not present are None. If separator is None, each line is split on tabs if
+	it contains any, otherwise on ':'.
+
+	:raises SubjectListError: if a line has too few or too many fields
+	"""
+	field_names, required_count = FORMATS[format_name]
+	field_count = len(field_names)
+
+	with open(file_name, 'r') as input_file:
+		for line_number, line in enumerate(input_file, 1):
+			line = line.strip()
+			if line == '' or line[0] == '#':
+				continue
+
+			fields = _split(line, separator)
+			if not required_count <= len(fields) <= field_count:
+				raise SubjectListError(file_name + ":" + str(line_number) + ": expected " + str(field_count) +
+									   " " + format_name + " fields, got " + str(len(fields)) + ": " + line)
+			if len(fields) < field_count:
+				fields.extend([None] * (field_count - len(fields)))
+			yield fields
+
+
+def read_records(file_name, format_name=DEFAULT_FORMAT, separator=None):
+	"""
+	Generator of (key, line) pairs for the subject lines in file_name (all lines for the
+	line format). The key is the subject ID and line is stripped of surrounding white
+	space.
+	"""
+	if format_name == 'line':
+		with open(file_name, 'r') as input_file:
+			for line in input_file:
+				line = line.rstrip()
+				yield line, line
+		return
+
+	key_index = FORMATS[format_name][0].index('subject_id')
+	with open(file_name, 'r') as input_file:
+		for line in input_file:
+			line = line.strip()
+			if line == '' or line[0] == '#':
+				continue
+			fields = _split(line, separator)
+			yield (fields[key_index] if key_index < len(fields) else ''), line
+
+
+def _keys(records):
+	return set(key for key, line in records)
+
+
+def union(*record_streams):
+	seen = set()
+	for key, line in itertools.chain(*record_streams):
+		if key not in seen:
+			seen.add(key)
+			yield line
+
+
+def dedup(*record_streams):
+	return union(*record_streams)
+
+
+def intersection(first, *others):
+	key_sets = [_keys(records) for records in others]
+	seen = set()
+	for key, line in first:
+		if key not in seen and all(key in keys for keys in key_sets):
+			seen.add(key)
+			yield line
+
+
+def difference(first, *others):
+	excluded = set()
+	for records in others:
+		excluded.update(_keys(records))
+	seen = set()
+	for key, line in first:
+		if key not in seen and key not in excluded:
+			seen.add(key)
+			yield line
+
+
+def join(left, right):
+	index = dict()
+	for key, line in right:
+		index.setdefault(key, line)
+	for key, line in left:
+		if key in index:
+			yield index[key]
+
+
+def _read_chunk(chunk_file, index):
+	for line in chunk_file:
+		key, line = line[:-1].split('\0', 1)
+		yield key, index, line
+
+
+def external_sort(records, chunk_records=DEFAULT_SORT_CHUNK_RECORDS, tmp_dir=None):
+	"""
+	Generator of the (key, line) records sorted by key (records with equal keys stay in
+	input order), holding at most chunk_records records in memory. Sorted chunks are
+	written to temporary files in tmp_dir and merged.
+	"""
+	work_dir = tempfile.mkdtemp(prefix='subject_list.', dir=tmp_dir)
+	try:
+		chunk_file_names = []
+		sequence = itertools.count()
+		while True:
+			chunk = sorted((key, next(sequence), line) for key, line in itertools.islice(records, chunk_records))
+			if not chunk:
+				break
+			chunk_file_name = os.path.join(work_dir, str(len(chunk_file_names)))
+			with open(chunk_file_name, 'w') as chunk_file:
+				for key, number, line in chunk:
+					chunk_file.write(key + '\0' + line + '\n')
+			chunk_file_names.append(chunk_file_name)
+
+		chunk_files = [open(chunk_file_name, 'r') for chunk_file_name in chunk_file_names]
+		try:
+			# (key, chunk index) keeps equal keys in input order, as chunks are in input order
+			streams = [_read_chunk(chunk_file, index) for index, chunk_file in enumerate(chunk_files)]
+			for key, index, line in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+				yield key, line
+		finally:
+			for chunk_file in chunk_files:
+				chunk_file.close()
+	finally:
+		shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _tagged(records, index):
+	for key, line in records:
+		yield key, index, line
+
+
+def merge_sorted(sorted_streams):
+	"""
+	Generator of (key, list of the lines for key in each stream) for streams of (key,
+	line) records sorted by key.
+	"""
+	tagged = [_tagged(stream, index) for index, stream in enumerate(sorted_streams)]
+	for key, group in itertools.groupby(heapq.merge(*tagged, key=lambda item: (item[0], item[1])),
+										key=lambda item: item[0]):
+		lines = [[] for stream in sorted_streams]
+		for key, index, line in group:
+			lines[index].append(line)
+		yield key, lines
+
+
+def sorted_operation(operation, sorted_streams):
+	"""
+	Generator of the output lines of operation for streams of (key, line) records sorted
+	by key. The output is in key order.
+	"""
+	for key, lines in merge_sorted(sorted_streams):
+		if operation in ('union', 'dedup'):
+			yield next(stream_lines[0] for stream_lines in lines if stream_lines)
+		elif operation == 'intersection':
+			if all(lines):
+				yield lines[0][0]
+		elif operation == 'difference':
+			if lines[0] and not any(lines[1:]):
+				yield lines[0][0]
+		elif operation == 'join':
+			if lines[1]:
+				for line in lines[0]:
+					yield lines[1][0]
+		else:
+			raise ValueError("unknown operation: " + str(operation))
+
+
+def hash_operation(operation, record_streams):
+	"""
+	Generator of the output lines of operation for streams of (key, line) records, using
+	hash indexes. The output is in the order of the first stream (of all streams for
+	union and dedup).
+	"""
+	if operation == 'union':
+		return union(*record_streams)
+	elif operation == 'dedup':
+		return dedup(*record_streams)
+	elif operation == 'intersection':
+		return intersection(*record_streams)
+	elif operation == 'difference':
+		return difference(*record_streams)
+	elif operation == 'join':
+		return join(*record_streams)
+	raise ValueError("unknown operation: " + str(operation))
+
+
+def combine(operation, file_names, format_names, separator=None, memory_limit=DEFAULT_MEMORY_LIMIT_BYTES,
+			tmp_dir=None, chunk_records=DEFAULT_SORT_CHUNK_RECORDS):
+	"""
+	Generator of the output lines of operation for the subject list files file_names,
+	read with the corresponding format_names.
+	"""
+	if operation == 'join' and len(file_names) != 2:
+		raise ValueError("join requires exactly two files")
+	if operation in ('intersection', 'difference') and len(file_names) < 2:
+		raise ValueError(operation + " requires at least two files")
+
+	record_streams = [read_records(file_name, format_name, separator)
+					  for file_name, format_name in zip(file_names, format_names)]
+
+	if sum(os.path.getsize(file_name) for file_name in file_names) <= memory_limit:
+		return hash_operation(operation, record_streams)
+
+	return sorted_operation(operation, [external_sort(records, chunk_records, tmp_dir)
+										for records in record_streams])
+
+
+def main():
+	# create a parser object for getting the command line options
+	parser = my_argparse.MyArgumentParser(
+		description="Combine subject list files by subject ID: " + ", ".join(OPERATIONS) + ".")
+
+	# mandatory arguments
+	parser.add_argument('operation', choices=OPERATIONS)
+	parser.add_argument('files', nargs='+', help="subject list files (- for standard input)")
+
+	# optional arguments
+	parser.add_argument('-f', '--format', dest='formats', required=False, action='append',
+						choices=list(FORMATS.keys()),
+						help="format of the files, in order (may be repeated; the last applies to the " +
+						"remaining files; default " + DEFAULT_FORMAT + ")")
+	parser.add_argument('-s', '--separator', dest='separator', required=False, type=str, default=None,
+						help="field separator (default: tab if a line has one, otherwise :)")
+	parser.add_argument('-o', '--output', dest='output', required=False, type=str, default=None)
+	parser.add_argument('-m', '--memory-limit-mb', dest='memory_limit_mb', required=False, type=float,
+						default=DEFAULT_MEMORY_LIMIT_BYTES / 1024 ** 2,
+						help="sort the files externally if together they are larger than this")
+	parser.add_argument('-t', '--tmp-dir', dest='tmp_dir', required=False, type=str, default=None)
+
+	# parse the command line arguments
+	args = parser.parse_args()
+
+	formats = args.formats if args.formats else [DEFAULT_FORMAT]
+	formats = formats + [formats[-1]] * (len(args.files) - len(formats))
+	file_names = ['/dev/stdin' if file_name == '-' else file_name for file_name in args.files]
+
+	output_file = open(args.output, 'w') if args.output else sys.stdout
+	try:
+		for line in combine(args.operation, file_names, formats[:len(file_names)], args.separator,
+							int(args.memory_limit_mb * 1024 ** 2), args.tmp_dir):
+			output_file.write(line + os.linesep)
+	except (OSError, ValueError) as e:
+		_inform("ERROR: " + str(e))
+		sys.exit(1)
+	finally:
+		if output_file is not sys.stdout:
+			output_file.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+"""
+utils/symlink_utils.py: Rewrite the symbolic links in a directory tree.
+
+  relative  replace each link with a relative link to the file it resolves to
+  copy      replace each link to a regular file with a copy of the file (e.g. to
+            make a tree created by lndir independent of the files linked to)
+
+The tree is read in one traversal (os.scandir, not following links to directories)
+and the rewrites to make are planned first. A plan can be listed without changing
+anything (a dry run). Link targets are resolved like os.path.realpath, except that the
+resolution of each directory is remembered, so that the many links into the same
+directories do not each look up every component of their paths again.
+
+The planned rewrites are then made by a pool of threads. Each link is replaced in one
+step: the new link or the copy is made under a temporary name in the link's directory
+and renamed over the link, so the path never stops existing and an interrupted copy
+never leaves a partial file in its place.
+"""
+
+# import of built-in modules
+import collections
+import concurrent.futures
+import errno
+import os
+import shutil
+import stat
+
+# import of third party modules
+# None
+
+# import of local modules
+# None
+
+# authorship information
+__author__ = "Timothy B. Brown"
+__copyright__ = "Copyright 2017, The Connectome Coordination Facility (CCF)"
+__maintainer__ = "Timothy B. Brown"
+
+RELATIVE = 'relative'
+COPY = 'copy'
+MODES = (RELATIVE, COPY)
+
+DEFAULT_MAX_WORKERS = 8
+
+# number of links followed in resolving a path before it is taken to be a loop
+MAX_LINK_HOPS = 40
+
+# suffix of the temporary name under which a replacement is made next to a link
+TEMPORARY_SUFFIX = '.rewriting'
+
+# mode: RELATIVE or COPY
+# path: path of the link
+# target: new link text (RELATIVE) or the file to copy (COPY)
+Rewrite = collections.namedtuple('Rewrite', ['mode', 'path', 'target'])
+
+
+class PathResolver(object):
+	"""
+	Resolves paths to real paths (as os.path.realpath does, without raising errors for
+	paths that do not exist), remembering the real path of each path resolved, including
+	the directories on the way.
+	"""
+
+	def __init__(self):
+		self._real_paths = dict()
+
+	def realpath(self, path):
+		return self._follow(os.getcwd(), path, 0)
+
+	def _follow(self, real_directory, path, hops):
+		"""Real path of path, which is relative to real_directory (a real path) if it is not absolute."""
+		real_path = os.sep if os.path.isabs(path) else real_directory
+		for name in path.split(os.sep):
+			if name in ('', os.curdir):
+				continue
+			if name == os.pardir:
+				real_path = os.path.dirname(real_path)
+			else:
+				real_path = self._resolve(os.path.join(real_path, name), hops)
+		return real_path
+
+	def _resolve(self, path, hops):
+		"""Real path of path, whose directory is a real path."""
+		real_path = self._real_paths.get(path)
+		if real_path is not None:
+			return real_path
+
+		try:
+			is_link = stat.S_ISLNK(os.lstat(path).st_mode)
+		except OSError:
+			is_link = False
+
+		if not is_link:
+			real_path = path
+		elif hops >= MAX_LINK_HOPS:
+			# a loop of links, leave it unresolved as os.path.realpath does
+			return path
+		else:
+			real_path = self._follow(os.path.dirname(path), os.readlink(path), hops + 1)
+
+		self._real_paths[path] = real_path
+		return real_path
+
+
+def plan(root, mode, resolver=None, errors=None):
+	"""
+	List of the Rewrites that mode (see MODES) makes of the links in the directory tree
+	at root, in traversal order. Links that are already as they would be rewritten are
+	left out, as are links in loops of links and (in COPY mode) links whose targets cannot
+	be examined, which os.path.isfile would report not to be files.
+
+	Directories that cannot be read are skipped. If errors is a list, a (path, OSError)
+	pair is appended to it for each of them; otherwise the first such OSError is raised.
+	"""
+	if mode not in MODES:
+		raise ValueError("unknown mode: " + str(mode))
+	if resolver is None:
+		resolver = PathResolver()
+
+	rewrites = []
+	directories = [os.path.abspath(root)]
+	while directories:
+		directory = directories.pop()
+		try:
+			with os.scandir(directory) as entries:
+				entries = sorted(entries, key=lambda entry: entry.name)
+		except OSError as e:
+			if errors is None:
+				raise
+			errors.append((directory, e))
+			continue
+
+		subdirectories = []
+		for entry in entries:
+			if entry.is_symlink():
+				if mode == RELATIVE and not _is_loop(entry):
+					relative_path = os.path.relpath(resolver.realpath(entry.path), resolver.realpath(directory))
+					if os.readlink(entry.path) != relative_path:
+						rewrites.append(Rewrite(mode, entry.path, relative_path))
+				elif _is_file(entry):
+					rewrites.append(Rewrite(mode, entry.path, resolver.realpath(entry.path)))
+			elif entry.is_dir(follow_symlinks=False):
+				subdirectories.append(entry.path)
+		directories.extend(reversed(subdirectories))
+
+	return rewrites
+
+
+def _is_loop(entry):
+	"""Whether the DirEntry is a link in a loop of links (which cannot be resolved)."""
+	try:
+		entry.stat()
+	except OSError as e:
+		return e.errno == errno.ELOOP
+	return False
+
+
+def _is_file(entry):
+	"""Whether the DirEntry is (or links to) a regular file, False if that cannot be determined."""
+	try:
+		return entry.is_file()
+	except OSError:
+		return False
+
+
+def describe(rewrite):
+	"""Line describing the rewrite."""
+	if rewrite.mode == RELATIVE:
+		return rewrite.path + " -> " + rewrite.target
+	return "Replacing: " + rewrite.path + " with copy of: " + rewrite.target
+
+
+def apply(rewrite):
+	"""Make the rewrite, replacing the link in one step."""
+	temporary_path = rewrite.path + TEMPORARY_SUFFIX
+	try:
+		if rewrite.mode == RELATIVE:
+			os.symlink(rewrite.target, temporary_path)
+		else:
+			shutil.copy2(rewrite.target, temporary_path)
+		os.replace(temporary_path, rewrite.path)
+	except BaseException:
+		if os.path.lexists(temporary_path):
+			os.remove(temporary_path)
+		raise
+
+
+def apply_all(rewrites, max_workers=DEFAULT_MAX_WORKERS):
+	"""
+	Make the rewrites, up to max_workers at a time. Returns a list of (rewrite, None or
+	the exception raised in making it) pairs in the order of rewrites.
+	"""
+	def apply_one(rewrite):
+		try:
+			apply(rewrite)
+			return None
+		except OSError as e:
+			return e
+
+	if max_workers <= 1:
+		return [(rewrite, apply_one(rewrite)) for rewrite in rewrites]
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+		return list(zip(rewrites, executor.map(apply_one, rewrites)))
+
+
+def rewrite_links(root, mode, dry_run=False, max_workers=DEFAULT_MAX_WORKERS, output=None):
+	"""
+	Plan and (unless dry_run is True) make the rewrites of mode of the links in the tree
+	at root, printing a description of each to output (if not None). Returns the number
+	of rewrites that failed plus the number of directories that could not be read.
+	"""
+	errors = []
+	rewrites = plan(root, mode, errors=errors)
+	if dry_run:
+		results = [(rewrite, None) for rewrite in rewrites]
+	else:
+		results = apply_all(rewrites, max_workers)
+
+	failures = len(errors)
+	if output:
+		for path, error in errors:
+			print("ERROR: unable to read directory: " + path + ": " + str(error), file=output)
+
+	for rewrite, error in results:
+		if error is not None:
+			failures += 1
+			if output:
+				print("ERROR: " + describe(rewrite) + ": " + str(error), file=output)
+		elif output:
+			print(describe(rewrite), file=output)
+	return failures
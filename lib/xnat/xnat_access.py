@@ -3,9 +3,7 @@
 """xnat_access.py: Utilities for interacting with and XNAT instance."""
 
 # import of built-in modules
-import requests
 import os
-import inspect
 import sys
 import json
 import time
@@ -22,7 +20,12 @@ from ssl import SSLError
 pass
 
 # path changes and import of local modules
-pass
+import utils.debug_utils as debug_utils
+import utils.lazy_import as lazy_import
+
+# requests is only imported when it is first used, as it is slow to import and most
+# users of this module (e.g. the completion checkers) never make a request
+requests = lazy_import.lazy_module('requests')
 
 # authorship information
 # based on code originally written by either Mohana Ramaratnam or Tony Wilson
@@ -43,43 +46,46 @@ def _inform(msg):
 DEBUG = False
 
 
-def _debug(msg):
-    """ """
-    # Note inspect.stack()[1][3] gives the name of the function that called this debug function
+def _debug(msg, *args):
+    """Output msg % args, prefixed by the name of the calling function, if DEBUG is set.
+
+    Nothing is formatted when DEBUG is not set, so pass values as args instead of
+    converting them to strings in the call.
+    """
     if DEBUG:
-        _inform(inspect.stack()[1][3] + ": DEBUG: " + msg)
+        _inform(debug_utils.get_name(2) + ": DEBUG: " + (msg % args))
 
 
 def get_session_id(server, username, password, project, subject, session):
 
     request_url = 'https://' + server + '/data/projects/' + project + '/subjects/' + subject + '/experiments'
-    _debug("request_url: " + request_url)
+    _debug("request_url: %s", request_url)
 
     response = requests.get(request_url, auth=(username, password))
-    _debug("response: " + str(response))
-    _debug("response.headers: " + str(response.headers))
-    _debug("response.text: " + str(response.text))
+    _debug("response: %s", response)
+    _debug("response.headers: %s", response.headers)
+    _debug("response.text: %s", response.text)
 
     if (response.status_code != 200):
-        _inform(inspect.stack()[0][3] + ": Cannot get response from request: " + request_url)
+        _inform(debug_utils.get_name() + ": Cannot get response from request: " + request_url)
         sys.exit(1)
 
     if 'application/json' not in response.headers['content-type']:
-        _inform(inspect.stack()[0][3] + ": Unexpected response content-type: " + response.headers['content-type'] +
+        _inform(debug_utils.get_name() + ": Unexpected response content-type: " + response.headers['content-type'] +
                 " from " + request_url)
         sys.exit(1)
 
     json_response = json.loads(response.text)
-    _debug("json_response: " + str(json_response))
+    _debug("json_response: %s", json_response)
 
     json_result_set = json_response['ResultSet']
-    _debug("json_result_set: " + str(json_result_set))
+    _debug("json_result_set: %s", json_result_set)
 
     json_record_count = int(json_result_set['totalRecords'])
-    _debug("json_record_count: " + str(json_record_count))
+    _debug("json_record_count: %s", json_record_count)
 
     json_result = json_result_set['Result']
-    _debug("json_result: " + str(json_result))
+    _debug("json_result: %s", json_result)
 
     session_and_session_id_list = []
     for i in range(0, json_record_count):
@@ -88,7 +94,7 @@ def get_session_id(server, username, password, project, subject, session):
             item_list.append(str(json_result[i][key]))
         session_and_session_id_list.append(item_list)
 
-    _debug("session_and_session_id_list: " + str(session_and_session_id_list))
+    _debug("session_and_session_id_list: %s", session_and_session_id_list)
 
     for session_and_session_id in session_and_session_id_list:
         if session == session_and_session_id[0]:
@@ -103,11 +109,11 @@ def get_jsession_id(server, username, password):
     response = requests.get(request_url, auth=(username, password))
 
     if (response.status_code != 200):
-        _inform(inspect.stack()[0][3] + ": Cannot get response from request: " + request_url)
-        _inform(inspect.stack()[0][3] + ": Check username and password")
+        _inform(debug_utils.get_name() + ": Cannot get response from request: " + request_url)
+        _inform(debug_utils.get_name() + ": Check username and password")
         sys.exit(1)
 
-    _debug("response.text: " + str(response.text))
+    _debug("response.text: %s", response.text)
     return str(response.text)
 
 
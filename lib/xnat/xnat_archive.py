@@ -6,7 +6,6 @@ xnat/xnat_archive.py: Provide information to allow direct access to an XNAT data
 
 # import of built-in modules
 import logging
-import logging.config
 import os
 
 # import of third-party modules
@@ -95,6 +94,8 @@ def _simple_interactive_demo():
 	print('build_space_root: ' + archive.build_space_root)
 
 if __name__ == "__main__":
+	# imported here as it is only needed when run as a program and is slow to import
+	import logging.config
 	logging.config.fileConfig(
 		file_utils.get_logging_config_file_name(__file__, False),
 		disable_existing_loggers=False)